@@ -1,11 +1,16 @@
 """
 Tests core caching facilities.
 """
+import os
+import shutil
+import tempfile
 
 from django.test import TestCase
 from opaque_keys.edx.locator import AssetLocator, CourseLocator
 
-from openedx.core.djangoapps.contentserver.caching import del_cached_content, get_cached_content, set_cached_content
+from openedx.core.djangoapps.contentserver.caching import (
+    DiskAssetCache, del_cached_content, get_cached_content, set_cached_content
+)
 
 
 class Content(object):
@@ -43,3 +48,83 @@ class CachingTestCase(TestCase):
                          'should not be stored in cache with unicodeLocation')
         self.assertEqual(None, get_cached_content(self.nonUnicodeLocation),
                          'should not be stored in cache with nonUnicodeLocation')
+
+
+class DiskAssetCacheTestCase(TestCase):
+    """
+    Tests for the local disk cache of course assets.
+    """
+    course_key = CourseLocator(u'mitX', u'800', u'2018')
+
+    def setUp(self):
+        super(DiskAssetCacheTestCase, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.cache = DiskAssetCache(self.directory, 10)
+
+    def _location(self, name):
+        """
+        Returns the location of the asset with the given name.
+        """
+        return self.course_key.make_asset_key(u'asset', name)
+
+    def _cached_files(self):
+        """
+        Returns the names of the files in the cache's directory.
+        """
+        return sorted(
+            filename for __, __, filenames in os.walk(self.directory) for filename in filenames
+        )
+
+    def test_set_and_get(self):
+        location = self._location(u'monsters.jpg')
+        self.assertIsNone(self.cache.get(location, u'abc'))
+
+        path = self.cache.set(location, u'abc', [b'my ', b'content'])
+        self.assertEqual(self.cache.get(location, u'abc'), path)
+        with open(path, 'rb') as cached_file:
+            self.assertEqual(cached_file.read(), b'my content')
+
+        # another version of the asset isn't cached
+        self.assertIsNone(self.cache.get(location, u'def'))
+
+    def test_failed_write(self):
+        def chunks():
+            """
+            Yields a chunk and fails.
+            """
+            yield b'my '
+            raise IOError
+
+        with self.assertRaises(IOError):
+            self.cache.set(self._location(u'monsters.jpg'), u'abc', chunks())
+        self.assertIsNone(self.cache.get(self._location(u'monsters.jpg'), u'abc'))
+        self.assertEqual(self._cached_files(), [])
+
+    def test_evict_least_recently_used(self):
+        paths = []
+        for index, name in enumerate([u'a.jpg', u'b.jpg']):
+            paths.append(self.cache.set(self._location(name), u'abc', [b'1234']))
+            os.utime(paths[-1], (index, index))
+
+        # the first asset was used since the second one was cached
+        self.cache.get(self._location(u'a.jpg'), u'abc')
+        paths.append(self.cache.set(self._location(u'c.jpg'), u'abc', [b'1234']))
+        self.assertEqual(
+            [os.path.exists(path) for path in paths],
+            [True, False, True],
+        )
+
+        self.cache.set(self._location(u'd.jpg'), u'abc', [b'12'])
+        self.assertEqual(len(self._cached_files()), 3)
+
+    def test_evict_old_temporary_files(self):
+        temp_file, temp_path = tempfile.mkstemp(dir=self.directory, prefix=DiskAssetCache.TEMP_PREFIX)
+        os.close(temp_file)
+        os.utime(temp_path, (0, 0))
+        recent_temp_file, recent_temp_path = tempfile.mkstemp(dir=self.directory, prefix=DiskAssetCache.TEMP_PREFIX)
+        os.close(recent_temp_file)
+
+        self.cache.set(self._location(u'a.jpg'), u'abc', [b'1234'])
+        self.assertFalse(os.path.exists(temp_path))
+        self.assertTrue(os.path.exists(recent_temp_path))
@@ -4,9 +4,11 @@ xblock_config Application Configuration
 from __future__ import absolute_import
 
 from django.apps import AppConfig
+from django.conf import settings
 
 import cms.lib.xblock.runtime
 import xmodule.x_module
+from capa.safe_exec import configure_cache, worker_pool
 
 
 class XBlockConfig(AppConfig):
@@ -25,3 +27,7 @@ class XBlockConfig(AppConfig):
         # https://openedx.atlassian.net/wiki/display/PLAT/Convert+from+Storage-centric+runtimes+to+Application-centric+runtimes
         xmodule.x_module.descriptor_global_handler_url = cms.lib.xblock.runtime.handler_url
         xmodule.x_module.descriptor_global_local_resource_url = xblock_local_resource_url
+
+        # Size the pool of sandboxed processes which run the code of capa problems.
+        worker_pool.configure(**settings.CODE_JAIL.get('pool', {}))
+        configure_cache(**settings.CODE_JAIL.get('cache', {}))
@@ -157,6 +157,22 @@ LOG_DIR = ENV_TOKENS['LOG_DIR']
 DATA_DIR = path(ENV_TOKENS.get('DATA_DIR', DATA_DIR))
 
 CACHES = ENV_TOKENS['CACHES']
+COURSE_STRUCTURE_CACHE_LOCAL_MAX_SIZE = ENV_TOKENS.get(
+    'COURSE_STRUCTURE_CACHE_LOCAL_MAX_SIZE', COURSE_STRUCTURE_CACHE_LOCAL_MAX_SIZE
+)
+COURSE_STRUCTURE_CACHE_CODEC = ENV_TOKENS.get('COURSE_STRUCTURE_CACHE_CODEC', COURSE_STRUCTURE_CACHE_CODEC)
+CONTENTSERVER_STREAM_CHUNK_SIZE = ENV_TOKENS.get('CONTENTSERVER_STREAM_CHUNK_SIZE', CONTENTSERVER_STREAM_CHUNK_SIZE)
+CONTENTSERVER_DISK_CACHE_DIR = ENV_TOKENS.get('CONTENTSERVER_DISK_CACHE_DIR', CONTENTSERVER_DISK_CACHE_DIR)
+CONTENTSERVER_DISK_CACHE_MAX_SIZE = ENV_TOKENS.get(
+    'CONTENTSERVER_DISK_CACHE_MAX_SIZE', CONTENTSERVER_DISK_CACHE_MAX_SIZE
+)
+CONTENTSERVER_DISK_CACHE_MAX_FILE_SIZE = ENV_TOKENS.get(
+    'CONTENTSERVER_DISK_CACHE_MAX_FILE_SIZE', CONTENTSERVER_DISK_CACHE_MAX_FILE_SIZE
+)
+CONTENTSERVER_DISK_CACHE_ACCEL_REDIRECT_PREFIX = ENV_TOKENS.get(
+    'CONTENTSERVER_DISK_CACHE_ACCEL_REDIRECT_PREFIX', CONTENTSERVER_DISK_CACHE_ACCEL_REDIRECT_PREFIX
+)
+
 # Cache used for location mapping -- called many times with the same key/value
 # in a given request.
 if 'loc_cache' not in CACHES:
@@ -570,6 +570,11 @@ XBLOCK_FIELD_DATA_WRAPPERS = ()
 ############################ Modulestore Configuration ################################
 MODULESTORE_BRANCH = 'draft-preferred'
 
+# DOC_STORE_CONFIG is shared with the LMS. Other options, such as 'maxPoolSize',
+# 'waitQueueTimeoutMS' and 'socketTimeoutMS', are passed to the MongoDB client.
+# Size 'maxPoolSize' for the threads serving requests in each process; an operation
+# waits at most 'waitQueueTimeoutMS' for a free connection.
+
 MODULESTORE = {
     'default': {
         'ENGINE': 'xmodule.modulestore.mixed.MixedModuleStore',
@@ -584,6 +589,7 @@ MODULESTORE = {
                         'default_class': 'xmodule.hidden_module.HiddenDescriptor',
                         'fs_root': DATA_DIR,
                         'render_template': 'edxmako.shortcuts.render_to_string',
+                        'definition_prefetch_size': 100,
                     }
                 },
                 {
@@ -601,6 +607,37 @@ MODULESTORE = {
     }
 }
 
+# Maximum total size in bytes of the course structures that each process keeps in
+# memory, in front of the 'course_structure_cache'. Set to 0 to disable.
+COURSE_STRUCTURE_CACHE_LOCAL_MAX_SIZE = 64 * 1024 * 1024
+
+# The codec used to store course structures in the 'course_structure_cache', named
+# '<serializer>-<compressor>'. The serializers are 'pickle', and 'flat', which stores
+# blocks in a form that is faster to load. The compressors are 'zlib', and 'lz4' if
+# the lz4 package is installed.
+COURSE_STRUCTURE_CACHE_CODEC = 'pickle-zlib'
+
+# Size in bytes of the chunks in which the contentserver streams assets which aren't
+# cached. None streams each asset in the chunks it is stored in, in GridFS.
+CONTENTSERVER_STREAM_CHUNK_SIZE = None
+
+# Directory in which the contentserver keeps copies of the course assets too big for the
+# 'course_assets' cache, so that they aren't read from GridFS again. None disables it.
+CONTENTSERVER_DISK_CACHE_DIR = None
+
+# Maximum total size in bytes of the copies in CONTENTSERVER_DISK_CACHE_DIR.
+CONTENTSERVER_DISK_CACHE_MAX_SIZE = 1024 * 1024 * 1024
+
+# Maximum size in bytes of an asset copied to CONTENTSERVER_DISK_CACHE_DIR. Assets are copied
+# whole before being served, even for range requests, so bigger ones are streamed from GridFS
+# instead. None copies assets of any size.
+CONTENTSERVER_DISK_CACHE_MAX_FILE_SIZE = 50 * 1024 * 1024
+
+# URL prefix of an internal location of the web server (e.g. nginx) which serves the files of
+# CONTENTSERVER_DISK_CACHE_DIR, to have it send the copies via X-Accel-Redirect. None sends
+# them from the app server.
+CONTENTSERVER_DISK_CACHE_ACCEL_REDIRECT_PREFIX = None
+
 # Modulestore-level field override providers. These field override providers don't
 # require student context.
 MODULESTORE_FIELD_OVERRIDE_PROVIDERS = ()
@@ -618,6 +655,24 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # Pool of warm sandboxed Python processes, per app process, which run the
+    # jailed code in forked copies of themselves.
+    'pool': {
+        # How many processes?  0 starts a new sandboxed process for each execution.
+        'size': 0,
+        # After how many executions is a process replaced?
+        'max_executions': 100,
+        # How many seconds to wait for a busy pool before running the code in a new process?
+        'queue_timeout': 1,
+    },
+
+    # Results of jailed code kept in the memory of each app process, in front
+    # of the django cache shared by all of them.
+    'cache': {
+        # How many results?  0 only uses the shared cache.
+        'local_size': 1000,
+    },
 }
 
 ############################ DJANGO_BUILTINS ################################
@@ -163,6 +163,7 @@ CACHES = {
         'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
     },
 }
+COURSE_STRUCTURE_CACHE_LOCAL_MAX_SIZE = 0
 
 ################################# CELERY ######################################
 
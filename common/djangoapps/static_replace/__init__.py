@@ -4,6 +4,8 @@ import re
 from django.contrib.staticfiles.storage import staticfiles_storage
 from django.contrib.staticfiles import finders
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 
 from xmodule.contentstore.content import StaticContent
 
@@ -13,6 +15,14 @@ from six import text_type
 log = logging.getLogger(__name__)
 XBLOCK_STATIC_RESOURCE_PREFIX = '/static/xblock'
 
+# Compiled url replacement patterns, by prefix.
+_URL_REPLACE_PATTERNS = {}
+
+# Results of staticfiles_storage lookups, which don't change once the static files are collected,
+# by (id(storage), method name, path).
+_STATICFILES_LOOKUPS = {}
+MAX_STATICFILES_LOOKUPS = 10000
+
 
 def _url_replace_regex(prefix):
     """
@@ -30,13 +40,65 @@ def _url_replace_regex(prefix):
         """.format(prefix=prefix)
 
 
+def _url_replace_pattern(prefix):
+    """
+    Returns the compiled _url_replace_regex for the given prefix.
+    """
+    pattern = _URL_REPLACE_PATTERNS.get(prefix)
+    if pattern is None:
+        pattern = _URL_REPLACE_PATTERNS[prefix] = re.compile(_url_replace_regex(prefix))
+    return pattern
+
+
+def _static_url_prefix(data_dir):
+    """
+    Returns the url prefix of static urls, excluding those in the given data directory.
+    """
+    return u'(?:{static_url}|/static/)(?!{data_dir})'.format(
+        static_url=settings.STATIC_URL,
+        data_dir=data_dir
+    )
+
+
+def _staticfiles_lookup(method_name, path):
+    """
+    Returns the result of the given method of staticfiles_storage for the given path,
+    memoized unless in debug mode, when the static files may change.
+    """
+    storage = staticfiles_storage
+    if settings.DEBUG:
+        return getattr(storage, method_name)(path)
+
+    key = (id(storage), method_name, path)
+    lookup = _STATICFILES_LOOKUPS.get(key)
+    # The storage is kept with the result, so that its id isn't reused.
+    if lookup is not None and lookup[0] is storage:
+        return lookup[1]
+
+    result = getattr(storage, method_name)(path)
+    if len(_STATICFILES_LOOKUPS) >= MAX_STATICFILES_LOOKUPS:
+        _STATICFILES_LOOKUPS.clear()
+    _STATICFILES_LOOKUPS[key] = (storage, result)
+    return result
+
+
+@receiver(setting_changed)
+def _clear_staticfiles_lookups(setting, **kwargs):  # pylint: disable=unused-argument
+    """
+    Clears the memoized staticfiles_storage lookups when the static files settings are changed,
+    as in tests.
+    """
+    if setting in ('STATICFILES_STORAGE', 'STATIC_ROOT', 'STATIC_URL', 'DEBUG'):
+        _STATICFILES_LOOKUPS.clear()
+
+
 def try_staticfiles_lookup(path):
     """
     Try to lookup a path in staticfiles_storage.  If it fails, return
     a dead link instead of raising an exception.
     """
     try:
-        url = staticfiles_storage.url(path)
+        url = _staticfiles_lookup('url', path)
     except Exception as err:
         log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
             path, str(err)))
@@ -71,7 +133,7 @@ def replace_jump_to_id_urls(text, course_id, jump_to_id_base_url):
         rest = match.group('rest')
         return "".join([quote, jump_to_id_base_url + rest, quote])
 
-    return re.sub(_url_replace_regex('/jump_to_id/'), replace_jump_to_id_url, text)
+    return _url_replace_pattern('/jump_to_id/').sub(replace_jump_to_id_url, text)
 
 
 def replace_course_urls(text, course_key):
@@ -91,7 +153,21 @@ def replace_course_urls(text, course_key):
         rest = match.group('rest')
         return "".join([quote, '/courses/' + course_id + '/', rest, quote])
 
-    return re.sub(_url_replace_regex('/course/'), replace_course_url, text)
+    return _url_replace_pattern('/course/').sub(replace_course_url, text)
+
+
+def _is_xblock_resource_url(prefix, rest):
+    """
+    Returns whether the matched static url is an XBlock resource link, which isn't rewritten.
+    """
+    # Probably wasn't a good idea that /static works for actual static assets and for
+    # magical course asset URLs....
+    full_url = prefix + rest
+
+    starts_with_static_url = full_url.startswith(unicode(settings.STATIC_URL))
+    starts_with_prefix = full_url.startswith(XBLOCK_STATIC_RESOURCE_PREFIX)
+    contains_prefix = XBLOCK_STATIC_RESOURCE_PREFIX in full_url
+    return starts_with_prefix or (starts_with_static_url and contains_prefix)
 
 
 def process_static_urls(text, replacement_function, data_dir=None):
@@ -109,26 +185,13 @@ def process_static_urls(text, replacement_function, data_dir=None):
         quote = match.group('quote')
         rest = match.group('rest')
 
-        # Don't rewrite XBlock resource links.  Probably wasn't a good idea that /static
-        # works for actual static assets and for magical course asset URLs....
-        full_url = prefix + rest
-
-        starts_with_static_url = full_url.startswith(unicode(settings.STATIC_URL))
-        starts_with_prefix = full_url.startswith(XBLOCK_STATIC_RESOURCE_PREFIX)
-        contains_prefix = XBLOCK_STATIC_RESOURCE_PREFIX in full_url
-        if starts_with_prefix or (starts_with_static_url and contains_prefix):
+        # Don't rewrite XBlock resource links.
+        if _is_xblock_resource_url(prefix, rest):
             return original
 
         return replacement_function(original, prefix, quote, rest)
 
-    return re.sub(
-        _url_replace_regex(u'(?:{static_url}|/static/)(?!{data_dir})'.format(
-            static_url=settings.STATIC_URL,
-            data_dir=data_dir
-        )),
-        wrap_part_extraction,
-        text
-    )
+    return _url_replace_pattern(_static_url_prefix(data_dir)).sub(wrap_part_extraction, text)
 
 
 def make_static_urls_absolute(request, html):
@@ -148,6 +211,67 @@ def make_static_urls_absolute(request, html):
     )
 
 
+def _replace_static_url(original, prefix, quote, rest, data_directory, course_id, static_asset_path,
+                        static_paths_out):
+    """
+    Replace a single matched static url. See replace_static_urls.
+    """
+    original_uri = "".join([prefix, rest])
+    # Don't mess with things that end in '?raw'
+    if rest.endswith('?raw'):
+        static_paths_out.append((original_uri, original_uri))
+        return original
+
+    # In debug mode, if we can find the url as is,
+    if settings.DEBUG and finders.find(rest, True):
+        static_paths_out.append((original_uri, original_uri))
+        return original
+
+    # if we're running with a MongoBacked store course_namespace is not None, then use studio style urls
+    elif (not static_asset_path) and course_id:
+        # first look in the static file pipeline and see if we are trying to reference
+        # a piece of static content which is in the edx-platform repo (e.g. JS associated with an xmodule)
+
+        exists_in_staticfiles_storage = False
+        try:
+            exists_in_staticfiles_storage = _staticfiles_lookup('exists', rest)
+        except Exception as err:
+            log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
+                rest, str(err)))
+
+        if exists_in_staticfiles_storage:
+            url = _staticfiles_lookup('url', rest)
+        else:
+            # if not, then assume it's courseware specific content and then look in the
+            # Mongo-backed database
+            # Import is placed here to avoid model import at project startup.
+            from static_replace.models import AssetBaseUrlConfig, AssetExcludedExtensionsConfig
+            base_url = AssetBaseUrlConfig.get_base_url()
+            excluded_exts = AssetExcludedExtensionsConfig.get_excluded_extensions()
+            url = StaticContent.get_canonicalized_asset_path(course_id, rest, base_url, excluded_exts)
+
+            if AssetLocator.CANONICAL_NAMESPACE in url:
+                url = url.replace('block@', 'block/', 1)
+
+    # Otherwise, look the file up in staticfiles_storage, and append the data directory if needed
+    else:
+        course_path = "/".join((static_asset_path or data_directory, rest))
+
+        try:
+            if _staticfiles_lookup('exists', rest):
+                url = _staticfiles_lookup('url', rest)
+            else:
+                url = _staticfiles_lookup('url', course_path)
+        # And if that fails, assume that it's course content, and add manually data directory
+        except Exception as err:
+            log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
+                rest, str(err)))
+            url = "".join([prefix, course_path])
+
+    static_paths_out.append((original_uri, url))
+    return "".join([quote, url, quote])
+
+
 def replace_static_urls(text, data_directory=None, course_id=None, static_asset_path='', static_paths_out=None):
     """
     Replace /static/$stuff urls either with their correct url as generated by collectstatic,
@@ -171,59 +295,50 @@ def replace_static_urls(text, data_directory=None, course_id=None, static_asset_
         """
         Replace a single matched url.
         """
-        original_uri = "".join([prefix, rest])
-        # Don't mess with things that end in '?raw'
-        if rest.endswith('?raw'):
-            static_paths_out.append((original_uri, original_uri))
-            return original
+        return _replace_static_url(
+            original, prefix, quote, rest, data_directory, course_id, static_asset_path, static_paths_out
+        )
 
-        # In debug mode, if we can find the url as is,
-        if settings.DEBUG and finders.find(rest, True):
-            static_paths_out.append((original_uri, original_uri))
-            return original
+    return process_static_urls(text, replace_static_url, data_dir=static_asset_path or data_directory)
 
-        # if we're running with a MongoBacked store course_namespace is not None, then use studio style urls
-        elif (not static_asset_path) and course_id:
-            # first look in the static file pipeline and see if we are trying to reference
-            # a piece of static content which is in the edx-platform repo (e.g. JS associated with an xmodule)
 
-            exists_in_staticfiles_storage = False
-            try:
-                exists_in_staticfiles_storage = staticfiles_storage.exists(rest)
-            except Exception as err:
-                log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
-                    rest, str(err)))
+def replace_urls(text, data_directory=None, course_id=None, static_asset_path='', jump_to_id_base_url=None,
+                 static_paths_out=None):
+    """
+    Does the replacements of replace_static_urls, then, if course_id is given, those of
+    replace_course_urls, then, if jump_to_id_base_url is given, those of replace_jump_to_id_urls,
+    in a single scan of the text.
 
-            if exists_in_staticfiles_storage:
-                url = staticfiles_storage.url(rest)
-            else:
-                # if not, then assume it's courseware specific content and then look in the
-                # Mongo-backed database
-                # Import is placed here to avoid model import at project startup.
-                from static_replace.models import AssetBaseUrlConfig, AssetExcludedExtensionsConfig
-                base_url = AssetBaseUrlConfig.get_base_url()
-                excluded_exts = AssetExcludedExtensionsConfig.get_excluded_extensions()
-                url = StaticContent.get_canonicalized_asset_path(course_id, rest, base_url, excluded_exts)
-
-                if AssetLocator.CANONICAL_NAMESPACE in url:
-                    url = url.replace('block@', 'block/', 1)
-
-        # Otherwise, look the file up in staticfiles_storage, and append the data directory if needed
+    See those functions for the arguments.
+    """
+    if static_paths_out is None:
+        static_paths_out = []
+
+    prefixes = [u'(?P<static>{})'.format(_static_url_prefix(static_asset_path or data_directory))]
+    if course_id is not None:
+        prefixes.append(u'(?P<course>/course/)')
+        course_url = u'/courses/{}/'.format(text_type(course_id))
+    if jump_to_id_base_url is not None:
+        prefixes.append(u'(?P<jump_to_id>/jump_to_id/)')
+
+    def replace_url(match):
+        """
+        Replace a single matched url of any kind.
+        """
+        original = match.group(0)
+        prefix = match.group('prefix')
+        quote = match.group('quote')
+        rest = match.group('rest')
+
+        if match.group('static') is not None:
+            if _is_xblock_resource_url(prefix, rest):
+                return original
+            return _replace_static_url(
+                original, prefix, quote, rest, data_directory, course_id, static_asset_path, static_paths_out
+            )
+        elif course_id is not None and match.group('course') is not None:
+            return "".join([quote, course_url, rest, quote])
         else:
-            course_path = "/".join((static_asset_path or data_directory, rest))
-
-            try:
-                if staticfiles_storage.exists(rest):
-                    url = staticfiles_storage.url(rest)
-                else:
-                    url = staticfiles_storage.url(course_path)
-            # And if that fails, assume that it's course content, and add manually data directory
-            except Exception as err:
-                log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
-                    rest, str(err)))
-                url = "".join([prefix, course_path])
-
-        static_paths_out.append((original_uri, url))
-        return "".join([quote, url, quote])
+            return "".join([quote, jump_to_id_base_url + rest, quote])
 
-    return process_static_urls(text, replace_static_url, data_dir=static_asset_path or data_directory)
+    return _url_replace_pattern(u'|'.join(prefixes)).sub(replace_url, text)
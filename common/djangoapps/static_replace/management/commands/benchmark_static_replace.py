@@ -0,0 +1,84 @@
+"""
+Django management command to compare the speed of the url replacements done on the html of courses.
+"""
+import timeit
+
+from django.core.management.base import BaseCommand
+from six import text_type
+
+from openedx.core.lib.command_utils import parse_course_keys
+from static_replace import replace_course_urls, replace_jump_to_id_urls, replace_static_urls, replace_urls
+from xmodule.modulestore.django import modulestore
+
+JUMP_TO_ID_BASE_URL = u'/courses/{course_id}/jump_to_id/'
+
+
+class Command(BaseCommand):
+    """
+    Example usage:
+        $ ./manage.py lms benchmark_static_replace 'edX/DemoX/Demo_Course' --settings=devstack
+    """
+    help = (
+        u'Compares the speed of replace_static_urls, replace_course_urls and replace_jump_to_id_urls, '
+        u'one after the other, and of replace_urls, on the html and problems of courses.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'courses',
+            nargs='+',
+            help=u'Course keys of the courses whose html is to be benchmarked.',
+        )
+        parser.add_argument(
+            '--iterations',
+            help=u'Number of times to repeat each measurement.',
+            default=5,
+            type=int,
+        )
+
+    def handle(self, *args, **options):
+        store = modulestore()
+        for course_key in parse_course_keys(options['courses']):
+            texts = [
+                block.data
+                for category in ('html', 'problem')
+                for block in store.get_items(course_key, qualifiers={'category': category})
+            ]
+            course = store.get_course(course_key)
+            self.stdout.write(u'{}: {} blocks, {} characters'.format(
+                course_key, len(texts), sum(len(text) for text in texts)
+            ))
+            self._benchmark(course, texts, options['iterations'])
+
+    def _benchmark(self, course, texts, iterations):
+        """
+        Writes the best time out of the given number of iterations for replacing
+        the urls of all of the given texts, in three passes and in one.
+        """
+        data_directory = getattr(course, 'data_dir', None)
+        jump_to_id_base_url = JUMP_TO_ID_BASE_URL.format(course_id=text_type(course.id))
+
+        def three_passes(text):
+            """
+            Replaces the urls of the text with the three functions, one after the other.
+            """
+            text = replace_static_urls(text, data_directory, course.id, static_asset_path=course.static_asset_path)
+            text = replace_course_urls(text, course.id)
+            return replace_jump_to_id_urls(text, course.id, jump_to_id_base_url)
+
+        def one_pass(text):
+            """
+            Replaces the urls of the text with replace_urls.
+            """
+            return replace_urls(
+                text, data_directory, course.id, static_asset_path=course.static_asset_path,
+                jump_to_id_base_url=jump_to_id_base_url,
+            )
+
+        differences = sum(1 for text in texts if three_passes(text) != one_pass(text))
+        if differences:
+            self.stdout.write(u'  {} blocks have different replacements'.format(differences))
+
+        for name, replace in ((u'three passes', three_passes), (u'one pass', one_pass)):
+            timing = min(timeit.repeat(lambda: [replace(text) for text in texts], number=1, repeat=iterations))
+            self.stdout.write(u'  {:<12} {:8.1f} ms'.format(name, timing * 1000))
@@ -14,12 +14,16 @@ from mock import Mock, patch
 from opaque_keys.edx.keys import CourseKey
 from PIL import Image
 
+import static_replace
 from static_replace import (
     _url_replace_regex,
     make_static_urls_absolute,
     process_static_urls,
     replace_course_urls,
-    replace_static_urls
+    replace_jump_to_id_urls,
+    replace_static_urls,
+    replace_urls,
+    try_staticfiles_lookup
 )
 from xmodule.assetstore.assetmgr import AssetManager
 from xmodule.contentstore.content import StaticContent
@@ -250,6 +254,89 @@ def test_static_url_with_xblock_resource_on_cdn(mock_modulestore, mock_storage):
     assert replace_static_urls(pre_text, DATA_DIRECTORY, COURSE_KEY) == post_text
 
 
+@pytest.mark.django_db
+@pytest.mark.parametrize('data_directory, course_id, static_asset_path', [
+    (DATA_DIRECTORY, None, ''),
+    (DATA_DIRECTORY, COURSE_KEY, ''),
+    (DATA_DIRECTORY, COURSE_KEY, 'static_asset_path'),
+])
+@patch('static_replace.staticfiles_storage', autospec=True)
+@patch('xmodule.modulestore.django.modulestore', autospec=True)
+def test_replace_urls(mock_modulestore, mock_storage, data_directory, course_id, static_asset_path):
+    """
+    Make sure that replace_urls does, in one pass, the same replacements as replace_static_urls,
+    replace_course_urls and replace_jump_to_id_urls, one after the other.
+    """
+    mock_storage.exists.side_effect = lambda path: path == 'js/file.js'
+    mock_storage.url.side_effect = lambda path: '/static/hashed/' + path
+    mock_modulestore.return_value = Mock(MongoModuleStore)
+
+    text = (
+        '<a href="/static/file.png">"/course/about" <img src=\'/static/js/file.js\'/> "/static/data_dir/file.png" '
+        '"/jump_to_id/some_id" "/static/xblock/resources/file.png" "/static/foo.png?raw" \\"/course/\\" '
+        '<a href="/courses/course">"/static/unmatched'
+    )
+    expected_static_paths = []
+    expected = replace_static_urls(
+        text, data_directory, course_id, static_asset_path, static_paths_out=expected_static_paths
+    )
+    if course_id is not None:
+        expected = replace_course_urls(expected, course_id)
+    expected = replace_jump_to_id_urls(expected, course_id, '/jump_to/')
+
+    static_paths = []
+    assert replace_urls(
+        text, data_directory, course_id, static_asset_path, jump_to_id_base_url='/jump_to/',
+        static_paths_out=static_paths
+    ) == expected
+    assert static_paths == expected_static_paths
+
+
+@patch('static_replace.staticfiles_storage', autospec=True)
+def test_staticfiles_lookups_memoized(mock_storage):
+    """
+    Make sure that staticfiles_storage lookups are only done once per path.
+    """
+    mock_storage.exists.return_value = False
+    mock_storage.url.side_effect = lambda path: '/static/hashed/' + path
+
+    assert try_staticfiles_lookup('file.png') == '/static/hashed/file.png'
+    assert try_staticfiles_lookup('file.png') == '/static/hashed/file.png'
+    assert replace_static_urls(STATIC_SOURCE, DATA_DIRECTORY) == '"/static/hashed/data_dir/file.png"'
+    assert replace_static_urls(STATIC_SOURCE, DATA_DIRECTORY) == '"/static/hashed/data_dir/file.png"'
+    assert mock_storage.url.call_count == 2
+    mock_storage.exists.assert_called_once_with('file.png')
+
+    with override_settings(STATIC_URL='/other_static/'):
+        assert try_staticfiles_lookup('file.png') == '/static/hashed/file.png'
+    assert mock_storage.url.call_count == 3
+
+
+@patch('static_replace.staticfiles_storage', autospec=True)
+@override_settings(DEBUG=True)
+def test_staticfiles_lookups_not_memoized_in_debug(mock_storage):
+    """
+    Make sure that staticfiles_storage lookups aren't memoized in debug mode, when the files may change.
+    """
+    mock_storage.url.side_effect = lambda path: '/static/hashed/' + path
+
+    assert try_staticfiles_lookup('file.png') == '/static/hashed/file.png'
+    assert try_staticfiles_lookup('file.png') == '/static/hashed/file.png'
+    assert mock_storage.url.call_count == 2
+
+
+def test_url_replace_patterns_compiled_once():
+    """
+    Make sure that the url replacement patterns are only compiled once.
+    """
+    with patch.dict(static_replace._URL_REPLACE_PATTERNS, clear=True):  # pylint: disable=protected-access
+        with patch('static_replace.re.compile', wraps=re.compile) as mock_compile:
+            for __ in range(2):
+                replace_course_urls('"/course/file.png"', COURSE_KEY)
+                replace_urls('"/course/file.png"', DATA_DIRECTORY, COURSE_KEY, jump_to_id_base_url='/jump_to/')
+    assert mock_compile.call_count == 2
+
+
 @ddt.ddt
 class CanonicalContentTest(SharedModuleStoreTestCase):
     """
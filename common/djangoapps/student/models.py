@@ -135,6 +135,21 @@ class AnonymousUserId(models.Model):
     course_id = CourseKeyField(db_index=True, max_length=255, blank=True)
 
 
+def compute_anonymous_id_for_user(user, course_id):
+    """
+    Return the unique id for a (user, course) pair that `anonymous_id_for_user`
+    returns, without saving it in an AnonymousUserId object, nor caching it on
+    the user, so that a later call to `anonymous_id_for_user` still saves it.
+    """
+    # include the secret key as a salt, and to make the ids unique across different LMS installs.
+    hasher = hashlib.md5()
+    hasher.update(settings.SECRET_KEY)
+    hasher.update(text_type(user.id))
+    if course_id:
+        hasher.update(text_type(course_id).encode('utf-8'))
+    return hasher.hexdigest()
+
+
 def anonymous_id_for_user(user, course_id, save=True):
     """
     Return a unique id for a (user, course) pair, suitable for inserting
@@ -155,13 +170,7 @@ def anonymous_id_for_user(user, course_id, save=True):
     if cached_id is not None:
         return cached_id
 
-    # include the secret key as a salt, and to make the ids unique across different LMS installs.
-    hasher = hashlib.md5()
-    hasher.update(settings.SECRET_KEY)
-    hasher.update(text_type(user.id))
-    if course_id:
-        hasher.update(text_type(course_id).encode('utf-8'))
-    digest = hasher.hexdigest()
+    digest = compute_anonymous_id_for_user(user, course_id)
 
     if not hasattr(user, '_anonymous_id'):
         user._anonymous_id = {}  # pylint: disable=protected-access
@@ -40,6 +40,7 @@ from student.models import (
     LinkedInAddToProfileConfiguration,
     UserAttribute,
     anonymous_id_for_user,
+    compute_anonymous_id_for_user,
     unique_id_for_user,
     user_by_anonymous_id
 )
@@ -1041,6 +1042,12 @@ class AnonymousLookupTable(ModuleStoreTestCase):
         self.assertEqual(self.user, real_user)
         self.assertEqual(anonymous_id, anonymous_id_for_user(self.user, self.course.id, save=False))
 
+    def test_computed_id_saved_later(self):
+        anonymous_id = compute_anonymous_id_for_user(self.user, self.course.id)
+        self.assertIsNone(user_by_anonymous_id(anonymous_id))
+        self.assertEqual(anonymous_id, anonymous_id_for_user(self.user, self.course.id))
+        self.assertEqual(self.user, user_by_anonymous_id(anonymous_id))
+
     def test_roundtrip_with_unicode_course_id(self):
         course2 = CourseFactory.create(display_name=u"Omega Course Ω")
         CourseEnrollment.enroll(self.user, course2.id)
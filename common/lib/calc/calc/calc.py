@@ -7,6 +7,8 @@ Uses pyparsing to parse. Main function as of now is evaluator().
 import math
 import numbers
 import operator
+import threading
+from collections import OrderedDict
 
 import numpy
 import scipy.constants
@@ -70,6 +72,13 @@ DEFAULT_FUNCTIONS = {
     'arccoth': functions.arccoth
 }
 
+# The default functions which evaluate arrays of values element by element,
+# the way they evaluate single values.
+VECTORIZED_FUNCTIONS = set(
+    function for name, function in DEFAULT_FUNCTIONS.iteritems()
+    if name not in ('fact', 'factorial', 'arccot')
+)
+
 DEFAULT_VARIABLES = {
     'i': numpy.complex(0, 1),
     'j': numpy.complex(0, 1),
@@ -81,6 +90,9 @@ SUFFIXES = {
     '%': 0.01,
 }
 
+# How many compiled expressions to keep, for `evaluator` to reuse.
+MAX_COMPILED_EXPRESSIONS = 1000
+
 
 class UndefinedVariable(Exception):
     """
@@ -216,6 +228,95 @@ def eval_product(parse_result):
     return prod
 
 
+# The following evaluation actions replace the ones above when evaluating
+# arrays of samples at once, see `CompiledExpression.evaluate_samples`.
+
+def eval_atom_array(parse_result):
+    """
+    Return the value wrapped by the atom, which may be an array.
+    """
+    return next(k for k in parse_result if not isinstance(k, basestring))
+
+
+def eval_power_array(parse_result):
+    """
+    Exponentiate numbers or arrays, right to left, like `eval_power`.
+    """
+    parse_result = reversed(
+        [k for k in parse_result
+         if not isinstance(k, basestring)]  # Ignore the '^' marks.
+    )
+    return reduce(lambda a, b: b ** a, parse_result)
+
+
+def eval_parallel_array(parse_result):
+    """
+    Compute the parallel resistors operator of numbers or arrays, like `eval_parallel`.
+
+    The result is NaN for the elements where an input is zero.
+    """
+    values = [e for e in parse_result if not isinstance(e, basestring)]
+    if len(values) == 1:
+        return values[0]
+    has_zero = reduce(numpy.logical_or, [numpy.equal(e, 0) for e in values])
+    # Don't divide by the zeros, their results are replaced anyway.
+    reciprocals = [1. / numpy.where(numpy.equal(e, 0), 1., e) for e in values]
+    return numpy.where(has_zero, float('nan'), 1. / sum(reciprocals))
+
+
+def eval_sum_array(parse_result):
+    """
+    Add the inputs, which may be arrays, keeping in mind their sign, like `eval_sum`.
+    """
+    total = 0.0
+    current_op = operator.add
+    for token in parse_result:
+        if isinstance(token, basestring):
+            current_op = operator.sub if token == '-' else operator.add
+        else:
+            total = current_op(total, token)
+    return total
+
+
+def eval_product_array(parse_result):
+    """
+    Multiply the inputs, which may be arrays, like `eval_product`.
+    """
+    prod = 1.0
+    current_op = operator.mul
+    for token in parse_result:
+        if isinstance(token, basestring):
+            current_op = operator.truediv if token == '/' else operator.mul
+        else:
+            prod = current_op(prod, token)
+    return prod
+
+
+def variable_arrays(variables_list):
+    """
+    Return a dictionary from each variable to the array of its values in the
+    dictionaries of `variables_list`.
+
+    Return None if the dictionaries don't all have the same variables, or if
+    some of their values aren't numbers.
+    """
+    if not variables_list:
+        return None
+    names = set(variables_list[0])
+    if any(set(variables) != names for variables in variables_list[1:]):
+        return None
+
+    arrays = {}
+    for name in names:
+        array = numpy.array([variables[name] for variables in variables_list])
+        if array.dtype.kind in 'iu':
+            array = array.astype(float)
+        elif array.dtype.kind not in 'fc':
+            return None
+        arrays[name] = array
+    return arrays
+
+
 def add_defaults(variables, functions, case_sensitive):
     """
     Create dictionaries with both the default and user-defined variables.
@@ -239,40 +340,59 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
     -Variables are passed as a dictionary from string to value. They must be
      python numbers.
     -Unary functions are passed as a dictionary from string to function.
+
+    The expression is only parsed the first time it is evaluated, see
+    `compile_expression`.
     """
     # No need to go further.
     if math_expr.strip() == "":
         return float('nan')
 
-    # Parse the tree.
-    check_parens(math_expr)
-    math_interpreter = ParseAugmenter(math_expr, case_sensitive)
-    math_interpreter.parse_algebra()
+    return compile_expression(math_expr, case_sensitive).evaluate(variables, functions)
 
-    # Get our variables together.
-    all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
 
-    # ...and check them
-    math_interpreter.check_variables(all_variables, all_functions)
+def evaluate_samples(variables_list, functions, math_expr, case_sensitive=False):
+    """
+    Evaluate an expression for each dictionary of variables in `variables_list`,
+    e.g. random samples of the variables, and return the list of results.
+
+    The results and exceptions are the same as those of calling `evaluator`
+    for each of the samples, see `CompiledExpression.evaluate_samples`.
+    """
+    # No need to go further.
+    if math_expr.strip() == "":
+        return [float('nan')] * len(variables_list)
+
+    return compile_expression(math_expr, case_sensitive).evaluate_samples(variables_list, functions)
 
-    # Create a recursion to evaluate the tree.
-    if case_sensitive:
-        casify = lambda x: x
-    else:
-        casify = lambda x: x.lower()  # Lowercase for case insens.
-
-    evaluate_actions = {
-        'number': eval_number,
-        'variable': lambda x: all_variables[casify(x[0])],
-        'function': lambda x: all_functions[casify(x[0])](x[1]),
-        'atom': eval_atom,
-        'power': eval_power,
-        'parallel': eval_parallel,
-        'product': eval_product,
-        'sum': eval_sum
-    }
 
-    return math_interpreter.reduce_tree(evaluate_actions)
+def compile_expression(math_expr, case_sensitive=False):
+    """
+    Return the `CompiledExpression` of `math_expr`.
+
+    The most recently used compiled expressions are kept, so that evaluating
+    an expression many times, e.g. at each sample of a formula, or for each
+    student who gave the same answer, only parses it once.
+    """
+    key = (math_expr, case_sensitive)
+    with COMPILED_EXPRESSIONS_LOCK:
+        compiled = COMPILED_EXPRESSIONS.pop(key, None)
+        if compiled is not None:
+            COMPILED_EXPRESSIONS[key] = compiled
+            return compiled
+
+    # Parse outside of the lock; an expression that doesn't parse isn't kept.
+    compiled = CompiledExpression(math_expr, case_sensitive)
+
+    with COMPILED_EXPRESSIONS_LOCK:
+        COMPILED_EXPRESSIONS[key] = compiled
+        while len(COMPILED_EXPRESSIONS) > MAX_COMPILED_EXPRESSIONS:
+            COMPILED_EXPRESSIONS.popitem(last=False)
+    return compiled
+
+
+COMPILED_EXPRESSIONS = OrderedDict()
+COMPILED_EXPRESSIONS_LOCK = threading.Lock()
 
 
 def check_parens(formula):
@@ -466,3 +586,132 @@ class ParseAugmenter(object):
 
         if bad_vars:
             raise UndefinedVariable(' '.join(sorted(bad_vars)))
+
+
+def compile_operation(eval_function):
+    """
+    Return a compile action which calls `eval_function` on the values of the
+    child nodes, like `reduce_tree` does.
+
+    The terminal nodes, e.g. operators, are passed to `eval_function` as they are.
+    """
+    def compile_node(parse_result):
+        """
+        Return the function evaluating the node from the functions evaluating its children.
+        """
+        children = [
+            child if callable(child) else (lambda token: lambda variables, functions: token)(child)
+            for child in parse_result
+        ]
+        return lambda variables, functions: eval_function(
+            [child(variables, functions) for child in children]
+        )
+    return compile_node
+
+
+def compile_number(parse_result):
+    """
+    Return the function evaluating a number, which is computed once.
+    """
+    value = eval_number(parse_result)
+    return lambda variables, functions: value
+
+
+class CompiledExpression(object):
+    """
+    An expression parsed once into nested functions, which evaluate it for
+    any variables and functions.
+
+    Raises the same exceptions as `evaluator` for expressions that can't be parsed.
+    """
+    def __init__(self, math_expr, case_sensitive=False):
+        """
+        Parse `math_expr` and compile its tree.
+        """
+        check_parens(math_expr)
+        self.math_interpreter = ParseAugmenter(math_expr, case_sensitive)
+        self.math_interpreter.parse_algebra()
+        self.case_sensitive = case_sensitive
+
+        if case_sensitive:
+            casify = lambda x: x
+        else:
+            casify = lambda x: x.lower()  # Lowercase for case insens.
+        self.casify = casify
+
+        def compile_variable(parse_result):
+            """
+            Return the function looking up a variable.
+            """
+            name = casify(parse_result[0])
+            return lambda variables, functions: variables[name]
+
+        def compile_function(parse_result):
+            """
+            Return the function applying a function to its evaluated argument.
+            """
+            name = casify(parse_result[0])
+            argument = parse_result[1]
+            return lambda variables, functions: functions[name](argument(variables, functions))
+
+        compile_actions = {
+            'number': compile_number,
+            'variable': compile_variable,
+            'function': compile_function,
+            'atom': compile_operation(eval_atom),
+            'power': compile_operation(eval_power),
+            'parallel': compile_operation(eval_parallel),
+            'product': compile_operation(eval_product),
+            'sum': compile_operation(eval_sum)
+        }
+        self.evaluate_tree = self.math_interpreter.reduce_tree(compile_actions)
+
+        compile_actions.update({
+            'atom': compile_operation(eval_atom_array),
+            'power': compile_operation(eval_power_array),
+            'parallel': compile_operation(eval_parallel_array),
+            'product': compile_operation(eval_product_array),
+            'sum': compile_operation(eval_sum_array)
+        })
+        self.evaluate_array_tree = self.math_interpreter.reduce_tree(compile_actions)
+
+    def evaluate(self, variables, functions):
+        """
+        Evaluate the expression, see `evaluator`.
+        """
+        # Get our variables together.
+        all_variables, all_functions = add_defaults(variables, functions, self.case_sensitive)
+
+        # ...and check them
+        self.math_interpreter.check_variables(all_variables, all_functions)
+
+        return self.evaluate_tree(all_variables, all_functions)
+
+    def evaluate_samples(self, variables_list, functions):
+        """
+        Evaluate the expression for each dictionary of variables in
+        `variables_list`, and return the list of results.
+
+        When the samples all have the same variables and the expression only
+        uses vectorized functions, all of the samples are evaluated at once,
+        with numpy arrays of the values of the variables. If that raises an
+        error or gives an invalid value (e.g. a division by zero, or a negative
+        number raised to a fractional power), or otherwise, the samples are
+        evaluated one by one with `evaluate`, which gives its usual results and
+        exceptions.
+        """
+        arrays = variable_arrays(variables_list)
+        if arrays is not None:
+            all_variables, all_functions = add_defaults(arrays, functions, self.case_sensitive)
+            self.math_interpreter.check_variables(all_variables, all_functions)
+
+            if all(all_functions[self.casify(name)] in VECTORIZED_FUNCTIONS
+                   for name in self.math_interpreter.functions_used):
+                try:
+                    with numpy.errstate(divide='raise', over='raise', invalid='raise'):
+                        results = self.evaluate_array_tree(all_variables, all_functions)
+                    return numpy.broadcast_to(results, (len(variables_list),)).tolist()
+                except Exception:  # pylint: disable=broad-except
+                    pass
+
+        return [self.evaluate(variables, functions) for variables in variables_list]
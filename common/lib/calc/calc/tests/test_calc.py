@@ -3,6 +3,7 @@ Unit tests for calc.py
 """
 
 import unittest
+import mock
 import numpy
 import calc
 from pyparsing import ParseException
@@ -552,3 +553,129 @@ class EvaluatorTest(unittest.TestCase):
             calc.evaluator({}, {}, "(1+2")
         with self.assertRaisesRegexp(calc.UnmatchedParenthesis, 'no matching opening parenthesis'):
             calc.evaluator({}, {}, "(1+2))")
+
+
+class CompiledExpressionTest(unittest.TestCase):
+    """
+    Test that expressions are parsed once by calc.evaluator, and evaluated
+    again with other variables.
+    """
+
+    def test_compiled_once(self):
+        compiled = calc.compile_expression("x^2 + sin(y)")
+        self.assertIs(calc.compile_expression("x^2 + sin(y)"), compiled)
+        self.assertIsNot(calc.compile_expression("x^2 + sin(y)", case_sensitive=True), compiled)
+
+        with mock.patch.object(calc.ParseAugmenter, 'parse_algebra') as mock_parse:
+            self.assertEqual(calc.evaluator({'x': 3, 'y': 0}, {}, "x^2 + sin(y)"), 9)
+            self.assertEqual(calc.evaluator({'x': 2, 'y': 0}, {}, "x^2 + sin(y)"), 4)
+        self.assertFalse(mock_parse.called)
+
+    def test_least_recently_used_forgotten(self):
+        with mock.patch('calc.calc.MAX_COMPILED_EXPRESSIONS', 2):
+            first = calc.compile_expression("1+1")
+            calc.compile_expression("1+2")
+            calc.compile_expression("1+1")
+            calc.compile_expression("1+3")
+            self.assertIs(calc.compile_expression("1+1"), first)
+            self.assertNotIn(("1+2", False), calc.COMPILED_EXPRESSIONS)
+
+    def test_same_results_as_parsing(self):
+        variables = {'R1': 2.0, 'R2': 4.0, 'x': 0.5, 'T': 1.5}
+        functions = {'f': lambda x: x * 3}
+        for expression in ["R1||R2 + 2", "-x^2^3 * 4/5 - e^(i*pi)", "f(x)*20%", "-T + 3.5e-1", "(R1)"]:
+            math_interpreter = calc.ParseAugmenter(expression)
+            math_interpreter.parse_algebra()
+            all_variables, all_functions = calc.add_defaults(variables, functions, False)
+            self.assertEqual(
+                calc.evaluator(variables, functions, expression),
+                math_interpreter.reduce_tree({
+                    'number': calc.eval_number,
+                    'variable': lambda x: all_variables[x[0].lower()],
+                    'function': lambda x: all_functions[x[0].lower()](x[1]),
+                    'atom': calc.eval_atom,
+                    'power': calc.eval_power,
+                    'parallel': calc.eval_parallel,
+                    'product': calc.eval_product,
+                    'sum': calc.eval_sum,
+                }),
+            )
+
+    def test_variables_checked_each_time(self):
+        self.assertEqual(calc.evaluator({'r1': 5, 'r2': 2}, {}, "r1+r2"), 7)
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'r2'):
+            calc.evaluator({'r1': 5}, {}, "r1+r2")
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'g'):
+            calc.evaluator({}, {'f': abs}, "g(1)")
+
+    def test_errors_not_kept(self):
+        with self.assertRaises(ParseException):
+            calc.evaluator({}, {}, '1+.')
+        with self.assertRaises(calc.UnmatchedParenthesis):
+            calc.evaluator({}, {}, '(1+2')
+        self.assertNotIn(('1+.', False), calc.COMPILED_EXPRESSIONS)
+        self.assertNotIn(('(1+2', False), calc.COMPILED_EXPRESSIONS)
+
+
+class EvaluateSamplesTest(unittest.TestCase):
+    """
+    Test that calc.evaluate_samples evaluates samples together, with the same
+    results and errors as calc.evaluator evaluating them one by one.
+    """
+    samples = [{'x': 0.5, 'y': -2.0}, {'x': 3.25, 'y': 1.5}, {'x': -1.75, 'y': 0.0}]
+
+    def assert_same_results(self, expression, samples=None, functions=None):
+        """
+        Check that evaluate_samples gives the results of evaluator for each sample.
+        """
+        samples = self.samples if samples is None else samples
+        functions = functions or {}
+        results = calc.evaluate_samples(samples, functions, expression)
+        self.assertEqual(len(results), len(samples))
+        for variables, result in zip(samples, results):
+            expected = calc.evaluator(variables, functions, expression)
+            if numpy.isnan(expected):
+                self.assertTrue(numpy.isnan(result), msg=expression)
+            else:
+                self.assertAlmostEqual(result, expected, msg=expression)
+
+    def test_same_results(self):
+        for expression in [
+                "x^2 + 3*y - 1/5", "-x^y^2", "sin(x)*cos(y) + sqrt(x)", "sqrt(y) + i*x", "x||y + 2||x",
+                "e^(i*pi*x)", "ln(x)", "abs(y)*50%", "sec(x) + arcsinh(y)", "X + Y", "3.5", "(x*(y+2))",
+        ]:
+            self.assert_same_results(expression)
+
+    def test_evaluated_together(self):
+        with mock.patch.object(calc.CompiledExpression, 'evaluate') as mock_evaluate:
+            calc.evaluate_samples(self.samples, {}, "x^2 + sin(y) + x||y")
+        self.assertFalse(mock_evaluate.called)
+
+    def test_functions_not_vectorized(self):
+        samples = [{'n': 3}, {'n': 5}]
+        self.assertEqual(calc.evaluate_samples(samples, {}, "fact(n)"), [6, 120])
+        self.assert_same_results("arccot(x) + arccot(y)")
+        self.assert_same_results("f(x)", functions={'f': lambda x: x if x > 0 else 0})
+
+    def test_different_variables(self):
+        samples = [{'x': 1.0}, {'x': 2.0, 'y': 3.0}]
+        self.assertEqual(calc.evaluate_samples(samples, {}, "x*2"), [2.0, 4.0])
+
+    def test_errors_of_a_sample(self):
+        with self.assertRaises(ZeroDivisionError):
+            calc.evaluate_samples(self.samples, {}, "x/y")
+        with self.assertRaises(ValueError):
+            calc.evaluate_samples(self.samples, {}, "y^0.5")
+        with self.assertRaises(ValueError):
+            calc.evaluate_samples([{'n': 3}, {'n': -1}], {}, "fact(n)")
+
+    def test_undefined_variables(self):
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'z'):
+            calc.evaluate_samples(self.samples, {}, "x+z")
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'X'):
+            calc.evaluate_samples(self.samples, {}, "X", case_sensitive=True)
+
+    def test_empty(self):
+        self.assertEqual(calc.evaluate_samples(self.samples, {}, "x*2")[0], 1.0)
+        self.assertEqual(calc.evaluate_samples([], {}, "x*2"), [])
+        self.assertTrue(all(numpy.isnan(result) for result in calc.evaluate_samples(self.samples, {}, " ")))
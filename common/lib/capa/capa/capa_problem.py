@@ -13,9 +13,11 @@ Main module which shows problems (of "capa" type).
 This is used by capa_module.
 """
 
+import hashlib
 import logging
 import os.path
 import re
+import threading
 from collections import OrderedDict
 from copy import deepcopy
 from datetime import datetime
@@ -71,6 +73,13 @@ html_problem_semantics = [
 
 log = logging.getLogger(__name__)
 
+# How many parsed problems to keep, for the learners who load the same problems
+# with the same seeds, see `LoncapaProblem._load_parsed_problem`.
+MAX_PARSED_PROBLEMS = 200
+
+# The attributes of a problem which are kept once it is parsed.
+PARSED_ATTRIBUTES = ('tree', 'context', 'problem_data', 'responders', '_shared_rng')
+
 #-----------------------------------------------------------------------------
 # main class for this module
 
@@ -123,6 +132,14 @@ class LoncapaSystem(object):
         self.matlab_api_key = matlab_api_key
 
 
+# The parsed problems, see `LoncapaProblem._load_parsed_problem`.  They refer to
+# these placeholders instead of the system and module of a learner.
+PARSED_PROBLEMS = OrderedDict()
+PARSED_PROBLEMS_LOCK = threading.Lock()
+PARSED_SYSTEM = object()
+PARSED_MODULE = object()
+
+
 class LoncapaProblem(object):
     """
     Main class for capa Problems.
@@ -178,8 +195,28 @@ class LoncapaProblem(object):
         problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
         self.problem_text = problem_text
 
+        if minimal_init:
+            self._parse_problem(minimal_init)
+        else:
+            self._load_parsed_problem()
+
+            if not self.student_answers:  # True when student_answers is an empty dict
+                self.set_initial_display()
+
+            # dictionary of InputType objects associated with this problem
+            #   input_id string -> InputType object
+            self.inputs = {}
+
+            if extract_tree:
+                self.extracted_tree = self._extract_html(self.tree)
+
+    def _parse_problem(self, minimal_init):
+        """
+        Parse the problem text into `self.tree`, run its scripts into `self.context`
+        and create its responders.
+        """
         # parse problem XML file into an element tree
-        self.tree = etree.XML(problem_text)
+        self.tree = etree.XML(self.problem_text)
 
         self.make_xml_compatible(self.tree)
 
@@ -199,13 +236,6 @@ class LoncapaProblem(object):
         self.problem_data = self._preprocess_problem(self.tree, minimal_init)
 
         if not minimal_init:
-            if not self.student_answers:  # True when student_answers is an empty dict
-                self.set_initial_display()
-
-            # dictionary of InputType objects associated with this problem
-            #   input_id string -> InputType object
-            self.inputs = {}
-
             # Run response late_transforms last (see MultipleChoiceResponse)
             # Sort the responses to be in *_1 *_2 ... order.
             responses = self.responders.values()
@@ -214,8 +244,84 @@ class LoncapaProblem(object):
                 if hasattr(response, 'late_transforms'):
                     response.late_transforms(self)
 
-            if extract_tree:
-                self.extracted_tree = self._extract_html(self.tree)
+    def _load_parsed_problem(self):
+        """
+        Load the parsed problem, as `_parse_problem` does, from a copy of the
+        same problem parsed for another learner with the same seed, if any.
+
+        The parsed problem depends on the problem text and id and on the seed,
+        which is shared by many learners, on the anonymous student id if the
+        problem refers to it, and on the resources of the course that its
+        includes and scripts use.  It is copied with its tree and responders,
+        and given the resources of this learner.
+        """
+        anonymous_student_id = self.capa_system.anonymous_student_id
+        key = (
+            self.problem_text,
+            self.problem_id,
+            self.seed,
+            anonymous_student_id if 'anonymous_student_id' in self.problem_text else None,
+        ) + self._course_resources_key()
+        with PARSED_PROBLEMS_LOCK:
+            parsed = PARSED_PROBLEMS.pop(key, None)
+            if parsed is not None:
+                PARSED_PROBLEMS[key] = parsed
+
+        if parsed is None:
+            self._parse_problem(minimal_init=False)
+            parsed = self._copy_parsed_attributes(
+                self.__dict__, self.capa_system, self.capa_module, PARSED_SYSTEM, PARSED_MODULE
+            )
+            with PARSED_PROBLEMS_LOCK:
+                PARSED_PROBLEMS[key] = parsed
+                while len(PARSED_PROBLEMS) > MAX_PARSED_PROBLEMS:
+                    PARSED_PROBLEMS.popitem(last=False)
+        else:
+            self.__dict__.update(self._copy_parsed_attributes(
+                parsed, PARSED_SYSTEM, PARSED_MODULE, self.capa_system, self.capa_module
+            ))
+            self.context['anonymous_student_id'] = anonymous_student_id
+            # The answers are shown in the language of the learner.
+            self.responder_answers = self._get_responder_answers()
+
+    def _course_resources_key(self):
+        """
+        Return the part of the key of the parsed problem that identifies the
+        resources of the course used to parse it: the course, the filestore of
+        its includes and script paths, whether it can execute unsafe code, and
+        the digest of its python_lib.zip, which is only read, as
+        `_extract_context` does, when the problem may have scripts.
+        """
+        python_lib_digest = None
+        if '<script' in self.problem_text or '<include' in self.problem_text:
+            zip_lib = self.capa_system.get_python_lib_zip()
+            if zip_lib is not None:
+                python_lib_digest = hashlib.sha1(zip_lib).hexdigest()
+        return (
+            unicode(self.capa_module.location.course_key),
+            getattr(self.capa_system.filestore, 'root_path', None),
+            bool(self.capa_system.can_execute_unsafe_code()),
+            python_lib_digest,
+        )
+
+    @staticmethod
+    def _copy_parsed_attributes(attributes, old_system, old_module, new_system, new_module):
+        """
+        Return a deep copy of the parsed attributes among `attributes`, in which
+        the elements of the copied tree replace those of the original tree, and
+        `new_system` and `new_module` replace `old_system` and `old_module`.
+        """
+        tree = attributes['tree']
+        tree_copy = deepcopy(tree)
+        # Keep the elements alive, so that their ids stay theirs while copying.
+        elements = list(tree.iter())
+        memo = {id(element): element_copy for element, element_copy in zip(elements, tree_copy.iter())}
+        memo[id(old_system)] = new_system
+        memo[id(old_module)] = new_module
+        return deepcopy(
+            {name: attributes[name] for name in PARSED_ATTRIBUTES if name in attributes},
+            memo
+        )
 
     def make_xml_compatible(self, tree):
         """
@@ -1054,16 +1160,7 @@ class LoncapaProblem(object):
             self.responders[response] = responder
 
         if not minimal_init:
-            # get responder answers (do this only once, since there may be a performance cost,
-            # eg with externalresponse)
-            self.responder_answers = {}
-            for response in self.responders.keys():
-                try:
-                    self.responder_answers[response] = self.responders[response].get_answers()
-                except:
-                    log.debug('responder %s failed to properly return get_answers()',
-                              self.responders[response])  # FIXME
-                    raise
+            self.responder_answers = self._get_responder_answers()
 
             # <solution>...</solution> may not be associated with any specific response; give
             # IDs for those separately
@@ -1075,6 +1172,22 @@ class LoncapaProblem(object):
 
         return problem_data
 
+    def _get_responder_answers(self):
+        """
+        Return the dict of the answers of each responder, keyed by response.
+        """
+        # get responder answers (do this only once, since there may be a performance cost,
+        # eg with externalresponse)
+        responder_answers = {}
+        for response in self.responders.keys():
+            try:
+                responder_answers[response] = self.responders[response].get_answers()
+            except:
+                log.debug('responder %s failed to properly return get_answers()',
+                          self.responders[response])  # FIXME
+                raise
+        return responder_answers
+
     def response_a11y_data(self, response, inputfields, responsetype_id, problem_data):
         """
         Construct data to be used for a11y.
@@ -3,11 +3,14 @@
 from codejail.safe_exec import safe_exec as codejail_safe_exec
 from codejail.safe_exec import not_safe_exec as codejail_not_safe_exec
 from codejail.safe_exec import json_safe, SafeExecException
-from . import lazymod
+from . import lazymod, worker_pool
 from dogapi import dog_stats_api
 from six import text_type
 
+from collections import OrderedDict
 import hashlib
+import json
+import threading
 
 # Establish the Python environment for Capa.
 # Capa assumes float-friendly division always.
@@ -37,6 +40,9 @@ ASSUMED_IMPORTS = [
     ("draganddrop", "verifiers.draganddrop"),
 ]
 
+# The modules imported by the warm sandboxed workers before they run any code.
+PRELOADED_MODULES = [modname for __, modname in ASSUMED_IMPORTS]
+
 # We'll need the code from lazymod.py for use in safe_exec, so read it now.
 lazymod_py_file = lazymod.__file__
 if lazymod_py_file.endswith("c"):
@@ -50,6 +56,14 @@ for name, modname in ASSUMED_IMPORTS:
 
 LAZY_IMPORTS = "".join(LAZY_IMPORTS)
 
+# The globals that can be part of a cache key: the ones `json_safe` keeps.
+CACHEABLE_TYPES = (type(None), int, long, float, str, unicode, list, tuple, dict)
+UNCACHEABLE_NAMES = ("__builtins__",)
+
+# How many digests of code and string globals to remember, and from what length.
+MAX_DIGESTS = 1000
+MIN_DIGESTED_LENGTH = 256
+
 
 def update_hash(hasher, obj):
     """
@@ -74,6 +88,120 @@ def update_hash(hasher, obj):
         hasher.update(repr(obj))
 
 
+class LRUCache(object):
+    """
+    A bounded cache of the least recently used values, in the memory of this process.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.values = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Return the value of `key`, or `default` if it isn't cached.
+        """
+        with self.lock:
+            try:
+                value = self.values.pop(key)
+            except KeyError:
+                return default
+            self.values[key] = value
+            return value
+
+    def set(self, key, value):
+        """
+        Cache `value` for `key`, forgetting the least recently used values beyond `max_size`.
+        """
+        if self.max_size <= 0:
+            return
+        with self.lock:
+            self.values.pop(key, None)
+            self.values[key] = value
+            while len(self.values) > self.max_size:
+                self.values.popitem(last=False)
+
+
+# The digests of the code and the string globals of problems, which are the
+# same on every execution of a problem and are often large.
+DIGESTS = LRUCache(MAX_DIGESTS)
+
+# The results of executions, serialized, in front of the cache given to `safe_exec`.
+LOCAL_RESULTS = LRUCache(0)
+
+
+def configure_cache(local_size=0):
+    """
+    Set how many results of executions are kept in the memory of this process,
+    in front of the (shared) cache given to `safe_exec`.
+    """
+    LOCAL_RESULTS.max_size = local_size
+    with LOCAL_RESULTS.lock:
+        LOCAL_RESULTS.values.clear()
+
+
+def value_digest(value):
+    """
+    Return the md5 hex digest of the canonical JSON of `value`, or None if
+    `value` can't be serialized to JSON.
+
+    The digests of long strings, such as code or the data strings of problems,
+    are remembered so that they are only computed once.
+    """
+    is_string = isinstance(value, basestring) and len(value) >= MIN_DIGESTED_LENGTH
+    if is_string:
+        digest = DIGESTS.get(value)
+        if digest is not None:
+            return digest
+    try:
+        serialized = json.dumps(value, sort_keys=True)
+    except Exception:  # pylint: disable=broad-except
+        # Like `json_safe`, leave out what can't be serialized.
+        return None
+    digest = hashlib.md5(serialized).hexdigest()
+    if is_string:
+        DIGESTS.set(value, digest)
+    return digest
+
+
+def globals_digest(globals_dict):
+    """
+    Return the md5 hex digest of the JSON-safe values of `globals_dict`.
+
+    Each global is hashed on its own, so that the strings which don't change
+    from one execution of a problem to the next aren't hashed again; the key
+    order of dicts doesn't matter.
+    """
+    digests = []
+    for name, value in globals_dict.iteritems():
+        if name in UNCACHEABLE_NAMES or not isinstance(value, CACHEABLE_TYPES):
+            continue
+        digest = value_digest(value)
+        if digest is not None:
+            digests.append((name, digest))
+    digests.sort()
+    return hashlib.md5(json.dumps(digests)).hexdigest()
+
+
+def cache_key(code, globals_dict, random_seed):
+    """
+    Return the key of the result of executing `code` with `globals_dict` and `random_seed`.
+    """
+    code_digest = value_digest(code) or hashlib.md5(repr(code)).hexdigest()
+    return "safe_exec.%r.%s.%s" % (random_seed, code_digest, globals_digest(globals_dict))
+
+
+def record_cache_access(result, slug):
+    """
+    Count the accesses to the cache for `slug`, by their `result`: "local_hit",
+    "hit" or "miss".
+    """
+    dog_stats_api.increment(
+        'capa.safe_exec.cache',
+        tags=[u'result:{}'.format(result), u'slug:{}'.format(slug)],
+    )
+
+
 @dog_stats_api.timed('capa.safe_exec.time')
 def safe_exec(
     code,
@@ -103,7 +231,8 @@ def safe_exec(
 
     `cache` is an object with .get(key) and .set(key, value) methods.  It will be used
     to cache the execution, taking into account the code, the values of the globals,
-    and the random seed.
+    and the random seed.  It is usually shared by all of the app processes, so the
+    results are also kept in the memory of this process, see `configure_cache`.
 
     `slug` is an arbitrary string, a description that's meaningful to the
     caller, that will be used in log messages.
@@ -113,16 +242,20 @@ def safe_exec(
     """
     # Check the cache for a previous result.
     if cache:
-        safe_globals = json_safe(globals_dict)
-        md5er = hashlib.md5()
-        md5er.update(repr(code))
-        update_hash(md5er, safe_globals)
-        key = "safe_exec.%r.%s" % (random_seed, md5er.hexdigest())
-        cached = cache.get(key)
+        key = cache_key(code, globals_dict, random_seed)
+        serialized = LOCAL_RESULTS.get(key)
+        if serialized is not None:
+            cached = json.loads(serialized)
+            record_cache_access('local_hit', slug)
+        else:
+            cached = cache.get(key)
+            record_cache_access('miss' if cached is None else 'hit', slug)
         if cached is not None:
             # We have a cached result.  The result is a pair: the exception
             # message, if any, else None; and the resulting globals dictionary.
             emsg, cleaned_results = cached
+            if serialized is None:
+                LOCAL_RESULTS.set(key, json.dumps(cached))
             globals_dict.update(cleaned_results)
             if emsg:
                 raise SafeExecException(emsg)
@@ -135,7 +268,8 @@ def safe_exec(
     if unsafely:
         exec_fn = codejail_not_safe_exec
     else:
-        exec_fn = codejail_safe_exec
+        pool = worker_pool.get_pool(PRELOADED_MODULES)
+        exec_fn = pool.safe_exec if pool else codejail_safe_exec
 
     # Run the code!  Results are side effects in globals_dict.
     try:
@@ -153,6 +287,7 @@ def safe_exec(
     if cache:
         cleaned_results = json_safe(globals_dict)
         cache.set(key, (emsg, cleaned_results))
+        LOCAL_RESULTS.set(key, json.dumps((emsg, cleaned_results)))
 
     # If an exception happened, raise it now.
     if emsg:
@@ -1,6 +1,7 @@
 """Test safe_exec.py"""
 
 import hashlib
+import json
 import os
 import os.path
 import random
@@ -8,9 +9,11 @@ import textwrap
 import unittest
 
 import pytest
+from mock import call, patch
 from six import text_type
 
-from capa.safe_exec import safe_exec, update_hash
+from capa.safe_exec import configure_cache, safe_exec, update_hash
+from capa.safe_exec.safe_exec import DIGESTS, cache_key, dog_stats_api
 from codejail.safe_exec import SafeExecException
 from codejail.jail_code import is_configured
 
@@ -167,6 +170,43 @@ class TestSafeExecCaching(unittest.TestCase):
         safe_exec(code, g, cache=DictCache(cache))
         self.assertEqual(g['a'], 17)
 
+    def test_local_cache(self):
+        configure_cache(local_size=10)
+        self.addCleanup(configure_cache)
+        cache = {}
+        g = {}
+        safe_exec("a = int(math.pi)", g, cache=DictCache(cache))
+
+        # The result is kept in this process, so the shared cache isn't read again.
+        cache[cache.keys()[0]] = (None, {'a': 17})
+        g = {}
+        safe_exec("a = int(math.pi)", g, cache=DictCache(cache))
+        self.assertEqual(g['a'], 3)
+
+        # Changing the result we were given doesn't change the kept one.
+        g['a'] = 4
+        g = {}
+        safe_exec("a = int(math.pi)", g, cache=DictCache({}))
+        self.assertEqual(g['a'], 3)
+
+    def test_local_cache_exceptions(self):
+        configure_cache(local_size=10)
+        self.addCleanup(configure_cache)
+        for __ in range(2):
+            with self.assertRaises(SafeExecException) as cm:
+                safe_exec("1/0", {}, cache=DictCache({}))
+            self.assertIn("ZeroDivisionError", text_type(cm.exception))
+
+    def test_cache_accesses_recorded(self):
+        cache = DictCache({})
+        with patch.object(dog_stats_api, 'increment') as mock_increment:
+            for __ in range(2):
+                safe_exec("a = 1", {}, cache=cache, slug='problem_1')
+        self.assertEqual(mock_increment.call_args_list, [
+            call('capa.safe_exec.cache', tags=[u'result:miss', u'slug:problem_1']),
+            call('capa.safe_exec.cache', tags=[u'result:hit', u'slug:problem_1']),
+        ])
+
     def test_unicode_submission(self):
         # Check that using non-ASCII unicode does not raise an encoding error.
         # Try several non-ASCII unicode characters.
@@ -236,6 +276,41 @@ class TestUpdateHash(unittest.TestCase):
         self.assertEqual(h1, h2)
 
 
+class TestCacheKey(unittest.TestCase):
+    """Test the safe_exec.cache_key function."""
+
+    def test_values_matter(self):
+        key = cache_key("a = b", {'b': [1, 2]}, 1)
+        self.assertNotEqual(key, cache_key("a = c", {'b': [1, 2]}, 1))
+        self.assertNotEqual(key, cache_key("a = b", {'b': [2, 1]}, 1))
+        self.assertNotEqual(key, cache_key("a = b", {'b': [1, 2]}, 2))
+        self.assertNotEqual(key, cache_key("a = b", {'c': [1, 2]}, 1))
+        self.assertNotEqual(key, cache_key("a = b", {'b': [1, 2.0]}, 1))
+        self.assertNotEqual(key, cache_key("a = b", {'b': [1, "2"]}, 1))
+
+    def test_dict_ordering(self):
+        d1, d2 = TestUpdateHash("test_dict_ordering").equal_but_different_dicts()
+        self.assertEqual(cache_key("a = b", d1, 1), cache_key("a = b", d2, 1))
+        self.assertEqual(cache_key("a = b", {'b': d1}, 1), cache_key("a = b", {'b': d2}, 1))
+
+    def test_unserializable_globals_ignored(self):
+        key = cache_key("a = b", {'b': 1}, 1)
+        self.assertEqual(key, cache_key("a = b", {'b': 1, 'f': len, '__builtins__': {}, 'o': [object()]}, 1))
+
+    def test_long_strings_digested_once(self):
+        code = "a = b\n" * 100
+        data = u"\u00e9" * 1000
+        cache_key(code, {'data': data}, 1)
+        self.assertIn(code, DIGESTS.values)
+        self.assertIn(data, DIGESTS.values)
+        with patch.object(json, 'dumps', wraps=json.dumps) as mock_dumps:
+            cache_key(code, {'data': data, 'b': 1}, 1)
+        dumped = [args[0] for args, __ in mock_dumps.call_args_list]
+        self.assertNotIn(code, dumped)
+        self.assertNotIn(data, dumped)
+        self.assertIn(1, dumped)
+
+
 class TestRealProblems(unittest.TestCase):
     def test_802x(self):
         code = textwrap.dedent("""\
@@ -0,0 +1,161 @@
+"""Test worker_pool.py"""
+
+import os
+import os.path
+import sys
+import textwrap
+import unittest
+
+from codejail import jail_code
+from codejail.safe_exec import SafeExecException
+from mock import patch
+from six import text_type
+
+from capa.safe_exec import worker_pool
+
+# Run the workers with the current Python, as the current user.
+TEST_COMMANDS = {
+    'python': {'cmdline_start': [sys.executable, '-E', '-B'], 'user': None},
+}
+
+
+@patch.dict(jail_code.COMMANDS, TEST_COMMANDS)
+@patch.dict(jail_code.LIMITS, {'CPU': 1, 'REALTIME': 3, 'VMEM': 0})
+class TestWorkerPool(unittest.TestCase):
+    """
+    Tests for the pool of warm sandboxed workers.
+    """
+    def setUp(self):
+        super(TestWorkerPool, self).setUp()
+        self.pool = worker_pool.WorkerPool(1, ['math'], max_executions=3, queue_timeout=0.1)
+
+    def tearDown(self):
+        while not self.pool.idle_workers.empty():
+            self.pool.idle_workers.get().close()
+        super(TestWorkerPool, self).tearDown()
+
+    def test_set_values(self):
+        g = {'x': 2}
+        self.pool.safe_exec("y = x + 15", g)
+        self.assertEqual(g['y'], 17)
+
+    def test_worker_reused(self):
+        for i in range(2):
+            g = {}
+            self.pool.safe_exec("import os; pid = os.getppid()", g)
+            if i == 0:
+                worker_pid = g['pid']
+        self.assertEqual(g['pid'], worker_pid)
+        self.assertEqual(self.pool.started, 1)
+
+    def test_executions_isolated(self):
+        self.pool.safe_exec("import math; math.pi = 3", {})
+        g = {}
+        self.pool.safe_exec("import math; a = math.pi", g)
+        self.assertGreater(g['a'], 3.14)
+
+    def test_previous_execution_not_visible(self):
+        self.pool.safe_exec("secret = answer", {'answer': 'first learner'})
+        g = {}
+        self.pool.safe_exec(textwrap.dedent("""\
+            import gc, sys, __main__
+            leaks = []
+            if hasattr(__main__, 'response') or hasattr(__main__, 'request'):
+                leaks.append('__main__')
+            frame = sys._getframe().f_back
+            while frame is not None:
+                if 'sec' + 'ret' in repr(frame.f_locals):
+                    leaks.append(frame.f_code.co_name)
+                frame = frame.f_back
+            for obj in gc.get_objects():
+                if isinstance(obj, dict) and 'sec' + 'ret' in obj:
+                    leaks.append('gc')
+            del frame, obj
+        """), g)
+        self.assertEqual(g['leaks'], [])
+
+    def test_kill_stops_the_process_group(self):
+        worker = worker_pool.SandboxWorker([])
+        try:
+            self.assertEqual(os.getpgid(worker.process.pid), worker.process.pid)
+        finally:
+            worker.kill()
+            worker.close()
+        self.assertIsNotNone(worker.process.poll())
+
+    def test_raising_exceptions(self):
+        with self.assertRaises(SafeExecException) as cm:
+            self.pool.safe_exec("1/0", {})
+        self.assertIn("ZeroDivisionError", text_type(cm.exception))
+        self.assertEqual(self.pool.idle_workers.qsize(), 1)
+
+    def test_printing_doesnt_break_the_worker(self):
+        g = {}
+        self.pool.safe_exec("import os; os.write(1, 'garbage\\n'); a = 1", g)
+        self.pool.safe_exec("b = 2", g)
+        self.assertEqual((g['a'], g['b']), (1, 2))
+
+    def test_python_path_and_extra_files(self):
+        pylib = os.path.dirname(__file__) + "/test_files/pylib"
+        g = {}
+        self.pool.safe_exec(
+            "import constant; a = constant.THE_CONST; b = open('extra.txt').read()",
+            g, python_path=[pylib], extra_files=[('extra.txt', 'hello')],
+        )
+        self.assertEqual(g['a'], 23)
+        self.assertEqual(g['b'], 'hello')
+
+    def test_recycled_after_max_executions(self):
+        for __ in range(3):
+            self.pool.safe_exec("a = 1", {})
+        self.assertEqual(self.pool.started, 0)
+        self.assertTrue(self.pool.idle_workers.empty())
+
+    @patch.dict(jail_code.LIMITS, {'CPU': 0, 'REALTIME': 1})
+    def test_recycled_on_realtime_limit(self):
+        with self.assertRaises(SafeExecException) as cm:
+            self.pool.safe_exec("import time; time.sleep(5)", {})
+        self.assertIn("Realtime limit exceeded", text_type(cm.exception))
+        self.assertEqual(self.pool.started, 0)
+
+    def test_recycled_on_cpu_limit(self):
+        with self.assertRaises(SafeExecException):
+            self.pool.safe_exec("while True: pass", {})
+        self.assertEqual(self.pool.started, 0)
+
+    @patch('capa.safe_exec.worker_pool.codejail_safe_exec')
+    def test_busy_pool(self, mock_safe_exec):
+        worker = self.pool.acquire()
+        try:
+            self.pool.safe_exec("a = 1", {}, slug='busy')
+        finally:
+            self.pool.release(worker)
+        mock_safe_exec.assert_called_once_with("a = 1", {}, python_path=None, extra_files=None, slug='busy')
+
+
+class TestGetPool(unittest.TestCase):
+    """
+    Tests for the configuration of the pool.
+    """
+    def tearDown(self):
+        worker_pool.configure()
+        super(TestGetPool, self).tearDown()
+
+    def test_disabled(self):
+        worker_pool.configure(size=0)
+        with patch.dict(jail_code.COMMANDS, TEST_COMMANDS):
+            self.assertIsNone(worker_pool.get_pool())
+
+    def test_codejail_not_configured(self):
+        worker_pool.configure(size=2)
+        with patch.dict(jail_code.COMMANDS, {}, clear=True):
+            self.assertIsNone(worker_pool.get_pool())
+
+    def test_one_pool_per_process(self):
+        worker_pool.configure(size=2, max_executions=10)
+        with patch.dict(jail_code.COMMANDS, TEST_COMMANDS):
+            pool = worker_pool.get_pool()
+            self.assertIs(worker_pool.get_pool(), pool)
+            self.assertEqual((pool.size, pool.max_executions), (2, 10))
+            with patch('os.getpid', return_value=-1):
+                self.assertIsNot(worker_pool.get_pool(), pool)
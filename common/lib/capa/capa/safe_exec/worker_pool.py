@@ -0,0 +1,474 @@
+"""
+A pool of warm sandboxed Python processes to run capa's jailed code.
+
+codejail starts a new sandboxed Python process for each execution, which then
+imports numpy and the other sandbox packages again.  The workers of this pool
+are sandboxed Python processes started the same way, as the sandbox user and
+with the sandbox Python, which import these packages once.  Each execution is
+then run in a forked copy of a worker, with codejail's resource limits applied
+to it, in a new directory, so that nothing it does outlives it: the worker
+itself never runs the jailed code, and keeps nothing of an execution once it is
+answered.
+
+Workers are retired after `max_executions` executions, and as soon as an
+execution breaches a resource limit.  When all of the workers are busy for more
+than `queue_timeout` seconds, the code is run by codejail in a new process.
+"""
+import json
+import logging
+import os
+import os.path
+import resource
+import select
+import shutil
+import signal
+import subprocess
+import tempfile
+import textwrap
+import threading
+import time
+from Queue import Empty, LifoQueue
+
+from codejail import jail_code
+from codejail.safe_exec import safe_exec as codejail_safe_exec
+from codejail.safe_exec import json_safe, SafeExecException
+from dogapi import dog_stats_api
+
+log = logging.getLogger(__name__)
+
+# Seconds given to a worker to answer, on top of the realtime limit of the execution.
+RESPONSE_TIMEOUT_MARGIN = 5
+
+# The code of the workers.  A worker reads the executions from its stdin, one JSON
+# object per line, forks a child for each of them, and writes the results of the
+# children to its stdout, one JSON object per line.  Its arguments are the modules
+# to import before the first execution.
+WORKER_CODE = textwrap.dedent("""\
+    import json
+    import os
+    import resource
+    import select
+    import shutil
+    import signal
+    import sys
+    import tempfile
+    import time
+    import traceback
+
+    for name in sys.argv[1:]:
+        try:
+            __import__(name)
+        except Exception:
+            pass
+
+    requests = sys.stdin
+    responses = sys.stdout
+    devnull = os.open(os.devnull, os.O_RDWR)
+
+    OK_TYPES = (type(None), int, long, float, str, unicode, list, tuple, dict)
+    BAD_KEYS = ("__builtins__",)
+
+    def jsonable(value):
+        if not isinstance(value, OK_TYPES):
+            return False
+        try:
+            json.dumps(value)
+        except Exception:
+            return False
+        return True
+
+    def run(request, result_fd):
+        # Keep the jailed code away from the pipes to the app.
+        for fd in (0, 1, 2):
+            os.dup2(devnull, fd)
+        os.chdir(request["directory"])
+        os.environ["TMPDIR"] = os.path.join(request["directory"], "tmp")
+        tempfile.tempdir = None
+        for limit, values in request["rlimits"]:
+            resource.setrlimit(limit, tuple(values))
+        sys.path.extend(request["python_path"])
+        g_dict = request["globals"]
+        try:
+            exec request["code"] in g_dict
+        except BaseException:
+            result = {"status": 1, "stderr": traceback.format_exc()}
+        else:
+            result = {
+                "status": 0,
+                "globals": dict(
+                    (key, value) for key, value in g_dict.iteritems()
+                    if jsonable(value) and key not in BAD_KEYS
+                ),
+            }
+        data = json.dumps(result)
+        while data:
+            data = data[os.write(result_fd, data):]
+
+    def wait_for_result(pid, result_fd, realtime):
+        chunks = []
+        deadline = time.time() + realtime if realtime else None
+        while True:
+            timeout = max(deadline - time.time(), 0) if deadline else None
+            if not select.select([result_fd], [], [], timeout)[0]:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+                return {"status": -signal.SIGKILL, "stderr": "Realtime limit exceeded", "breach": True}
+            chunk = os.read(result_fd, 65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        status = os.waitpid(pid, 0)[1]
+        if os.WIFSIGNALED(status):
+            return {"status": -os.WTERMSIG(status), "stderr": "", "breach": True}
+        try:
+            result = json.loads("".join(chunks))
+            return {
+                "status": int(result["status"]),
+                "globals": dict(result.get("globals") or {}),
+                "stderr": unicode(result.get("stderr") or ""),
+                "breach": "MemoryError" in (result.get("stderr") or ""),
+            }
+        except Exception:
+            return {"status": os.WEXITSTATUS(status) or 1, "stderr": "Invalid result"}
+
+    def clean(directory):
+        tmp = os.path.join(directory, "tmp")
+        for name in os.listdir(tmp):
+            path = os.path.join(tmp, name)
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def serve():
+        # Runs in a function, and drops each request and response once it is
+        # answered, so that nothing of an execution is left in the worker for
+        # the child of the next one to find.
+        while True:
+            line = requests.readline()
+            if not line:
+                break
+            request = json.loads(line)
+            del line
+            result_fd, child_result_fd = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    os.close(result_fd)
+                    run(request, child_result_fd)
+                finally:
+                    os._exit(0)
+            os.close(child_result_fd)
+            try:
+                response = wait_for_result(pid, result_fd, request["realtime"])
+            finally:
+                os.close(result_fd)
+                clean(request["directory"])
+            responses.write(json.dumps(response) + "\\n")
+            responses.flush()
+            del request, response
+
+    serve()
+""")
+
+
+class WorkerError(Exception):
+    """
+    A worker didn't answer.
+    """
+    pass
+
+
+def create_rlimits():
+    """
+    Returns the resource limits of codejail, to apply to each execution.
+    """
+    limits = jail_code.LIMITS
+    # No subprocesses.
+    rlimits = [(resource.RLIMIT_NPROC, (0, 0))]
+    # CPU seconds, with a soft limit below the hard one, so that SIGXCPU is sent first.
+    cpu = limits.get("CPU")
+    if cpu:
+        rlimits.append((resource.RLIMIT_CPU, (cpu, cpu + 1)))
+    # Total process virtual memory.
+    vmem = limits.get("VMEM")
+    if vmem:
+        rlimits.append((resource.RLIMIT_AS, (vmem, vmem)))
+    # Size of written files.  Can be zero (nothing can be written).
+    fsize = limits.get("FSIZE", 0)
+    rlimits.append((resource.RLIMIT_FSIZE, (fsize, fsize)))
+    return rlimits
+
+
+def create_directory():
+    """
+    Creates a directory that the sandbox user can read, with a `tmp` directory
+    it can write to, in the place where codejail creates its own.
+    """
+    directory = tempfile.mkdtemp(prefix="codejail-")
+    os.chmod(directory, 0o775)
+    tmp = os.path.join(directory, "tmp")
+    os.mkdir(tmp)
+    os.chmod(tmp, 0o777)
+    return directory
+
+
+def copy_files(directory, python_path, extra_files):
+    """
+    Copies the directories of `python_path` and writes the `extra_files` into
+    `directory`, the way codejail does, and returns the entries to add to the
+    Python path of the execution.
+    """
+    extra_names = set(name for name, __ in extra_files)
+    for name, contents in extra_files:
+        with open(os.path.join(directory, name), "wb") as extra_file:
+            extra_file.write(contents)
+
+    path_names = []
+    for pydir in python_path:
+        pybase = os.path.basename(pydir)
+        path_names.append(pybase)
+        if pybase not in extra_names:
+            destination = os.path.join(directory, pybase)
+            if os.path.isdir(pydir):
+                shutil.copytree(pydir, destination)
+            else:
+                shutil.copy(pydir, destination)
+    return path_names
+
+
+class SandboxWorker(object):
+    """
+    A warm sandboxed Python process, which runs the jailed code in forked copies of itself.
+    """
+    def __init__(self, preload):
+        command = jail_code.COMMANDS["python"]
+        self.executions = 0
+        self.home = create_directory()
+        with open(os.path.join(self.home, "jailed_code"), "wb") as worker_code:
+            worker_code.write(WORKER_CODE)
+
+        self.user = command["user"]
+        cmd = []
+        if command["user"]:
+            cmd.extend(["sudo", "-u", command["user"], "TMPDIR=tmp"])
+        cmd.extend(command["cmdline_start"])
+        cmd.append("jailed_code")
+        cmd.extend(preload)
+        with open(os.devnull, "wb") as devnull:
+            # The worker leads a new process group, with sudo and its children.
+            self.process = subprocess.Popen(
+                cmd, cwd=self.home, env={"TMPDIR": "tmp"}, close_fds=True, preexec_fn=os.setsid,
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=devnull,
+            )
+
+    def execute(self, request, timeout):
+        """
+        Sends the execution to the worker and returns its result, waiting for at
+        most `timeout` seconds.
+        """
+        self.process.stdin.write(json.dumps(request) + "\n")
+        self.process.stdin.flush()
+        if not select.select([self.process.stdout], [], [], timeout)[0]:
+            raise WorkerError("The sandboxed worker didn't answer in {} seconds".format(timeout))
+        line = self.process.stdout.readline()
+        if not line:
+            raise WorkerError("The sandboxed worker exited with status {}".format(self.process.poll()))
+        return json.loads(line)
+
+    def close(self):
+        """
+        Stops the worker, which exits at the end of its input.
+        """
+        try:
+            self.process.stdin.close()
+            for __ in range(10):
+                if self.process.poll() is not None:
+                    break
+                time.sleep(0.05)
+            else:
+                self.kill()
+        except (IOError, OSError):
+            log.exception("Couldn't stop the sandboxed worker %r", self.process.pid)
+        shutil.rmtree(self.home, ignore_errors=True)
+
+    def kill(self):
+        """
+        Kills the process group of the worker: the sudo wrapper, the worker it
+        runs as the sandbox user, and its children.  As codejail does, the
+        processes of the sandbox user are killed with `sudo pkill`.
+        """
+        if self.user:
+            subprocess.call(["sudo", "pkill", "-9", "-g", str(self.process.pid)])
+        else:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        self.process.wait()
+
+
+class WorkerPool(object):
+    """
+    A pool of at most `size` warm sandboxed workers, started as they are needed.
+    """
+    def __init__(self, size, preload, max_executions=100, queue_timeout=1):
+        self.size = size
+        self.preload = list(preload)
+        self.max_executions = max_executions
+        self.queue_timeout = queue_timeout
+        # The most recently used workers are reused first, since they are the warmest.
+        self.idle_workers = LifoQueue()
+        self.lock = threading.Lock()
+        self.started = 0
+        self.waiting = 0
+
+    def _start_worker(self):
+        """
+        Returns a new worker, or None if the pool is full.
+        """
+        with self.lock:
+            if self.started >= self.size:
+                return None
+            self.started += 1
+        try:
+            return SandboxWorker(self.preload)
+        except Exception:
+            with self.lock:
+                self.started -= 1
+            raise
+
+    def acquire(self):
+        """
+        Returns an idle worker, or None if all of the workers stayed busy for `queue_timeout` seconds.
+        """
+        start = time.time()
+        try:
+            worker = self.idle_workers.get_nowait()
+        except Empty:
+            worker = self._start_worker()
+            if worker is None:
+                with self.lock:
+                    self.waiting += 1
+                    dog_stats_api.histogram('capa.safe_exec.pool.queue_length', self.waiting)
+                try:
+                    worker = self.idle_workers.get(timeout=self.queue_timeout)
+                except Empty:
+                    worker = None
+                finally:
+                    with self.lock:
+                        self.waiting -= 1
+        dog_stats_api.histogram('capa.safe_exec.pool.wait_time', time.time() - start)
+        return worker
+
+    def release(self, worker, recycle_reason=None):
+        """
+        Returns the worker to the pool, or stops it if there is a reason to recycle it.
+        """
+        if recycle_reason is None:
+            self.idle_workers.put(worker)
+            return
+
+        dog_stats_api.increment('capa.safe_exec.pool.recycled', tags=[u'reason:{}'.format(recycle_reason)])
+        worker.close()
+        with self.lock:
+            self.started -= 1
+
+    def safe_exec(self, code, globals_dict, python_path=None, extra_files=None, slug=None):
+        """
+        Executes the code in a warm sandboxed worker, like `codejail.safe_exec.safe_exec`.
+        """
+        realtime = jail_code.LIMITS.get("REALTIME")
+        directory = create_directory()
+        try:
+            request = {
+                "code": code,
+                "globals": json_safe(globals_dict),
+                "directory": directory,
+                "python_path": copy_files(directory, python_path or (), extra_files or ()),
+                "rlimits": create_rlimits(),
+                "realtime": realtime,
+            }
+
+            try:
+                worker = self.acquire()
+            except (IOError, OSError):
+                log.exception("Couldn't start a sandboxed worker for %s", slug)
+                worker = None
+            if worker is None:
+                dog_stats_api.increment('capa.safe_exec.pool.overflow')
+                return codejail_safe_exec(
+                    code, globals_dict, python_path=python_path, extra_files=extra_files, slug=slug
+                )
+
+            recycle_reason = "error"
+            try:
+                response = worker.execute(request, realtime + RESPONSE_TIMEOUT_MARGIN if realtime else None)
+                worker.executions += 1
+                if response.get("breach"):
+                    recycle_reason = "limit"
+                elif worker.executions >= self.max_executions:
+                    recycle_reason = "max_executions"
+                else:
+                    recycle_reason = None
+            except (WorkerError, IOError, OSError, ValueError) as exc:
+                log.warning("Sandboxed worker failed for %s: %s", slug, exc)
+                raise SafeExecException("Couldn't execute jailed code: {}".format(exc))
+            finally:
+                self.release(worker, recycle_reason)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+        if response["status"] != 0:
+            raise SafeExecException(
+                "Couldn't execute jailed code: stdout: {!r}, stderr: {!r} with status code: {}".format(
+                    "", response.get("stderr", ""), response["status"]
+                )
+            )
+        globals_dict.update(response["globals"])
+
+
+POOL_SETTINGS = {
+    'size': 0,
+    'max_executions': 100,
+    'queue_timeout': 1,
+}
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def configure(size=0, max_executions=100, queue_timeout=1):
+    """
+    Configures the pool of each process: `size` is the number of workers, 0 to
+    disable the pool, `max_executions` the number of executions after which a
+    worker is replaced, and `queue_timeout` the number of seconds to wait for a
+    worker before running the code in a new process.
+    """
+    global _pool  # pylint: disable=global-statement
+    with _pool_lock:
+        POOL_SETTINGS.update(size=size, max_executions=max_executions, queue_timeout=queue_timeout)
+        _pool = None
+
+
+def get_pool(preload=()):
+    """
+    Returns the pool of the current process, importing the `preload` modules in
+    its workers, or None if the pool is disabled or codejail isn't configured.
+    """
+    global _pool, _pool_pid  # pylint: disable=global-statement
+    if not POOL_SETTINGS['size'] or not jail_code.is_configured("python"):
+        return None
+
+    with _pool_lock:
+        # The workers of a parent process can't be shared with its forked children.
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = WorkerPool(
+                POOL_SETTINGS['size'],
+                preload,
+                max_executions=POOL_SETTINGS['max_executions'],
+                queue_timeout=POOL_SETTINGS['queue_timeout'],
+            )
+            _pool_pid = os.getpid()
+        return _pool
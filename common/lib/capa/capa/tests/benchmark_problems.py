@@ -0,0 +1,66 @@
+"""
+Compares the speed of creating capa problems that are parsed, and that are
+copied from the problems parsed for other learners.
+
+Example usage, from common/lib/capa:
+    $ python -m capa.tests.benchmark_problems [problem.xml ...]
+
+Without arguments, uses the problems of the capa tests and of the test courses.
+"""
+import glob
+import os.path
+import sys
+import timeit
+
+from capa import capa_problem
+from capa.tests.helpers import TEST_DIR, mock_capa_module, test_capa_system
+
+TEST_PROBLEMS = [
+    os.path.join(TEST_DIR, 'test_files', '*.xml'),
+    os.path.join(TEST_DIR, '..', '..', '..', '..', 'test', 'data', '*', 'problem', '*.xml'),
+]
+
+
+def load_problems(paths):
+    """
+    Returns the texts of the problems in the given files which can be created.
+    """
+    capa_system = test_capa_system()
+    capa_module = mock_capa_module()
+    texts = []
+    for path in paths:
+        with open(path) as problem_file:
+            text = problem_file.read().decode('utf8')
+        try:
+            capa_problem.LoncapaProblem(text, '1', capa_system, capa_module, seed=1)
+        except Exception:  # pylint: disable=broad-except
+            continue
+        texts.append(text)
+    return texts
+
+
+def benchmark(texts, iterations=5):
+    """
+    Prints the best time out of the given number of iterations for creating
+    all of the problems, parsed and copied.
+    """
+    capa_system = test_capa_system()
+    capa_module = mock_capa_module()
+
+    def create_all(parsed):
+        """
+        Creates all of the problems, parsing them again if `parsed`.
+        """
+        for text in texts:
+            if parsed:
+                capa_problem.PARSED_PROBLEMS.clear()
+            capa_problem.LoncapaProblem(text, '1', capa_system, capa_module, seed=1, extract_tree=False)
+
+    print u'{} problems'.format(len(texts))
+    for name, parsed in ((u'parsed', True), (u'copied', False)):
+        timing = min(timeit.repeat(lambda: create_all(parsed), number=1, repeat=iterations))
+        print u'  {:<8} {:8.1f} ms'.format(name, timing * 1000)
+
+
+if __name__ == '__main__':
+    benchmark(load_problems(sys.argv[1:] or sorted(sum((glob.glob(pattern) for pattern in TEST_PROBLEMS), []))))
@@ -91,11 +91,19 @@ def mock_capa_module():
         """
         return u'i4x://Foo/bar/mock/abc'
 
+    def mock_course_key_text(self):
+        """
+        Mock implementation of __unicode__ or __str__ for the module's course key.
+        """
+        return u'Foo/bar/mock'
+
     capa_module = Mock()
     if six.PY2:
         capa_module.location.__unicode__ = mock_location_text
+        capa_module.location.course_key.__unicode__ = mock_course_key_text
     else:
         capa_module.location.__str__ = mock_location_text
+        capa_module.location.course_key.__str__ = mock_course_key_text
     # The following comes into existence by virtue of being called
     # capa_module.runtime.track_function
     return capa_module
@@ -3,11 +3,14 @@ Test capa problem.
 """
 import ddt
 import textwrap
+import zipfile
+from cStringIO import StringIO
 from lxml import etree
 from mock import patch
 import unittest
 
-from capa.tests.helpers import new_loncapa_problem
+from capa.capa_problem import PARSED_PROBLEMS, LoncapaProblem
+from capa.tests.helpers import mock_capa_module, new_loncapa_problem, test_capa_system
 from openedx.core.djangolib.markup import HTML
 
 
@@ -708,3 +711,131 @@ class CAPAProblemReportHelpersTest(unittest.TestCase):
             """
         )
         self.assertEquals(problem.find_answer_text('1_2_1', 'hide'), 'hide')
+
+
+class CAPAParsedProblemTest(unittest.TestCase):
+    """
+    Tests for reusing the problems parsed for other learners.
+    """
+    xml = textwrap.dedent("""
+        <problem>
+            <script type="loncapa/python">
+answer = str(random.randint(0, 1000))
+            </script>
+            <multiplechoiceresponse>
+                <choicegroup type="MultipleChoice" shuffle="true">
+                    <choice correct="true">Apple</choice>
+                    <choice correct="false">Banana</choice>
+                    <choice correct="false">Chocolate</choice>
+                    <choice correct="false">Donut</choice>
+                </choicegroup>
+            </multiplechoiceresponse>
+            <stringresponse answer="$answer">
+                <textline size="40"/>
+            </stringresponse>
+        </problem>
+    """)
+
+    def setUp(self):
+        super(CAPAParsedProblemTest, self).setUp()
+        PARSED_PROBLEMS.clear()
+        self.addCleanup(PARSED_PROBLEMS.clear)
+
+    def test_parsed_once(self):
+        problem = new_loncapa_problem(self.xml)
+        with patch.object(LoncapaProblem, '_parse_problem') as mock_parse:
+            other_problem = new_loncapa_problem(self.xml)
+        self.assertFalse(mock_parse.called)
+
+        self.assertEqual(other_problem.get_html(), problem.get_html())
+        self.assertEqual(other_problem.context['answer'], problem.context['answer'])
+        self.assertEqual(other_problem.get_question_answers(), problem.get_question_answers())
+        self.assertEqual(
+            other_problem.grade_answers({'1_2_1': 'choice_0', '1_3_1': problem.context['answer']}).get_dict(),
+            problem.grade_answers({'1_2_1': 'choice_0', '1_3_1': problem.context['answer']}).get_dict(),
+        )
+
+    def test_copies_are_independent(self):
+        problem = new_loncapa_problem(self.xml)
+        other_problem = new_loncapa_problem(self.xml)
+
+        self.assertIsNot(other_problem.tree, problem.tree)
+        self.assertIsNot(other_problem.context, problem.context)
+        for response, responder in other_problem.responders.items():
+            self.assertIs(response.getroottree().getroot(), other_problem.tree)
+            self.assertIs(responder.xml, response)
+            self.assertIs(responder.context, other_problem.context)
+            self.assertIs(responder.capa_system, other_problem.capa_system)
+            self.assertIs(responder.capa_module, other_problem.capa_module)
+
+        other_problem.tree.find('.//choice').text = 'Changed'
+        self.assertNotIn('Changed', new_loncapa_problem(self.xml).get_html())
+
+    def test_seed_and_problem_id(self):
+        problem = new_loncapa_problem(self.xml, seed=1)
+        self.assertNotEqual(new_loncapa_problem(self.xml, seed=2).context['seed'], problem.context['seed'])
+        self.assertEqual(new_loncapa_problem(self.xml, problem_id='2', seed=1).responders.values()[0].id[0], '2')
+
+    def test_anonymous_student_id(self):
+        xml = textwrap.dedent("""
+            <problem>
+                <script type="loncapa/python">
+student = anonymous_student_id
+                </script>
+                <stringresponse answer="$student">
+                    <textline size="40"/>
+                </stringresponse>
+            </problem>
+        """)
+        capa_system = test_capa_system()
+        new_loncapa_problem(xml, capa_system=capa_system)
+        capa_system.anonymous_student_id = 'other_student'
+        problem = new_loncapa_problem(xml, capa_system=capa_system)
+        self.assertEqual(problem.context['student'], 'other_student')
+
+        problem = new_loncapa_problem(self.xml, capa_system=capa_system)
+        self.assertEqual(problem.context['anonymous_student_id'], 'other_student')
+
+    def test_courses_with_different_python_libs(self):
+        xml = textwrap.dedent("""
+            <problem>
+                <script type="loncapa/python">
+import course_helper
+value = course_helper.VALUE
+                </script>
+                <stringresponse answer="$value">
+                    <textline size="40"/>
+                </stringresponse>
+            </problem>
+        """)
+
+        def python_lib_zip(value):
+            """
+            Returns a python_lib.zip with a course_helper module setting VALUE.
+            """
+            zip_string = StringIO()
+            with zipfile.ZipFile(zip_string, 'w') as zip_file:
+                zip_file.writestr('course_helper.py', 'VALUE = {!r}\n'.format(value))
+            return zip_string.getvalue()
+
+        values = []
+        for value in ('first course', 'rerun', 'first course'):
+            capa_system = test_capa_system()
+            capa_system.get_python_lib_zip = lambda value=value: python_lib_zip(value)
+            values.append(new_loncapa_problem(xml, capa_system=capa_system).context['value'])
+        self.assertEqual(values, ['first course', 'rerun', 'first course'])
+        self.assertEqual(len(PARSED_PROBLEMS), 2)
+
+    def test_courses_not_shared(self):
+        new_loncapa_problem(self.xml)
+        capa_module = mock_capa_module()
+        capa_module.location.course_key.__unicode__ = lambda self: u'Foo/bar/rerun'
+        LoncapaProblem(self.xml, id='1', seed=723, capa_system=test_capa_system(), capa_module=capa_module)
+        self.assertEqual(len(PARSED_PROBLEMS), 2)
+
+    def test_minimal_init_not_kept(self):
+        LoncapaProblem(
+            self.xml, id='1', seed=723, capa_system=test_capa_system(), capa_module=mock_capa_module(),
+            minimal_init=True,
+        )
+        self.assertEqual(len(PARSED_PROBLEMS), 0)
@@ -152,6 +152,32 @@ class MongoContentStore(ContentStore):
             else:
                 return None
 
+    @autoretry_read()
+    def find_metadata(self, location, throw_on_not_found=True):
+        """
+        Find the attributes of the asset at location, without opening its file.
+
+        Returns a StaticContent whose data is None.
+        """
+        content_id, __ = self.asset_db_key(location)
+        item = self.fs_files.find_one({'_id': content_id})
+        if item is None:
+            if throw_on_not_found:
+                raise NotFoundError(content_id)
+            else:
+                return None
+
+        thumbnail_location = item.get('thumbnail_location')
+        if thumbnail_location:
+            thumbnail_location = location.course_key.make_asset_key('thumbnail', thumbnail_location[4])
+        return StaticContent(
+            location, item.get('displayname'), item.get('contentType'), None, last_modified_at=item['uploadDate'],
+            thumbnail_location=thumbnail_location,
+            import_path=item.get('import_path'),
+            length=item['length'], locked=item.get('locked', False),
+            content_digest=item.get('md5'),
+        )
+
     def export(self, location, output_directory):
         content = self.find(location)
 
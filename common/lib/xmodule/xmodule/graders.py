@@ -12,6 +12,7 @@ import sys
 from collections import OrderedDict
 from datetime import datetime
 
+import numpy
 from contracts import contract
 from pytz import UTC
 from django.utils.translation import ugettext_lazy as _
@@ -458,6 +459,117 @@ class AssignmentFormatGrader(CourseGrader):
         }
 
 
+def totals_with_drops(percents, lengths, drop_count):
+    """
+    Calculates, as AssignmentFormatGrader.total_with_drops does for a single
+    breakdown, the total score of each row of the 2D array `percents`, made
+    of its first `lengths[row]` percents, while dropping the lowest
+    `drop_count` of them.  Returns the array of the totals.
+
+    The percents kept are summed column by column, in the order of the
+    breakdowns, so that the totals are exactly those of total_with_drops.
+    """
+    num_rows, num_columns = percents.shape
+    present = numpy.arange(num_columns) < lengths[:, numpy.newaxis]
+    kept = present.copy()
+    if drop_count > 0 and num_columns > 0:
+        # Sort by descending percent, stably as `sorted` does, with the
+        # padding first so that it is never among the dropped percents.
+        sort_keys = numpy.where(present, -percents, -numpy.inf)
+        descending = numpy.argsort(sort_keys, axis=1, kind='mergesort')
+        dropped = descending[:, max(num_columns - drop_count, 0):]
+        kept[numpy.arange(num_rows)[:, numpy.newaxis], dropped] = False
+
+    totals = numpy.zeros(num_rows)
+    for column in range(num_columns):
+        totals += numpy.where(kept[:, column], percents[:, column], 0.0)
+
+    divisors = lengths - drop_count
+    return numpy.where(divisors > 0, totals / numpy.maximum(divisors, 1), totals)
+
+
+class ArrayGrader(object):
+    """
+    Grades a batch of learners at once with arrays, giving the percents that
+    a WeightedSubsectionsGrader of AssignmentFormatGraders gives each of
+    them, without building the breakdowns that are only used for display.
+
+    The grading policy is held in arrays with an entry for each subgrader:
+    its assignment type, minimum and drop counts, and weight.
+    """
+    # The ArrayGraders of the grading policies, keyed by the assignment type,
+    # minimum and drop counts, and weight of each of their subgraders.
+    _by_policy = {}
+
+    def __init__(self, subgraders):
+        self.types = [subgrader.type for subgrader, _, _ in subgraders]
+        self.min_counts = numpy.array([subgrader.min_count for subgrader, _, _ in subgraders], dtype=int)
+        self.drop_counts = numpy.array([subgrader.drop_count for subgrader, _, _ in subgraders], dtype=int)
+        self.weights = [weight for _, _, weight in subgraders]
+
+    @classmethod
+    def for_grader(cls, grader):
+        """
+        Returns the ArrayGrader of the given course grader, or None if the
+        grader cannot be graded with arrays.
+
+        Course graders are created from the grading policy each time they are
+        accessed, so the ArrayGraders are kept for each version of the
+        policy rather than on the graders.
+        """
+        if not isinstance(grader, WeightedSubsectionsGrader):
+            return None
+        if not all(type(subgrader) is AssignmentFormatGrader for subgrader, _, _ in grader.subgraders):
+            return None
+        policy = tuple(
+            (subgrader.type, subgrader.min_count, subgrader.drop_count, weight)
+            for subgrader, _, weight in grader.subgraders
+        )
+        array_grader = cls._by_policy.get(policy)
+        if array_grader is None:
+            array_grader = cls._by_policy[policy] = cls(grader.subgraders)
+        return array_grader
+
+    def grade(self, percents_by_type, num_learners):
+        """
+        Returns the percents of a batch of learners, as the array of their
+        totals and the list of the arrays of their averages for each
+        subgrader.
+
+        percents_by_type maps each assignment type to the list, with an
+        entry for each learner, of the percents of their graded subsections
+        of that type, in the order of their grade sheet.
+        """
+        totals = numpy.zeros(num_learners)
+        averages = []
+        for index, assignment_type in enumerate(self.types):
+            learner_percents = percents_by_type.get(assignment_type) or [[]] * num_learners
+            counts = numpy.array([len(percents) for percents in learner_percents], dtype=int)
+            lengths = numpy.maximum(counts, self.min_counts[index])
+
+            # Sections which are not there count as zero, up to the minimum count.
+            padded_percents = numpy.zeros((num_learners, lengths.max() if num_learners else 0))
+            for row, percents in enumerate(learner_percents):
+                padded_percents[row, :len(percents)] = percents
+
+            subgrader_averages = totals_with_drops(padded_percents, lengths, self.drop_counts[index])
+            totals += subgrader_averages * self.weights[index]
+            averages.append(subgrader_averages)
+        return totals, averages
+
+    def grade_percent(self, grade_sheet):
+        """
+        Returns the percent of a single learner with the given grade sheet,
+        as WeightedSubsectionsGrader.grade returns it.
+        """
+        percents_by_type = {
+            assignment_type: [[score.percent_graded for score in grade_sheet.get(assignment_type, {}).values()]]
+            for assignment_type in self.types
+        }
+        totals, _ = self.grade(percents_by_type, 1)
+        return float(totals[0])
+
+
 def _iter_graded(scores):
     """
     Yield the scores that belong to explicitly graded blocks
@@ -22,7 +22,7 @@ from xmodule.edxnotes_utils import edxnotes
 from xmodule.html_checker import check_html
 from xmodule.stringify import stringify_children
 from xmodule.util.misc import escape_html_characters
-from xmodule.x_module import DEPRECATION_VSCOMPAT_EVENT, XModule
+from xmodule.x_module import DEPRECATION_VSCOMPAT_EVENT, USER_INDEPENDENT, XModule
 from xmodule.xml_module import XmlDescriptor, name_to_pathname
 
 log = logging.getLogger("edx.courseware")
@@ -72,13 +72,23 @@ class HtmlBlock(object):
 
     ENABLE_HTML_XBLOCK_STUDENT_VIEW_DATA = 'ENABLE_HTML_XBLOCK_STUDENT_VIEW_DATA'
 
-    @XBlock.supports("multi_device")
+    @XBlock.supports("multi_device", USER_INDEPENDENT)
     def student_view(self, _context):
         """
         Return a fragment that contains the html for the student view
         """
         return Fragment(self.get_html())
 
+    def has_support(self, view, functionality):
+        """
+        Override the XBlock.has_support method to return False for the
+        user independent functionality when the html contains the
+        %%USER_ID%% placeholder, which is replaced for each user.
+        """
+        if functionality == USER_INDEPENDENT and "%%USER_ID%%" in (self.data or u""):
+            return False
+        return super(HtmlBlock, self).has_support(view, functionality)
+
     def student_view_data(self, context=None):  # pylint: disable=unused-argument
         """
         Return a JSON representation of the student_view of this XBlock.
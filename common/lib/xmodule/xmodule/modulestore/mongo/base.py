@@ -19,6 +19,8 @@ import logging
 import pymongo
 import re
 import sys
+from collections import defaultdict
+from time import sleep
 from uuid import uuid4
 
 from bson.son import SON
@@ -70,6 +72,12 @@ BLOCK_TYPES_WITH_CHILDREN = list(set(
     name for name, class_ in XBlock.load_classes() if getattr(class_, 'has_children', False)
 ))
 
+# How long (in seconds) a worker may hold the lock for computing a course's metadata
+# inheritance tree, and how long and how often other workers check for its result.
+METADATA_INHERITANCE_LOCK_TIMEOUT = 60
+METADATA_INHERITANCE_LOCK_WAIT = 10
+METADATA_INHERITANCE_LOCK_POLL_INTERVAL = 0.1
+
 # Allow us to call _from_deprecated_(son|string) throughout the file
 # pylint: disable=protected-access
 
@@ -555,10 +563,15 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         super(MongoModuleStore, self).__init__(contentstore=contentstore, **kwargs)
 
         def do_connection(
-            db, collection, host, port=27017, tz_aware=True, user=None, password=None, asset_collection=None, **kwargs
+            db, collection, host, port=27017, tz_aware=True, user=None, password=None, asset_collection=None,
+            published_read_preference=None, query_timeout_ms=None,  # pylint: disable=unused-argument
+            **kwargs
         ):
             """
             Create & open the connection, authenticate, and provide pointers to the collection
+
+            published_read_preference and query_timeout_ms are only used by the split modulestore,
+            and are accepted so that both modulestores can share a DOC_STORE_CONFIG.
             """
             # Set a write concern of 1, which makes writes complete successfully to the primary
             # only before returning. Also makes pymongo report write errors.
@@ -681,18 +694,24 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         else:
             return ParentLocationCache()
 
-    def _compute_metadata_inheritance_tree(self, course_id):
-        '''
-        Find all inheritable fields from all xblocks in the course which may define inheritable data
-        '''
+    def _find_inheritance_records(self, course_id, location_urls=None):
+        """
+        Find the children and inheritable metadata of the blocks of the course which may
+        have children, optionally only those with the given location urls.
+
+        Returns a tuple of a dict mapping the url of each block's published location to
+        its record, merging the children of its draft and published versions, and the url
+        of the course block, if it was found.
+        """
         # get all collections in the course, this query should not return any leaf nodes
-        course_id = self.fill_in_run(course_id)
         query = SON([
             ('_id.tag', 'i4x'),
             ('_id.org', course_id.org),
             ('_id.course', course_id.course),
             ('_id.category', {'$in': BLOCK_TYPES_WITH_CHILDREN})
         ])
+        if location_urls is not None:
+            query['_id.name'] = {'$in': list(set(UsageKey.from_string(url).block_id for url in location_urls))}
         # if we're only dealing in the published branch, then only get published containers
         if self.get_branch_setting() == ModuleStoreEnum.Branch.published_only:
             query['_id.revision'] = None
@@ -718,6 +737,9 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             location = as_published(BlockUsageLocator._from_deprecated_son(result['_id'], course_id.run))
 
             location_url = unicode(location)
+            if location_urls is not None and location_url not in location_urls:
+                # a block of another type with the same name
+                continue
             if location_url in results_by_url:
                 # found either draft or live to complement the other revision
                 # FIXME this is wrong. If the child was moved in draft from one parent to the other, it will
@@ -732,6 +754,15 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             if location.block_type == 'course':
                 root = location_url
 
+        return results_by_url, root
+
+    def _compute_metadata_inheritance_tree(self, course_id):
+        '''
+        Find all inheritable fields from all xblocks in the course which may define inheritable data
+        '''
+        course_id = self.fill_in_run(course_id)
+        results_by_url, root = self._find_inheritance_records(course_id)
+
         # now traverse the tree and compute down the inherited metadata
         metadata_to_inherit = {}
 
@@ -765,6 +796,161 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
 
         return metadata_to_inherit
 
+    def _update_metadata_inheritance_subtree(self, course_id, tree, location):
+        """
+        Recompute, in place, the entries of the metadata inheritance tree of the course
+        for the block at location and its descendants, after the block's children or
+        inheritable metadata changed. Only the blocks of that subtree are read from the db,
+        one query per level of the subtree.
+
+        Returns whether the tree could be updated, which it can't be for the course
+        block itself.
+        """
+        branch = self.get_branch_setting()
+        url = unicode(as_published(location))
+        if location.block_type == 'course':
+            return False
+        if url not in tree:
+            # The block isn't attached to the course (yet), so nothing inherits from it.
+            return True
+
+        parent_url = tree[url].get('parent', {}).get(branch)
+        if parent_url is None:
+            return False
+        if parent_url in tree:
+            parent_metadata = {key: value for key, value in tree[parent_url].iteritems() if key != 'parent'}
+        else:
+            # The course block has no entry of its own.
+            parent_record = self._find_inheritance_records(course_id, {parent_url})[0].get(parent_url)
+            if parent_record is None:
+                return False
+            parent_metadata = parent_record.get('metadata', {})
+
+        new_entries = {}
+        new_parents = {}
+        level = [(url, parent_url, parent_metadata)]
+        while level:
+            container_urls = {
+                block_url for block_url, __, __ in level
+                if UsageKey.from_string(block_url).block_type in BLOCK_TYPES_WITH_CHILDREN
+            }
+            records = self._find_inheritance_records(course_id, container_urls)[0] if container_urls else {}
+            next_level = []
+            for block_url, block_parent_url, inherited_metadata in level:
+                if block_url in new_entries:
+                    continue
+                record = records.get(block_url)
+                if record is None:
+                    metadata = inherited_metadata.copy()
+                else:
+                    metadata = copy.deepcopy(inherited_metadata)
+                    metadata.update(record.get('metadata', {}))
+                    next_level.extend(
+                        (child_url, block_url, metadata)
+                        for child_url in record.get('definition', {}).get('children', [])
+                    )
+                new_entries[block_url] = metadata
+                new_parents[block_url] = block_parent_url
+            level = next_level
+
+        # Add the parents only now, so that they aren't inherited. See _compute_metadata_inheritance_tree.
+        for block_url, metadata in new_entries.iteritems():
+            metadata['parent'] = {branch: new_parents[block_url]}
+
+        for block_url in self._get_metadata_inheritance_subtree(tree, url, branch):
+            if block_url not in new_entries:
+                del tree[block_url]
+        tree.update(new_entries)
+        return True
+
+    @staticmethod
+    def _get_metadata_inheritance_subtree(tree, url, branch):
+        """
+        Return the urls of the block at url and of its descendants, according to
+        the parents recorded in the given metadata inheritance tree.
+        """
+        children = defaultdict(list)
+        for block_url, metadata in tree.iteritems():
+            children[metadata.get('parent', {}).get(branch)].append(block_url)
+
+        subtree = set()
+        to_visit = [url]
+        while to_visit:
+            block_url = to_visit.pop()
+            if block_url not in subtree:
+                subtree.add(block_url)
+                to_visit.extend(children[block_url])
+        return subtree
+
+    def _get_metadata_inheritance_cache_entry(self, course_id):
+        """
+        Return the (version, tree) of the course's metadata inheritance tree in the
+        caching subsystem, or (None, None) if it isn't there.
+        """
+        if self.metadata_inheritance_cache_subsystem is None:
+            return None, None
+        entry = self.metadata_inheritance_cache_subsystem.get(unicode(course_id), {})
+        if not entry:
+            return None, None
+        if 'tree' in entry and 'version' in entry:
+            return entry['version'], entry['tree']
+        # an entry stored before trees were versioned
+        return None, entry
+
+    def _set_metadata_inheritance_cache_entry(self, course_id, tree):
+        """
+        Store the course's metadata inheritance tree in the caching subsystem, stamped with
+        a new version, and in the request cache.
+        """
+        if self.metadata_inheritance_cache_subsystem is not None:
+            self.metadata_inheritance_cache_subsystem.set(
+                unicode(course_id), {'version': uuid4().hex, 'tree': tree}
+            )
+        self._set_request_cached_metadata_inheritance_tree(course_id, tree)
+
+    def _set_request_cached_metadata_inheritance_tree(self, course_id, tree):
+        """
+        Store the course's metadata inheritance tree in the request cache, if available.
+        """
+        if self.request_cache is not None:
+            # we can't assume the 'metadatat_inheritance' part of the request cache dict has been
+            # defined
+            if 'metadata_inheritance' not in self.request_cache.data:
+                self.request_cache.data['metadata_inheritance'] = {}
+            self.request_cache.data['metadata_inheritance'][unicode(course_id)] = tree
+
+    def _compute_cached_metadata_inheritance_tree(self, course_id):
+        """
+        Compute and cache the course's metadata inheritance tree after a cache miss.
+
+        Only one worker computes it at a time: the others wait, for up to
+        METADATA_INHERITANCE_LOCK_WAIT seconds, for it to be cached.
+        """
+        cache = self.metadata_inheritance_cache_subsystem
+        lock_key = u'{}.lock'.format(course_id)
+        # The lock holds a token of the worker that acquired it, so that it is only
+        # released by that worker, and not once it expired and another acquired it.
+        lock_token = None
+        if cache is not None and hasattr(cache, 'add'):
+            lock_token = uuid4().hex
+            if not cache.add(lock_key, lock_token, METADATA_INHERITANCE_LOCK_TIMEOUT):
+                lock_token = None
+                for __ in range(int(METADATA_INHERITANCE_LOCK_WAIT / METADATA_INHERITANCE_LOCK_POLL_INTERVAL)):
+                    sleep(METADATA_INHERITANCE_LOCK_POLL_INTERVAL)
+                    __, tree = self._get_metadata_inheritance_cache_entry(course_id)
+                    if tree:
+                        self._set_request_cached_metadata_inheritance_tree(course_id, tree)
+                        return tree
+                log.warning(u'Timed out waiting for the metadata inheritance tree of %s', course_id)
+
+        try:
+            tree = self._compute_metadata_inheritance_tree(course_id)
+            self._set_metadata_inheritance_cache_entry(course_id, tree)
+        finally:
+            if lock_token is not None and hasattr(cache, 'delete') and cache.get(lock_key) == lock_token:
+                cache.delete(lock_key)
+        return tree
+
     def _get_cached_metadata_inheritance_tree(self, course_id, force_refresh=False):
         '''
         Compute the metadata inheritance for the course.
@@ -772,52 +958,82 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         tree = {}
 
         course_id = self.fill_in_run(course_id)
-        if not force_refresh:
-            # see if we are first in the request cache (if present)
-            if self.request_cache is not None and unicode(course_id) in self.request_cache.data.get('metadata_inheritance', {}):
-                return self.request_cache.data['metadata_inheritance'][unicode(course_id)]
-
-            # then look in any caching subsystem (e.g. memcached)
-            if self.metadata_inheritance_cache_subsystem is not None:
-                tree = self.metadata_inheritance_cache_subsystem.get(unicode(course_id), {})
-            else:
-                logging.warning(
-                    'Running MongoModuleStore without a metadata_inheritance_cache_subsystem. This is \
-                    OK in localdev and testing environment. Not OK in production.'
-                )
+        if force_refresh:
+            tree = self._compute_metadata_inheritance_tree(course_id)
+            self._set_metadata_inheritance_cache_entry(course_id, tree)
+            return tree
+
+        # see if we are first in the request cache (if present)
+        if self.request_cache is not None:
+            request_cached_trees = self.request_cache.data.get('metadata_inheritance', {})
+            if unicode(course_id) in request_cached_trees:
+                return request_cached_trees[unicode(course_id)]
+
+        # then look in any caching subsystem (e.g. memcached)
+        if self.metadata_inheritance_cache_subsystem is not None:
+            __, tree = self._get_metadata_inheritance_cache_entry(course_id)
+        else:
+            logging.warning(
+                'Running MongoModuleStore without a metadata_inheritance_cache_subsystem. This is \
+                OK in localdev and testing environment. Not OK in production.'
+            )
 
         if not tree:
-            # if not in subsystem, or we are on force refresh, then we have to compute
-            tree = self._compute_metadata_inheritance_tree(course_id)
+            # if not in subsystem, then we have to compute
+            return self._compute_cached_metadata_inheritance_tree(course_id)
 
-            # now write out computed tree to caching subsystem (e.g. memcached), if available
-            if self.metadata_inheritance_cache_subsystem is not None:
-                self.metadata_inheritance_cache_subsystem.set(unicode(course_id), tree)
+        # now populate a request_cache, if available, so that after a memcache hit,
+        # it'll be in the request_cache
+        self._set_request_cached_metadata_inheritance_tree(course_id, tree)
+        return tree
 
-        # now populate a request_cache, if available. NOTE, we are outside of the
-        # scope of the above if: statement so that after a memcache hit, it'll get
-        # put into the request_cache
-        if self.request_cache is not None:
-            # we can't assume the 'metadatat_inheritance' part of the request cache dict has been
-            # defined
-            if 'metadata_inheritance' not in self.request_cache.data:
-                self.request_cache.data['metadata_inheritance'] = {}
-            self.request_cache.data['metadata_inheritance'][unicode(course_id)] = tree
+    def _update_cached_metadata_inheritance_tree(self, course_id, location):
+        """
+        Incrementally update the course's cached metadata inheritance tree after the
+        children or inheritable metadata of the block at location changed.
 
+        Returns the updated tree, or None if it must be recomputed instead: if there's
+        no cached tree to update, if the block is the course, or if another process
+        updated the cached tree meanwhile.
+        """
+        course_id = self.fill_in_run(course_id)
+        version, tree = self._get_metadata_inheritance_cache_entry(course_id)
+        if not tree and self.request_cache is not None:
+            tree = self.request_cache.data.get('metadata_inheritance', {}).get(unicode(course_id))
+        if not tree:
+            return None
+
+        tree = dict(tree)
+        if not self._update_metadata_inheritance_subtree(course_id, tree, location):
+            return None
+        if self._get_metadata_inheritance_cache_entry(course_id)[0] != version:
+            return None
+
+        self._set_metadata_inheritance_cache_entry(course_id, tree)
         return tree
 
-    def refresh_cached_metadata_inheritance_tree(self, course_id, runtime=None):
+    def refresh_cached_metadata_inheritance_tree(self, course_id, runtime=None, location=None):
         """
         Refresh the cached metadata inheritance tree for the org/course combination
         for location
 
+        If given the location of the block whose children or metadata changed, only
+        the part of the tree below it is recomputed.
+
         If given a runtime, it replaces the cached_metadata in that runtime. NOTE: failure to provide
         a runtime may mean that some objects report old values for inherited data.
         """
         course_id = course_id.for_branch(None)
         if not self._is_in_bulk_operation(course_id):
-            # below is done for side effects when runtime is None
-            cached_metadata = self._get_cached_metadata_inheritance_tree(course_id, force_refresh=True)
+            cached_metadata = None
+            if location is not None:
+                if location.block_type not in BLOCK_TYPES_WITH_CHILDREN:
+                    # nothing inherits from this block, so the tree is unchanged
+                    return
+                cached_metadata = self._update_cached_metadata_inheritance_tree(course_id, location)
+            if cached_metadata is None:
+                # below is done for side effects when runtime is None
+                cached_metadata = self._get_cached_metadata_inheritance_tree(course_id, force_refresh=True)
             if runtime:
                 runtime.cached_metadata = cached_metadata
 
@@ -1565,7 +1781,9 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             xblock._edit_info = payload['edit_info']
 
             # recompute (and update) the metadata inheritance tree which is cached
-            self.refresh_cached_metadata_inheritance_tree(xblock.scope_ids.usage_id.course_key, xblock.runtime)
+            self.refresh_cached_metadata_inheritance_tree(
+                xblock.scope_ids.usage_id.course_key, xblock.runtime, xblock.scope_ids.usage_id
+            )
             # fire signal that we've written to DB
         except ItemNotFoundError:
             if not allow_not_found:
@@ -82,6 +82,8 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
         self.module_data = module_data
         self.default_class = default_class
         self.local_modules = {}
+        # Definitions prefetched for the blocks in module_data, by definition id.
+        self._definitions = {}
         self._services['library_tools'] = LibraryToolsService(modulestore)
 
     @lazy
@@ -159,6 +161,43 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
 
         return json_data
 
+    def get_definition(self, course_key, definition_id):
+        """
+        Return the definition with the given id.
+
+        If the modulestore has a definition_prefetch_size, the definitions of up to that
+        many of the blocks in module_data whose definitions haven't been loaded yet are
+        fetched along with it, so that loading the definitions of the blocks of a subtree
+        doesn't take a round trip to the database per block.
+        """
+        batch_size = self.modulestore.definition_prefetch_size
+        if batch_size and definition_id not in self._definitions:
+            self._prefetch_definitions(course_key, definition_id, batch_size)
+
+        definition = self._definitions.get(definition_id)
+        if definition is None:
+            definition = self.modulestore.get_definition(course_key, definition_id)
+        return definition
+
+    def _prefetch_definitions(self, course_key, definition_id, batch_size):
+        """
+        Fetch the given definition, and those of up to batch_size - 1 of the blocks in
+        module_data, into the definition cache.
+        """
+        definition_ids = {definition_id}
+        for block_data in self.module_data.itervalues():
+            if len(definition_ids) >= batch_size:
+                break
+            if (
+                    block_data.definition is not None and
+                    not block_data.definition_loaded and
+                    block_data.definition not in self._definitions
+            ):
+                definition_ids.add(block_data.definition)
+
+        for definition in self.modulestore.get_definitions(course_key, list(definition_ids)):
+            self._definitions[definition['_id']] = definition
+
     # xblock's runtime does not always pass enough contextual information to figure out
     # which named container (course x branch) or which parent is requesting an item. Because split allows
     # a many:1 mapping from named containers to structures and because item's identities encode
@@ -193,7 +232,7 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
 
         if definition_id is not None and not block_data.definition_loaded:
             definition_loader = DefinitionLazyLoader(
-                self.modulestore,
+                self,
                 course_key,
                 block_key.type,
                 definition_id,
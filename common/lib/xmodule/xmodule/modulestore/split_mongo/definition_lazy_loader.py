@@ -12,7 +12,8 @@ class DefinitionLazyLoader(object):
     def __init__(self, modulestore, course_key, block_type, definition_id, field_converter):
         """
         Simple placeholder for yet-to-be-fetched data
-        :param modulestore: the pymongo db connection with the definitions
+        :param modulestore: the modulestore or runtime (see CachingDescriptorSystem.get_definition)
+            which fetches the definitions
         :param definition_locator: the id of the record in the above to fetch
         """
         self.modulestore = modulestore
@@ -8,6 +8,8 @@ import zlib
 import pymongo
 import pytz
 import re
+import threading
+from collections import OrderedDict
 from contextlib import contextmanager
 from time import time
 
@@ -15,20 +17,27 @@ from time import time
 from pymongo.errors import DuplicateKeyError  # pylint: disable=unused-import
 
 try:
+    from django.conf import settings
     from django.core.cache import caches, InvalidCacheBackendError
     DJANGO_AVAILABLE = True
 except ImportError:
     DJANGO_AVAILABLE = False
 
+try:
+    import lz4.frame
+    LZ4_AVAILABLE = True
+except ImportError:
+    LZ4_AVAILABLE = False
+
 import dogstats_wrapper as dog_stats_api
 import logging
 
 from contracts import check, new_contract
 from mongodb_proxy import autoretry_read
 from xmodule.exceptions import HeartbeatFailure
-from xmodule.modulestore import BlockData
+from xmodule.modulestore import BlockData, ModuleStoreEnum
 from xmodule.modulestore.split_mongo import BlockKey
-from xmodule.mongo_utils import connect_to_mongodb, create_collection_index
+from xmodule.mongo_utils import connect_to_mongodb, create_collection_index, get_read_preference
 
 
 new_contract('BlockData', BlockData)
@@ -225,58 +234,302 @@ def structure_to_mongo(structure, course_context=None):
         return new_structure
 
 
+EDIT_INFO_FIELDS = (
+    'previous_version', 'update_version', 'source_version', 'edited_on', 'edited_by',
+    'original_usage', 'original_usage_version',
+)
+
+
+def pickle_structure(structure):
+    """
+    Pickle a structure as is.
+    """
+    return pickle.dumps(structure, pickle.HIGHEST_PROTOCOL)
+
+
+def flatten_structure(structure):
+    """
+    Pickle a structure with each of its blocks flattened into a tuple of
+    builtin values, so that no BlockData, EditInfo or BlockKey objects
+    have to be unpickled.
+    """
+    flat_structure = dict(structure)
+    flat_structure['root'] = tuple(structure['root'])
+    flat_blocks = []
+    for block_key, block in structure['blocks'].iteritems():
+        fields = block.fields
+        if 'children' in fields:
+            fields = dict(fields)
+            fields['children'] = [tuple(child) for child in fields['children']]
+        edit_info = block.edit_info
+        flat_blocks.append((
+            block_key.type,
+            block_key.id,
+            fields,
+            block.block_type,
+            block.definition,
+            block.defaults,
+            block.get_asides(),
+            tuple(getattr(edit_info, name) for name in EDIT_INFO_FIELDS),
+        ))
+    flat_structure['blocks'] = flat_blocks
+    return pickle.dumps(flat_structure, pickle.HIGHEST_PROTOCOL)
+
+
+def unflatten_structure(pickled_data):
+    """
+    Load a structure pickled by :func:`flatten_structure` straight into the
+    shape returned by :func:`structure_from_mongo`.
+    """
+    structure = pickle.loads(pickled_data)
+    structure['root'] = BlockKey(*structure['root'])
+    blocks = {}
+    for block_key_type, block_id, fields, block_type, definition, defaults, asides, edit_info in structure['blocks']:
+        if 'children' in fields:
+            fields['children'] = [BlockKey(*child) for child in fields['children']]
+        blocks[BlockKey(block_key_type, block_id)] = BlockData(
+            fields=fields,
+            block_type=block_type,
+            definition=definition,
+            defaults=defaults,
+            asides=asides,
+            edit_info=dict(zip(EDIT_INFO_FIELDS, edit_info)),
+        )
+    structure['blocks'] = blocks
+    return structure
+
+
+STRUCTURE_SERIALIZERS = {
+    'pickle': (pickle_structure, pickle.loads),
+    'flat': (flatten_structure, unflatten_structure),
+}
+
+STRUCTURE_COMPRESSORS = {
+    # 1 = Fastest (slightly larger results)
+    'zlib': (lambda data: zlib.compress(data, 1), zlib.decompress),
+}
+if LZ4_AVAILABLE:
+    STRUCTURE_COMPRESSORS['lz4'] = (lz4.frame.compress, lz4.frame.decompress)
+
+DEFAULT_STRUCTURE_CODEC = 'pickle-zlib'
+
+
+class StructureCodec(object):
+    """
+    Encodes course structures for the course structure cache, by serializing
+    and then compressing them.
+
+    A codec is named '<serializer>-<compressor>', after one of
+    STRUCTURE_SERIALIZERS and one of STRUCTURE_COMPRESSORS. Since other
+    processes may be using a different codec, the structures encoded by
+    each codec are cached under their own keys, except for those of the
+    default codec, which keep the original keys.
+    """
+    def __init__(self, name):
+        serializer_name, _, compressor_name = name.partition('-')
+        self.name = name
+        self.serialize, self.deserialize = STRUCTURE_SERIALIZERS[serializer_name]
+        self.compress, self.decompress = STRUCTURE_COMPRESSORS[compressor_name]
+
+    def cache_key(self, key):
+        """
+        Return the key under which this codec's encoding of the structure
+        with the given id is cached.
+        """
+        if self.name == DEFAULT_STRUCTURE_CODEC:
+            return key
+        return '{}:{}'.format(self.name, key)
+
+
+_STRUCTURE_CODECS = {}
+
+
+def get_structure_codec(name):
+    """
+    Return the StructureCodec with the given name, or the default codec if
+    there is no such codec (for instance if its compressor isn't installed).
+    """
+    if name not in _STRUCTURE_CODECS:
+        try:
+            _STRUCTURE_CODECS[name] = StructureCodec(name)
+        except KeyError:
+            log.warning("Unknown course structure cache codec %s, using %s", name, DEFAULT_STRUCTURE_CODEC)
+            _STRUCTURE_CODECS[name] = get_structure_codec(DEFAULT_STRUCTURE_CODEC)
+    return _STRUCTURE_CODECS[name]
+
+
+class LocalStructureCache(object):
+    """
+    A process-local, least-recently-used cache of serialized course structures,
+    bounded by the total size in bytes of the cached values.
+
+    Structures are immutable and keyed by their version id, so entries never
+    need to be invalidated; they are only evicted to stay within the size limit.
+    The serialized (but uncompressed) data is kept rather than the structure itself
+    because split mutates the block data of the structures it loads, and XBlocks
+    may mutate the field values that they read from it.  A hit therefore saves the
+    round trip to the django cache and the decompression, but the structure is
+    still deserialized, since a copy that is safe to hand out would need deep
+    copies of the field values, which take longer than unpickling them.
+    """
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return the pickled data cached for the given key, or None.
+        """
+        with self._lock:
+            pickled_data = self._entries.pop(key, None)
+            if pickled_data is not None:
+                self._entries[key] = pickled_data
+            return pickled_data
+
+    def set(self, key, pickled_data, max_size):
+        """
+        Cache the pickled data for the given key, evicting the least recently
+        used entries to keep the total size within max_size bytes.
+
+        Returns the number of evicted entries.
+        """
+        evictions = 0
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            if len(pickled_data) > max_size:
+                return evictions
+
+            while self._entries and self._size + len(pickled_data) > max_size:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                evictions += 1
+
+            self._entries[key] = pickled_data
+            self._size += len(pickled_data)
+        return evictions
+
+    def clear(self):
+        """
+        Remove all entries from the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        """
+        The total size in bytes of the cached values.
+        """
+        return self._size
+
+
+LOCAL_STRUCTURE_CACHE = LocalStructureCache()
+
+
 class CourseStructureCache(object):
     """
     Wrapper around django cache object to cache course structure objects.
-    The course structures are pickled and compressed when cached.
+    The course structures are serialized and compressed when cached, by the
+    StructureCodec named by COURSE_STRUCTURE_CACHE_CODEC.
 
     If the 'course_structure_cache' doesn't exist, then don't do anything for
     for set and get.
+
+    If COURSE_STRUCTURE_CACHE_LOCAL_MAX_SIZE is set, the most recently used
+    structures are also kept in a process-local cache of at most that many
+    bytes, so that they are read without a round trip to the django cache.
     """
     def __init__(self):
         self.cache = None
+        self.local_max_size = 0
+        codec_name = DEFAULT_STRUCTURE_CODEC
         if DJANGO_AVAILABLE:
             try:
                 self.cache = get_cache('course_structure_cache')
             except InvalidCacheBackendError:
                 pass
+            self.local_max_size = getattr(settings, 'COURSE_STRUCTURE_CACHE_LOCAL_MAX_SIZE', 0)
+            codec_name = getattr(settings, 'COURSE_STRUCTURE_CACHE_CODEC', DEFAULT_STRUCTURE_CODEC)
+        self.codec = get_structure_codec(codec_name)
 
     def get(self, key, course_context=None):
-        """Pull the compressed, pickled struct data from cache and deserialize."""
+        """Pull the compressed, serialized struct data from cache and deserialize."""
         if self.cache is None:
             return None
 
+        cache_key = self.codec.cache_key(key)
         with TIMER.timer("CourseStructureCache.get", course_context) as tagger:
-            compressed_pickled_data = self.cache.get(key)
-            tagger.tag(from_cache=str(compressed_pickled_data is not None).lower())
-
-            if compressed_pickled_data is None:
+            tagger.tag(codec=self.codec.name)
+            if self.local_max_size:
+                serialized_data = LOCAL_STRUCTURE_CACHE.get(cache_key)
+                tagger.tag(from_local_cache=str(serialized_data is not None).lower())
+                if serialized_data is not None:
+                    tagger.measure('uncompressed_size', len(serialized_data))
+                    return self._deserialize(serialized_data, tagger)
+
+            compressed_data = self.cache.get(cache_key)
+            tagger.tag(from_cache=str(compressed_data is not None).lower())
+
+            if compressed_data is None:
                 # Always log cache misses, because they are unexpected
                 tagger.sample_rate = 1
                 return None
 
-            tagger.measure('compressed_size', len(compressed_pickled_data))
+            tagger.measure('compressed_size', len(compressed_data))
 
-            pickled_data = zlib.decompress(compressed_pickled_data)
-            tagger.measure('uncompressed_size', len(pickled_data))
+            start = time()
+            serialized_data = self.codec.decompress(compressed_data)
+            tagger.measure('decompress_time', time() - start)
+            tagger.measure('uncompressed_size', len(serialized_data))
 
-            return pickle.loads(pickled_data)
+            self._set_local(cache_key, serialized_data, tagger)
+            return self._deserialize(serialized_data, tagger)
 
     def set(self, key, structure, course_context=None):
-        """Given a structure, will pickle, compress, and write to cache."""
+        """Given a structure, will serialize, compress, and write to cache."""
         if self.cache is None:
             return None
 
+        cache_key = self.codec.cache_key(key)
         with TIMER.timer("CourseStructureCache.set", course_context) as tagger:
-            pickled_data = pickle.dumps(structure, pickle.HIGHEST_PROTOCOL)
-            tagger.measure('uncompressed_size', len(pickled_data))
+            tagger.tag(codec=self.codec.name)
+            serialized_data = self.codec.serialize(structure)
+            tagger.measure('uncompressed_size', len(serialized_data))
 
-            # 1 = Fastest (slightly larger results)
-            compressed_pickled_data = zlib.compress(pickled_data, 1)
-            tagger.measure('compressed_size', len(compressed_pickled_data))
+            compressed_data = self.codec.compress(serialized_data)
+            tagger.measure('compressed_size', len(compressed_data))
 
             # Stuctures are immutable, so we set a timeout of "never"
-            self.cache.set(key, compressed_pickled_data, None)
+            self.cache.set(cache_key, compressed_data, None)
+            self._set_local(cache_key, serialized_data, tagger)
+
+    def _deserialize(self, serialized_data, tagger):
+        """
+        Deserialize the structure, recording the time that it took.
+        """
+        start = time()
+        structure = self.codec.deserialize(serialized_data)
+        tagger.measure('deserialize_time', time() - start)
+        return structure
+
+    def _set_local(self, cache_key, serialized_data, tagger):
+        """
+        Add the serialized data to the process-local cache, if it is enabled,
+        and record the resulting evictions and size of the local cache.
+        """
+        if not self.local_max_size:
+            return
+
+        evictions = LOCAL_STRUCTURE_CACHE.set(cache_key, serialized_data, self.local_max_size)
+        tagger.measure('local_cache_evictions', evictions)
+        tagger.measure('local_cache_size', LOCAL_STRUCTURE_CACHE.size)
 
 
 class MongoConnection(object):
@@ -285,10 +538,19 @@ class MongoConnection(object):
     """
     def __init__(
         self, db, collection, host, port=27017, tz_aware=True, user=None, password=None,
-        asset_collection=None, retry_wait_time=0.1, **kwargs
+        asset_collection=None, retry_wait_time=0.1, published_read_preference=None, query_timeout_ms=None,
+        **kwargs
     ):
         """
         Create & open the connection, authenticate, and provide pointers to the collections
+
+        Arguments:
+            published_read_preference: If given, the read preference (e.g. "SECONDARY_PREFERRED")
+                used to get the structures and definitions of published branches. Reads that
+                find nothing, e.g. because a secondary is lagging, are retried on the primary.
+                Requires the 'replicaSet' option.
+            query_timeout_ms: If given, the server-side time limit of the queries which get
+                structures, definitions and course indexes.
         """
         # Set a write concern of 1, which makes writes complete successfully to the primary
         # only before returning. Also makes pymongo report write errors.
@@ -304,6 +566,19 @@ class MongoConnection(object):
         self.structures = self.database[collection + '.structures']
         self.definitions = self.database[collection + '.definitions']
 
+        if published_read_preference is not None:
+            read_preference = get_read_preference(published_read_preference)
+            self.published_structures = self.database.get_collection(
+                collection + '.structures', read_preference=read_preference
+            )
+            self.published_definitions = self.database.get_collection(
+                collection + '.definitions', read_preference=read_preference
+            )
+        else:
+            self.published_structures = None
+            self.published_definitions = None
+        self.query_timeout_ms = query_timeout_ms
+
     def heartbeat(self):
         """
         Check that the db is reachable.
@@ -329,7 +604,9 @@ class MongoConnection(object):
                 tagger_get_structure.sample_rate = 1
 
                 with TIMER.timer("get_structure.find_one", course_context) as tagger_find_one:
-                    doc = self.structures.find_one({'_id': key})
+                    doc = self._find_one_published(
+                        self.structures, self.published_structures, {'_id': key}, course_context, tagger_find_one
+                    )
                     if doc is None:
                         log.warning(
                             "doc was None when attempting to retrieve structure for item with key %s",
@@ -356,7 +633,7 @@ class MongoConnection(object):
             tagger.measure("requested_ids", len(ids))
             docs = [
                 structure_from_mongo(structure, course_context)
-                for structure in self.structures.find({'_id': {'$in': ids}})
+                for structure in self._fetch(self._find(self.structures, {'_id': {'$in': ids}}), tagger)
             ]
             tagger.measure("structures", len(docs))
             return docs
@@ -439,7 +716,7 @@ class MongoConnection(object):
         """
         Get the course_index from the persistence mechanism whose id is the given key
         """
-        with TIMER.timer("get_course_index", key):
+        with TIMER.timer("get_course_index", key) as tagger:
             if ignore_case:
                 query = {
                     key_attr: re.compile(u'^{}$'.format(re.escape(getattr(key, key_attr))), re.IGNORECASE)
@@ -450,7 +727,7 @@ class MongoConnection(object):
                     key_attr: getattr(key, key_attr)
                     for key_attr in ('org', 'course', 'run')
                 }
-            return self.course_index.find_one(query)
+            return self._find_one(self.course_index, query, tagger)
 
     def find_matching_course_indexes(
             self,
@@ -555,7 +832,9 @@ class MongoConnection(object):
         Get the definition from the persistence mechanism whose id is the given key
         """
         with TIMER.timer("get_definition", course_context) as tagger:
-            definition = self.definitions.find_one({'_id': key})
+            definition = self._find_one_published(
+                self.definitions, self.published_definitions, {'_id': key}, course_context, tagger
+            )
             tagger.measure("fields", len(definition['fields']))
             tagger.tag(block_type=definition['block_type'])
             return definition
@@ -566,8 +845,73 @@ class MongoConnection(object):
         """
         with TIMER.timer("get_definitions", course_context) as tagger:
             tagger.measure('definitions', len(definitions))
-            definitions = self.definitions.find({'_id': {'$in': definitions}})
-            return definitions
+            if self.published_definitions is None or not self._is_published(course_context):
+                return self._find(self.definitions, {'_id': {'$in': definitions}})
+
+            tagger.tag(read_preference='published')
+            found = self._fetch(self._find(self.published_definitions, {'_id': {'$in': definitions}}), tagger)
+            if len(found) < len(definitions):
+                found_ids = set(definition['_id'] for definition in found)
+                missing = [definition_id for definition_id in definitions if definition_id not in found_ids]
+                tagger.measure('primary_retries', len(missing))
+                found.extend(self._fetch(self._find(self.definitions, {'_id': {'$in': missing}}), tagger))
+            return found
+
+    def _find(self, collection, query, *args, **kwargs):
+        """
+        Return a cursor over the documents of the collection matching the query,
+        limited to query_timeout_ms if it is set.
+        """
+        cursor = collection.find(query, *args, **kwargs)
+        if self.query_timeout_ms:
+            cursor = cursor.max_time_ms(self.query_timeout_ms)
+        return cursor
+
+    def _find_one(self, collection, query, tagger=None):
+        """
+        Return the first document of the collection matching the query, or None,
+        limited to query_timeout_ms if it is set.
+        """
+        documents = self._fetch(self._find(collection, query).limit(-1), tagger)
+        return documents[0] if documents else None
+
+    @staticmethod
+    def _fetch(cursor, tagger=None):
+        """
+        Return the documents of the cursor as a list. If a tagger is given, the time
+        spent in the client fetching them is measured as 'client_time'.
+
+        The pinned pymongo doesn't report how long an operation waited for a pooled
+        connection, so client_time is the nearest measure of it: it covers the wait
+        for a connection as well as the round trips to the server. When it grows
+        while the server's own query times don't, the connection pool is too small.
+        """
+        start = time()
+        documents = list(cursor)
+        if tagger is not None:
+            tagger.measure('client_time', time() - start)
+        return documents
+
+    def _find_one_published(self, collection, published_collection, query, course_context, tagger):
+        """
+        Return the first document of the collection matching the query, reading published
+        branches with the published_read_preference, and falling back to the primary if
+        the document isn't found there.
+        """
+        if published_collection is not None and self._is_published(course_context):
+            tagger.tag(read_preference='published')
+            document = self._find_one(published_collection, query, tagger)
+            if document is not None:
+                return document
+            tagger.measure('primary_retries', 1)
+        return self._find_one(collection, query, tagger)
+
+    @staticmethod
+    def _is_published(course_context):
+        """
+        Return whether the course_context is a published branch.
+        """
+        return getattr(course_context, 'branch', None) == ModuleStoreEnum.BranchName.published
 
     def insert_definition(self, definition, course_context=None):
         """
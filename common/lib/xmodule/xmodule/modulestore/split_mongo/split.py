@@ -697,9 +697,11 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                  default_class=None,
                  error_tracker=null_error_tracker,
                  i18n_service=None, fs_service=None, user_service=None,
-                 services=None, signal_handler=None, **kwargs):
+                 services=None, signal_handler=None, definition_prefetch_size=0, **kwargs):
         """
         :param doc_store_config: must have a host, db, and collection entries. Other common entries: port, tz_aware.
+        :param definition_prefetch_size: the maximum number of block definitions to fetch from the db at once
+            when lazily loading the definition of a block (0 fetches them one at a time).
         """
 
         super(SplitMongoModuleStore, self).__init__(contentstore, **kwargs)
@@ -715,6 +717,7 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
         self.fs_root = path(fs_root)
         self.error_tracker = error_tracker
         self.render_template = render_template
+        self.definition_prefetch_size = definition_prefetch_size
         self.services = services or {}
         if i18n_service is not None:
             self.services["i18n"] = i18n_service
@@ -15,7 +15,7 @@ from tempfile import mkdtemp
 from uuid import uuid4
 from datetime import datetime
 from pytz import UTC
-from mock import patch
+from mock import Mock, patch
 from xblock.core import XBlock
 
 from xblock.fields import Scope, Reference, ReferenceList, ReferenceValueDict
@@ -712,6 +712,79 @@ class TestMongoModuleStore(TestMongoModuleStoreBase):
         # Clean up the data so we don't break other tests which apparently expect a particular state
         self.draft_store.delete_course(course.id, self.dummy_user)
 
+    def test_incremental_metadata_inheritance_tree(self):
+        """
+        Test that updating a container only recomputes its part of the cached
+        metadata inheritance tree, and that the result matches a full computation.
+        """
+        course = self.draft_store.create_course("TestX", "InheritanceTest", "1234_A1", self.dummy_user)
+        chapter = self.draft_store.create_child(self.dummy_user, course.location, "chapter")
+        sequential = self.draft_store.create_child(self.dummy_user, chapter.location, "sequential")
+        vertical = self.draft_store.create_child(self.dummy_user, sequential.location, "vertical")
+        html = self.draft_store.create_child(self.dummy_user, vertical.location, "html")
+        other_chapter = self.draft_store.create_child(self.dummy_user, course.location, "chapter")
+        self.draft_store.refresh_cached_metadata_inheritance_tree(course.id)
+
+        chapter = self.draft_store.get_item(chapter.location)
+        chapter.days_early_for_beta = 3
+        with patch.object(
+            self.draft_store, '_find_inheritance_records', wraps=self.draft_store._find_inheritance_records
+        ) as mock_find:
+            self.draft_store.update_item(chapter, self.dummy_user)
+        # one query for the course and one per level of containers in the chapter's subtree
+        self.assertEqual(mock_find.call_count, 4)
+        queried_urls = set()
+        for call in mock_find.call_args_list:
+            queried_urls.update(call[0][1])
+        self.assertNotIn(unicode(other_chapter.location), queried_urls)
+
+        tree = self.draft_store._get_cached_metadata_inheritance_tree(course.id)
+        self.assertEqual(tree[unicode(html.location)]['days_early_for_beta'], 3)
+        self.assertEqual(tree, self.draft_store._compute_metadata_inheritance_tree(course.id))
+
+        # the tree's entries for leaves only hold what they inherit from their ancestors,
+        # so updating a leaf's own metadata doesn't change the tree
+        html = self.draft_store.get_item(html.location)
+        html.days_early_for_beta = 5
+        with patch.object(self.draft_store, '_find_inheritance_records') as mock_find:
+            self.draft_store.update_item(html, self.dummy_user)
+        self.assertFalse(mock_find.called)
+        tree = self.draft_store._get_cached_metadata_inheritance_tree(course.id)
+        self.assertEqual(tree[unicode(html.location)]['days_early_for_beta'], 3)
+        self.assertEqual(tree, self.draft_store._compute_metadata_inheritance_tree(course.id))
+
+        self.draft_store.delete_item(sequential.location, self.dummy_user)
+        tree = self.draft_store._get_cached_metadata_inheritance_tree(course.id)
+        self.assertNotIn(unicode(vertical.location), tree)
+        self.assertEqual(tree, self.draft_store._compute_metadata_inheritance_tree(course.id))
+
+        self.draft_store.delete_course(course.id, self.dummy_user)
+
+    def test_inheritance_tree_lock_released_by_holder_only(self):
+        """
+        Test that a worker computing the metadata inheritance tree only releases
+        the cache lock if it still holds it.
+        """
+        course_key = CourseLocator('edX', 'toy', '2012_Fall', deprecated=True)
+        cache = Mock(spec=['get', 'set', 'add', 'delete'])
+        cache.get.return_value = {}
+        with patch.object(self.draft_store, 'metadata_inheritance_cache_subsystem', cache):
+            # another worker holds the lock and never caches the tree
+            cache.add.return_value = False
+            with patch('xmodule.modulestore.mongo.base.sleep'):
+                self.draft_store._compute_cached_metadata_inheritance_tree(course_key)
+            self.assertFalse(cache.delete.called)
+
+            # this worker's lock expired while computing, and another worker acquired it
+            cache.add.return_value = True
+            self.draft_store._compute_cached_metadata_inheritance_tree(course_key)
+            self.assertFalse(cache.delete.called)
+
+            # this worker still holds its lock
+            cache.get.side_effect = lambda key, default=None: cache.add.call_args[0][1]
+            self.draft_store._compute_cached_metadata_inheritance_tree(course_key)
+            cache.delete.assert_called_once_with(u'{}.lock'.format(course_key))
+
     def test_make_course_usage_key(self):
         """Test that we get back the appropriate usage key for the root of a course key."""
         course_key = CourseLocator(org="edX", course="101", run="2015")
@@ -14,12 +14,13 @@ import uuid
 import ddt
 from contracts import contract
 from django.core.cache import caches, InvalidCacheBackendError
+from django.test.utils import override_settings
 
 from openedx.core.lib import tempdir
 from openedx.core.lib.tests import attr
 from xblock.fields import Reference, ReferenceList, ReferenceValueDict
 from xmodule.course_module import CourseDescriptor
-from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore import BlockData, ModuleStoreEnum
 from xmodule.modulestore.exceptions import (
     ItemNotFoundError, VersionConflictError,
     DuplicateItemError, DuplicateCourseError,
@@ -33,6 +34,9 @@ from xmodule.fields import Date, Timedelta
 from xmodule.modulestore.split_mongo.split import SplitMongoModuleStore
 from xmodule.modulestore.tests.test_modulestore import check_has_course_method
 from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.mongo_connection import (
+    DEFAULT_STRUCTURE_CODEC, LOCAL_STRUCTURE_CACHE, LocalStructureCache, get_structure_codec
+)
 from xmodule.modulestore.tests.factories import check_mongo_calls
 from xmodule.modulestore.tests.mongo_connection import MONGO_PORT_NUM, MONGO_HOST
 from xmodule.modulestore.tests.utils import mock_tab_from_json
@@ -940,6 +944,7 @@ class SplitModuleCourseTests(SplitModuleTest):
 
 
 @attr(shard=2)
+@ddt.ddt
 class TestCourseStructureCache(SplitModuleTest):
     """Tests for the CourseStructureCache"""
 
@@ -952,6 +957,8 @@ class TestCourseStructureCache(SplitModuleTest):
         self.cache.clear()
         # ... and after
         self.addCleanup(self.cache.clear)
+        LOCAL_STRUCTURE_CACHE.clear()
+        self.addCleanup(LOCAL_STRUCTURE_CACHE.clear)
 
         # make a new course:
         self.user = random.getrandbits(32)
@@ -992,6 +999,51 @@ class TestCourseStructureCache(SplitModuleTest):
         # now make sure that you get the same structure
         self.assertEqual(cached_structure, not_cached_structure)
 
+    @override_settings(COURSE_STRUCTURE_CACHE_LOCAL_MAX_SIZE=1024 * 1024)
+    @patch('xmodule.modulestore.split_mongo.mongo_connection.get_cache')
+    def test_course_structure_local_cache(self, mock_get_cache):
+        mock_get_cache.return_value = self.cache
+
+        with check_mongo_calls(1):
+            not_cached_structure = self._get_structure(self.new_course)
+
+        # the local cache is used even if the structure is no longer in the django cache
+        self.cache.clear()
+        with check_mongo_calls(0):
+            cached_structure = self._get_structure(self.new_course)
+
+        self.assertEqual(cached_structure, not_cached_structure)
+        self.assertIsNot(cached_structure, not_cached_structure)
+
+    @override_settings(COURSE_STRUCTURE_CACHE_LOCAL_MAX_SIZE=1)
+    @patch('xmodule.modulestore.split_mongo.mongo_connection.get_cache')
+    def test_course_structure_local_cache_too_small(self, mock_get_cache):
+        mock_get_cache.return_value = self.cache
+
+        with check_mongo_calls(1):
+            self._get_structure(self.new_course)
+        self.assertEqual(len(LOCAL_STRUCTURE_CACHE), 0)
+
+    @ddt.data(('pickle-zlib', 'flat-zlib'), ('flat-zlib', 'pickle-zlib'))
+    @ddt.unpack
+    @patch('xmodule.modulestore.split_mongo.mongo_connection.get_cache')
+    def test_course_structure_cache_codec(self, codec_name, other_codec_name, mock_get_cache):
+        mock_get_cache.return_value = self.cache
+
+        with override_settings(COURSE_STRUCTURE_CACHE_CODEC=codec_name):
+            with check_mongo_calls(1):
+                not_cached_structure = self._get_structure(self.new_course)
+
+            with check_mongo_calls(0):
+                cached_structure = self._get_structure(self.new_course)
+
+        self.assertEqual(cached_structure, not_cached_structure)
+
+        # structures cached by one codec aren't read by another
+        with override_settings(COURSE_STRUCTURE_CACHE_CODEC=other_codec_name):
+            with check_mongo_calls(1):
+                self._get_structure(self.new_course)
+
     def test_dummy_cache(self):
         with check_mongo_calls(1):
             not_cached_structure = self._get_structure(self.new_course)
@@ -1013,12 +1065,109 @@ class TestCourseStructureCache(SplitModuleTest):
         )
 
 
+class TestLocalStructureCache(unittest.TestCase):
+    """Tests for the LocalStructureCache"""
+
+    def setUp(self):
+        super(TestLocalStructureCache, self).setUp()
+        self.cache = LocalStructureCache()
+
+    def test_get(self):
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.set('a', 'aaa', 10), 0)
+        self.assertEqual(self.cache.get('a'), 'aaa')
+        self.assertEqual(self.cache.size, 3)
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set('a', 'aaa', 10)
+        self.cache.set('b', 'bbb', 10)
+        self.cache.set('c', 'ccc', 10)
+        self.cache.get('a')
+
+        self.assertEqual(self.cache.set('d', 'dddd', 10), 1)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('c'), 'ccc')
+        self.assertEqual(self.cache.get('a'), 'aaa')
+        self.assertEqual(self.cache.size, 10)
+
+    def test_value_too_large(self):
+        self.cache.set('a', 'aaa', 10)
+        self.assertEqual(self.cache.set('b', 'b' * 11, 10), 0)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a'), 'aaa')
+
+
+@ddt.ddt
+class TestStructureCodec(unittest.TestCase):
+    """Tests for the StructureCodec"""
+
+    def _structure(self):
+        """
+        Return a structure in the shape returned by structure_from_mongo.
+        """
+        root = BlockKey('course', 'course')
+        chapter = BlockKey('chapter', 'chapter')
+        return {
+            '_id': 'version',
+            'root': root,
+            'blocks': {
+                root: BlockData(
+                    block_type='course',
+                    definition='course_definition',
+                    fields={'children': [chapter], 'display_name': 'Course'},
+                    edit_info={'edited_by': 'user', 'update_version': 'version'},
+                ),
+                chapter: BlockData(
+                    block_type='chapter',
+                    definition='chapter_definition',
+                    defaults={'display_name': 'Chapter'},
+                    asides={'aside': {}},
+                ),
+            },
+        }
+
+    @ddt.data('pickle-zlib', 'flat-zlib')
+    def test_round_trip(self, codec_name):
+        codec = get_structure_codec(codec_name)
+        structure = codec.deserialize(codec.decompress(codec.compress(codec.serialize(self._structure()))))
+        self.assertEqual(structure, self._structure())
+        self.assertIsInstance(structure['root'], BlockKey)
+        for block_key, block in structure['blocks'].iteritems():
+            self.assertIsInstance(block_key, BlockKey)
+            self.assertIsInstance(block, BlockData)
+            for child in block.fields.get('children', []):
+                self.assertIsInstance(child, BlockKey)
+
+    def test_flat_serialization_leaves_structure_unchanged(self):
+        structure = self._structure()
+        get_structure_codec('flat-zlib').serialize(structure)
+        self.assertEqual(structure, self._structure())
+
+    def test_cache_key(self):
+        self.assertEqual(get_structure_codec(DEFAULT_STRUCTURE_CODEC).cache_key('version'), 'version')
+        self.assertEqual(get_structure_codec('flat-zlib').cache_key('version'), 'flat-zlib:version')
+
+    def test_unknown_codec(self):
+        self.assertIs(get_structure_codec('flat-unknown'), get_structure_codec(DEFAULT_STRUCTURE_CODEC))
+
+
 @attr(shard=2)
 class SplitModuleItemTests(SplitModuleTest):
     '''
     Item read tests including inheritance
     '''
 
+    @patch('xmodule.tabs.CourseTab.from_json', side_effect=mock_tab_from_json)
+    def test_definition_prefetch(self, _from_json):
+        course_locator = CourseLocator(org='testx', course='GreekHero', run='run', branch=BRANCH_NAME_DRAFT)
+        for prefetch_size, expected_calls in ((0, None), (1000, 1)):
+            with patch.object(modulestore(), 'definition_prefetch_size', prefetch_size):
+                runtime = modulestore().get_course(course_locator, depth=None).runtime
+                definition_ids = set(block.definition for block in runtime.module_data.itervalues())
+                with check_mongo_calls(expected_calls or len(definition_ids)):
+                    for definition_id in definition_ids:
+                        self.assertEqual(runtime.get_definition(course_locator, definition_id)['_id'], definition_id)
+
     @patch('xmodule.tabs.CourseTab.from_json', side_effect=mock_tab_from_json)
     def test_has_item(self, _from_json):
         '''
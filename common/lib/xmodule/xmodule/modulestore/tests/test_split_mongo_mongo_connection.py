@@ -1,6 +1,8 @@
 """ Test the behavior of split_mongo/MongoConnection """
 import unittest
-from mock import patch
+from mock import MagicMock, patch
+from opaque_keys.edx.locator import CourseLocator
+from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection
 from xmodule.exceptions import HeartbeatFailure
 
@@ -19,3 +21,59 @@ class TestHeartbeatFailureException(unittest.TestCase):
 
             with self.assertRaises(HeartbeatFailure):
                 useless_conn.heartbeat()
+
+
+class TestPublishedReads(unittest.TestCase):
+    """ Test the reads of published branches with the published_read_preference """
+    shard = 2
+
+    @patch('pymongo.MongoClient')
+    @patch('pymongo.database.Database')
+    def setUp(self, *calls):
+        # pylint: disable=W0613
+        super(TestPublishedReads, self).setUp()
+        self.conn = MongoConnection(
+            'useless', 'useless', 'useless', published_read_preference='SECONDARY_PREFERRED', query_timeout_ms=100
+        )
+        self.conn.definitions = MagicMock(name='definitions')
+        self.conn.published_definitions = MagicMock(name='published_definitions')
+        self.published = CourseLocator('org', 'course', 'run', branch=ModuleStoreEnum.BranchName.published)
+        self.draft = CourseLocator('org', 'course', 'run', branch=ModuleStoreEnum.BranchName.draft)
+
+    def _set_definitions(self, collection, definitions):
+        """ Make find queries to the collection return the given definitions """
+        cursor = collection.find.return_value.max_time_ms.return_value
+        cursor.__iter__.side_effect = lambda: iter(definitions)
+        cursor.limit.return_value = definitions
+
+    def test_published_read(self):
+        self._set_definitions(self.conn.published_definitions, [{'_id': 'a', 'fields': {}, 'block_type': 'html'}])
+        self.assertEqual(self.conn.get_definition('a', self.published)['_id'], 'a')
+        self.assertFalse(self.conn.definitions.find.called)
+        self.conn.published_definitions.find.return_value.max_time_ms.assert_called_with(100)
+
+    def test_published_read_falls_back_to_primary(self):
+        self._set_definitions(self.conn.published_definitions, [])
+        self._set_definitions(self.conn.definitions, [{'_id': 'a', 'fields': {}, 'block_type': 'html'}])
+        self.assertEqual(self.conn.get_definition('a', self.published)['_id'], 'a')
+
+    def test_draft_read(self):
+        self._set_definitions(self.conn.definitions, [{'_id': 'a', 'fields': {}, 'block_type': 'html'}])
+        self.assertEqual(self.conn.get_definition('a', self.draft)['_id'], 'a')
+        self.assertFalse(self.conn.published_definitions.find.called)
+
+    def test_published_definitions_fall_back_to_primary(self):
+        self._set_definitions(self.conn.published_definitions, [{'_id': 'a'}])
+        self._set_definitions(self.conn.definitions, [{'_id': 'b'}])
+        self.assertEqual(
+            sorted(definition['_id'] for definition in self.conn.get_definitions(['a', 'b'], self.published)),
+            ['a', 'b'],
+        )
+        self.conn.definitions.find.assert_called_with({'_id': {'$in': ['b']}})
+
+    @patch('xmodule.modulestore.split_mongo.mongo_connection.dog_stats_api')
+    def test_client_time_measured(self, mock_stats):
+        self._set_definitions(self.conn.definitions, [{'_id': 'a', 'fields': {}, 'block_type': 'html'}])
+        self.conn.get_definition('a', self.draft)
+        metrics = [call[0][0] for call in mock_stats.histogram.call_args_list]
+        self.assertIn('xmodule.modulestore.split_mongo.mongo_connection.get_definition.client_time', metrics)
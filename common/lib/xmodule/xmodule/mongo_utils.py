@@ -10,6 +10,18 @@ from mongodb_proxy import MongoProxy
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
 
+def get_read_preference(read_preference):
+    """
+    If read_preference is given as a name of a valid ReadPreference.<NAME> constant
+    such as "SECONDARY_PREFERRED", convert it. Otherwise return it unchanged.
+    """
+    if isinstance(read_preference, basestring):
+        converted = getattr(ReadPreference, read_preference, None)
+        if converted is not None:
+            return converted
+    return read_preference
+
+
 # pylint: disable=bad-continuation
 def connect_to_mongodb(
     db, host,
@@ -20,6 +32,9 @@ def connect_to_mongodb(
     Returns a MongoDB Database connection, optionally wrapped in a proxy. The proxy
     handles AutoReconnect errors by retrying read operations, since these exceptions
     typically indicate a temporary step-down condition for MongoDB.
+
+    Any other kwargs, such as maxPoolSize, waitQueueTimeoutMS or socketTimeoutMS,
+    are passed to the client.
     """
     # The MongoReplicaSetClient class is deprecated in Mongo 3.x, in favor of using
     # the MongoClient class for all connections. Update/simplify this code when using
@@ -34,12 +49,8 @@ def connect_to_mongodb(
         # No 'replicaSet' in kwargs - so no secondary reads.
         mongo_client_class = pymongo.MongoClient
 
-    # If read_preference is given as a name of a valid ReadPreference.<NAME> constant
-    # such as "SECONDARY_PREFERRED", convert it. Otherwise pass it through unchanged.
     if 'read_preference' in kwargs:
-        read_preference = getattr(ReadPreference, kwargs['read_preference'], None)
-        if read_preference is not None:
-            kwargs['read_preference'] = read_preference
+        kwargs['read_preference'] = get_read_preference(kwargs['read_preference'])
 
     mongo_conn = pymongo.database.Database(
         mongo_client_class(
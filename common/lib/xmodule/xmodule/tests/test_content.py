@@ -216,6 +216,18 @@ class ContentTest(unittest.TestCase):
 
         self.assertEqual(total_length, last_byte - first_byte + 1)
 
+    def test_static_content_stream_stream_data_in_range_chunk_size(self):
+        """
+        Test that StaticContentStream stream_data_in_range reads chunks aligned on
+        multiples of the given chunk size.
+        """
+        item = FakeGridFsItem(SAMPLE_STRING)
+        static_content_stream = StaticContentStream('loc', 'name', 'type', item, length=item.length)
+
+        chunks = list(static_content_stream.stream_data_in_range(150, 420, chunk_size=100))
+        self.assertEqual([len(chunk) for chunk in chunks], [50, 100, 100, 71])
+        self.assertEqual(''.join(chunks), SAMPLE_STRING[150:421])
+
     def test_static_content_write_js(self):
         """
         Test that only one filename starts with 000.
@@ -6,6 +6,7 @@ import unittest
 from datetime import datetime, timedelta
 
 import ddt
+import numpy
 from pytz import UTC
 from lms.djangoapps.grades.scores import compute_percent
 from six import text_type
@@ -303,6 +304,64 @@ class GraderTest(unittest.TestCase):
         self.assertAlmostEqual(graded['percent'], 0.11)
         self.assertEqual(len(graded['section_breakdown']), 12 + 1)
 
+    def test_array_grader(self):
+        grader_conf = [
+            {'type': "Homework", 'min_count': 12, 'drop_count': 2, 'weight': 0.25},
+            {'type': "Lab", 'min_count': 7, 'drop_count': 3, 'weight': 0.25},
+            {'type': "Midterm", 'min_count': 0, 'drop_count': 0, 'weight': 0.5},
+        ]
+        weighted_grader = graders.grader_from_conf(grader_conf)
+        array_grader = graders.ArrayGrader.for_grader(weighted_grader)
+        # The arrays of the grading policy are computed once per policy.
+        self.assertIs(graders.ArrayGrader.for_grader(weighted_grader), array_grader)
+        self.assertIs(graders.ArrayGrader.for_grader(graders.grader_from_conf(grader_conf)), array_grader)
+        self.assertIsNot(
+            graders.ArrayGrader.for_grader(graders.grader_from_conf([
+                {'type': "Homework", 'min_count': 12, 'drop_count': 2, 'weight': 0.5},
+                {'type': "Midterm", 'min_count': 0, 'drop_count': 0, 'weight': 0.5},
+            ])),
+            array_grader,
+        )
+
+        gradesheets = [self.empty_gradesheet, self.incomplete_gradesheet, self.test_gradesheet]
+        for gradesheet in gradesheets:
+            self.assertEqual(array_grader.grade_percent(gradesheet), weighted_grader.grade(gradesheet)['percent'])
+
+        percents_by_type = {
+            assignment_type: [
+                [grade.percent_graded for grade in gradesheet.get(assignment_type, {}).values()]
+                for gradesheet in gradesheets
+            ]
+            for assignment_type in ["Homework", "Lab", "Midterm"]
+        }
+        totals, averages = array_grader.grade(percents_by_type, len(gradesheets))
+        self.assertEqual(
+            totals.tolist(),
+            [weighted_grader.grade(gradesheet)['percent'] for gradesheet in gradesheets],
+        )
+        for (subgrader, _, _), subgrader_averages in zip(weighted_grader.subgraders, averages):
+            self.assertEqual(
+                subgrader_averages.tolist(),
+                [subgrader.grade(gradesheet)['percent'] for gradesheet in gradesheets],
+            )
+
+    def test_array_grader_for_other_graders(self):
+        self.assertIsNone(graders.ArrayGrader.for_grader(graders.AssignmentFormatGrader("Homework", 12, 2)))
+
+    @ddt.data(0, 1, 2, 3, 5)
+    def test_totals_with_drops(self, drop_count):
+        grader = graders.AssignmentFormatGrader("Homework", 0, drop_count)
+        breakdowns = [[0.5, 0.25, 0.5, 1.0], [0.1, 0.2, 0.3, 0.1], [0.7, 0.2], []]
+        totals = graders.totals_with_drops(
+            numpy.array([breakdown + [0.0] * (4 - len(breakdown)) for breakdown in breakdowns]),
+            numpy.array([len(breakdown) for breakdown in breakdowns]),
+            drop_count,
+        )
+        self.assertEqual(
+            totals.tolist(),
+            [grader.total_with_drops([{'percent': percent} for percent in breakdown])[0] for breakdown in breakdowns],
+        )
+
     @ddt.data(
         (
             # empty
@@ -10,7 +10,7 @@ from pymongo import ReadPreference
 
 from django.conf import settings
 
-from xmodule.mongo_utils import connect_to_mongodb
+from xmodule.mongo_utils import connect_to_mongodb, get_read_preference
 
 
 @ddt.ddt
@@ -38,3 +38,12 @@ class MongoUtilsTests(TestCase):
         # Support for read_preference given as mongos name.
         connection = connect_to_mongodb(db, host, read_preference=mongos_name)
         self.assertEqual(connection.client.read_preference, expected_read_preference)
+
+    @ddt.data(
+        ('SECONDARY_PREFERRED', ReadPreference.SECONDARY_PREFERRED),
+        ('secondaryPreferred', 'secondaryPreferred'),
+        (ReadPreference.NEAREST, ReadPreference.NEAREST),
+    )
+    @ddt.unpack
+    def test_get_read_preference(self, read_preference, expected_read_preference):
+        self.assertEqual(get_read_preference(read_preference), expected_read_preference)
@@ -4,6 +4,7 @@ import sys
 import time
 import yaml
 
+from contextlib import contextmanager
 from contracts import contract, new_contract
 from functools import partial
 from lxml import etree
@@ -67,6 +68,10 @@ STUDIO_VIEW = 'studio_view'
 # Views that present a "preview" view of an xblock (as opposed to an editing view).
 PREVIEW_VIEWS = [STUDENT_VIEW, AUTHOR_VIEW]
 
+# The functionality that a view declares support for, with `XBlock.supports`, when it renders
+# the same fragment for every user. The LMS caches the fragments rendered by these views.
+USER_INDEPENDENT = 'user_independent'
+
 
 # Make '_' a no-op so we can scrape strings. Using lambda instead of
 #  `django.utils.translation.ugettext_noop` because Django cannot be imported in this file
@@ -1308,10 +1313,19 @@ class MetricsMixin(object):
     """
 
     def render(self, block, view_name, context=None):
+        with self._render_metrics(block, view_name):
+            return super(MetricsMixin, self).render(block, view_name, context=context)
+
+    @contextmanager
+    def _render_metrics(self, block, view_name):
+        """
+        Records the metrics of rendering the view of the block in the managed block
+        of code, for runtimes which render views without calling this class's render.
+        """
         start_time = time.time()
         try:
             status = "success"
-            return super(MetricsMixin, self).render(block, view_name, context=context)
+            yield
 
         except:
             status = "failure"
@@ -4,6 +4,7 @@ API function for retrieving course blocks data
 
 import lms.djangoapps.course_blocks.api as course_blocks_api
 from lms.djangoapps.course_blocks.transformers.hidden_content import HiddenContentTransformer
+from lms.djangoapps.course_blocks.transformers.visibility import VisibilityTransformer
 from openedx.core.djangoapps.content.block_structure.transformers import BlockStructureTransformers
 
 from .serializers import BlockDictSerializer, BlockSerializer
@@ -76,8 +77,15 @@ def get_blocks(
     if include_completion:
         transformers += [BlockCompletionTransformer()]
 
-    # transform
-    blocks = course_blocks_api.get_course_blocks(user, usage_key, transformers)
+    # transform, loading only the collected data of the requested
+    # transformers and of the VisibilityTransformer, which is read
+    # by the serializer
+    blocks = course_blocks_api.get_course_blocks(
+        user,
+        usage_key,
+        transformers,
+        collected_data_names=transformers.collected_data_names() | {VisibilityTransformer.name()},
+    )
 
     # filter blocks by types
     if block_types_filter:
@@ -2,16 +2,19 @@
 Tests for Blocks api.py
 """
 
+import cPickle as pickle
 from itertools import product
 
 import ddt
 from django.test.client import RequestFactory
 from django.test.utils import override_settings
+from mock import patch
 
 import course_blocks.api as course_blocks_api
 
-from openedx.core.djangoapps.content.block_structure.api import clear_course_from_cache
+from openedx.core.djangoapps.content.block_structure.api import clear_course_from_cache, get_block_structure_manager
 from openedx.core.djangoapps.content.block_structure.config import STORAGE_BACKING_FOR_CACHE, waffle
+from openedx.core.djangoapps.content.block_structure.manager import BlockStructureManager
 from student.tests.factories import UserFactory
 from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
@@ -70,6 +73,33 @@ class TestGetBlocks(SharedModuleStoreTestCase):
         self.assertIn(unicode(problem_block.location), vertical_descendants)
         self.assertNotIn(unicode(self.html_block.location), vertical_descendants)
 
+    def test_collected_data_not_modified(self):
+        """
+        Tests that the transformers leave the block data of the collected
+        block structure unchanged, when transforming a copy of it that shares
+        that block data until it is modified.
+        """
+        def pickled_block_data(block_structure):
+            """
+            Returns the pickled values of the collected data of each block.
+            """
+            return {
+                block_key: pickle.dumps((
+                    block_data.fields,
+                    {name: data.fields for name, data in block_data.transformer_data.iteritems()},
+                ))
+                for block_key, block_data in block_structure.iteritems()
+            }
+
+        collected_block_structure = get_block_structure_manager(self.course.id).get_collected()
+        collected_block_data = pickled_block_data(collected_block_structure)
+        with patch.object(BlockStructureManager, 'get_collected', return_value=collected_block_structure.copy()):
+            get_blocks(
+                self.request, self.course.location, self.user,
+                nav_depth=5, requested_fields=['nav_depth'], block_counts=['problem'],
+            )
+        self.assertEqual(pickled_block_data(collected_block_structure), collected_block_data)
+
     def test_sub_structure(self):
         sequential_block = self.store.get_item(self.course.id.make_usage_key('sequential', 'sequential_y1'))
 
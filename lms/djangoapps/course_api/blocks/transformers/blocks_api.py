@@ -38,6 +38,19 @@ class BlocksAPITransformer(BlockStructureTransformer):
     def name(cls):
         return "blocks_api"
 
+    @classmethod
+    def collected_data_names(cls):
+        """
+        Includes the data of all contained transformers.
+        """
+        return {
+            cls.name(),
+            StudentViewTransformer.name(),
+            BlockCountsTransformer.name(),
+            BlockDepthTransformer.name(),
+            BlockNavigationTransformer.name(),
+        }
+
     @classmethod
     def collect(cls, block_structure):
         """
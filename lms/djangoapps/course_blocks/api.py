@@ -43,6 +43,7 @@ def get_course_blocks(
         starting_block_usage_key,
         transformers=None,
         collected_block_structure=None,
+        collected_data_names=None,
 ):
     """
     A higher order function implemented on top of the
@@ -65,6 +66,12 @@ def get_course_blocks(
             BlockStructureManager.get_collected.  Can be optionally
             provided if already available, for optimization.
 
+        collected_data_names (set(string)) - Optional names of the
+            transformers whose collected data is to be loaded when
+            collected_block_structure is not provided.  If None, the
+            collected data of all transformers is loaded.  See
+            BlockStructureManager.get_collected.
+
     Returns:
         BlockStructureBlockData - A transformed block structure,
             starting at starting_block_usage_key, that has undergone the
@@ -82,4 +89,44 @@ def get_course_blocks(
         transformers,
         starting_block_usage_key,
         collected_block_structure,
+        collected_data_names,
     )
+
+
+def get_course_blocks_for_users(
+        users,
+        starting_block_usage_key,
+        transformers=None,
+        collected_block_structure=None,
+        collected_data_names=None,
+):
+    """
+    A generator that yields (user, block_structure) with the transformed
+    block structure for each of the given users, starting at
+    starting_block_usage_key.  Equivalent to calling get_course_blocks for
+    each user, except the collected block structure is retrieved only once
+    and users with equivalent access, such as users in the same partition
+    groups, share the result of the transformation.
+
+    Arguments:
+        users (iterable(django.contrib.auth.models.User)) - The users
+            for which the block structure is to be transformed.
+            Consumed lazily.
+
+        starting_block_usage_key, transformers, collected_block_structure,
+        collected_data_names - See the descriptions in get_course_blocks.
+    """
+    if not transformers:
+        transformers = BlockStructureTransformers(get_course_block_access_transformers())
+    course_key = starting_block_usage_key.course_key
+
+    usage_infos = (CourseUsageInfo(course_key, user) for user in users)
+    for usage_info, block_structure in get_block_structure_manager(course_key).iter_transformed(
+            transformers,
+            usage_infos,
+            starting_block_usage_key,
+            collected_block_structure,
+            collected_data_names,
+    ):
+        yield usage_info.user, block_structure
+
@@ -31,6 +31,7 @@ class HiddenContentTransformer(FilteringTransformerMixin, BlockStructureTransfor
     """
     WRITE_VERSION = 2
     READ_VERSION = 2
+    INCREMENTAL_COLLECT = True
     MERGED_DUE_DATE = 'merged_due_date'
     MERGED_HIDE_AFTER_DUE = 'merged_hide_after_due'
 
@@ -88,6 +89,16 @@ class HiddenContentTransformer(FilteringTransformerMixin, BlockStructureTransfor
 
         block_structure.request_xblock_fields(u'self_paced', u'end')
 
+    def transform_memo_key(self, usage_info, block_structure):
+        if usage_info.has_staff_access:
+            return 'staff'
+
+        # Content can be hidden only after its due date, so the result
+        # is time-dependent only if any block hides content after due.
+        if any(self._get_merged_hide_after_due(block_structure, block_key) for block_key in block_structure):
+            return None
+        return 'nothing_hidden'
+
     def transform_block_filters(self, usage_info, block_structure):
         # Users with staff access bypass the Visibility check.
         if usage_info.has_staff_access:
@@ -67,6 +67,12 @@ class ContentLibraryTransformer(FilteringTransformerMixin, BlockStructureTransfo
                 summary = summarize_block(child_key)
                 block_structure.set_transformer_block_field(child_key, cls, 'block_analytics_summary', summary)
 
+    def transform_memo_key(self, usage_info, block_structure):
+        # Each user is given their own selection of library content.
+        if any(block_key.block_type == 'library_content' for block_key in block_structure):
+            return None
+        return ()
+
     def transform_block_filters(self, usage_info, block_structure):
         all_library_children = set()
         all_selected_children = set()
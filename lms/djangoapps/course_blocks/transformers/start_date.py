@@ -1,6 +1,10 @@
 """
 Start Date Transformer implementation.
 """
+from datetime import datetime
+
+from pytz import UTC
+
 from lms.djangoapps.courseware.access_utils import check_start_date
 from openedx.core.djangoapps.content.block_structure.transformer import (
     BlockStructureTransformer,
@@ -29,6 +33,7 @@ class StartDateTransformer(FilteringTransformerMixin, BlockStructureTransformer)
     """
     WRITE_VERSION = 1
     READ_VERSION = 1
+    INCREMENTAL_COLLECT = True
     MERGED_START_DATE = 'merged_start_date'
 
     @classmethod
@@ -67,6 +72,20 @@ class StartDateTransformer(FilteringTransformerMixin, BlockStructureTransformer)
             func_merge_ancestors=max,
         )
 
+    def transform_memo_key(self, usage_info, block_structure):
+        if usage_info.has_staff_access:
+            return 'staff'
+
+        # Once all blocks have started, all users can access them,
+        # regardless of their beta testing offsets.  Otherwise, the
+        # result is time-dependent.
+        now = datetime.now(UTC)
+        for block_key in block_structure:
+            start = self._get_merged_start_date(block_structure, block_key)
+            if start and start >= now:
+                return None
+        return 'started'
+
     def transform_block_filters(self, usage_info, block_structure):
         # Users with staff access bypass the Start Date check.
         if usage_info.has_staff_access:
@@ -8,9 +8,11 @@ from django.utils.timezone import now
 from mock import patch
 
 from courseware.tests.factories import BetaTesterFactory
+from openedx.core.djangoapps.content.block_structure.api import get_course_in_cache
 
+from ...usage_info import CourseUsageInfo
 from ..start_date import DEFAULT_START_DATE, StartDateTransformer
-from .helpers import BlockParentsMapTestCase, update_block
+from .helpers import BlockParentsMapTestCase, publish_course, update_block
 
 
 @ddt.ddt
@@ -119,3 +121,26 @@ class StartDateTransformerTestCase(BlockParentsMapTestCase):
             blocks_with_differing_student_access,
             self.transformers,
         )
+
+    @ddt.data(
+        (STUDENT, {0: StartDateType.released}, 'started'),
+        (STUDENT, {0: StartDateType.released, 4: StartDateType.future}, None),
+        (BETA_USER, {0: StartDateType.released, 4: StartDateType.future}, None),
+        (None, {0: StartDateType.released, 4: StartDateType.future}, 'staff'),
+    )
+    @ddt.unpack
+    def test_transform_memo_key(self, user_type, start_date_type_values, expected_memo_key):
+        for idx, start_date_type in start_date_type_values.iteritems():
+            block = self.get_block(idx)
+            block.start = self.StartDateType.start(start_date_type)
+            update_block(block)
+        publish_course(self.course)
+
+        user = {self.STUDENT: self.student, self.BETA_USER: self.beta_user}.get(user_type, self.staff)
+        self.assertEqual(
+            StartDateTransformer().transform_memo_key(
+                CourseUsageInfo(self.course.id, user),
+                get_course_in_cache(self.course.id),
+            ),
+            expected_memo_key,
+        )
@@ -32,6 +32,13 @@ class UserPartitionTransformer(FilteringTransformerMixin, BlockStructureTransfor
         """
         return "user_partitions"
 
+    @classmethod
+    def collected_data_names(cls):
+        """
+        Includes the data of the contained SplitTestTransformer.
+        """
+        return {cls.name(), SplitTestTransformer.name()}
+
     @classmethod
     def collect(cls, block_structure):
         """
@@ -70,6 +77,19 @@ class UserPartitionTransformer(FilteringTransformerMixin, BlockStructureTransfor
             merged_group_access = _MergedGroupAccess(user_partitions, xblock, merged_parent_access_list)
             block_structure.set_transformer_block_field(block_key, cls, 'merged_group_access', merged_group_access)
 
+    def transform_memo_key(self, usage_info, block_structure):
+        user_partitions = block_structure.get_transformer_data(self, 'user_partitions')
+        if not user_partitions:
+            return ()
+
+        # The result depends only on the user's staff access and the
+        # user's group in each partition.
+        user_groups = _get_user_partition_groups(usage_info.course_key, user_partitions, usage_info.user)
+        return (
+            usage_info.has_staff_access,
+            tuple(sorted((partition_id, group.id) for partition_id, group in user_groups.iteritems())),
+        )
+
     def transform_block_filters(self, usage_info, block_structure):
         user = usage_info.user
         result_list = SplitTestTransformer().transform_block_filters(usage_info, block_structure)
@@ -56,6 +56,7 @@ from openedx.core.lib.url_utils import quote_slashes
 from student.models import anonymous_id_for_user
 from verify_student.tests.factories import SoftwareSecurePhotoVerificationFactory
 from xblock_django.models import XBlockConfiguration
+from xmodule.html_module import HtmlBlock
 from xmodule.lti_module import LTIDescriptor
 from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.django import modulestore
@@ -1442,6 +1443,105 @@ class TestHtmlModifiers(ModuleStoreTestCase):
         )
 
 
+@attr(shard=1)
+@ddt.ddt
+@override_settings(XBLOCK_FRAGMENT_CACHE_TIMEOUT=300)
+class TestFragmentCache(ModuleStoreTestCase):
+    """
+    Tests that the fragments of the views which render the same fragment for every
+    user are cached, and wrapped as uncached fragments are.
+    """
+    def setUp(self):
+        super(TestFragmentCache, self).setUp()
+        self.request = RequestFactory().get('/')
+        self.request.user = self.user
+        self.request.session = {}
+        self.rewrite_link = '<a href="/static/foo/content">Test rewrite</a>'
+
+    def _create_html(self, store, data):
+        """
+        Creates an html block with the given data in a new course of the given store.
+        """
+        course = CourseFactory.create(default_store=store)
+        return ItemFactory.create(category='html', parent=course, data=data)
+
+    def _get_module(self, descriptor, request=None):
+        """
+        Returns the html block bound to the user.
+        """
+        field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
+            descriptor.location.course_key, self.user, descriptor
+        )
+        return render.get_module(self.user, request or self.request, descriptor.location, field_data_cache)
+
+    @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
+    def test_cached_fragment(self, store):
+        module = self._get_module(self._create_html(store, self.rewrite_link))
+        first_content = module.render(STUDENT_VIEW).content
+        module.xmodule_runtime.xmodule_instance.data = u'<p>Changed in place</p>'
+        second_content = module.render(STUDENT_VIEW).content
+
+        self.assertEqual(first_content, second_content)
+        self.assertNotIn('"/static/foo/content"', second_content)
+        self.assertIn('foo_content', second_content)
+
+    @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
+    def test_user_id_not_cached(self, store):
+        module = self._get_module(self._create_html(store, u'<p>%%USER_ID%%</p>'))
+        module.render(STUDENT_VIEW)
+        module.xmodule_runtime.xmodule_instance.data = u'<p>Changed in place</p>'
+        self.assertIn('Changed in place', module.render(STUDENT_VIEW).content)
+
+    @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
+    def test_same_content_as_uncached(self, store):
+        descriptor = self._create_html(store, self.rewrite_link)
+        with override_settings(XBLOCK_FRAGMENT_CACHE_TIMEOUT=0):
+            uncached_content = self._get_module(descriptor).render(STUDENT_VIEW).content
+
+        self.assertEqual(self._get_module(descriptor).render(STUDENT_VIEW).content, uncached_content)
+        self.assertEqual(self._get_module(descriptor).render(STUDENT_VIEW).content, uncached_content)
+
+    def test_wrappers_applied_to_cached_fragment(self):
+        descriptor = self._create_html(ModuleStoreEnum.Type.split, self.rewrite_link)
+        self._get_module(descriptor).render(STUDENT_VIEW)
+
+        other_request = RequestFactory().get('/')
+        other_request.user = self.user
+        other_request.session = {}
+        content = self._get_module(descriptor, other_request).render(STUDENT_VIEW).content
+        self.assertIn(
+            'data-request-token="{}"'.format(render.xblock_request_token(other_request)),
+            content
+        )
+        self.assertIn('foo_content', content)
+
+    def test_view_name_set_while_rendering(self):
+        module = self._get_module(self._create_html(ModuleStoreEnum.Type.split, self.rewrite_link))
+        runtime = module.xmodule_runtime
+        view_names = []
+
+        def get_html(block):  # pylint: disable=unused-argument
+            """ Records the active view of the runtime """
+            view_names.append(runtime._view_name)  # pylint: disable=protected-access
+            return self.rewrite_link
+
+        with patch.object(HtmlBlock, 'get_html', autospec=True, side_effect=get_html):
+            module.render(STUDENT_VIEW)
+        self.assertEqual(view_names, [STUDENT_VIEW])
+        self.assertIsNone(runtime._view_name)  # pylint: disable=protected-access
+
+    @patch('xmodule.x_module.dog_stats_api')
+    def test_metrics_of_cached_fragment(self, mock_stats):
+        descriptor = self._create_html(ModuleStoreEnum.Type.split, self.rewrite_link)
+        self._get_module(descriptor).render(STUDENT_VIEW)
+        self._get_module(descriptor).render(STUDENT_VIEW)
+        html_renders = [
+            call for call in mock_stats.increment.call_args_list
+            if u'block_type:html' in call[1]['tags'] and u'action:render' in call[1]['tags']
+        ]
+        self.assertEqual(len(html_renders), 2)
+
+
 class XBlockWithJsonInitData(XBlock):
     """
     Pure XBlock to use in tests, with JSON init data.
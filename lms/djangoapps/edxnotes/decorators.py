@@ -7,6 +7,7 @@ import json
 from django.conf import settings
 
 from edxmako.shortcuts import render_to_string
+from xmodule.x_module import USER_INDEPENDENT
 
 
 def edxnotes(cls):
@@ -14,13 +15,14 @@ def edxnotes(cls):
     Decorator that makes components annotatable.
     """
     original_get_html = cls.get_html
+    original_has_support = cls.has_support
 
-    def get_html(self, *args, **kwargs):
+    def get_course_and_user(self):
         """
-        Returns raw html for the component.
+        Returns the course and the user of the component, or None if edxnotes are disabled for them.
         """
         # Import is placed here to avoid model import at project startup.
-        from edxnotes.helpers import generate_uid, get_edxnotes_id_token, get_public_endpoint, get_token_url, is_feature_enabled
+        from edxnotes.helpers import is_feature_enabled
         is_studio = getattr(self.system, "is_author_mode", False)
         course = self.descriptor.runtime.modulestore.get_course(self.runtime.course_id)
 
@@ -32,8 +34,21 @@ def edxnotes(cls):
         user = self.runtime.get_real_user(self.runtime.anonymous_student_id)
 
         if is_studio or not is_feature_enabled(course, user):
+            return None
+        return course, user
+
+    def get_html(self, *args, **kwargs):
+        """
+        Returns raw html for the component.
+        """
+        # Import is placed here to avoid model import at project startup.
+        from edxnotes.helpers import generate_uid, get_edxnotes_id_token, get_public_endpoint, get_token_url
+        course_and_user = get_course_and_user(self)
+
+        if course_and_user is None:
             return original_get_html(self, *args, **kwargs)
         else:
+            course, user = course_and_user
             return render_to_string("edxnotes_wrapper.html", {
                 "content": original_get_html(self, *args, **kwargs),
                 "uid": generate_uid(),
@@ -52,5 +67,16 @@ def edxnotes(cls):
                 },
             })
 
+    def has_support(self, view, functionality):
+        """
+        Returns whether the view has support for the functionality. The html of
+        annotatable components contains a token of the user, so it isn't user
+        independent when edxnotes are enabled.
+        """
+        if functionality == USER_INDEPENDENT and get_course_and_user(self) is not None:
+            return False
+        return original_has_support(self, view, functionality)
+
     cls.get_html = get_html
+    cls.has_support = has_support
     return cls
@@ -36,6 +36,7 @@ from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.tabs import CourseTab
+from xmodule.x_module import USER_INDEPENDENT
 
 FEATURES = settings.FEATURES.copy()
 
@@ -89,6 +90,12 @@ class TestProblem(object):
         """
         return "original_get_html"
 
+    def has_support(self, view, functionality):  # pylint: disable=unused-argument
+        """
+        Imitate has_support in module, for a view supporting every functionality.
+        """
+        return True
+
 
 @attr(shard=3)
 @skipUnless(settings.FEATURES["ENABLE_EDXNOTES"], "EdxNotes feature needs to be enabled.")
@@ -147,6 +154,24 @@ class EdxNotesDecoratorTest(ModuleStoreTestCase):
             render_to_string("edxnotes_wrapper.html", expected_context),
         )
 
+    @patch.dict("django.conf.settings.FEATURES", {"ENABLE_EDXNOTES": True})
+    def test_edxnotes_enabled_not_user_independent(self):
+        """
+        Tests that the view isn't user independent when edxnotes are enabled,
+        since the html contains a token of the user.
+        """
+        CourseEnrollmentFactory(course_id=self.course.id, user=self.user)
+        enable_edxnotes_for_the_course(self.course, self.user.id)
+        self.assertFalse(self.problem.has_support(None, USER_INDEPENDENT))
+        self.assertTrue(self.problem.has_support(None, "multi_device"))
+
+    @patch.dict("django.conf.settings.FEATURES", {"ENABLE_EDXNOTES": False})
+    def test_edxnotes_disabled_user_independent(self):
+        """
+        Tests that has_support is not changed when edxnotes are disabled.
+        """
+        self.assertTrue(self.problem.has_support(None, USER_INDEPENDENT))
+
     @patch.dict("django.conf.settings.FEATURES", {"ENABLE_EDXNOTES": True})
     def test_edxnotes_disabled_if_edxnotes_flag_is_false(self):
         """
@@ -1,5 +1,10 @@
-from lms.djangoapps.course_blocks.api import get_course_blocks
+from lms.djangoapps.course_blocks.api import (
+    get_course_block_access_transformers,
+    get_course_blocks,
+    get_course_blocks_for_users,
+)
 from openedx.core.djangoapps.content.block_structure.api import get_block_structure_manager
+from openedx.core.djangoapps.content.block_structure.transformers import BlockStructureTransformers
 from xmodule.modulestore.django import modulestore
 
 from .transformer import GradesTransformer
@@ -13,8 +18,19 @@ class CourseData(object):
 
     This is an in-memory object that maintains its own internal
     cache during its lifecycle.
+
+    When given bulk_structures (BulkCourseStructures), the structure
+    for the user is transformed by it, when first needed.
     """
-    def __init__(self, user, course=None, collected_block_structure=None, structure=None, course_key=None):
+    def __init__(
+            self,
+            user,
+            course=None,
+            collected_block_structure=None,
+            structure=None,
+            course_key=None,
+            bulk_structures=None,
+    ):
         if not any([course, collected_block_structure, structure, course_key]):
             raise ValueError(
                 "You must specify one of course, collected_block_structure, structure, or course_key to this method."
@@ -22,6 +38,7 @@ class CourseData(object):
         self.user = user
         self._collected_block_structure = collected_block_structure
         self._structure = structure
+        self._bulk_structures = bulk_structures
         self._course = course
         self._course_key = course_key
         self._location = None
@@ -50,18 +67,23 @@ class CourseData(object):
 
     @property
     def structure(self):
+        if self._structure is None and self._bulk_structures is not None:
+            self._structure = self._bulk_structures.get(self.user)
         if self._structure is None:
             self._structure = get_course_blocks(
                 self.user,
                 self.location,
                 collected_block_structure=self._collected_block_structure,
+                collected_data_names=_grades_collected_data_names(),
             )
         return self._structure
 
     @property
     def collected_structure(self):
         if self._collected_block_structure is None:
-            self._collected_block_structure = get_block_structure_manager(self.course_key).get_collected()
+            self._collected_block_structure = get_block_structure_manager(self.course_key).get_collected(
+                _grades_collected_data_names(),
+            )
         return self._collected_block_structure
 
     @property
@@ -110,3 +132,55 @@ class CourseData(object):
     @property
     def effective_structure(self):
         return self._structure or self._collected_block_structure
+
+
+class BulkCourseStructures(object):
+    """
+    Transforms the collected structure of the course of the given
+    CourseData for each of the users of a batch, when requested, with
+    get_course_blocks_for_users, so users with equivalent access share
+    the result of the transformation.
+    """
+    def __init__(self, course_data):
+        self.course_data = course_data
+        self._requested_user = None
+        self._structures = None
+
+    def get(self, user):
+        """
+        Returns the transformed course structure for the given user.
+        """
+        if self._structures is None:
+            self._structures = get_course_blocks_for_users(
+                self._iter_requested_users(),
+                self.course_data.location,
+                collected_block_structure=self.course_data.collected_structure,
+                collected_data_names=_grades_collected_data_names(),
+            )
+        self._requested_user = user
+        try:
+            __, structure = next(self._structures)
+        except Exception:
+            # The generator cannot continue after an error, so the
+            # structure of the next user is transformed by a new one.
+            self._structures = None
+            raise
+        return structure
+
+    def _iter_requested_users(self):
+        """
+        Yields the user whose structure is requested, one at a time, so
+        the structures are transformed only for the users that need them.
+        """
+        while True:
+            yield self._requested_user
+
+
+def _grades_collected_data_names():
+    """
+    Returns the names of the transformers whose collected data is needed
+    for grading: the course block access transformers, which are applied
+    to the collected structure for each user, and the GradesTransformer.
+    """
+    transformers = BlockStructureTransformers(get_course_block_access_transformers() + [GradesTransformer()])
+    return transformers.collected_data_names()
@@ -9,6 +9,7 @@ from lazy import lazy
 
 from ccx_keys.locator import CCXLocator
 from xmodule import block_metadata_utils
+from xmodule.graders import ArrayGrader
 
 from .config import assume_zero_if_absent
 from .subsection_grade import ZeroSubsectionGrade
@@ -153,6 +154,19 @@ class CourseGradeBase(object):
             generate_random_scores=settings.GENERATE_PROFILE_SCORES,
         )
 
+    @lazy
+    def grader_percent(self):
+        """
+        Returns the percent from the course grader, computed with its
+        ArrayGrader when it has one, as the breakdowns of the full
+        grader_result are only needed for display.
+        """
+        course = self._prep_course_for_grading(self.course_data.course)
+        array_grader = ArrayGrader.for_grader(course.grader)
+        if array_grader is None or settings.GENERATE_PROFILE_SCORES:
+            return self.grader_result['percent']
+        return array_grader.grade_percent(self.graded_subsections_by_format)
+
     @property
     def summary(self):
         """
@@ -249,7 +263,7 @@ class CourseGrade(CourseGradeBase):
         """
         Updates the grade for the course. Also updates subsection grades
         if self.force_update_subsections is true, via the lazy call
-        to self.grader_result.
+        to self.grader_percent.
         """
         # TODO update this code to be more functional and readable.
         # Currently, it is hard to follow since there are plenty of
@@ -257,7 +271,7 @@ class CourseGrade(CourseGradeBase):
         # can be passed through and not confusingly stored and used
         # at a later time.
         grade_cutoffs = self.course_data.course.grade_cutoffs
-        self.percent = self._compute_percent(self.grader_result)
+        self.percent = self._compute_percent(self.grader_percent)
         self.letter_grade = self._compute_letter_grade(grade_cutoffs, self.percent)
         self.passed = self._compute_passed(grade_cutoffs, self.percent)
         return self
@@ -285,12 +299,12 @@ class CourseGrade(CourseGradeBase):
             return self._subsection_grade_factory.create(subsection, read_only=True)
 
     @staticmethod
-    def _compute_percent(grader_result):
+    def _compute_percent(grader_percent):
         """
         Computes and returns the grade percentage from the given
-        result from the grader.
+        percent from the grader.
         """
-        return round(grader_result['percent'] * 100 + 0.05) / 100
+        return round(grader_percent * 100 + 0.05) / 100
 
     @staticmethod
     def _compute_letter_grade(grade_cutoffs, percent):
@@ -2,6 +2,8 @@
 Course Grade Factory Class
 """
 from collections import namedtuple
+from contextlib import contextmanager
+from itertools import islice
 from logging import getLogger
 
 import dogstats_wrapper as dog_stats_api
@@ -10,9 +12,11 @@ from six import text_type
 from openedx.core.djangoapps.signals.signals import COURSE_GRADE_CHANGED, COURSE_GRADE_NOW_PASSED
 
 from .config import assume_zero_if_absent, should_persist_grades
-from .course_data import CourseData
+from .course_data import BulkCourseStructures, CourseData
 from .course_grade import CourseGrade, ZeroCourseGrade
-from .models import PersistentCourseGrade, prefetch
+from .models import PersistentCourseGrade, PersistentSubsectionGrade, prefetch
+from .scores import possibly_scored
+from .subsection_grade_factory import clear_prefetched_scores, prefetch_scores
 
 log = getLogger(__name__)
 
@@ -23,6 +27,9 @@ class CourseGradeFactory(object):
     """
     GradeResult = namedtuple('GradeResult', ['student', 'course_grade', 'error'])
 
+    # Number of users whose grades and scores are prefetched together by iter.
+    USER_BATCH_SIZE = 100
+
     def read(
             self,
             user,
@@ -31,6 +38,7 @@ class CourseGradeFactory(object):
             course_structure=None,
             course_key=None,
             create_if_needed=True,
+            bulk_structures=None,
     ):
         """
         Returns the CourseGrade for the given user in the course.
@@ -40,9 +48,12 @@ class CourseGradeFactory(object):
         Else, returns None.
 
         At least one of course, collected_block_structure, course_structure,
-        or course_key should be provided.
+        or course_key should be provided.  bulk_structures optionally
+        provides the course structure of the user, when needed.
         """
-        course_data = CourseData(user, course, collected_block_structure, course_structure, course_key)
+        course_data = CourseData(
+            user, course, collected_block_structure, course_structure, course_key, bulk_structures,
+        )
         try:
             return self._read(user, course_data)
         except PersistentCourseGrade.DoesNotExist:
@@ -61,15 +72,19 @@ class CourseGradeFactory(object):
             course_structure=None,
             course_key=None,
             force_update_subsections=False,
+            bulk_structures=None,
     ):
         """
         Computes, updates, and returns the CourseGrade for the given
         user in the course.
 
         At least one of course, collected_block_structure, course_structure,
-        or course_key should be provided.
+        or course_key should be provided.  bulk_structures optionally
+        provides the course structure of the user, when needed.
         """
-        course_data = CourseData(user, course, collected_block_structure, course_structure, course_key)
+        course_data = CourseData(
+            user, course, collected_block_structure, course_structure, course_key, bulk_structures,
+        )
         return self._update(
             user,
             course_data,
@@ -92,6 +107,13 @@ class CourseGradeFactory(object):
 
         If an error occurred, course_grade will be None and err_msg will be an
         exception message. If there was no error, err_msg is an empty string.
+
+        The students are graded in batches of USER_BATCH_SIZE.  The persisted
+        course grades of the students in a batch are prefetched together.
+        Their subsection grades and scores are also prefetched together, once
+        the grade of a student in the batch needs to be computed.  Students
+        with equivalent access to the course share the transformation of the
+        course structure.
         """
         # Pre-fetch the collected course_structure (in _iter_grade_result) so:
         # 1. Correctness: the same version of the course is used to
@@ -101,18 +123,86 @@ class CourseGradeFactory(object):
         course_data = CourseData(
             user=None, course=course, collected_block_structure=collected_block_structure, course_key=course_key,
         )
+        bulk_structures = BulkCourseStructures(course_data)
         stats_tags = [u'action:{}'.format(course_data.course_key)]
-        for user in users:
-            with dog_stats_api.timer('lms.grades.CourseGradeFactory.iter', tags=stats_tags):
-                yield self._iter_grade_result(user, course_data, force_update)
+        users = iter(users)
+        while True:
+            user_batch = list(islice(users, self.USER_BATCH_SIZE))
+            if not user_batch:
+                break
+            with self._prefetched_batch(user_batch, course_data) as prefetch_for_computing:
+                for user in user_batch:
+                    if self._is_computed(user, course_data.course_key, force_update):
+                        prefetch_for_computing()
+                    with dog_stats_api.timer('lms.grades.CourseGradeFactory.iter', tags=stats_tags):
+                        yield self._iter_grade_result(user, course_data, force_update, bulk_structures)
+
+    @staticmethod
+    @contextmanager
+    def _prefetched_batch(users, course_data):
+        """
+        Prefetches the persisted course grades of the given users in the
+        course for the duration of the context, so they are not queried for
+        each user.
+
+        Yields a function that prefetches the persisted subsection grades
+        and the scores of the users, which are only needed to compute
+        grades.  It queries them on its first call only.
+        """
+        course_key = course_data.course_key
+        should_persist = should_persist_grades(course_key)
+        if should_persist:
+            PersistentCourseGrade.prefetch(course_key, users)
+
+        prefetched = []
+
+        def prefetch_for_computing():
+            """
+            Prefetches the persisted subsection grades and the scores of
+            the users, unless they were already prefetched.
+            """
+            if prefetched:
+                return
+            prefetched.append(True)
+            if should_persist:
+                PersistentSubsectionGrade.prefetch(course_key, users)
+            scorable_locations = [
+                block_key for block_key in course_data.collected_structure if possibly_scored(block_key)
+            ]
+            prefetch_scores(course_key, users, scorable_locations)
+
+        try:
+            yield prefetch_for_computing
+        finally:
+            if should_persist:
+                PersistentCourseGrade.clear_prefetched_data(course_key)
+            if prefetched:
+                if should_persist:
+                    PersistentSubsectionGrade.clear_prefetched_data(course_key, users)
+                clear_prefetched_scores(course_key)
+
+    @staticmethod
+    def _is_computed(user, course_key, force_update):
+        """
+        Returns whether iter computes the grade of the given user in the
+        course, rather than reading it from storage or assuming it is zero.
+        """
+        if force_update or not should_persist_grades(course_key):
+            return True
+        try:
+            PersistentCourseGrade.read(user.id, course_key)
+        except PersistentCourseGrade.DoesNotExist:
+            return not assume_zero_if_absent(course_key)
+        return False
 
-    def _iter_grade_result(self, user, course_data, force_update):
+    def _iter_grade_result(self, user, course_data, force_update, bulk_structures=None):
         try:
             kwargs = {
                 'user': user,
                 'course': course_data.course,
                 'collected_block_structure': course_data.collected_structure,
-                'course_key': course_data.course_key
+                'course_key': course_data.course_key,
+                'bulk_structures': bulk_structures,
             }
             if force_update:
                 kwargs['force_update_subsections'] = True
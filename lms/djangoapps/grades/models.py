@@ -234,10 +234,28 @@ class VisibleBlocks(models.Model):
             user_id=user_id,
             course_id=course_key,
         )
-        prefetched = {grade.visible_blocks.hashed: grade.visible_blocks for grade in grades_with_blocks}
+        return cls.prefetch_from_grades(user_id, course_key, grades_with_blocks)
+
+    @classmethod
+    def prefetch_from_grades(cls, user_id, course_key, grades):
+        """
+        Stores the visible blocks of the given subsection grades, which
+        must have been read with their visible blocks, in the cache as
+        the prefetched visible blocks for the given user and course.
+        Returns a dictionary mapping hashes of these block records to the
+        block record objects.
+        """
+        prefetched = {grade.visible_blocks.hashed: grade.visible_blocks for grade in grades}
         get_cache(cls._CACHE_NAMESPACE)[cls._cache_key(user_id, course_key)] = prefetched
         return prefetched
 
+    @classmethod
+    def clear_prefetched_data(cls, user_id, course_key):
+        """
+        Clears the prefetched visible blocks for the given user and course.
+        """
+        get_cache(cls._CACHE_NAMESPACE).pop(cls._cache_key(user_id, course_key), None)
+
     @classmethod
     def _update_cache(cls, user_id, course_key, visible_blocks):
         """
@@ -309,6 +327,8 @@ class PersistentSubsectionGrade(TimeStampedModel):
     visible_blocks = models.ForeignKey(VisibleBlocks, db_column='visible_blocks_hash', to_field='hashed',
                                        on_delete=models.CASCADE)
 
+    _CACHE_NAMESPACE = u"grades.models.PersistentSubsectionGrade"
+
     @property
     def full_usage_key(self):
         """
@@ -355,6 +375,43 @@ class PersistentSubsectionGrade(TimeStampedModel):
             usage_key=usage_key,
         )
 
+    @classmethod
+    def prefetch(cls, course_key, users):
+        """
+        Prefetches the grades of the given users for the given course,
+        along with their visible blocks and overrides, in a single query.
+        """
+        grades_by_user = {user.id: [] for user in users}
+        for grade in cls.objects.select_related('visible_blocks', 'override').filter(
+                user_id__in=list(grades_by_user),
+                course_id=course_key,
+        ):
+            grades_by_user[grade.user_id].append(grade)
+
+        get_cache(cls._CACHE_NAMESPACE)[cls._cache_key(course_key)] = grades_by_user
+        for user_id, grades in grades_by_user.iteritems():
+            VisibleBlocks.prefetch_from_grades(user_id, course_key, grades)
+            PersistentSubsectionGradeOverride.prefetch_from_grades(user_id, course_key, grades)
+
+    @classmethod
+    def clear_prefetched_data(cls, course_key, users):
+        """
+        Clears the grades, visible blocks and overrides prefetched for the
+        given users for the given course.
+        """
+        get_cache(cls._CACHE_NAMESPACE).pop(cls._cache_key(course_key), None)
+        for user in users:
+            VisibleBlocks.clear_prefetched_data(user.id, course_key)
+            PersistentSubsectionGradeOverride.clear_prefetched_data(user.id, course_key)
+
+    @classmethod
+    def is_prefetched(cls, user_id, course_key):
+        """
+        Returns whether the grades of the given user for the given course
+        were prefetched, and not updated since.
+        """
+        return user_id in get_cache(cls._CACHE_NAMESPACE).get(cls._cache_key(course_key), {})
+
     @classmethod
     def bulk_read_grades(cls, user_id, course_key):
         """
@@ -364,6 +421,9 @@ class PersistentSubsectionGrade(TimeStampedModel):
             user_id: The user associated with the desired grades
             course_key: The course identifier for the desired grades
         """
+        prefetched_grades = get_cache(cls._CACHE_NAMESPACE).get(cls._cache_key(course_key), {})
+        if user_id in prefetched_grades:
+            return prefetched_grades[user_id]
         return cls.objects.select_related('visible_blocks', 'override').filter(
             user_id=user_id,
             course_id=course_key,
@@ -394,6 +454,7 @@ class PersistentSubsectionGrade(TimeStampedModel):
             grade.first_attempted = first_attempted
             grade.save()
 
+        cls._clear_prefetched_grades(user_id, usage_key.course_key)
         cls._emit_grade_calculated_event(grade)
         return grade
 
@@ -405,7 +466,8 @@ class PersistentSubsectionGrade(TimeStampedModel):
         if not grade_params_iter:
             return
 
-        PersistentSubsectionGradeOverride.prefetch(user_id, course_key)
+        if not cls.is_prefetched(user_id, course_key):
+            PersistentSubsectionGradeOverride.prefetch(user_id, course_key)
 
         map(cls._prepare_params, grade_params_iter)
         VisibleBlocks.bulk_get_or_create(
@@ -416,6 +478,7 @@ class PersistentSubsectionGrade(TimeStampedModel):
 
         grades = [PersistentSubsectionGrade(**params) for params in grade_params_iter]
         grades = cls.objects.bulk_create(grades)
+        cls._clear_prefetched_grades(user_id, course_key)
         for grade in grades:
             cls._emit_grade_calculated_event(grade)
         return grades
@@ -456,6 +519,18 @@ class PersistentSubsectionGrade(TimeStampedModel):
             if override.possible_graded_override is not None:
                 params['possible_graded'] = override.possible_graded_override
 
+    @classmethod
+    def _clear_prefetched_grades(cls, user_id, course_key):
+        """
+        Removes the prefetched grades of the given user, if any, since
+        they are outdated.  They are read from the database from now on.
+        """
+        get_cache(cls._CACHE_NAMESPACE).get(cls._cache_key(course_key), {}).pop(user_id, None)
+
+    @classmethod
+    def _cache_key(cls, course_id):
+        return u"subsection_grades_cache.{}".format(course_id)
+
     @staticmethod
     def _emit_grade_calculated_event(grade):
         events.subsection_grade_calculated(grade)
@@ -526,6 +601,13 @@ class PersistentCourseGrade(TimeStampedModel):
             cls.objects.filter(user_id__in=[user.id for user in users], course_id=course_id)
         }
 
+    @classmethod
+    def clear_prefetched_data(cls, course_id):
+        """
+        Clears the grades prefetched for the given course.
+        """
+        get_cache(cls._CACHE_NAMESPACE).pop(cls._cache_key(course_id), None)
+
     @classmethod
     def read(cls, user_id, course_id):
         """
@@ -618,6 +700,26 @@ class PersistentSubsectionGradeOverride(models.Model):
             cls.objects.filter(grade__user_id=user_id, grade__course_id=course_key)
         }
 
+    @classmethod
+    def prefetch_from_grades(cls, user_id, course_key, grades):
+        """
+        Stores the overrides of the given subsection grades, which must
+        have been read with their overrides, in the cache as the
+        prefetched overrides for the given user and course.
+        """
+        get_cache(cls._CACHE_NAMESPACE)[(user_id, str(course_key))] = {
+            grade.usage_key: grade.override
+            for grade in grades
+            if hasattr(grade, 'override')
+        }
+
+    @classmethod
+    def clear_prefetched_data(cls, user_id, course_key):
+        """
+        Clears the prefetched overrides for the given user and course.
+        """
+        get_cache(cls._CACHE_NAMESPACE).pop((user_id, str(course_key)), None)
+
     @classmethod
     def get_override(cls, user_id, usage_key):
         prefetch_values = get_cache(cls._CACHE_NAMESPACE).get((user_id, str(usage_key.course_key)), None)
@@ -634,5 +736,12 @@ class PersistentSubsectionGradeOverride(models.Model):
 
 
 def prefetch(user, course_key):
-    PersistentSubsectionGradeOverride.prefetch(user.id, course_key)
-    VisibleBlocks.bulk_read(user.id, course_key)
+    """
+    Prefetches the overrides and visible blocks of the grades of the given
+    user for the given course, unless already prefetched along with the
+    user's grades.
+    """
+    if not PersistentSubsectionGrade.is_prefetched(user.id, course_key):
+        PersistentSubsectionGradeOverride.prefetch(user.id, course_key)
+        VisibleBlocks.bulk_read(user.id, course_key)
+
@@ -8,3 +8,8 @@ def plugin_settings(settings):
     settings.POLICY_CHANGE_GRADES_ROUTING_KEY = settings.ENV_TOKENS.get(
         'POLICY_CHANGE_GRADES_ROUTING_KEY', settings.LOW_PRIORITY_QUEUE,
     )
+
+    # Seconds during which the recalculations of subsection grades are coalesced
+    settings.RECALCULATE_GRADES_COALESCE_SECONDS = settings.ENV_TOKENS.get(
+        'RECALCULATE_GRADES_COALESCE_SECONDS', settings.RECALCULATE_GRADES_COALESCE_SECONDS,
+    )
@@ -4,3 +4,8 @@ def plugin_settings(settings):
 
     # Queue to use for updating grades due to grading policy change
     settings.POLICY_CHANGE_GRADES_ROUTING_KEY = settings.LOW_PRIORITY_QUEUE
+
+    # Seconds by which the recalculations of subsection grades are delayed, so that
+    # the score changes of a learner in a course during that time are recalculated
+    # together. Needs the default cache to be shared with the workers; 0 disables it.
+    settings.RECALCULATE_GRADES_COALESCE_SECONDS = 5
@@ -27,11 +27,7 @@ from .. import events
 from ..constants import ScoreDatabaseTableEnum
 from ..course_grade_factory import CourseGradeFactory
 from ..scores import weighted_score
-from ..tasks import (
-    RECALCULATE_GRADE_DELAY_SECONDS,
-    recalculate_subsection_grade_v3,
-    recalculate_course_and_subsection_grades_for_user
-)
+from ..tasks import enqueue_subsection_grade_recalculation, recalculate_course_and_subsection_grades_for_user
 
 log = getLogger(__name__)
 
@@ -215,8 +211,8 @@ def enqueue_subsection_update(sender, **kwargs):  # pylint: disable=unused-argum
     enqueueing a subsection update operation to occur asynchronously.
     """
     events.grade_updated(**kwargs)
-    recalculate_subsection_grade_v3.apply_async(
-        kwargs=dict(
+    enqueue_subsection_grade_recalculation(
+        dict(
             user_id=kwargs['user_id'],
             anonymous_user_id=kwargs.get('anonymous_user_id'),
             course_id=kwargs['course_id'],
@@ -227,18 +223,22 @@ def enqueue_subsection_update(sender, **kwargs):  # pylint: disable=unused-argum
             event_transaction_id=unicode(get_event_transaction_id()),
             event_transaction_type=unicode(get_event_transaction_type()),
             score_db_table=kwargs['score_db_table'],
-        ),
-        countdown=RECALCULATE_GRADE_DELAY_SECONDS,
+        )
     )
 
 
 @receiver(SUBSECTION_SCORE_CHANGED)
-def recalculate_course_grade_only(sender, course, course_structure, user, **kwargs):  # pylint: disable=unused-argument
+def recalculate_course_grade_only(
+        sender, course, course_structure, user, update_course_grade=True, **kwargs
+):  # pylint: disable=unused-argument
     """
     Updates a saved course grade, but does not update the subsection
-    grades the user has in this course.
+    grades the user has in this course. Does nothing unless
+    update_course_grade, which is False for all but the last of the
+    subsection grades updated together.
     """
-    CourseGradeFactory().update(user, course=course, course_structure=course_structure)
+    if update_course_grade:
+        CourseGradeFactory().update(user, course=course, course_structure=course_structure)
 
 
 @receiver(ENROLLMENT_TRACK_UPDATED)
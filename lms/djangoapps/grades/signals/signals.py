@@ -82,6 +82,9 @@ SUBSECTION_SCORE_CHANGED = Signal(
         'course_structure',  # BlockStructure object
         'user',  # User object
         'subsection_grade',  # SubsectionGrade object
+        'update_course_grade',  # Boolean indicating whether the course grade is to be updated,
+                                # which is False for all but the last of the subsection grades
+                                # updated together.
     ]
 )
 
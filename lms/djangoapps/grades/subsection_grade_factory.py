@@ -1,4 +1,4 @@
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
 from logging import getLogger
 
 from lazy import lazy
@@ -7,15 +7,77 @@ from courseware.model_data import ScoresClient
 from lms.djangoapps.grades.config import assume_zero_if_absent, should_persist_grades
 from lms.djangoapps.grades.models import PersistentSubsectionGrade
 from lms.djangoapps.grades.scores import possibly_scored
+from openedx.core.lib.cache_utils import get_cache
 from openedx.core.lib.grade_utils import is_score_higher_or_equal
-from student.models import anonymous_id_for_user
+from student.models import anonymous_id_for_user, compute_anonymous_id_for_user
 from submissions import api as submissions_api
+from submissions.models import ScoreSummary
+from submissions.serializers import UnannotatedScoreSerializer
 
 from .course_data import CourseData
 from .subsection_grade import CreateSubsectionGrade, ReadSubsectionGrade, ZeroSubsectionGrade
 
 log = getLogger(__name__)
 
+PrefetchedScores = namedtuple('PrefetchedScores', ['csm_scores', 'submissions_scores'])
+
+_SCORES_CACHE_NAMESPACE = u'grades.subsection_grade_factory.scores'
+
+
+def prefetch_scores(course_key, users, scorable_locations):
+    """
+    Prefetches the scores of the given users for the given locations of the
+    course, from CSM and from the Submissions API, in a query for each.
+    The SubsectionGradeFactory objects of these users then use the
+    prefetched scores, until they are cleared.
+    """
+    csm_scores = ScoresClient.create_for_users(course_key, [user.id for user in users], scorable_locations)
+    submissions_scores = _bulk_get_submissions_scores(course_key, users)
+    get_cache(_SCORES_CACHE_NAMESPACE)[unicode(course_key)] = {
+        user.id: PrefetchedScores(csm_scores[user.id], submissions_scores[user.id])
+        for user in users
+    }
+
+
+def clear_prefetched_scores(course_key):
+    """
+    Clears the scores prefetched for the given course.
+    """
+    get_cache(_SCORES_CACHE_NAMESPACE).pop(unicode(course_key), None)
+
+
+def _get_prefetched_scores(course_key, user_id):
+    """
+    Returns the PrefetchedScores of the given user for the given course,
+    or None if they were not prefetched.
+    """
+    return get_cache(_SCORES_CACHE_NAMESPACE).get(unicode(course_key), {}).get(user_id)
+
+
+def _bulk_get_submissions_scores(course_key, users):
+    """
+    Returns a dict of the ids of the given users to their scores stored
+    by the Submissions API for the course, in the format returned by
+    submissions_api.get_scores.
+    """
+    # The anonymous ids are only needed to find the users' submissions,
+    # and users with submissions already have their anonymous ids saved.
+    # They are not cached on the users, so that they are still saved when
+    # they are needed later on.
+    user_ids_by_anonymous_id = {
+        compute_anonymous_id_for_user(user, course_key): user.id for user in users
+    }
+    scores = {user.id: {} for user in users}
+    score_summaries = ScoreSummary.objects.filter(
+        student_item__course_id=str(course_key),
+        student_item__student_id__in=list(user_ids_by_anonymous_id),
+    ).select_related('latest', 'latest__submission', 'student_item')
+    for summary in score_summaries:
+        if not summary.latest.is_hidden():
+            user_id = user_ids_by_anonymous_id[summary.student_item.student_id]
+            scores[user_id][summary.student_item.item_id] = UnannotatedScoreSerializer(summary.latest).data
+    return scores
+
 
 class SubsectionGradeFactory(object):
     """
@@ -104,6 +166,9 @@ class SubsectionGradeFactory(object):
         Lazily queries and returns all the scores stored in the user
         state (in CSM) for the course, while caching the result.
         """
+        prefetched_scores = _get_prefetched_scores(self.course_data.course_key, self.student.id)
+        if prefetched_scores:
+            return prefetched_scores.csm_scores
         scorable_locations = [block_key for block_key in self.course_data.structure if possibly_scored(block_key)]
         return ScoresClient.create_for_locations(self.course_data.course_key, self.student.id, scorable_locations)
 
@@ -113,6 +178,9 @@ class SubsectionGradeFactory(object):
         Lazily queries and returns the scores stored by the
         Submissions API for the course, while caching the result.
         """
+        prefetched_scores = _get_prefetched_scores(self.course_data.course_key, self.student.id)
+        if prefetched_scores:
+            return prefetched_scores.submissions_scores
         anonymous_user_id = anonymous_id_for_user(self.student, self.course_data.course_key)
         return submissions_api.get_scores(str(self.course_data.course_key), anonymous_user_id)
 
@@ -2,6 +2,8 @@
 This module contains tasks for asynchronous execution of grade updates.
 """
 
+import time
+from collections import OrderedDict
 from logging import getLogger
 
 import six
@@ -10,6 +12,7 @@ from celery_utils.persist_on_failure import LoggedPersistOnFailureTask
 from courseware.model_data import get_score
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.db.utils import DatabaseError
 from edx_django_utils.monitoring import set_custom_metric, set_custom_metrics_for_course_key
@@ -35,12 +38,15 @@ from .transformer import GradesTransformer
 
 log = getLogger(__name__)
 
+COALESCED_RECALCULATIONS_KEY = u'grades.recalculate_subsection_grade.{user_id}.{course_id}'
+COALESCED_RECALCULATIONS_TIMEOUT = 24 * 60 * 60
 COURSE_GRADE_TIMEOUT_SECONDS = 1200
 KNOWN_RETRY_ERRORS = (  # Errors we expect occasionally, should be resolved on retry
     DatabaseError,
     ValidationError,
     DatabaseNotReadyError,
 )
+MAX_COALESCED_RECALCULATIONS = 50
 RECALCULATE_GRADE_DELAY_SECONDS = 2  # to prevent excessive _has_db_updated failures. See TNL-6424.
 RETRY_DELAY_SECONDS = 40
 SUBSECTION_GRADE_TIMEOUT_SECONDS = 300
@@ -164,6 +170,28 @@ def recalculate_subsection_grade_v3(self, **kwargs):
     _recalculate_subsection_grade(self, **kwargs)
 
 
+def enqueue_subsection_grade_recalculation(task_kwargs):
+    """
+    Enqueues a recalculate_subsection_grade_v3 task with the given kwargs.
+
+    Unless settings.RECALCULATE_GRADES_COALESCE_SECONDS is 0, or the cache
+    cannot keep them, the kwargs are cached and numbered in the sequence of
+    the recalculations pending for the learner in the course, and the task is
+    delayed by that many seconds, so that the recalculations of a burst of
+    score changes are done together by the task of the last one.
+    """
+    countdown = RECALCULATE_GRADE_DELAY_SECONDS
+    coalesce_seconds = getattr(settings, 'RECALCULATE_GRADES_COALESCE_SECONDS', 0)
+    sequence = _add_pending_recalculation(task_kwargs) if coalesce_seconds else None
+    if sequence is not None:
+        task_kwargs = dict(task_kwargs, coalesce_sequence=sequence)
+        countdown = max(countdown, coalesce_seconds)
+    recalculate_subsection_grade_v3.apply_async(
+        kwargs=task_kwargs,
+        countdown=countdown,
+    )
+
+
 def _recalculate_subsection_grade(self, **kwargs):
     """
     Updates a saved subsection grade.
@@ -186,6 +214,9 @@ def _recalculate_subsection_grade(self, **kwargs):
             event at the root of the current event transaction.
         score_db_table (ScoreDatabaseTableEnum): database table that houses
             the changed score. Used in conjunction with expected_modified_time.
+        coalesce_sequence (int, OPTIONAL): number of the recalculation in
+            the sequence of those pending for the user in the course, which
+            are done together by the task of the last one.
     """
     try:
         course_key = CourseLocator.from_string(kwargs['course_id'])
@@ -202,22 +233,41 @@ def _recalculate_subsection_grade(self, **kwargs):
         set_event_transaction_id(kwargs.get('event_transaction_id'))
         set_event_transaction_type(kwargs.get('event_transaction_type'))
 
-        # Verify the database has been updated with the scores when the task was
+        recalculations = _pending_recalculations(kwargs)
+        if recalculations is None:
+            set_custom_metric('recalculate_subsection_grade_merged', True)
+            log.info(
+                u"Grades: recalculation merged into a later task. Task ID: {}. Kwargs: {}".format(
+                    self.request.id,
+                    kwargs,
+                )
+            )
+            return
+        if recalculations:
+            set_custom_metric('recalculate_subsection_grade_merged_count', len(recalculations) - 1)
+        else:
+            set_custom_metric('recalculate_subsection_grade_all_subsections', True)
+
+        # Verify the database has been updated with the scores when the tasks were
         # created. This race condition occurs if the transaction in the task
         # creator's process hasn't committed before the task initiates in the worker
-        # process.
-        has_database_updated = _has_db_updated_with_new_score(self, scored_block_usage_key, **kwargs)
-
-        if not has_database_updated:
-            raise DatabaseNotReadyError
+        # process. Only the last recalculation of each score is verified, since the
+        # earlier ones may have been superseded, e.g. by the deletion of the score.
+        latest_recalculations = OrderedDict(
+            ((recalculation['usage_id'], recalculation['score_db_table']), recalculation)
+            for recalculation in recalculations or [kwargs]
+        )
+        for recalculation in latest_recalculations.itervalues():
+            usage_key = UsageKey.from_string(recalculation['usage_id']).replace(course_key=course_key)
+            if not _has_db_updated_with_new_score(self, usage_key, **recalculation):
+                raise DatabaseNotReadyError
 
         _update_subsection_grades(
             course_key,
-            scored_block_usage_key,
-            kwargs['only_if_higher'],
+            recalculations,
             kwargs['user_id'],
-            kwargs['score_deleted'],
         )
+        _mark_recalculations_done(kwargs)
     except Exception as exc:
         if not isinstance(exc, KNOWN_RETRY_ERRORS):
             log.info("tnl-6244 grades unexpected failure: {}. task id: {}. kwargs={}".format(
@@ -228,6 +278,112 @@ def _recalculate_subsection_grade(self, **kwargs):
         raise self.retry(kwargs=kwargs, exc=exc)
 
 
+def _recalculation_keys(user_id, course_id):
+    """
+    Returns the cache keys of the last number in the sequence of the
+    recalculations pending for the user in the course, of the number the
+    sequence started after, and of the last number whose recalculation is
+    done.
+    """
+    key = COALESCED_RECALCULATIONS_KEY.format(user_id=user_id, course_id=course_id)
+    return key + u'.sequence', key + u'.start', key + u'.done'
+
+
+def _recalculation_key(user_id, course_id, sequence):
+    """
+    Returns the cache key of the kwargs of the recalculation with the
+    given number for the user in the course.
+    """
+    return COALESCED_RECALCULATIONS_KEY.format(user_id=user_id, course_id=course_id) + u'.{}'.format(sequence)
+
+
+def _add_pending_recalculation(task_kwargs):
+    """
+    Caches the given recalculation kwargs, and returns their number in the
+    sequence of the recalculations pending for the user in the course, or
+    None if the cache cannot keep the sequence.
+    """
+    sequence_key, start_key, __ = _recalculation_keys(task_kwargs['user_id'], task_kwargs['course_id'])
+    try:
+        sequence = cache.incr(sequence_key)
+    except ValueError:
+        # Start a new sequence after the time in microseconds, so that its
+        # numbers are greater than those of any previous sequence. The
+        # start is not marked as done: the tasks of a previous sequence may
+        # still be pending, and recalculate all of the subsection grades.
+        start = int(time.time() * 1000000)
+        if cache.add(sequence_key, start, COALESCED_RECALCULATIONS_TIMEOUT):
+            cache.set(start_key, start, COALESCED_RECALCULATIONS_TIMEOUT)
+        try:
+            sequence = cache.incr(sequence_key)
+        except ValueError:
+            return None
+    cache.set(
+        _recalculation_key(task_kwargs['user_id'], task_kwargs['course_id'], sequence),
+        task_kwargs,
+        COALESCED_RECALCULATIONS_TIMEOUT,
+    )
+    return sequence
+
+
+def _pending_recalculations(kwargs):
+    """
+    Returns the kwargs of the recalculations to be done by the task with the
+    given kwargs: its own, or all of those pending for the user in the course
+    up to its own when it is numbered in their sequence. Returns None if they
+    are left to the task of a later recalculation, or were done already, and
+    an empty list if some of them are no longer cached or the task is
+    numbered in a previous sequence, in which case all of the subsection
+    grades of the user in the course are to be recalculated.
+    """
+    sequence = kwargs.get('coalesce_sequence')
+    if sequence is None:
+        return [kwargs]
+
+    user_id, course_id = kwargs['user_id'], kwargs['course_id']
+    sequence_key, start_key, done_key = _recalculation_keys(user_id, course_id)
+    cached = cache.get_many([sequence_key, start_key, done_key])
+    last, start, done = cached.get(sequence_key), cached.get(start_key), cached.get(done_key)
+    if start is None and last is not None:
+        # The start of the sequence is no longer cached, so it is restored
+        # at its last number, and only the tasks numbered after it go on
+        # coalescing their recalculations.
+        cache.add(start_key, last, COALESCED_RECALCULATIONS_TIMEOUT)
+    if start is None or sequence <= start:
+        # The task is numbered in a previous sequence, or before the start
+        # was restored, so whether its recalculation was done by the task
+        # of another one is unknown.
+        return []
+    if done is not None and done >= sequence:
+        return None
+    if done is None or done < start:
+        done = start
+    # Debounce the recalculations, up to a maximum number of them.
+    if last is not None and sequence < last < done + MAX_COALESCED_RECALCULATIONS:
+        return None
+    if sequence - done > MAX_COALESCED_RECALCULATIONS:
+        return []
+
+    keys = [_recalculation_key(user_id, course_id, number) for number in six.moves.range(done + 1, sequence + 1)]
+    recalculations = cache.get_many(keys)
+    if len(recalculations) < len(keys):
+        return []
+    return [recalculations[key] for key in keys]
+
+
+def _mark_recalculations_done(kwargs):
+    """
+    Marks the recalculations pending for the user in the course as done, up
+    to that of the task with the given kwargs when it is numbered in their
+    sequence.
+    """
+    sequence = kwargs.get('coalesce_sequence')
+    if sequence is not None:
+        __, __, done_key = _recalculation_keys(kwargs['user_id'], kwargs['course_id'])
+        if cache.get(done_key, 0) < sequence:
+            cache.set(done_key, sequence, COALESCED_RECALCULATIONS_TIMEOUT)
+
+
 def _has_db_updated_with_new_score(self, scored_block_usage_key, **kwargs):
     """
     Returns whether the database has been updated with the
@@ -276,40 +432,64 @@ def _has_db_updated_with_new_score(self, scored_block_usage_key, **kwargs):
     return db_is_updated
 
 
-def _update_subsection_grades(course_key, scored_block_usage_key, only_if_higher, user_id, score_deleted):
+def _update_subsection_grades(course_key, recalculations, user_id):
     """
     A helper function to update subsection grades in the database
-    for each subsection containing the given block, and to signal
-    that those subsection grades were updated.
+    for each subsection containing the blocks of the given recalculations,
+    or for each subsection of the course if there are none, and to signal
+    that those subsection grades were updated. The course grade is updated
+    with the last of them.
     """
     student = User.objects.get(id=user_id)
     store = modulestore()
     with store.bulk_operations(course_key):
         course_structure = get_course_blocks(student, store.make_course_usage_key(course_key))
-        subsections_to_update = course_structure.get_transformer_block_field(
-            scored_block_usage_key,
-            GradesTransformer,
-            'subsections',
-            set(),
-        )
+        subsections_to_update = OrderedDict()
+        if recalculations:
+            for recalculation in recalculations:
+                scored_block_usage_key = UsageKey.from_string(recalculation['usage_id']).replace(course_key=course_key)
+                for subsection_usage_key in course_structure.get_transformer_block_field(
+                    scored_block_usage_key,
+                    GradesTransformer,
+                    'subsections',
+                    set(),
+                ):
+                    only_if_higher, score_deleted = recalculation['only_if_higher'], recalculation['score_deleted']
+                    if subsection_usage_key in subsections_to_update:
+                        # Update the grade unconditionally if any recalculation does.
+                        previous_only_if_higher, previous_score_deleted = subsections_to_update[subsection_usage_key]
+                        only_if_higher = previous_only_if_higher and only_if_higher
+                        score_deleted = previous_score_deleted or score_deleted
+                    subsections_to_update[subsection_usage_key] = (only_if_higher, score_deleted)
+        else:
+            for subsection_usage_key in course_structure.topological_traversal(
+                filter_func=lambda block_key: block_key.block_type == 'sequential',
+            ):
+                subsections_to_update[subsection_usage_key] = (None, False)
 
         course = store.get_course(course_key, depth=0)
         subsection_grade_factory = SubsectionGradeFactory(student, course, course_structure)
 
-        for subsection_usage_key in subsections_to_update:
-            if subsection_usage_key in course_structure:
-                subsection_grade = subsection_grade_factory.update(
-                    course_structure[subsection_usage_key],
-                    only_if_higher,
-                    score_deleted
-                )
-                SUBSECTION_SCORE_CHANGED.send(
-                    sender=None,
-                    course=course,
-                    course_structure=course_structure,
-                    user=student,
-                    subsection_grade=subsection_grade,
-                )
+        subsections_to_update = [
+            (subsection_usage_key, flags)
+            for subsection_usage_key, flags in subsections_to_update.iteritems()
+            if subsection_usage_key in course_structure
+        ]
+        set_custom_metric('recalculate_subsection_grade_subsections', len(subsections_to_update))
+        for index, (subsection_usage_key, (only_if_higher, score_deleted)) in enumerate(subsections_to_update):
+            subsection_grade = subsection_grade_factory.update(
+                course_structure[subsection_usage_key],
+                only_if_higher,
+                score_deleted
+            )
+            SUBSECTION_SCORE_CHANGED.send(
+                sender=None,
+                course=course,
+                course_structure=course_structure,
+                user=student,
+                subsection_grade=subsection_grade,
+                update_course_grade=index == len(subsections_to_update) - 1,
+            )
 
 
 def _course_task_args(course_key, **kwargs):
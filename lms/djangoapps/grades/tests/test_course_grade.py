@@ -7,6 +7,7 @@ from openedx.core.djangolib.testing.utils import get_mock_request
 from student.models import CourseEnrollment
 from student.tests.factories import UserFactory
 from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
+from xmodule.graders import ArrayGrader
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 
 from ..config.waffle import ASSUME_ZERO_GRADE_IF_ABSENT, waffle
@@ -153,3 +154,34 @@ class TestScoreForModule(SharedModuleStoreTestCase):
         earned, possible = self.course_grade.score_for_module(self.m.location)
         self.assertEqual(earned, 0)
         self.assertEqual(possible, 0)
+
+
+class CourseGradeTest(GradeTestBase):
+    """
+    Tests CourseGrade functionality.
+    """
+    shard = 4
+
+    def test_grader_percent(self):
+        """
+        Tests that the percent computed with the ArrayGrader of the course
+        grader is the percent of the full grader result.
+        """
+        answer_problem(self.course, self.request, self.problem, score=1, max_value=3)
+        course_grade = CourseGradeFactory().update(self.request.user, self.course)
+        self.assertEqual(course_grade.grader_percent, course_grade.grader_result['percent'])
+
+        with patch('lms.djangoapps.grades.course_grade.ArrayGrader.for_grader', return_value=None):
+            course_grade_without_arrays = CourseGradeFactory().update(self.request.user, self.course)
+        self.assertEqual(course_grade_without_arrays.percent, course_grade.percent)
+        self.assertEqual(course_grade_without_arrays.letter_grade, course_grade.letter_grade)
+
+    def test_array_grader_of_course(self):
+        """
+        Tests that the ArrayGrader of the course grader is created once,
+        even though the course creates a new grader on each access.
+        """
+        self.assertIsNot(self.course.grader, self.course.grader)
+        array_grader = ArrayGrader.for_grader(self.course.grader)
+        self.assertIsNotNone(array_grader)
+        self.assertIs(ArrayGrader.for_grader(self.course.grader), array_grader)
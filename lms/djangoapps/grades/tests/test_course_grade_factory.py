@@ -3,11 +3,13 @@ import itertools
 import ddt
 from courseware.access import has_access
 from django.conf import settings
+from lms.djangoapps.course_blocks.api import get_course_blocks_for_users
 from lms.djangoapps.grades.config.tests.utils import persistent_grades_feature_flags
 from mock import patch
 from openedx.core.djangoapps.content.block_structure.factory import BlockStructureFactory
 from six import text_type
 
+from student.models import anonymous_id_for_user, user_by_anonymous_id
 from student.tests.factories import UserFactory
 from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
 from xmodule.modulestore.tests.factories import CourseFactory
@@ -15,6 +17,7 @@ from xmodule.modulestore.tests.factories import CourseFactory
 from ..config.waffle import ASSUME_ZERO_GRADE_IF_ABSENT, waffle
 from ..course_grade import CourseGrade, ZeroCourseGrade
 from ..course_grade_factory import CourseGradeFactory
+from ..models import PersistentSubsectionGrade
 from ..subsection_grade import ReadSubsectionGrade, ZeroSubsectionGrade
 from .base import GradeTestBase
 from .utils import mock_get_score
@@ -311,7 +314,7 @@ class TestGradeIteration(SharedModuleStoreTestCase):
             else mock_course_grade.return_value
             for student in self.students
         ]
-        with self.assertNumQueries(4):
+        with self.assertNumQueries(5):
             all_course_grades, all_errors = self._course_grades_and_errors_for(self.course, self.students)
         self.assertEqual(
             {student: text_type(all_errors[student]) for student in all_errors},
@@ -333,7 +336,51 @@ class TestGradeIteration(SharedModuleStoreTestCase):
         self.assertIsNotNone(all_course_grades[student2])
         self.assertIsNotNone(all_course_grades[student5])
 
-    def _course_grades_and_errors_for(self, course, students):
+    @patch.object(CourseGradeFactory, 'USER_BATCH_SIZE', 2)
+    def test_prefetched_in_batches(self):
+        with patch.object(
+            PersistentSubsectionGrade, 'prefetch', wraps=PersistentSubsectionGrade.prefetch,
+        ) as mock_prefetch:
+            all_course_grades, all_errors = self._course_grades_and_errors_for(
+                self.course, self.students, force_update=True,
+            )
+
+        self.assertEqual(len(all_course_grades), 5)
+        self.assertEqual(len(all_errors), 0)
+        self.assertEqual(
+            [users for (_, users), _ in mock_prefetch.call_args_list],
+            [self.students[0:2], self.students[2:4], self.students[4:5]],
+        )
+
+    def test_not_prefetched_when_not_computed(self):
+        with patch.object(PersistentSubsectionGrade, 'prefetch') as mock_prefetch:
+            with patch('lms.djangoapps.grades.course_grade_factory.prefetch_scores') as mock_prefetch_scores:
+                all_course_grades, all_errors = self._course_grades_and_errors_for(self.course, self.students)
+
+        self.assertEqual(len(all_course_grades), 5)
+        self.assertEqual(len(all_errors), 0)
+        self.assertFalse(mock_prefetch.called)
+        self.assertFalse(mock_prefetch_scores.called)
+
+    def test_structures_transformed_in_bulk(self):
+        with patch(
+            'lms.djangoapps.grades.course_data.get_course_blocks_for_users',
+            wraps=get_course_blocks_for_users,
+        ) as mock_bulk_course_blocks:
+            with patch('lms.djangoapps.grades.course_data.get_course_blocks') as mock_course_blocks:
+                all_course_grades, all_errors = self._course_grades_and_errors_for(self.course, self.students)
+
+        self.assertEqual(len(all_course_grades), 5)
+        self.assertEqual(len(all_errors), 0)
+        self.assertEqual(mock_bulk_course_blocks.call_count, 1)
+        self.assertFalse(mock_course_blocks.called)
+
+    def test_anonymous_ids_saved_after_iteration(self):
+        self._course_grades_and_errors_for(self.course, self.students)
+        anonymous_id = anonymous_id_for_user(self.students[0], self.course.id)
+        self.assertEqual(user_by_anonymous_id(anonymous_id), self.students[0])
+
+    def _course_grades_and_errors_for(self, course, students, force_update=False):
         """
         Simple helper method to iterate through student grades and give us
         two dictionaries -- one that has all students and their respective
@@ -343,7 +390,7 @@ class TestGradeIteration(SharedModuleStoreTestCase):
         students_to_course_grades = {}
         students_to_errors = {}
 
-        for student, course_grade, error in CourseGradeFactory().iter(students, course):
+        for student, course_grade, error in CourseGradeFactory().iter(students, course, force_update=force_update):
             students_to_course_grades[student] = course_grade
             if error:
                 students_to_errors[student] = error
@@ -13,7 +13,7 @@ from django.db.utils import IntegrityError
 from django.test import TestCase
 from django.utils.timezone import now
 from freezegun import freeze_time
-from mock import patch
+from mock import Mock, patch
 from opaque_keys.edx.locator import BlockUsageLocator, CourseLocator
 
 from lms.djangoapps.grades.models import (
@@ -307,6 +307,33 @@ class PersistentSubsectionGradeTest(GradesModelTestCase):
         self.assertEqual(grade.earned_all, 0.0)
         self.assertEqual(grade.earned_graded, 0.0)
 
+    def test_prefetch(self):
+        grade = PersistentSubsectionGrade.update_or_create_grade(**self.params)
+        override = PersistentSubsectionGradeOverride.objects.create(grade=grade, earned_all_override=0.0)
+        users = [Mock(id=self.params['user_id']), Mock(id=54321)]
+        self.addCleanup(PersistentSubsectionGrade.clear_prefetched_data, self.course_key, users)
+
+        with self.assertNumQueries(1):
+            PersistentSubsectionGrade.prefetch(self.course_key, users)
+        with self.assertNumQueries(0):
+            self.assertEqual(list(PersistentSubsectionGrade.bulk_read_grades(12345, self.course_key)), [grade])
+            self.assertEqual(list(PersistentSubsectionGrade.bulk_read_grades(54321, self.course_key)), [])
+            self.assertEqual(list(VisibleBlocks.bulk_read(12345, self.course_key)), [self.block_records.hash_value])
+            self.assertEqual(PersistentSubsectionGradeOverride.get_override(12345, self.usage_key), override)
+            self.assertIsNone(PersistentSubsectionGradeOverride.get_override(54321, self.usage_key))
+
+    def test_prefetched_grades_outdated_by_update(self):
+        PersistentSubsectionGrade.update_or_create_grade(**self.params)
+        users = [Mock(id=self.params['user_id'])]
+        self.addCleanup(PersistentSubsectionGrade.clear_prefetched_data, self.course_key, users)
+        PersistentSubsectionGrade.prefetch(self.course_key, users)
+        self.assertTrue(PersistentSubsectionGrade.is_prefetched(12345, self.course_key))
+
+        self.params['earned_all'] = 7.0
+        PersistentSubsectionGrade.update_or_create_grade(**self.params)
+        self.assertFalse(PersistentSubsectionGrade.is_prefetched(12345, self.course_key))
+        self.assertEqual(PersistentSubsectionGrade.bulk_read_grades(12345, self.course_key)[0].earned_all, 7.0)
+
     def _assert_tracker_emitted_event(self, tracker_mock, grade):
         """
         Helper function to ensure that the mocked event tracker
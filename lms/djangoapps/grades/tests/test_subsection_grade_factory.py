@@ -1,11 +1,12 @@
 import ddt
+from courseware.tests.factories import StudentModuleFactory
 from courseware.tests.test_submitting_problems import ProblemSubmissionTestMixin
 from django.conf import settings
 from lms.djangoapps.grades.config.tests.utils import persistent_grades_feature_flags
 from mock import patch
 
 from ..models import PersistentSubsectionGrade
-from ..subsection_grade_factory import ZeroSubsectionGrade
+from ..subsection_grade_factory import ZeroSubsectionGrade, clear_prefetched_scores, prefetch_scores
 from .base import GradeTestBase
 from .utils import mock_get_score
 
@@ -100,3 +101,18 @@ class TestSubsectionGradeFactory(ProblemSubmissionTestMixin, GradeTestBase):
             ):
                 self.subsection_grade_factory.create(self.sequence)
         self.assertEqual(mock_read_saved_grade.called, feature_flag and course_setting)
+
+    def test_prefetched_scores(self):
+        StudentModuleFactory.create(
+            student=self.request.user,
+            course_id=self.course.id,
+            module_state_key=self.problem.location,
+            grade=1,
+            max_grade=1,
+        )
+        prefetch_scores(self.course.id, [self.request.user], [self.problem.location])
+        self.addCleanup(clear_prefetched_scores, self.course.id)
+
+        with self.assertNumQueries(0):
+            grade = self.subsection_grade_factory.update(self.sequence, persist_grade=False)
+        self.assert_grade(grade, 1.0, 1.0)
@@ -11,7 +11,9 @@ import ddt
 import pytz
 import six
 from django.conf import settings
+from django.core.cache import cache
 from django.db.utils import IntegrityError
+from django.test.utils import override_settings
 from mock import MagicMock, patch
 
 from lms.djangoapps.grades import tasks
@@ -228,6 +230,19 @@ class RecalculateSubsectionGradeTest(HasCourseWithProblemsMixin, ModuleStoreTest
             {self.sequential.location, accessible_seq.location},
         )
 
+    @patch('lms.djangoapps.grades.signals.signals.SUBSECTION_SCORE_CHANGED.send')
+    def test_course_grade_updated_with_last_subsection(self, mock_subsection_signal):
+        self.set_up_course()
+        other_seq = ItemFactory.create(parent=self.chapter, category='sequential')
+        other_seq.children = [self.problem.location]
+        modulestore().update_item(other_seq, self.user.id)
+
+        self._apply_recalculate_subsection_grade()
+        self.assertEqual(
+            [args[1]['update_course_grade'] for args in mock_subsection_signal.call_args_list],
+            [False, True],
+        )
+
     @ddt.data(
         (ModuleStoreEnum.Type.mongo, 1, 12),
         (ModuleStoreEnum.Type.split, 3, 12),
@@ -407,6 +422,163 @@ class RecalculateSubsectionGradeTest(HasCourseWithProblemsMixin, ModuleStoreTest
         self.assertFalse(mock_retry.called)
 
 
+@override_settings(
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'coalesced_recalculations',
+        }
+    },
+    RECALCULATE_GRADES_COALESCE_SECONDS=5,
+)
+@patch.dict(settings.FEATURES, {'PERSISTENT_GRADES_ENABLED_FOR_ALL_TESTS': False})
+@ddt.ddt
+class CoalescedRecalculateSubsectionGradeTest(HasCourseWithProblemsMixin, ModuleStoreTestCase):
+    """
+    Ensures that the recalculations of bursts of score changes are done together.
+    """
+    shard = 4
+    ENABLED_SIGNALS = ['course_published', 'pre_publish']
+
+    def setUp(self):
+        super(CoalescedRecalculateSubsectionGradeTest, self).setUp()
+        self.user = UserFactory()
+        PersistentGradesEnabledFlag.objects.create(enabled_for_all_courses=True, enabled=True)
+        self.set_up_course()
+        self.problems = [self.problem] + [
+            ItemFactory.create(parent=self.sequential, category='problem') for __ in range(2)
+        ]
+        self.addCleanup(cache.clear)
+
+    def _enqueue_recalculations(self, problems=None):
+        """
+        Sends a PROBLEM_WEIGHTED_SCORE_CHANGED signal for each of the given
+        problems, or of all of them, and returns the kwargs of the tasks
+        enqueued.
+        """
+        with patch('lms.djangoapps.grades.tasks.recalculate_subsection_grade_v3.apply_async') as mock_task_apply:
+            for problem in problems or self.problems:
+                send_args = dict(self.problem_weighted_score_changed_kwargs, usage_id=unicode(problem.location))
+                PROBLEM_WEIGHTED_SCORE_CHANGED.send(sender=None, **send_args)
+        for args in mock_task_apply.call_args_list:
+            self.assertEqual(args[1]['countdown'], 5)
+        return [args[1]['kwargs'] for args in mock_task_apply.call_args_list]
+
+    def _apply_recalculations(self, tasks_kwargs):
+        """
+        Applies the tasks with the given kwargs, and returns the recalculations
+        done by each of them, as the usage ids they updated or None.
+        """
+        recalculations = []
+        mock_score = MagicMock(modified=datetime.utcnow().replace(tzinfo=pytz.UTC) + timedelta(days=1))
+        with patch('lms.djangoapps.grades.tasks.get_score', return_value=mock_score):
+            for task_kwargs in tasks_kwargs:
+                with patch('lms.djangoapps.grades.tasks._update_subsection_grades') as mock_update:
+                    recalculate_subsection_grade_v3.apply(kwargs=task_kwargs)
+                if mock_update.called:
+                    course_key, updated, user_id = mock_update.call_args[0]
+                    self.assertEqual((course_key, user_id), (self.course.id, self.user.id))
+                    recalculations.append([recalculation['usage_id'] for recalculation in updated])
+                else:
+                    recalculations.append(None)
+        return recalculations
+
+    def test_enqueued_in_sequence(self):
+        tasks_kwargs = self._enqueue_recalculations()
+        first = tasks_kwargs[0]['coalesce_sequence']
+        self.assertEqual(
+            [task_kwargs['coalesce_sequence'] for task_kwargs in tasks_kwargs],
+            [first, first + 1, first + 2],
+        )
+        for task_kwargs, problem in zip(tasks_kwargs, self.problems):
+            self.assertEqual(task_kwargs['usage_id'], unicode(problem.location))
+
+    @patch('lms.djangoapps.grades.tasks.set_custom_metric')
+    def test_merged_into_last_task(self, mock_set_custom_metric):
+        tasks_kwargs = self._enqueue_recalculations()
+        self.assertEqual(
+            self._apply_recalculations(tasks_kwargs),
+            [None, None, [unicode(problem.location) for problem in self.problems]],
+        )
+        mock_set_custom_metric.assert_any_call('recalculate_subsection_grade_merged', True)
+        mock_set_custom_metric.assert_any_call('recalculate_subsection_grade_merged_count', 2)
+
+        # The recalculations are not done again when the tasks are retried.
+        self.assertEqual(self._apply_recalculations(tasks_kwargs), [None, None, None])
+
+    def test_superseded_recalculation_not_verified(self):
+        tasks_kwargs = self._enqueue_recalculations([self.problem])
+        with patch.dict(self.problem_weighted_score_changed_kwargs, score_deleted=True):
+            tasks_kwargs += self._enqueue_recalculations([self.problem])
+
+        # The score was reset after it was submitted, so only the verification
+        # of the last recalculation can succeed.
+        with patch('lms.djangoapps.grades.tasks.get_score', return_value=None):
+            with patch('lms.djangoapps.grades.tasks._update_subsection_grades') as mock_update:
+                for task_kwargs in tasks_kwargs:
+                    recalculate_subsection_grade_v3.apply(kwargs=task_kwargs)
+        self.assertEqual(mock_update.call_count, 1)
+        self.assertEqual(
+            [recalculation['score_deleted'] for recalculation in mock_update.call_args[0][1]],
+            [False, True],
+        )
+
+    def test_maximum_merged(self):
+        tasks_kwargs = self._enqueue_recalculations()
+        usage_ids = [unicode(problem.location) for problem in self.problems]
+        with patch('lms.djangoapps.grades.tasks.MAX_COALESCED_RECALCULATIONS', 3):
+            self.assertEqual(self._apply_recalculations(tasks_kwargs), [usage_ids[:1], None, usage_ids[1:]])
+
+    def test_recalculations_no_longer_cached(self):
+        tasks_kwargs = self._enqueue_recalculations()
+        cache.delete(tasks._recalculation_key(  # pylint: disable=protected-access
+            self.user.id, unicode(self.course.id), tasks_kwargs[0]['coalesce_sequence'],
+        ))
+        self.assertEqual(self._apply_recalculations(tasks_kwargs), [None, None, []])
+
+    @ddt.data(True, False)
+    def test_cache_flushed_between_recalculations(self, earlier_task_first):
+        other_seq = ItemFactory.create(parent=self.chapter, category='sequential')
+        other_problem = ItemFactory.create(parent=other_seq, category='problem')
+        earlier_kwargs = self._enqueue_recalculations([self.problem])
+        cache.clear()
+        later_kwargs = self._enqueue_recalculations([other_problem])
+
+        # The task of the previous sequence recalculates all of the
+        # subsection grades, whichever task runs first.
+        if earlier_task_first:
+            expected = [[], [unicode(other_problem.location)]]
+            self.assertEqual(self._apply_recalculations(earlier_kwargs + later_kwargs), expected)
+        else:
+            expected = [[unicode(other_problem.location)], []]
+            self.assertEqual(self._apply_recalculations(later_kwargs + earlier_kwargs), expected)
+
+    def test_sequence_start_no_longer_cached(self):
+        tasks_kwargs = self._enqueue_recalculations()
+        __, start_key, __ = tasks._recalculation_keys(  # pylint: disable=protected-access
+            self.user.id, unicode(self.course.id),
+        )
+        cache.delete(start_key)
+        self.assertEqual(self._apply_recalculations(tasks_kwargs), [[], [], []])
+
+        # The start is restored, so later recalculations are coalesced again.
+        tasks_kwargs = self._enqueue_recalculations()
+        self.assertEqual(
+            self._apply_recalculations(tasks_kwargs),
+            [None, None, [unicode(problem.location) for problem in self.problems]],
+        )
+
+    @patch('lms.djangoapps.grades.signals.signals.SUBSECTION_SCORE_CHANGED.send')
+    def test_all_subsections_updated(self, mock_subsection_signal):
+        other_seq = ItemFactory.create(parent=self.chapter, category='sequential')
+        with mock_get_score(1, 2):
+            tasks._update_subsection_grades(self.course.id, [], self.user.id)  # pylint: disable=protected-access
+        self.assertEqual(
+            [args[1]['subsection_grade'].location for args in mock_subsection_signal.call_args_list],
+            [self.sequential.location, other_seq.location],
+        )
+
+
 @ddt.ddt
 class ComputeGradesForCourseTest(HasCourseWithProblemsMixin, ModuleStoreTestCase):
     """
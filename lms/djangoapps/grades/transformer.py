@@ -75,6 +75,10 @@ class GradesTransformer(BlockStructureTransformer):
         cls._collect_explicit_graded(block_structure)
         cls._collect_grading_policy_hash(block_structure)
 
+    def transform_memo_key(self, usage_info, block_structure):
+        # The transform method performs no transformations.
+        return ()
+
     def transform(self, block_structure, usage_context):
         """
         Perform no transformations.
@@ -2450,10 +2450,15 @@ def export_ora2_data(request, course_id):
 def calculate_grades_csv(request, course_id):
     """
     AlreadyRunningError is raised if the course's grades are already being updated.
+
+    Takes the following query parameters:
+    - (optional) incremental - if 'true', only the learners whose grades changed
+      since the previous grade report are graded again
     """
     report_type = _('grade')
     course_key = CourseKey.from_string(course_id)
-    lms.djangoapps.instructor_task.api.submit_calculate_grades_csv(request, course_key)
+    incremental = _get_boolean_param(request, 'incremental')
+    lms.djangoapps.instructor_task.api.submit_calculate_grades_csv(request, course_key, incremental=incremental)
     success_status = SUCCESS_MESSAGE_TEMPLATE.format(report_type=report_type)
 
     return JsonResponse({"status": success_status})
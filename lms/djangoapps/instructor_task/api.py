@@ -336,13 +336,16 @@ def submit_calculate_problem_responses_csv(request, course_key, problem_location
     return submit_task(request, task_type, task_class, course_key, task_input, task_key)
 
 
-def submit_calculate_grades_csv(request, course_key):
+def submit_calculate_grades_csv(request, course_key, incremental=False):
     """
     AlreadyRunningError is raised if the course's grades are already being updated.
+
+    If `incremental`, the grade report reuses the rows of the previous one for
+    the learners whose grades did not change since.
     """
     task_type = 'grade_course'
     task_class = calculate_grades_csv
-    task_input = {}
+    task_input = {'incremental': True} if incremental else {}
     task_key = ""
 
     return submit_task(request, task_type, task_class, course_key, task_input, task_key)
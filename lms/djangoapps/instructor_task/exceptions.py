@@ -16,3 +16,8 @@ class UpdateProblemModuleStateError(Exception):
 class DuplicateTaskException(Exception):
     """Exception indicating that a task already exists or has already completed."""
     pass
+
+
+class GradeReportShardError(Exception):
+    """Exception indicating that the shards of a grade report can't be concatenated into it."""
+    pass
@@ -18,12 +18,14 @@ import hashlib
 import json
 import logging
 import os.path
+import shutil
+import tempfile
 from uuid import uuid4
 
 from boto.exception import BotoServerError
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.core.files.base import ContentFile
+from django.core.files.base import ContentFile, File
 from django.db import models, transaction
 from opaque_keys.edx.django.models import CourseKeyField
 from six import text_type
@@ -265,6 +267,23 @@ class DjangoStorageReportStore(ReportStore):
         path = self.path_to(course_id, filename)
         self.storage.save(path, buff)
 
+    def open(self, course_id, filename):
+        """
+        Returns a file-like object for reading the file named `filename` in
+        the directory of `course_id`, or None if there is no such file.
+        """
+        path = self.path_to(course_id, filename)
+        if not self.storage.exists(path):
+            return None
+        return self.storage.open(path)
+
+    def delete(self, course_id, filename):
+        """
+        Deletes the file named `filename` in the directory of `course_id`, if
+        there is one.
+        """
+        self.storage.delete(self.path_to(course_id, filename))
+
     def store_rows(self, course_id, filename, rows):
         """
         Given a course_id, filename, and rows (each row is an iterable of
@@ -278,6 +297,23 @@ class DjangoStorageReportStore(ReportStore):
         output_buffer.seek(0)
         self.store(course_id, filename, output_buffer)
 
+    def store_csv_files(self, course_id, filename, header, csv_files):
+        """
+        Given a course_id, filename, header row and csv_files (file-like
+        objects holding utf-8 encoded csv rows), write the header followed
+        by the contents of each file, in order, to the storage backend.
+        The rows are copied through a temporary file rather than memory.
+        """
+        with tempfile.TemporaryFile() as output_file:
+            # Adding unicode signature (BOM) for MS Excel 2013 compatibility
+            output_file.write(codecs.BOM_UTF8)
+            csv.writer(output_file).writerows(self._get_utf8_encoded_rows([header]))
+            for csv_file in csv_files:
+                csv_file.seek(0)
+                shutil.copyfileobj(csv_file, output_file)
+            output_file.seek(0)
+            self.store(course_id, filename, File(output_file))
+
     def links_for(self, course_id):
         """
         For a given `course_id`, return a list of `(filename, url)` tuples.
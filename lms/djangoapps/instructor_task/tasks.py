@@ -187,6 +187,26 @@ def calculate_grades_csv(entry_id, xmodule_instance_args):
     return run_main_task(entry_id, task_fn, action_name)
 
 
+@task(routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)
+def generate_grade_report_shard(entry_id, xmodule_instance_args, shard_index, subtask_status_dict):
+    """
+    Grade a shard of the users of a course grade report, and store its partial files.
+
+    These subtasks are queued by `calculate_grades_csv` when the report is split into
+    several shards, and update the InstructorTask of the report themselves.
+    """
+    CourseGradeReport.generate_shard(xmodule_instance_args, entry_id, shard_index, subtask_status_dict)
+
+
+@task(routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)
+def upload_grade_report_shards(entry_id, xmodule_instance_args, subtask_status_dict):
+    """
+    Concatenate the partial files of the shards of a course grade report, and push the
+    report to an S3 bucket for download.
+    """
+    CourseGradeReport.upload_shards(xmodule_instance_args, entry_id, subtask_status_dict)
+
+
 @task(base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)
 def calculate_problem_grade_report(entry_id, xmodule_instance_args):
     """
@@ -1,29 +1,51 @@
 """
 Functionality for generating grade reports.
 """
+import codecs
+import csv
+import heapq
+import json
 import logging
 import re
+import shutil
+import traceback
 from collections import OrderedDict
 from datetime import datetime
 from itertools import chain, izip, izip_longest
+from tempfile import TemporaryFile
 from time import time
+from uuid import uuid4
 
+import numpy
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from celery.states import FAILURE, READY_STATES, SUCCESS
 from lazy import lazy
 from opaque_keys.edx.keys import UsageKey
 from pytz import UTC
 from six import text_type
 
 from course_blocks.api import get_course_blocks
+from course_modes.models import CourseMode
 from courseware.courses import get_course_by_id
 from courseware.user_state_client import DjangoXBlockUserStateClient
 from instructor_analytics.basic import list_problem_responses
 from instructor_analytics.csvs import format_dictlist
 from lms.djangoapps.certificates.models import CertificateWhitelist, GeneratedCertificate, certificate_info_for_user
+from lms.djangoapps.grades.config import should_persist_grades
 from lms.djangoapps.grades.context import grading_context, grading_context_for_course
-from lms.djangoapps.grades.models import PersistentCourseGrade
 from lms.djangoapps.grades.course_grade_factory import CourseGradeFactory
+from lms.djangoapps.grades.models import PersistentCourseGrade, PersistentSubsectionGrade
+from lms.djangoapps.instructor_task.exceptions import GradeReportShardError
+from lms.djangoapps.instructor_task.models import InstructorTask, ReportStore
+from lms.djangoapps.instructor_task.subtasks import (
+    SubtaskStatus,
+    check_subtask_is_valid,
+    initialize_subtask_info,
+    update_subtask_status
+)
 from lms.djangoapps.teams.models import CourseTeamMembership
 from lms.djangoapps.verify_student.services import IDVerificationService
 from openedx.core.djangoapps.content.block_structure.api import get_course_in_cache
@@ -31,15 +53,20 @@ from openedx.core.djangoapps.course_groups.cohorts import bulk_cache_cohorts, ge
 from openedx.core.djangoapps.user_api.course_tag.api import BulkCourseTags
 from student.models import CourseEnrollment
 from student.roles import BulkRoleCache
+from util.db import outer_atomic
+from xmodule.graders import totals_with_drops
 from xmodule.modulestore.django import modulestore
 from xmodule.partitions.partitions_service import PartitionService
 from xmodule.split_test_module import get_split_user_partitions
 
 from .runner import TaskProgress
-from .utils import upload_csv_to_report_store
+from .utils import upload_csv_files_to_report_store, upload_csv_to_report_store
 
 TASK_LOG = logging.getLogger('edx.celery.task')
 
+# Task type of the InstructorTasks which generate course grade reports.
+GRADE_REPORT_TASK_TYPE = 'grade_course'
+
 ENROLLED_IN_COURSE = 'enrolled'
 
 NOT_ENROLLED_IN_COURSE = 'unenrolled'
@@ -79,8 +106,11 @@ class _CourseGradeReportContext(object):
             course_id=course_id,
             task_input=_task_input,
         )
+        self.xmodule_instance_args = _xmodule_instance_args
+        self.entry_id = _entry_id
         self.action_name = action_name
         self.course_id = course_id
+        self.incremental = bool(_task_input and _task_input.get('incremental'))
         self.task_progress = TaskProgress(self.action_name, total=None, start_time=time())
 
     @lazy
@@ -138,13 +168,15 @@ class _CourseGradeReportContext(object):
             }
         return graded_assignments_map
 
-    def update_status(self, message):
+    def update_status(self, message, extra_meta=None):
         """
-        Updates the status on the celery task to the given message.
-        Also logs the update.
+        Updates the status on the celery task to the given message, and
+        the optional extra_meta. Also logs the update.
         """
         TASK_LOG.info(u'%s, Task type: %s, %s', self.task_info_string, self.action_name, message)
-        return self.task_progress.update_task_state(extra_meta={'step': message})
+        meta = {'step': message}
+        meta.update(extra_meta or {})
+        return self.task_progress.update_task_state(extra_meta=meta)
 
 
 class _CertificateBulkContext(object):
@@ -184,10 +216,222 @@ class _CourseGradeBulkContext(object):
         self.enrollments = _EnrollmentBulkContext(context, users)
         bulk_cache_cohorts(context.course_id, users)
         BulkRoleCache.prefetch(users)
-        PersistentCourseGrade.prefetch(context.course_id, users)
         BulkCourseTags.prefetch(context.course_id, users)
 
 
+class _CourseGradeReportShard(object):
+    """
+    Internal class for the part of a grade report covering the users whose
+    ids are in [start, end), either bound being optional, or else the users
+    with the given user_ids.  Its rows are streamed into partial CSV files
+    rather than kept in memory.
+
+    When a report has several shards, each of them is graded by its own
+    subtask, which stores its partial files in the report store for the
+    subtask which concatenates them.
+    """
+    def __init__(self, start=None, end=None, user_ids=None):
+        self.start = start
+        self.end = end
+        self.user_ids = user_ids
+        self.success_file = TemporaryFile()
+        self.error_file = TemporaryFile()
+        self.succeeded = 0
+        self.failed = 0
+
+    @classmethod
+    def from_dict(cls, shard_dict):
+        """
+        Returns the shard of the given dict representation.
+        """
+        return cls(**shard_dict)
+
+    def to_dict(self):
+        """
+        Returns a JSON-serializable dict representation of the users of this
+        shard, to pass to its subtask.
+        """
+        return {'start': self.start, 'end': self.end, 'user_ids': self.user_ids}
+
+    def filter(self, users):
+        """
+        Returns the given queryset of users restricted to this shard.
+        """
+        if self.start is not None:
+            users = users.filter(id__gte=self.start)
+        if self.end is not None:
+            users = users.filter(id__lt=self.end)
+        if self.user_ids is not None:
+            users = users.filter(id__in=self.user_ids)
+        return users
+
+    def rows(self):
+        """
+        Returns a generator of the (utf-8 encoded) success rows of this shard.
+        """
+        self.success_file.seek(0)
+        return csv.reader(self.success_file)
+
+    def write_rows(self, success_rows, error_rows):
+        """
+        Appends the given rows to the partial files of this shard.
+        """
+        csv.writer(self.success_file).writerows(self._utf8_encoded(success_rows))
+        csv.writer(self.error_file).writerows(self._utf8_encoded(error_rows))
+        self.succeeded += len(success_rows)
+        self.failed += len(error_rows)
+
+    def close(self):
+        """
+        Closes, and so deletes, the partial files of this shard.
+        """
+        self.success_file.close()
+        self.error_file.close()
+
+    def store(self, course_id, task_id, index):
+        """
+        Stores the partial files of this shard, the index-th of the report of
+        the given task, in the report store.
+        """
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        for csv_name, partial_file in self._partial_files():
+            partial_file.seek(0)
+            report_store.store(course_id, self._partial_name(csv_name, task_id, index), File(partial_file))
+
+    def load(self, course_id, task_id, index):
+        """
+        Reads the partial files of this shard, the index-th of the report of
+        the given task, from the report store.
+        """
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        for csv_name, partial_file in self._partial_files():
+            stored_file = report_store.open(course_id, self._partial_name(csv_name, task_id, index))
+            if stored_file is None:
+                raise GradeReportShardError(
+                    u'Missing partial file {} of shard {} of task {}'.format(csv_name, index, task_id)
+                )
+            try:
+                shutil.copyfileobj(stored_file, partial_file)
+            finally:
+                stored_file.close()
+
+    def delete_stored(self, course_id, task_id, index):
+        """
+        Deletes the partial files of this shard, the index-th of the report of
+        the given task, from the report store.
+        """
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        for csv_name, __ in self._partial_files():
+            report_store.delete(course_id, self._partial_name(csv_name, task_id, index))
+
+    def _partial_files(self):
+        return [('grade_report', self.success_file), ('grade_report_err', self.error_file)]
+
+    def _partial_name(self, csv_name, task_id, index):
+        # Partial files are kept in a subdirectory, so they aren't listed
+        # among the reports of the course.
+        return u'partial/{task_id}/{csv_name}_{index}.csv'.format(task_id=task_id, csv_name=csv_name, index=index)
+
+    def _utf8_encoded(self, rows):
+        for row in rows:
+            yield [text_type(item).encode('utf-8') for item in row]
+
+
+class _CourseGradeReportCheckpoint(object):
+    """
+    Internal class for the previous grade report of a course, from which an
+    incremental grade report carries over the rows of the learners whose
+    grades did not change since that report was requested.
+
+    Only the changes to persisted grades and certificates, and to the
+    enrollment track, verification status and enrollment status columns,
+    are noticed, so the other columns (cohorts, experiment groups, teams)
+    of the rows carried over are as of the previous report.
+    """
+    def __init__(self, previous_task_id, since, report_file):
+        self.previous_task_id = previous_task_id
+        self.since = since
+        self.report_file = report_file
+        self.carried_user_ids = set()
+        self.changed_user_ids = []
+
+    @classmethod
+    def load(cls, context, success_headers, previous_task_id=None):
+        """
+        Returns the checkpoint for the given report context, from the
+        InstructorTask with the given id or else the latest successful grade
+        report task, or None if the previous grade report is missing or has
+        different headers.
+        """
+        previous_tasks = InstructorTask.objects.filter(
+            course_id=context.course_id,
+            task_type=GRADE_REPORT_TASK_TYPE,
+            task_state=SUCCESS,
+        )
+        if previous_task_id is not None:
+            previous_tasks = previous_tasks.filter(id=previous_task_id)
+        previous_task = previous_tasks.order_by('-id').first()
+        if previous_task is None:
+            return None
+        report_name = json.loads(previous_task.task_output or '{}').get('report_name')
+        if not report_name:
+            return None
+        stored_file = ReportStore.from_config(config_name='GRADES_DOWNLOAD').open(context.course_id, report_name)
+        if stored_file is None:
+            return None
+
+        report_file = TemporaryFile()
+        try:
+            shutil.copyfileobj(stored_file, report_file)
+        finally:
+            stored_file.close()
+        checkpoint = cls(previous_task.id, previous_task.created, report_file)
+        if checkpoint.header() != [text_type(header).encode('utf-8') for header in success_headers]:
+            checkpoint.close()
+            return None
+        return checkpoint
+
+    def carry_over(self, enrolled_user_ids, changed_user_ids):
+        """
+        Carries over the rows of the previous report of the given enrolled
+        users, but for the given changed ones, and sets the users to grade
+        again to the other enrolled users.
+
+        Users missing from the previous report, as their grading failed or
+        they enrolled since, are graded again as well.
+        """
+        previous_user_ids = set(int(row[0]) for row in self.rows())
+        self.carried_user_ids = (previous_user_ids & enrolled_user_ids) - set(changed_user_ids)
+        self.changed_user_ids = sorted(enrolled_user_ids - self.carried_user_ids)
+
+    def header(self):
+        """
+        Returns the (utf-8 encoded) header row of the previous report.
+        """
+        return next(self._reader(), None)
+
+    def rows(self):
+        """
+        Returns a generator of the (utf-8 encoded) rows of the previous
+        report, without its header row.
+        """
+        reader = self._reader()
+        next(reader, None)
+        return reader
+
+    def close(self):
+        """
+        Closes, and so deletes, the local copy of the previous report.
+        """
+        self.report_file.close()
+
+    def _reader(self):
+        self.report_file.seek(0)
+        if self.report_file.read(len(codecs.BOM_UTF8)) != codecs.BOM_UTF8:
+            self.report_file.seek(0)
+        return csv.reader(self.report_file)
+
+
 class CourseGradeReport(object):
     """
     Class to encapsulate functionality related to generating Grade Reports.
@@ -204,6 +448,108 @@ class CourseGradeReport(object):
             context = _CourseGradeReportContext(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name)
             return CourseGradeReport()._generate(context)
 
+    @classmethod
+    def generate_shard(cls, xmodule_instance_args, entry_id, shard_index, subtask_status_dict):
+        """
+        Public method to grade the users of the given shard of a grade report,
+        in a subtask, and to store its partial files.
+        """
+        subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+        check_subtask_is_valid(entry_id, subtask_status.task_id, subtask_status)
+
+        entry = InstructorTask.objects.get(pk=entry_id)
+        context = cls._subtask_context(xmodule_instance_args, entry)
+        shard_dict = json.loads(entry.subtasks)['grade_report']['shards'][shard_index]
+        shard = _CourseGradeReportShard.from_dict(shard_dict)
+        try:
+            with modulestore().bulk_operations(context.course_id):
+                CourseGradeReport()._compile_shard(context, shard)
+            shard.store(context.course_id, entry.task_id, shard_index)
+            subtask_status.increment(succeeded=shard.succeeded, failed=shard.failed, state=SUCCESS)
+        except Exception:  # pylint: disable=broad-except
+            TASK_LOG.exception(u'%s, Failed to grade shard %s', context.task_info_string, shard_index)
+            subtask_status.increment(state=FAILURE)
+        finally:
+            shard.close()
+
+        update_subtask_status(entry_id, subtask_status.task_id, subtask_status)
+        cls._queue_upload_when_compiled(xmodule_instance_args, entry_id)
+
+    @classmethod
+    def upload_shards(cls, xmodule_instance_args, entry_id, subtask_status_dict):
+        """
+        Public method to concatenate the partial files of the shards of a
+        grade report into the report, in a subtask, once they are all graded.
+        """
+        subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+        check_subtask_is_valid(entry_id, subtask_status.task_id, subtask_status)
+
+        entry = InstructorTask.objects.get(pk=entry_id)
+        context = cls._subtask_context(xmodule_instance_args, entry)
+        try:
+            report_name = CourseGradeReport()._concatenate_shards(context, entry)
+        except Exception as exception:  # pylint: disable=broad-except
+            # The subtask status isn't updated, as the task would then be marked as succeeded.
+            TASK_LOG.exception(u'%s, Failed to upload grades', context.task_info_string)
+            with transaction.atomic():
+                entry = InstructorTask.objects.select_for_update().get(pk=entry_id)
+                entry.task_output = InstructorTask.create_output_for_failure(exception, traceback.format_exc())
+                entry.task_state = FAILURE
+                entry.save()
+            return
+
+        with transaction.atomic():
+            entry = InstructorTask.objects.select_for_update().get(pk=entry_id)
+            task_progress = json.loads(entry.task_output)
+            task_progress.update({'step': u'Completed grades', 'report_name': report_name})
+            entry.task_output = InstructorTask.create_output_for_success(task_progress)
+            entry.save()
+        subtask_status.increment(skipped=context.task_progress.skipped, state=SUCCESS)
+        update_subtask_status(entry_id, subtask_status.task_id, subtask_status)
+
+    @classmethod
+    def _subtask_context(cls, xmodule_instance_args, entry):
+        """
+        Returns the context of the grade report of the given InstructorTask,
+        for one of its subtasks.
+        """
+        return _CourseGradeReportContext(
+            xmodule_instance_args,
+            entry.id,
+            entry.course_id,
+            json.loads(entry.task_input),
+            json.loads(entry.task_output)['action_name'],
+        )
+
+    @classmethod
+    def _queue_upload_when_compiled(cls, xmodule_instance_args, entry_id):
+        """
+        Queues the subtask which uploads the grade report of the given
+        InstructorTask, if all of its shards are completed and it isn't
+        queued yet.
+        """
+        # Imported here, as the tasks module imports this one.
+        from lms.djangoapps.instructor_task.tasks import upload_grade_report_shards
+
+        with transaction.atomic():
+            entry = InstructorTask.objects.select_for_update().get(pk=entry_id)
+            subtask_dict = json.loads(entry.subtasks)
+            grade_report = subtask_dict['grade_report']
+            if grade_report['upload_queued'] or any(
+                subtask_dict['status'][subtask_id]['state'] not in READY_STATES
+                for subtask_id in grade_report['shard_subtask_ids']
+            ):
+                return
+            grade_report['upload_queued'] = True
+            entry.subtasks = json.dumps(subtask_dict)
+            entry.save()
+
+        upload_subtask_id = grade_report['upload_subtask_id']
+        upload_grade_report_shards.apply_async(
+            (entry_id, xmodule_instance_args, SubtaskStatus.create(upload_subtask_id).to_dict()),
+            task_id=upload_subtask_id,
+        )
+
     def _generate(self, context):
         """
         Internal method for generating a grade report for the given context.
@@ -211,15 +557,26 @@ class CourseGradeReport(object):
         context.update_status(u'Starting grades')
         success_headers = self._success_headers(context)
         error_headers = self._error_headers()
-        batched_rows = self._batched_rows(context)
-
-        context.update_status(u'Compiling grades')
-        success_rows, error_rows = self._compile(context, batched_rows)
-
-        context.update_status(u'Uploading grades')
-        self._upload(context, success_headers, success_rows, error_headers, error_rows)
-
-        return context.update_status(u'Completed grades')
+        checkpoint = self._checkpoint(context, success_headers)
+        try:
+            shards = self._shards(context, checkpoint)
+            try:
+                if len(shards) > 1:
+                    return self._queue_shards(context, shards, checkpoint)
+
+                context.update_status(u'Compiling grades')
+                self._update_progress(context, self._compile_shard(context, shards[0]))
+
+                context.update_status(u'Uploading grades')
+                report_name = self._upload(context, success_headers, error_headers, shards, checkpoint)
+            finally:
+                for shard in shards:
+                    shard.close()
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+
+        return context.update_status(u'Completed grades', extra_meta={'report_name': report_name})
 
     def _success_headers(self, context):
         """
@@ -242,40 +599,261 @@ class CourseGradeReport(object):
         """
         return ["Student ID", "Username", "Error"]
 
-    def _batched_rows(self, context):
+    def _checkpoint(self, context, success_headers):
+        """
+        Returns the checkpoint of an incremental report for the given context,
+        with the users to grade again and those whose rows are carried over,
+        or None if all of the users are to be graded.
+        """
+        if not (context.incremental and should_persist_grades(context.course_id)):
+            return None
+        checkpoint = _CourseGradeReportCheckpoint.load(context, success_headers)
+        if checkpoint is None:
+            TASK_LOG.info(u'%s, No previous grade report to update, grading all users', context.task_info_string)
+            return None
+
+        enrolled_user_ids = set(self._enrolled_users(context).values_list('id', flat=True))
+        changed_user_ids = set(
+            PersistentCourseGrade.objects.filter(
+                course_id=context.course_id, modified__gte=checkpoint.since,
+            ).values_list('user_id', flat=True)
+        )
+        changed_user_ids.update(
+            PersistentSubsectionGrade.objects.filter(
+                course_id=context.course_id, modified__gte=checkpoint.since,
+            ).values_list('user_id', flat=True)
+        )
+        changed_user_ids.update(
+            GeneratedCertificate.objects.filter(
+                course_id=context.course_id, modified_date__gte=checkpoint.since,
+            ).values_list('user_id', flat=True)
+        )
+
+        # Enrollments keep no history of their changes, so the users whose
+        # enrollment columns differ from those of the previous report are
+        # graded again.
+        enrollment_columns = self._enrollment_columns(context)
+        column_indexes = [
+            success_headers.index(header) for header in ('Enrollment Track', 'Verification Status', 'Enrollment Status')
+        ]
+        for row in checkpoint.rows():
+            user_id = int(row[0])
+            if [row[index].decode('utf-8') for index in column_indexes] != enrollment_columns.get(user_id):
+                changed_user_ids.add(user_id)
+
+        checkpoint.carry_over(enrolled_user_ids, changed_user_ids)
+        return checkpoint
+
+    def _enrollment_columns(self, context):
+        """
+        Returns a dict of the ids of the users enrolled in the course of this
+        report to their current Enrollment Track, Verification Status and
+        Enrollment Status columns.
+        """
+        enrollments = CourseEnrollment.objects.filter(course_id=context.course_id)
+        verified_user_ids = set(IDVerificationService.get_verified_user_ids(
+            enrollments.filter(mode__in=CourseMode.VERIFIED_MODES).values('user_id')
+        ))
+        return {
+            user_id: [
+                text_type(mode),
+                IDVerificationService.verification_status_for_user(
+                    None, mode, user_is_verified=user_id in verified_user_ids,
+                ),
+                ENROLLED_IN_COURSE if is_active else NOT_ENROLLED_IN_COURSE,
+            ]
+            for user_id, mode, is_active in enrollments.values_list('user_id', 'mode', 'is_active')
+        }
+
+    def _shards(self, context, checkpoint=None):
+        """
+        Returns the shards of this report, one for each of the configured
+        workers, covering contiguous ranges of the ids of the enrolled users,
+        or only the users to grade again of the given checkpoint.
+        """
+        workers = max(settings.GRADES_DOWNLOAD_WORKERS, 1)
+        if checkpoint is not None:
+            user_ids = checkpoint.changed_user_ids
+            shard_size = max((len(user_ids) + workers - 1) // workers, 1)
+            return [
+                _CourseGradeReportShard(user_ids=user_ids[index:index + shard_size])
+                for index in range(0, len(user_ids), shard_size)
+            ] or [_CourseGradeReportShard(user_ids=[])]
+
+        if workers == 1:
+            return [_CourseGradeReportShard()]
+
+        user_ids = list(self._enrolled_users(context).order_by('id').values_list('id', flat=True))
+        shard_size = max((len(user_ids) + workers - 1) // workers, 1)
+        boundaries = user_ids[shard_size::shard_size]
+        return [
+            _CourseGradeReportShard(start, end)
+            for start, end in izip([None] + boundaries, boundaries + [None])
+        ]
+
+    def _batched_rows(self, context, shard):
         """
-        A generator of batches of (success_rows, error_rows) for this report.
+        A generator of batches of (success_rows, error_rows) for the given
+        shard of this report.
         """
-        for users in self._batch_users(context):
+        for users in self._batch_users(context, shard):
             users = filter(lambda u: u is not None, users)
             yield self._rows_for_users(context, users)
 
-    def _compile(self, context, batched_rows):
+    def _queue_shards(self, context, shards, checkpoint=None):
         """
-        Compiles and returns the complete list of (success_rows, error_rows) for
-        the given batched_rows and context.
+        Queues a subtask grading each of the given shards. Their partial files
+        are concatenated into the report by another subtask, which is queued
+        once they are all completed, and counted among the subtasks so that
+        the task only succeeds once the report is uploaded. Returns the
+        progress of the task.
         """
-        # partition and chain successes and errors
-        success_rows, error_rows = izip(*batched_rows)
-        success_rows = list(chain(*success_rows))
-        error_rows = list(chain(*error_rows))
+        # Imported here, as the tasks module imports this one.
+        from lms.djangoapps.instructor_task.tasks import generate_grade_report_shard
 
-        # update metrics on task status
-        context.task_progress.succeeded = len(success_rows)
-        context.task_progress.failed = len(error_rows)
+        if checkpoint is not None:
+            total = len(checkpoint.changed_user_ids)
+        else:
+            total = self._enrolled_users(context).count()
+        shard_subtask_ids = [str(uuid4()) for __ in shards]
+        upload_subtask_id = str(uuid4())
+
+        # Make sure the subtasks are committed to the database before any of them runs.
+        with outer_atomic():
+            entry = InstructorTask.objects.get(pk=context.entry_id)
+            task_progress = initialize_subtask_info(
+                entry, context.action_name, total, shard_subtask_ids + [upload_subtask_id],
+            )
+            subtask_dict = json.loads(entry.subtasks)
+            subtask_dict['grade_report'] = {
+                'shards': [shard.to_dict() for shard in shards],
+                'shard_subtask_ids': shard_subtask_ids,
+                'upload_subtask_id': upload_subtask_id,
+                'upload_queued': False,
+                'previous_task_id': checkpoint.previous_task_id if checkpoint is not None else None,
+            }
+            entry.subtasks = json.dumps(subtask_dict)
+            entry.save_now()
+
+        TASK_LOG.info(u'%s, Queuing %s grade report shards', context.task_info_string, len(shards))
+        for index, subtask_id in enumerate(shard_subtask_ids):
+            generate_grade_report_shard.apply_async(
+                (context.entry_id, context.xmodule_instance_args, index, SubtaskStatus.create(subtask_id).to_dict()),
+                task_id=subtask_id,
+            )
+        return task_progress
+
+    def _concatenate_shards(self, context, entry):
+        """
+        Uploads the report of the given InstructorTask, from the partial files
+        which its subtasks stored for each of its shards, and then deletes
+        them. Returns the name of the grade report.
+        """
+        subtask_dict = json.loads(entry.subtasks)
+        grade_report = subtask_dict['grade_report']
+        shards = [_CourseGradeReportShard.from_dict(shard_dict) for shard_dict in grade_report['shards']]
+        checkpoint = None
+        try:
+            for index, (shard, subtask_id) in enumerate(izip(shards, grade_report['shard_subtask_ids'])):
+                shard_status = SubtaskStatus.from_dict(subtask_dict['status'][subtask_id])
+                if shard_status.state != SUCCESS:
+                    raise GradeReportShardError(
+                        u'Shard {} of grade report task {} failed'.format(index, entry.task_id)
+                    )
+                shard.load(context.course_id, entry.task_id, index)
+                shard.succeeded = shard_status.succeeded
+                shard.failed = shard_status.failed
+
+            with modulestore().bulk_operations(context.course_id):
+                success_headers = self._success_headers(context)
+                if grade_report['previous_task_id'] is not None:
+                    checkpoint = _CourseGradeReportCheckpoint.load(
+                        context, success_headers, grade_report['previous_task_id'],
+                    )
+                    if checkpoint is None:
+                        raise GradeReportShardError(
+                            u'Previous grade report of task {} is no longer available'.format(entry.task_id)
+                        )
+                    checkpoint.carry_over(
+                        set(self._enrolled_users(context).values_list('id', flat=True)),
+                        _flatten(shard.user_ids for shard in shards),
+                    )
+                context.update_status(u'Uploading grades')
+                return self._upload(context, success_headers, self._error_headers(), shards, checkpoint)
+        finally:
+            for index, shard in enumerate(shards):
+                shard.close()
+                shard.delete_stored(context.course_id, entry.task_id, index)
+            if checkpoint is not None:
+                checkpoint.close()
+
+    def _compile_shard(self, context, shard):
+        """
+        Streams the rows of the given shard into its partial files.
+        """
+        for success_rows, error_rows in self._batched_rows(context, shard):
+            shard.write_rows(success_rows, error_rows)
+        return shard
+
+    def _update_progress(self, context, shard):
+        """
+        Adds the rows of the given completed shard to the metrics on task
+        status.
+        """
+        context.task_progress.succeeded += shard.succeeded
+        context.task_progress.failed += shard.failed
         context.task_progress.attempted = context.task_progress.succeeded + context.task_progress.failed
         context.task_progress.total = context.task_progress.attempted
-        return success_rows, error_rows
+        context.update_status(u'Compiling grades')
 
-    def _upload(self, context, success_headers, success_rows, error_headers, error_rows):
+    def _upload(self, context, success_headers, error_headers, shards, checkpoint=None):
         """
-        Creates and uploads a CSV for the given headers and rows.
+        Creates and uploads a CSV for the given headers and the partial files
+        of the given shards, merged with the rows carried over from the given
+        checkpoint, if any. Returns the name of the grade report.
         """
         date = datetime.now(UTC)
-        upload_csv_to_report_store([success_headers] + success_rows, 'grade_report', context.course_id, date)
-        if len(error_rows) > 0:
-            error_rows = [error_headers] + error_rows
-            upload_csv_to_report_store(error_rows, 'grade_report_err', context.course_id, date)
+        with TemporaryFile() as merged_file:
+            if checkpoint is not None:
+                self._merge(context, checkpoint, shards, merged_file)
+                success_files = [merged_file]
+            else:
+                success_files = [shard.success_file for shard in shards]
+            report_name = upload_csv_files_to_report_store(
+                success_headers,
+                success_files,
+                'grade_report',
+                context.course_id,
+                date,
+            )
+        if any(shard.failed for shard in shards):
+            upload_csv_files_to_report_store(
+                error_headers,
+                [shard.error_file for shard in shards],
+                'grade_report_err',
+                context.course_id,
+                date,
+            )
+        return report_name
+
+    def _merge(self, context, checkpoint, shards, merged_file):
+        """
+        Writes to merged_file the success rows of the given shards and the
+        rows carried over from the given checkpoint, in order of user id.
+        """
+        carried_rows = (
+            row for row in checkpoint.rows() if int(row[0]) in checkpoint.carried_user_ids
+        )
+        # The rows of each shard, and the shards themselves, are in order of user id.
+        graded_rows = chain.from_iterable(shard.rows() for shard in shards)
+        csv_writer = csv.writer(merged_file)
+        for _, row, carried in heapq.merge(
+            ((int(row[0]), row, True) for row in carried_rows),
+            ((int(row[0]), row, False) for row in graded_rows),
+        ):
+            csv_writer.writerow(row)
+            if carried:
+                context.task_progress.skipped += 1
 
     def _grades_header(self, context):
         """
@@ -289,67 +867,86 @@ class CourseGradeReport(object):
             grades_header.append(assignment_info['average_header'])
         return grades_header
 
-    def _batch_users(self, context):
+    def _enrolled_users(self, context):
         """
-        Returns a generator of batches of users.
+        Returns a queryset of the users enrolled in the course of this report.
+        """
+        return CourseEnrollment.objects.users_enrolled_in(context.course_id, include_inactive=True)
+
+    def _batch_users(self, context, shard):
+        """
+        Returns a generator of batches of the users of the given shard.
         """
         def grouper(iterable, chunk_size=self.USER_BATCH_SIZE, fillvalue=None):
             args = [iter(iterable)] * chunk_size
             return izip_longest(*args, fillvalue=fillvalue)
 
-        users = CourseEnrollment.objects.users_enrolled_in(context.course_id, include_inactive=True)
-        users = users.select_related('profile')
-        return grouper(users)
+        users = shard.filter(self._enrolled_users(context))
+        users = users.select_related('profile').order_by('id')
+        return grouper(users.iterator())
 
-    def _user_grades(self, course_grade, context):
+    def _user_grades(self, course_grade, subsection_grades, assignment_averages, context):
         """
-        Returns a list of grade results for the given course_grade corresponding
-        to the headers for this report.
+        Returns a list of grade results for the given course_grade, its
+        subsection_grades and assignment_averages corresponding to the
+        headers for this report.
         """
         grade_results = []
-        for assignment_type, assignment_info in context.graded_assignments.iteritems():
+        for assignment_type in context.graded_assignments:
+            for subsection_grade in subsection_grades[assignment_type]:
+                if subsection_grade.attempted_graded:
+                    grade_results.append(subsection_grade.percent_graded)
+                else:
+                    grade_results.append(u'Not Attempted')
 
-            subsection_grades, subsection_grades_results = self._user_subsection_grades(
-                course_grade,
-                assignment_info['subsection_headers'],
-            )
-            grade_results.extend(subsection_grades_results)
+            if assignment_type in assignment_averages:
+                grade_results.append(assignment_averages[assignment_type])
 
-            assignment_average = self._user_assignment_average(course_grade, subsection_grades, assignment_info)
-            if assignment_average is not None:
-                grade_results.append([assignment_average])
+        return [course_grade.percent] + grade_results
 
-        return [course_grade.percent] + _flatten(grade_results)
+    def _user_subsection_grades(self, course_grade, context):
+        """
+        Returns a dict that maps each assignment type to the list of the
+        subsection grades of the given course_grade corresponding to the
+        headers for this report.
+        """
+        return {
+            assignment_type: [
+                course_grade.subsection_grade(subsection_location)
+                for subsection_location in assignment_info['subsection_headers']
+            ]
+            for assignment_type, assignment_info in context.graded_assignments.iteritems()
+        }
 
-    def _user_subsection_grades(self, course_grade, subsection_headers):
+    def _assignment_averages(self, graded_users, context):
         """
-        Returns a list of grade results for the given course_grade corresponding
-        to the headers for this report.
+        Returns a list with, for each of the given (user, course_grade,
+        subsection_grades), a dict that maps the assignment types with an
+        average column in this report to the user's average.  The averages
+        of an assignment type are computed for all of the users at once.
         """
-        subsection_grades = []
-        grade_results = []
-        for subsection_location in subsection_headers:
-            subsection_grade = course_grade.subsection_grade(subsection_location)
-            if subsection_grade.attempted_graded:
-                grade_result = subsection_grade.percent_graded
-            else:
-                grade_result = u'Not Attempted'
-            grade_results.append([grade_result])
-            subsection_grades.append(subsection_grade)
-        return subsection_grades, grade_results
-
-    def _user_assignment_average(self, course_grade, subsection_grades, assignment_info):
-        if assignment_info['separate_subsection_avg_headers']:
-            if assignment_info['grader']:
-                if course_grade.attempted:
-                    subsection_breakdown = [
-                        {'percent': subsection_grade.percent_graded}
-                        for subsection_grade in subsection_grades
-                    ]
-                    assignment_average, _ = assignment_info['grader'].total_with_drops(subsection_breakdown)
-                else:
-                    assignment_average = 0.0
-                return assignment_average
+        assignment_averages = [{} for _ in graded_users]
+        attempted_indices = [
+            index for index, (_, course_grade, _) in enumerate(graded_users) if course_grade.attempted
+        ]
+        for assignment_type, assignment_info in context.graded_assignments.iteritems():
+            grader = assignment_info['grader']
+            if not (assignment_info['separate_subsection_avg_headers'] and grader):
+                continue
+
+            num_subsections = len(assignment_info['subsection_headers'])
+            percents = numpy.zeros((len(attempted_indices), num_subsections))
+            for row, index in enumerate(attempted_indices):
+                subsection_grades = graded_users[index][2][assignment_type]
+                percents[row] = [subsection_grade.percent_graded for subsection_grade in subsection_grades]
+            lengths = numpy.repeat(num_subsections, len(attempted_indices))
+            totals = totals_with_drops(percents, lengths, grader.drop_count)
+
+            for user_averages in assignment_averages:
+                user_averages[assignment_type] = 0.0
+            for index, total in izip(attempted_indices, totals.tolist()):
+                assignment_averages[index][assignment_type] = total
+        return assignment_averages
 
     def _user_cohort_group_names(self, user, context):
         """
@@ -429,7 +1026,7 @@ class CourseGradeReport(object):
         with modulestore().bulk_operations(context.course_id):
             bulk_context = _CourseGradeBulkContext(context, users)
 
-            success_rows, error_rows = [], []
+            graded_users, error_rows = [], []
             for user, course_grade, error in CourseGradeFactory().iter(
                 users,
                 course=context.course,
@@ -440,16 +1037,21 @@ class CourseGradeReport(object):
                     # An empty gradeset means we failed to grade a student.
                     error_rows.append([user.id, user.username, text_type(error)])
                 else:
-                    success_rows.append(
-                        [user.id, user.email, user.username] +
-                        self._user_grades(course_grade, context) +
-                        self._user_cohort_group_names(user, context) +
-                        self._user_experiment_group_names(user, context) +
-                        self._user_team_names(user, bulk_context.teams) +
-                        self._user_verification_mode(user, context, bulk_context.enrollments) +
-                        self._user_certificate_info(user, context, course_grade, bulk_context.certs) +
-                        [_user_enrollment_status(user, context.course_id)]
-                    )
+                    graded_users.append((user, course_grade, self._user_subsection_grades(course_grade, context)))
+
+            success_rows = []
+            assignment_averages = self._assignment_averages(graded_users, context)
+            for (user, course_grade, subsection_grades), user_averages in izip(graded_users, assignment_averages):
+                success_rows.append(
+                    [user.id, user.email, user.username] +
+                    self._user_grades(course_grade, subsection_grades, user_averages, context) +
+                    self._user_cohort_group_names(user, context) +
+                    self._user_experiment_group_names(user, context) +
+                    self._user_team_names(user, bulk_context.teams) +
+                    self._user_verification_mode(user, context, bulk_context.enrollments) +
+                    self._user_certificate_info(user, context, course_grade, bulk_context.certs) +
+                    [_user_enrollment_status(user, context.course_id)]
+                )
             return success_rows, error_rows
 
 
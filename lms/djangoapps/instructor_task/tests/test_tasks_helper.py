@@ -8,15 +8,18 @@ Unit tests for LMS instructor-initiated background tasks helper functions.
 
 """
 
+import json
 import os
 import shutil
 import tempfile
 import urllib
 from contextlib import contextmanager
 from datetime import datetime, timedelta
+from uuid import uuid4
 
 import ddt
 import unicodecsv
+from celery.states import FAILURE, SUCCESS
 from capa.tests.response_xml_factory import MultipleChoiceResponseXMLFactory
 from course_modes.models import CourseMode
 from course_modes.tests.factories import CourseModeFactory
@@ -70,12 +73,14 @@ from lms.djangoapps.instructor_task.tasks_helper.grades import (
     CourseGradeReport,
     ProblemGradeReport,
     ProblemResponses,
+    _CourseGradeReportContext,
 )
 from lms.djangoapps.instructor_task.tasks_helper.misc import (
     cohort_students_and_upload,
     upload_course_survey_report,
     upload_ora2_data,
 )
+from lms.djangoapps.instructor_task.tests.factories import InstructorTaskFactory
 from lms.djangoapps.instructor_task.tests.test_base import (
     InstructorTaskCourseTestCase,
     InstructorTaskModuleTestCase,
@@ -88,7 +93,7 @@ from openedx.core.djangoapps.course_groups.tests.helpers import CohortFactory
 from openedx.core.djangoapps.credit.tests.factories import CreditCourseFactory
 from openedx.core.djangoapps.user_api.partition_schemes import RandomUserPartitionScheme
 from openedx.core.djangoapps.util.testing import ContentGroupTestCase, TestConditionalContent
-from ..models import ReportStore
+from ..models import InstructorTask, ReportStore
 from ..tasks_helper.utils import UPDATE_STATUS_FAILED, UPDATE_STATUS_SUCCEEDED
 
 
@@ -441,6 +446,177 @@ class TestInstructorGradeReport(InstructorGradeReportTestCase):
             {'attempted': expected_students, 'succeeded': expected_students, 'failed': 0}, result
         )
 
+    @ddt.data((1, 5, 1), (2, 5, 2), (3, 5, 3), (4, 2, 2), (2, 0, 1))
+    @ddt.unpack
+    def test_shards(self, workers, num_students, expected_shards):
+        """
+        Test that the enrolled users are split into contiguous shards, one
+        for each worker.
+        """
+        students = [self.create_student(u'student{}'.format(i)) for i in range(num_students)]
+        context = _CourseGradeReportContext(None, None, self.course.id, None, 'graded')
+        report = CourseGradeReport()
+        with override_settings(GRADES_DOWNLOAD_WORKERS=workers):
+            shards = report._shards(context)  # pylint: disable=protected-access
+        try:
+            self.assertEqual(len(shards), expected_shards)
+            sharded_ids = [
+                user.id
+                for shard in shards
+                for users in report._batch_users(context, shard)  # pylint: disable=protected-access
+                for user in users
+                if user is not None
+            ]
+            self.assertEqual(sharded_ids, [student.id for student in students])
+        finally:
+            for shard in shards:
+                shard.close()
+
+    def _generate_sharded_report(self):
+        """
+        Generates a grade report split into shards, and returns its
+        InstructorTask.
+        """
+        entry = InstructorTaskFactory.create(
+            course_id=self.course.id,
+            task_type='grade_course',
+            task_id=str(uuid4()),
+        )
+        with override_settings(GRADES_DOWNLOAD_WORKERS=2):
+            with patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task'):
+                CourseGradeReport.generate(None, entry.id, self.course.id, None, 'graded')
+        return InstructorTask.objects.get(pk=entry.id)
+
+    def test_sharded_report(self):
+        """
+        Test that the shards of a report are graded by subtasks, whose partial
+        files are concatenated into the report once they are all graded.
+        """
+        students = [self.create_student(u'student{}'.format(i)) for i in range(3)]
+        entry = self._generate_sharded_report()
+
+        self.assertEqual(entry.task_state, SUCCESS)
+        task_output = json.loads(entry.task_output)
+        self.assertDictContainsSubset({'attempted': 3, 'succeeded': 3, 'failed': 0}, task_output)
+        self.assertIn('report_name', task_output)
+        self.verify_rows_in_csv(
+            [
+                {'Student ID': text_type(student.id), 'Username': student.username, 'Email': student.email}
+                for student in students
+            ],
+            ignore_other_columns=True,
+        )
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        for index in range(2):
+            self.assertIsNone(
+                report_store.open(self.course.id, u'partial/{}/grade_report_{}.csv'.format(entry.task_id, index))
+            )
+
+    def test_sharded_report_failed_shard(self):
+        """
+        Test that a report whose shard failed to be graded fails.
+        """
+        for i in range(3):
+            self.create_student(u'student{}'.format(i))
+        with patch.object(CourseGradeReport, '_compile_shard', side_effect=[MagicMock(), Exception('boom')]):
+            entry = self._generate_sharded_report()
+
+        self.assertEqual(entry.task_state, FAILURE)
+        self.assertIn('GradeReportShardError', entry.task_output)
+
+    def _generate_incremental_report(self):
+        """
+        Generates an incremental grade report, and returns the result and the
+        user ids of the rows of the report.
+        """
+        with patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task'):
+            result = CourseGradeReport.generate(None, None, self.course.id, {'incremental': True}, 'graded')
+        report_file = ReportStore.from_config(config_name='GRADES_DOWNLOAD').open(self.course.id, result['report_name'])
+        with report_file:
+            user_ids = [int(row['Student ID']) for row in unicodecsv.DictReader(report_file, encoding='utf-8-sig')]
+        return result, user_ids
+
+    def test_incremental_without_previous_report(self):
+        """
+        Test that all of the users are graded by an incremental report when
+        there is no previous report.
+        """
+        students = [self.create_student(u'student{}'.format(i)) for i in range(2)]
+        result, user_ids = self._generate_incremental_report()
+        self.assertDictContainsSubset({'attempted': 2, 'succeeded': 2, 'failed': 0, 'skipped': 0}, result)
+        self.assertEqual(user_ids, [student.id for student in students])
+
+    def test_incremental_report(self):
+        """
+        Test that an incremental report only grades again the users whose
+        grades changed, or who enrolled, since the previous report, and
+        carries over the rows of the others.
+        """
+        students = [self.create_student(u'student{}'.format(i)) for i in range(3)]
+        unenrolled_student = self.create_student(u'unenrolled')
+        previous_result, _ = self._generate_incremental_report()
+        InstructorTaskFactory.create(
+            course_id=self.course.id,
+            task_type='grade_course',
+            task_state=SUCCESS,
+            task_output=json.dumps(previous_result),
+        )
+
+        with freeze_time(datetime.now(UTC) + timedelta(hours=1)):
+            students.append(self.create_student(u'new_student'))
+            CourseEnrollment.objects.filter(user=unenrolled_student).delete()
+            PersistentCourseGrade.update_or_create(
+                user_id=students[1].id,
+                course_id=self.course.id,
+                passed=False,
+                percent_grade=0.0,
+                grading_policy_hash=GradesTransformer.grading_policy_hash(self.course),
+            )
+            result, user_ids = self._generate_incremental_report()
+
+        self.assertDictContainsSubset({'attempted': 2, 'succeeded': 2, 'failed': 0, 'skipped': 2}, result)
+        self.assertEqual(user_ids, [student.id for student in students])
+
+    def test_incremental_report_with_enrollment_changes(self):
+        """
+        Test that an incremental report grades again the users whose
+        enrollment track or status changed since the previous report.
+        """
+        students = [self.create_student(u'student{}'.format(i)) for i in range(3)]
+        previous_result, _ = self._generate_incremental_report()
+        InstructorTaskFactory.create(
+            course_id=self.course.id,
+            task_type='grade_course',
+            task_state=SUCCESS,
+            task_output=json.dumps(previous_result),
+        )
+
+        with freeze_time(datetime.now(UTC) + timedelta(hours=1)):
+            CourseEnrollment.objects.filter(user=students[0]).update(mode=CourseMode.VERIFIED)
+            CourseEnrollment.objects.filter(user=students[1]).update(is_active=False)
+            result, user_ids = self._generate_incremental_report()
+
+        self.assertDictContainsSubset({'attempted': 2, 'succeeded': 2, 'failed': 0, 'skipped': 1}, result)
+        self.assertEqual(user_ids, [student.id for student in students])
+
+    def test_incremental_report_with_changed_headers(self):
+        """
+        Test that all of the users are graded by an incremental report when
+        the headers of the previous report differ.
+        """
+        self.create_student(u'student')
+        previous_result, _ = self._generate_incremental_report()
+        InstructorTaskFactory.create(
+            course_id=self.course.id,
+            task_type='grade_course',
+            task_state=SUCCESS,
+            task_output=json.dumps(previous_result),
+        )
+
+        with patch.object(CourseGradeReport, '_success_headers', return_value=['Student ID', 'Email', 'Username']):
+            result, _ = self._generate_incremental_report()
+        self.assertDictContainsSubset({'attempted': 1, 'succeeded': 1, 'skipped': 0}, result)
+
 
 class TestTeamGradeReport(InstructorGradeReportTestCase):
     """ Test that teams appear correctly in the grade report when it is enabled for the course. """
@@ -1969,7 +2145,7 @@ class TestGradeReport(TestReportMixin, InstructorTaskModuleTestCase):
         if create_non_zero_grade:
             self.submit_student_answer(self.student.username, u'Problem1', ['Option 1'])
         with patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task'):
-            with patch('lms.djangoapps.grades.course_data.get_course_blocks') as mock_course_blocks:
+            with patch('lms.djangoapps.grades.course_data.get_course_blocks_for_users') as mock_course_blocks:
                 with patch('lms.djangoapps.grades.subsection_grade.get_score') as mock_get_score:
                     CourseGradeReport.generate(None, None, self.course.id, None, 'graded')
                     self.assertFalse(mock_get_score.called)
@@ -4,8 +4,10 @@ lms_xblock Application Configuration
 from __future__ import absolute_import
 
 from django.apps import AppConfig
+from django.conf import settings
 
 import xmodule.x_module
+from capa.safe_exec import configure_cache, worker_pool
 
 
 class LMSXBlockConfig(AppConfig):
@@ -24,3 +26,7 @@ class LMSXBlockConfig(AppConfig):
         # https://openedx.atlassian.net/wiki/display/PLAT/Convert+from+Storage-centric+runtimes+to+Application-centric+runtimes
         xmodule.x_module.descriptor_global_handler_url = handler_url
         xmodule.x_module.descriptor_global_local_resource_url = local_resource_url
+
+        # Size the pool of sandboxed processes which run the code of capa problems.
+        worker_pool.configure(**settings.CODE_JAIL.get('pool', {}))
+        configure_cache(**settings.CODE_JAIL.get('cache', {}))
@@ -1,15 +1,21 @@
 """
 Module implementing `xblock.runtime.Runtime` functionality for the LMS
 """
+import hashlib
+
 from completion.services import CompletionService
 from django.conf import settings
+from django.core.cache import cache
 from django.urls import reverse
+from django.utils.translation import get_language
 from edx_django_utils.cache import DEFAULT_REQUEST_CACHE
+from web_fragments.fragment import Fragment
 import xblock.reference.plugins
 
 from badges.service import BadgingService
 from badges.utils import badges_enabled
 from lms.djangoapps.lms_xblock.models import XBlockAsidesConfig
+from openedx.core.djangoapps.theming.helpers import get_current_theme
 from openedx.core.djangoapps.user_api.course_tag import api as user_course_tag_api
 from openedx.core.lib.url_utils import quote_slashes
 from openedx.core.lib.xblock_utils import xblock_local_resource_url
@@ -17,7 +23,7 @@ from xmodule.library_tools import LibraryToolsService
 from xmodule.modulestore.django import ModuleI18nService, modulestore
 from xmodule.partitions.partitions_service import PartitionService
 from xmodule.services import SettingsService
-from xmodule.x_module import ModuleSystem
+from xmodule.x_module import USER_INDEPENDENT, ModuleSystem
 
 
 def handler_url(block, handler_name, suffix='', query='', thirdparty=False):
@@ -80,6 +86,37 @@ def local_resource_url(block, uri):
     return xblock_local_resource_url(block, uri)
 
 
+def fragment_cache_key(block, view_name):
+    """
+    Returns the key of the cached fragment rendered by the view of the block, or
+    None if the view doesn't render the same fragment for every user.
+
+    The key depends on the version of the block's content, so that a new version
+    of the content is rendered again, and on the language and theme of the request.
+    """
+    view = getattr(block, view_name, None)
+    if view is None or not block.has_support(view, USER_INDEPENDENT):
+        return None
+
+    # Split mongo blocks carry the version of their course structure, old mongo
+    # blocks only the date they were last edited on. XModules leave both on the
+    # descriptor they are bound to.
+    descriptor = getattr(block, 'descriptor', block)
+    version = getattr(descriptor, 'course_version', None) or getattr(descriptor, 'edited_on', None)
+    if version is None:
+        return None
+
+    theme = get_current_theme()
+    key = u'|'.join([
+        unicode(block.scope_ids.usage_id),
+        view_name,
+        unicode(version),
+        get_language() or u'',
+        theme.theme_dir_name if theme else u'',
+    ])
+    return u'xblock_fragment.{}'.format(hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+
 class UserTagsService(object):
     """
     A runtime class that provides an interface to the user service.  It handles filling in
@@ -152,6 +189,38 @@ class LmsModuleSystem(ModuleSystem):  # pylint: disable=abstract-method
         self.request_token = kwargs.pop('request_token', None)
         super(LmsModuleSystem, self).__init__(**kwargs)
 
+    def render(self, block, view_name, context=None):
+        """
+        Render a block by invoking its view.
+
+        The fragments of the views that render the same fragment for every user
+        are cached for XBLOCK_FRAGMENT_CACHE_TIMEOUT seconds, before any wrapper
+        is applied to them. The wrappers and the asides are applied to the cached
+        fragment on every render, as they are to an uncached one.
+        """
+        timeout = getattr(settings, 'XBLOCK_FRAGMENT_CACHE_TIMEOUT', 0)
+        cache_key = fragment_cache_key(block, view_name) if timeout else None
+        if cache_key is None:
+            return super(LmsModuleSystem, self).render(block, view_name, context=context)
+
+        with self._render_metrics(block, view_name):
+            # Set the active view, as Runtime.render does, so that render_child
+            # can use it as a default.
+            old_view_name = self._view_name
+            self._view_name = view_name
+            try:
+                fragment_dict = cache.get(cache_key)
+                if fragment_dict is None:
+                    frag = getattr(block, view_name)(context)
+                    block.save()
+                    cache.set(cache_key, frag.to_dict(), timeout)
+                else:
+                    frag = Fragment.from_dict(fragment_dict)
+                frag = self.wrap_xblock(block, view_name, frag, context)
+                return self.render_asides(block, view_name, frag, context)
+            finally:
+                self._view_name = old_view_name
+
     def handler_url(self, *args, **kwargs):
         """
         Implement the XBlock runtime handler_url interface.
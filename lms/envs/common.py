@@ -841,6 +841,11 @@ DOC_STORE_CONFIG = {
     # If 'asset_collection' defined, it'll be used
     # as the collection name for asset metadata.
     # Otherwise, a default collection name will be used.
+
+    # Other options, such as 'maxPoolSize', 'waitQueueTimeoutMS' and
+    # 'socketTimeoutMS', are passed to the MongoDB client. The split modulestore
+    # also accepts 'published_read_preference' (e.g. 'SECONDARY_PREFERRED') for
+    # reading published course content, and 'query_timeout_ms'.
 }
 MODULESTORE = {
     'default': {
@@ -856,6 +861,7 @@ MODULESTORE = {
                         'default_class': 'xmodule.hidden_module.HiddenDescriptor',
                         'fs_root': DATA_DIR,
                         'render_template': 'edxmako.shortcuts.render_to_string',
+                        'definition_prefetch_size': 100,
                     }
                 },
                 {
@@ -873,6 +879,41 @@ MODULESTORE = {
     }
 }
 
+# Maximum total size in bytes of the course structures that each process keeps in
+# memory, in front of the 'course_structure_cache'. Set to 0 to disable.
+COURSE_STRUCTURE_CACHE_LOCAL_MAX_SIZE = 64 * 1024 * 1024
+
+# The codec used to store course structures in the 'course_structure_cache', named
+# '<serializer>-<compressor>'. The serializers are 'pickle', and 'flat', which stores
+# blocks in a form that is faster to load. The compressors are 'zlib', and 'lz4' if
+# the lz4 package is installed.
+COURSE_STRUCTURE_CACHE_CODEC = 'pickle-zlib'
+
+# Size in bytes of the chunks in which the contentserver streams assets which aren't
+# cached. None streams each asset in the chunks it is stored in, in GridFS.
+CONTENTSERVER_STREAM_CHUNK_SIZE = None
+
+# Directory in which the contentserver keeps copies of the course assets too big for the
+# 'course_assets' cache, so that they aren't read from GridFS again. None disables it.
+CONTENTSERVER_DISK_CACHE_DIR = None
+
+# Maximum total size in bytes of the copies in CONTENTSERVER_DISK_CACHE_DIR.
+CONTENTSERVER_DISK_CACHE_MAX_SIZE = 1024 * 1024 * 1024
+
+# Maximum size in bytes of an asset copied to CONTENTSERVER_DISK_CACHE_DIR. Assets are copied
+# whole before being served, even for range requests, so bigger ones are streamed from GridFS
+# instead. None copies assets of any size.
+CONTENTSERVER_DISK_CACHE_MAX_FILE_SIZE = 50 * 1024 * 1024
+
+# URL prefix of an internal location of the web server (e.g. nginx) which serves the files of
+# CONTENTSERVER_DISK_CACHE_DIR, to have it send the copies via X-Accel-Redirect. None sends
+# them from the app server.
+CONTENTSERVER_DISK_CACHE_ACCEL_REDIRECT_PREFIX = None
+
+# Number of seconds for which the LMS caches the fragments rendered by the views of
+# xblocks that render the same fragment for every user. Set to 0 to disable the cache.
+XBLOCK_FRAGMENT_CACHE_TIMEOUT = 300
+
 #################### Python sandbox ############################################
 
 CODE_JAIL = {
@@ -886,6 +927,24 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # Pool of warm sandboxed Python processes, per app process, which run the
+    # jailed code in forked copies of themselves.
+    'pool': {
+        # How many processes?  0 starts a new sandboxed process for each execution.
+        'size': 0,
+        # After how many executions is a process replaced?
+        'max_executions': 100,
+        # How many seconds to wait for a busy pool before running the code in a new process?
+        'queue_timeout': 1,
+    },
+
+    # Results of jailed code kept in the memory of each app process, in front
+    # of the django cache shared by all of them.
+    'cache': {
+        # How many results?  0 only uses the shared cache.
+        'local_size': 1000,
+    },
 }
 
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
@@ -1932,6 +1991,11 @@ BLOCK_STRUCTURES_SETTINGS = dict(
 
     # Backend storage options
     PRUNING_ACTIVE=False,
+
+    # Maximum number of results of transforming a collected block
+    # structure that are memoized for sharing among users, per
+    # collected block structure.
+    MAX_MEMOIZED_TRANSFORMS=16,
 )
 
 ################################ Bulk Email ###################################
@@ -2587,6 +2651,12 @@ GRADES_DOWNLOAD = {
     'ROOT_PATH': '/tmp/edx-s3/grades',
 }
 
+# Number of shards into which a course grade report is split.  Each shard
+# covers a range of user ids and is graded by its own celery subtask, which
+# streams its rows into partial files, concatenated into the report once all
+# of the shards are graded.
+GRADES_DOWNLOAD_WORKERS = 1
+
 FINANCIAL_REPORTS = {
     'STORAGE_TYPE': 'localfs',
     'BUCKET': 'edx-financial-reports',
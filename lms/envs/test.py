@@ -211,6 +211,13 @@ CACHES = {
         'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
     },
 }
+COURSE_STRUCTURE_CACHE_LOCAL_MAX_SIZE = 0
+
+# Don't cache the fragments of xblocks, which tests render again after changing their fields in place
+XBLOCK_FRAGMENT_CACHE_TIMEOUT = 0
+
+# Only keep the results of jailed code in the django cache, which tests can clear
+CODE_JAIL['cache']['local_size'] = 0
 
 # Dummy secret key for dev
 SECRET_KEY = '85920908f28904ed733fe576320db18cabd7b6cd'
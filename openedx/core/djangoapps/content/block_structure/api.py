@@ -7,17 +7,20 @@ from xmodule.modulestore.django import modulestore
 from .manager import BlockStructureManager
 
 
-def get_course_in_cache(course_key):
+def get_course_in_cache(course_key, collected_data_names=None):
     """
     A higher order function implemented on top of the
     block_structure.get_collected function that returns the block
     structure in the cache for the given course_key.
 
+    Only the collected data of the transformers in collected_data_names
+    is loaded, if provided.
+
     Returns:
         BlockStructureBlockData - The collected block structure,
             starting at root_block_usage_key.
     """
-    return get_block_structure_manager(course_key).get_collected()
+    return get_block_structure_manager(course_key).get_collected(collected_data_names)
 
 
 def update_course_in_cache(course_key):
@@ -7,8 +7,16 @@ Module with family of classes for block structures.
 The following internal data structures are implemented:
     _BlockRelations - Data structure for a single block's relations.
     _BlockData - Data structure for a single block's data.
+
+Since block structures are allocated per block and copied for every
+request, these data structures use __slots__ instead of per-instance
+dictionaries, and BlockStructureBlockData.copy shares block data between
+copies until it is modified (copy-on-write).  Block relations remain
+lists of usage keys, which get_parents and get_children return as is;
+only the serialized format keeps them as arrays of block indices.
 """
-from copy import deepcopy
+from collections import OrderedDict
+from contextlib import contextmanager
 from functools import partial
 from logging import getLogger
 
@@ -23,12 +31,20 @@ logger = getLogger(__name__)  # pylint: disable=invalid-name
 # A dictionary key value for storing a transformer's version number.
 TRANSFORMER_VERSION_KEY = '_version'
 
+# The name under which the modulestore version of each block is stored
+# in the block structure, for determining which blocks changed since
+# the block structure was last collected.
+BLOCK_VERSIONS_DATA_NAME = 'block_versions'
+BLOCK_VERSION_KEY = 'version'
+
 
 class _BlockRelations(object):
     """
     Data structure to encapsulate relationships for a single block,
     including its children and parents.
     """
+    __slots__ = ('parents', 'children')
+
     def __init__(self):
 
         # List of usage keys of this block's parents.
@@ -39,6 +55,23 @@ class _BlockRelations(object):
         # list [UsageKey]
         self.children = []
 
+    def __getstate__(self):
+        return {'parents': self.parents, 'children': self.children}
+
+    def __setstate__(self, state):
+        self.parents = state['parents']
+        self.children = state['children']
+
+    def copy(self):
+        """
+        Returns a new _BlockRelations with copies of this instance's
+        lists of relations.
+        """
+        relations = _BlockRelations()
+        relations.parents = list(self.parents)
+        relations.children = list(self.children)
+        return relations
+
 
 class BlockStructure(object):
     """
@@ -281,6 +314,8 @@ class FieldData(object):
     """
     Data structure to encapsulate collected fields.
     """
+    __slots__ = ('fields',)
+
     def class_field_names(self):
         """
         Returns list of names of fields that are defined directly
@@ -314,6 +349,15 @@ class FieldData(object):
         else:
             del self.fields[field_name]
 
+    def __getstate__(self):
+        return {field_name: getattr(self, field_name) for field_name in self.class_field_names()}
+
+    def __setstate__(self, state):
+        # Also accepts the __dict__ of instances pickled before this
+        # class defined __slots__.
+        for field_name, field_value in state.iteritems():
+            object.__setattr__(self, field_name, field_value)
+
     def _is_own_field(self, field_name):
         """
         Returns whether the given field_name is the name of an
@@ -326,7 +370,16 @@ class TransformerData(FieldData):
     """
     Data structure to encapsulate collected data for a transformer.
     """
-    pass
+    __slots__ = ()
+
+    def copy(self):
+        """
+        Returns a new TransformerData with a shallow copy of this
+        instance's fields.
+        """
+        transformer_data = TransformerData()
+        transformer_data.fields = dict(self.fields)
+        return transformer_data
 
 
 class TransformerDataMap(dict):
@@ -379,6 +432,8 @@ class BlockData(FieldData):
     """
     Data structure to encapsulate collected data for a single block.
     """
+    __slots__ = ('location', 'transformer_data')
+
     def class_field_names(self):
         return super(BlockData, self).class_field_names() + ['location', 'transformer_data']
 
@@ -391,6 +446,17 @@ class BlockData(FieldData):
         # Map of transformer name to its block-specific data.
         self.transformer_data = TransformerDataMap()
 
+    def copy(self):
+        """
+        Returns a new BlockData with shallow copies of this instance's
+        fields and transformer data.
+        """
+        block_data = BlockData(self.location)
+        block_data.fields = dict(self.fields)
+        for transformer_name, transformer_data in self.transformer_data.iteritems():
+            block_data.transformer_data[transformer_name] = transformer_data.copy()
+        return block_data
+
 
 class BlockStructureBlockData(BlockStructure):
     """
@@ -414,18 +480,51 @@ class BlockStructureBlockData(BlockStructure):
         # Map of a transformer's name to its non-block-specific data.
         self.transformer_data = TransformerDataMap()
 
+        # Usage keys of the blocks whose BlockData is owned by this
+        # instance and hence can be modified in place.  None if all
+        # BlockData are owned.  BlockData that is not owned may be
+        # shared with copies of this instance and is copied before it
+        # is modified.
+        # set(UsageKey) or None
+        self._owned_block_keys = None
+
+        # Names of the transformers whose non-block-specific data is
+        # owned by this instance, similar to _owned_block_keys.
+        # set(string) or None
+        self._owned_transformer_names = None
+
+        # Results of transforming this block structure, by the memo
+        # keys of the transformations, in order of last access.  See
+        # BlockStructureManager.get_transformed.
+        # OrderedDict {tuple: BlockStructureBlockData}
+        self._transform_memo = OrderedDict()
+
     def copy(self):
         """
-        Returns a new instance of BlockStructureBlockData with a
-        deep-copy of this instance's contents.
+        Returns a new instance of BlockStructureBlockData with a copy
+        of this instance's contents.
+
+        The block relations are copied immediately, while block data and
+        transformer data are shared between this instance and the copy
+        until either one modifies them (copy-on-write).  So transformers
+        that only remove blocks never duplicate any block data.
+
+        Note: Values of collected fields are not copied, so transformers
+        are expected to replace them rather than mutate them in place.
         """
-        from .factory import BlockStructureFactory
-        return BlockStructureFactory.create_new(
-            self.root_block_usage_key,
-            deepcopy(self._block_relations),
-            deepcopy(self.transformer_data),
-            deepcopy(self._block_data_map),
-        )
+        # Neither instance owns the data that is now shared.
+        self._owned_block_keys = set()
+        self._owned_transformer_names = set()
+
+        block_structure = BlockStructureBlockData(self.root_block_usage_key)
+        block_structure._block_relations = {
+            usage_key: relations.copy() for usage_key, relations in self._block_relations.iteritems()
+        }
+        block_structure.transformer_data = TransformerDataMap(self.transformer_data)
+        block_structure._block_data_map = self._block_data_map.copy()
+        block_structure._owned_block_keys = set()
+        block_structure._owned_transformer_names = set()
+        return block_structure
 
     def iteritems(self):
         """
@@ -479,8 +578,7 @@ class BlockStructureBlockData(BlockStructure):
 
             override_data (object) - The data you want to set
         """
-        block_data = self._block_data_map.get(usage_key)
-        setattr(block_data, field_name, override_data)
+        setattr(self._get_writable_block(usage_key), field_name, override_data)
 
     def get_transformer_data(self, transformer, key, default=None):
         """
@@ -513,7 +611,7 @@ class BlockStructureBlockData(BlockStructure):
             value (any picklable type) - The value to associate with the
                 given key for the given transformer's data.
         """
-        setattr(self.transformer_data.get_or_create(transformer), key, value)
+        setattr(self._get_writable_transformer_data(transformer), key, value)
 
     def get_transformer_block_data(self, usage_key, transformer):
         """
@@ -593,7 +691,7 @@ class BlockStructureBlockData(BlockStructure):
                 whose data entry is to be deleted.
         """
         try:
-            transformer_block_data = self.get_transformer_block_data(usage_key, transformer)
+            transformer_block_data = self._get_writable_block(usage_key).transformer_data[transformer]
             delattr(transformer_block_data, key)
         except (AttributeError, KeyError):
             pass
@@ -631,7 +729,8 @@ class BlockStructureBlockData(BlockStructure):
 
         # Remove block.
         self._block_relations.pop(usage_key, None)
-        self._block_data_map.pop(usage_key, None)
+        if usage_key in self._block_data_map:
+            del self._block_data_map[usage_key]
 
         # Recreate the graph connections if descendants are to be kept.
         if keep_descendants:
@@ -752,17 +851,50 @@ class BlockStructureBlockData(BlockStructure):
 
     def _get_or_create_block(self, usage_key):
         """
-        Returns the BlockData associated with the given usage_key.
-        If not found, creates and returns a new BlockData and
-        maps it to the given key.
+        Returns the BlockData associated with the given usage_key,
+        ready to be modified.  If not found, creates and returns a new
+        BlockData and maps it to the given key.
         """
         try:
-            return self._block_data_map[usage_key]
+            return self._get_writable_block(usage_key)
         except KeyError:
             block_data = BlockData(usage_key)
             self._block_data_map[usage_key] = block_data
+            if self._owned_block_keys is not None:
+                self._owned_block_keys.add(usage_key)
             return block_data
 
+    def _get_writable_block(self, usage_key):
+        """
+        Returns the BlockData associated with the given usage_key,
+        first replacing it with a copy if it isn't owned by this
+        instance.
+
+        Raises KeyError if not found.
+        """
+        block_data = self._block_data_map[usage_key]
+        if self._owned_block_keys is not None and usage_key not in self._owned_block_keys:
+            block_data = block_data.copy()
+            self._block_data_map[usage_key] = block_data
+            self._owned_block_keys.add(usage_key)
+        return block_data
+
+    def _get_writable_transformer_data(self, transformer):
+        """
+        Returns the non-block-specific TransformerData of the given
+        transformer, first replacing it with a copy if it isn't owned by
+        this instance.  If not found, creates and returns a new
+        TransformerData.
+        """
+        transformer_data = self.transformer_data.get_or_create(transformer)
+        if self._owned_transformer_names is not None:
+            transformer_name = self.transformer_data._translate_key(transformer)  # pylint: disable=protected-access
+            if transformer_name not in self._owned_transformer_names:
+                transformer_data = transformer_data.copy()
+                self.transformer_data[transformer_name] = transformer_data
+                self._owned_transformer_names.add(transformer_name)
+        return transformer_data
+
 
 class BlockStructureModulestoreData(BlockStructureBlockData):
     """
@@ -786,6 +918,35 @@ class BlockStructureModulestoreData(BlockStructureBlockData):
         # set(string)
         self._requested_xblock_fields = set()
 
+        # Set of usage keys of the blocks that are yielded by the
+        # traversals of this block structure while a transformer
+        # collects its data incrementally.  None if all blocks are
+        # yielded.
+        # set(UsageKey) or None
+        self._blocks_to_collect = None
+
+    def topological_traversal(self, *args, **kwargs):
+        """
+        See the description in BlockStructure.topological_traversal.
+
+        While a transformer collects its data incrementally, yields only
+        the blocks whose data is to be collected.
+        """
+        return self._filter_blocks_to_collect(
+            super(BlockStructureModulestoreData, self).topological_traversal(*args, **kwargs)
+        )
+
+    def post_order_traversal(self, *args, **kwargs):
+        """
+        See the description in BlockStructure.post_order_traversal.
+
+        While a transformer collects its data incrementally, yields only
+        the blocks whose data is to be collected.
+        """
+        return self._filter_blocks_to_collect(
+            super(BlockStructureModulestoreData, self).post_order_traversal(*args, **kwargs)
+        )
+
     def request_xblock_fields(self, *field_names):
         """
         Records request for collecting data for the given xBlock fields.
@@ -858,3 +1019,85 @@ class BlockStructureModulestoreData(BlockStructureBlockData):
         """
         if hasattr(xblock, field_name):
             setattr(block_data, field_name, getattr(xblock, field_name))
+
+    def _collect_block_versions(self):
+        """
+        Stores the modulestore version of each block, as recorded on its
+        xBlock's update_version attribute.  Only blocks from modulestores
+        that record the version in which each block was last edited
+        (i.e., Split) have a version.
+        """
+        for xblock_usage_key, xblock in self._xblock_map.iteritems():
+            version = getattr(xblock, 'update_version', None)
+            if version is not None:
+                self.set_transformer_block_field(
+                    xblock_usage_key, BLOCK_VERSIONS_DATA_NAME, BLOCK_VERSION_KEY, unicode(version),
+                )
+
+    def _get_blocks_to_collect(self, previous_block_structure):
+        """
+        Returns the set of usage keys of the blocks whose collected data
+        may differ from their data in the given previously collected
+        block structure: blocks that are new, changed, or moved, along
+        with all of their descendants.
+
+        Arguments:
+            previous_block_structure (BlockStructureBlockData) - A
+                block structure previously collected for the same root.
+        """
+        blocks_to_collect = set()
+        for block_key in super(BlockStructureModulestoreData, self).topological_traversal():
+            parents = self.get_parents(block_key)
+            version = self.get_transformer_block_field(block_key, BLOCK_VERSIONS_DATA_NAME, BLOCK_VERSION_KEY)
+            if (
+                    version is None or
+                    block_key not in previous_block_structure or
+                    version != previous_block_structure.get_transformer_block_field(
+                        block_key, BLOCK_VERSIONS_DATA_NAME, BLOCK_VERSION_KEY,
+                    ) or
+                    set(parents) != set(previous_block_structure.get_parents(block_key)) or
+                    any(parent_key in blocks_to_collect for parent_key in parents)
+            ):
+                blocks_to_collect.add(block_key)
+        return blocks_to_collect
+
+    def _copy_transformer_data(self, previous_block_structure, transformer, excluded_blocks):
+        """
+        Copies the given transformer's collected data from the given
+        previously collected block structure, excluding the block data
+        of the given blocks.
+        """
+        previous_transformer_data = previous_block_structure.transformer_data.get(transformer.name())
+        if previous_transformer_data is not None:
+            self.transformer_data[transformer] = previous_transformer_data.copy()
+
+        for block_key in self:
+            if block_key in excluded_blocks or block_key not in previous_block_structure:
+                continue
+            try:
+                previous_block_data = previous_block_structure.get_transformer_block_data(block_key, transformer)
+            except KeyError:
+                continue
+            self._get_or_create_block(block_key).transformer_data[transformer] = previous_block_data.copy()
+
+    @contextmanager
+    def _collecting_blocks(self, blocks_to_collect):
+        """
+        A context manager that limits the traversals of this block
+        structure to the given blocks.
+        """
+        self._blocks_to_collect = blocks_to_collect
+        try:
+            yield
+        finally:
+            self._blocks_to_collect = None
+
+    def _filter_blocks_to_collect(self, block_keys):
+        """
+        Returns the given iterable of block keys, filtered by the
+        blocks to collect, if any.
+        """
+        blocks_to_collect = self._blocks_to_collect
+        if blocks_to_collect is None:
+            return block_keys
+        return (block_key for block_key in block_keys if block_key in blocks_to_collect)
@@ -0,0 +1,94 @@
+"""
+Command to compare the serialization formats of collected course blocks.
+"""
+import timeit
+
+from django.core.management.base import BaseCommand
+
+import openedx.core.djangoapps.content.block_structure.api as api
+from openedx.core.djangoapps.content.block_structure import serialization
+from openedx.core.djangoapps.content.block_structure.factory import BlockStructureFactory
+from openedx.core.lib.cache_utils import zpickle, zunpickle
+from openedx.core.lib.command_utils import parse_course_keys
+
+
+class Command(BaseCommand):
+    """
+    Example usage:
+        $ ./manage.py lms benchmark_block_structure_serialization 'edX/DemoX/Demo_Course' --settings=devstack
+    """
+    help = u'Compares the size and speed of the zpickle and columnar formats of collected course blocks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'courses',
+            nargs='+',
+            help=u'Course keys of the courses whose collected blocks are to be benchmarked.',
+        )
+        parser.add_argument(
+            '--iterations',
+            help=u'Number of times to repeat each measurement.',
+            default=5,
+            type=int,
+        )
+
+    def handle(self, *args, **options):
+        for course_key in parse_course_keys(options['courses']):
+            block_structure = api.get_course_in_cache(course_key)
+            self.stdout.write(u'{}: {} blocks'.format(course_key, len(block_structure)))
+            for format_name, serialize, deserialize in self._formats():
+                self._benchmark(format_name, serialize, deserialize, block_structure, options['iterations'])
+
+    def _formats(self):
+        """
+        Returns (name, serialize, deserialize) for each of the compared formats.
+        """
+        def pickled_serialize(block_structure):
+            # pylint: disable=protected-access
+            return zpickle((
+                block_structure._block_relations,
+                block_structure.transformer_data,
+                block_structure._block_data_map,
+            ))
+
+        return [
+            (u'zpickle', pickled_serialize, zunpickle),
+            (u'columnar', serialization.serialize, serialization.deserialize),
+        ]
+
+    def _benchmark(self, format_name, serialize, deserialize, block_structure, iterations):
+        """
+        Writes the size of the given format's serialization and the best
+        time out of the given number of iterations for serializing,
+        deserializing, and deserializing followed by reading the data of
+        all blocks.
+        """
+        serialized_data = serialize(block_structure)
+
+        def deserialize_and_read():
+            """
+            Deserializes and accesses the data of every block.
+            """
+            deserialized = BlockStructureFactory.create_new(
+                block_structure.root_block_usage_key,
+                *deserialize(serialized_data)
+            )
+            for _ in deserialized.itervalues():
+                pass
+
+        timings = [
+            min(timeit.repeat(func, number=1, repeat=iterations))
+            for func in (
+                lambda: serialize(block_structure),
+                lambda: deserialize(serialized_data),
+                deserialize_and_read,
+            )
+        ]
+        self.stdout.write(
+            u'  {:<10} size: {:>10} bytes, serialize: {:8.1f} ms, deserialize: {:8.1f} ms, '
+            u'deserialize and read: {:8.1f} ms'.format(
+                format_name,
+                len(serialized_data),
+                *[timing * 1000 for timing in timings]
+            )
+        )
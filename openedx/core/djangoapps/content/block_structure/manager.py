@@ -4,6 +4,8 @@ BlockStructures.
 """
 from contextlib import contextmanager
 
+from django.conf import settings
+
 from . import config
 from .exceptions import UsageKeyNotInBlockStructure, TransformerDataIncompatible, BlockStructureNotFound
 from .factory import BlockStructureFactory
@@ -34,7 +36,13 @@ class BlockStructureManager(object):
         self.modulestore = modulestore
         self.store = BlockStructureStore(cache)
 
-    def get_transformed(self, transformers, starting_block_usage_key=None, collected_block_structure=None):
+    def get_transformed(
+            self,
+            transformers,
+            starting_block_usage_key=None,
+            collected_block_structure=None,
+            collected_data_names=None,
+    ):
         """
         Returns the transformed Block Structure for the root_block_usage_key,
         starting at starting_block_usage_key, getting block data from the cache
@@ -54,29 +62,89 @@ class BlockStructureManager(object):
             collected_block_structure (BlockStructureBlockData) - A
                 block structure retrieved from a prior call to
                 get_collected.  Can be optionally provided if already available,
-                for optimization.
+                for optimization.  If the memoize_transforms switch is
+                enabled, the results of transforming it are shared among
+                usages with equal transform memo keys.  See
+                BlockStructureTransformer.transform_memo_key.
+
+            collected_data_names (set(string)) - See the description in
+                get_collected.  Used only if collected_block_structure is
+                not provided.  Callers typically pass the value of
+                transformers.collected_data_names(), along with the names
+                of any transformers whose data they read from the
+                transformed block structure.
 
         Returns:
             BlockStructureBlockData - A transformed block structure,
                 starting at starting_block_usage_key.
         """
-        block_structure = collected_block_structure.copy() if collected_block_structure else self.get_collected()
+        if collected_block_structure:
+            transform_memo = None
+            if config.waffle().is_enabled(config.MEMOIZE_TRANSFORMS):
+                transform_memo = collected_block_structure._transform_memo  # pylint: disable=protected-access
+            return self._get_transformed_from_collected(
+                transformers,
+                starting_block_usage_key,
+                collected_block_structure,
+                transform_memo,
+                settings.BLOCK_STRUCTURES_SETTINGS.get('MAX_MEMOIZED_TRANSFORMS', 16),
+            )
 
-        if starting_block_usage_key:
-            # Override the root_block_usage_key so traversals start at the
-            # requested location.  The rest of the structure will be pruned
-            # as part of the transformation.
-            if starting_block_usage_key not in block_structure:
-                raise UsageKeyNotInBlockStructure(
-                    "The requested usage_key '{0}' is not found in the block_structure with root '{1}'",
-                    unicode(starting_block_usage_key),
-                    unicode(self.root_block_usage_key),
-                )
-            block_structure.set_root_block(starting_block_usage_key)
-        transformers.transform(block_structure)
+        block_structure = self.get_collected(collected_data_names)
+        self._transform(transformers, starting_block_usage_key, block_structure)
         return block_structure
 
-    def get_collected(self):
+    def iter_transformed(
+            self,
+            transformers,
+            usage_infos,
+            starting_block_usage_key=None,
+            collected_block_structure=None,
+            collected_data_names=None,
+    ):
+        """
+        Generator that yields (usage_info, block_structure) with the
+        transformed Block Structure for each of the given usage_infos,
+        all transformed from the same collected Block Structure.
+
+        Usages with equal transform memo keys, such as users with the
+        same staff access and partition groups, share the result of
+        transforming the collected Block Structure, which is computed
+        only once per batch (see
+        BlockStructureTransformer.transform_memo_key).  So the cost of
+        transforming a course for a batch of users grows with the number
+        of distinct memo keys rather than with the number of users.
+
+        Arguments:
+            transformers (BlockStructureTransformers) - Collection of
+                transformers to apply.  Its usage_info is set to each of
+                the given usage_infos in turn.
+
+            usage_infos (iterable) - The usage_info objects to transform
+                the Block Structure for.  Consumed lazily.
+
+            starting_block_usage_key, collected_block_structure,
+            collected_data_names - See the descriptions in
+                get_transformed.  The collected Block Structure is
+                retrieved only once if not provided.
+        """
+        if not collected_block_structure:
+            collected_block_structure = self.get_collected(collected_data_names)
+
+        # The memo of this batch is kept for the lifetime of the
+        # generator and is not limited in size, since it has at most
+        # one entry per distinct memo key.
+        transform_memo = {}
+        for usage_info in usage_infos:
+            transformers.usage_info = usage_info
+            yield usage_info, self._get_transformed_from_collected(
+                transformers,
+                starting_block_usage_key,
+                collected_block_structure,
+                transform_memo,
+            )
+
+    def get_collected(self, collected_data_names=None):
         """
         Returns the collected Block Structure for the root_block_usage_key,
         getting block data from the cache and modulestore, as needed.
@@ -85,6 +153,14 @@ class BlockStructureManager(object):
         the modulestore is accessed if needed (at cache miss), and the
         transformers data is collected if needed.
 
+        Arguments:
+            collected_data_names (set(string)) - Optional names of the
+                transformers whose collected data is to be loaded, in
+                addition to the collected xBlock fields.  If None, the
+                collected data of all transformers is loaded.  Loading
+                only the needed data saves memory and deserialization
+                time for consumers that apply only a few transformers.
+
         Returns:
             BlockStructureBlockData - A collected block structure,
                 starting at root_block_usage_key, with collected data
@@ -94,8 +170,9 @@ class BlockStructureManager(object):
             block_structure = BlockStructureFactory.create_from_store(
                 self.root_block_usage_key,
                 self.store,
+                collected_data_names,
             )
-            BlockStructureTransformers.verify_versions(block_structure)
+            BlockStructureTransformers.verify_versions(block_structure, collected_data_names)
 
         except (BlockStructureNotFound, TransformerDataIncompatible):
             if config.waffle().is_enabled(config.RAISE_ERROR_WHEN_NOT_FOUND):
@@ -124,10 +201,26 @@ class BlockStructureManager(object):
                 self.root_block_usage_key,
                 self.modulestore,
             )
-            BlockStructureTransformers.collect(block_structure)
+            incremental_collect = config.waffle().is_enabled(config.INCREMENTAL_COLLECT)
+            BlockStructureTransformers.collect(
+                block_structure,
+                self._get_previous_collected() if incremental_collect else None,
+                collect_block_versions=incremental_collect,
+            )
             self.store.add(block_structure)
             return block_structure
 
+    def _get_previous_collected(self):
+        """
+        Returns the block structure that was previously collected and is
+        still in the store, for incremental collection.  Returns None if
+        not found.
+        """
+        try:
+            return BlockStructureFactory.create_from_store(self.root_block_usage_key, self.store)
+        except BlockStructureNotFound:
+            return None
+
     def clear(self):
         """
         Removes data for the block structure associated with the given
@@ -135,6 +228,78 @@ class BlockStructureManager(object):
         """
         self.store.delete(self.root_block_usage_key)
 
+    def _get_transformed_from_collected(
+            self,
+            transformers,
+            starting_block_usage_key,
+            collected_block_structure,
+            transform_memo,
+            max_memoized=None,
+    ):
+        """
+        Returns the result of transforming a copy of the given collected
+        block structure, memoizing it in the given transform_memo, if
+        any, for sharing among usages with the same memo key.
+        """
+        memo_key = None
+        if transform_memo is not None:
+            transformers_memo_key = transformers.transform_memo_key(collected_block_structure)
+            if transformers_memo_key is not None:
+                memo_key = (starting_block_usage_key, transformers_memo_key)
+                memoized_block_structure = self._get_memoized_transform(transform_memo, memo_key)
+                if memoized_block_structure is not None:
+                    return memoized_block_structure.copy()
+
+        block_structure = collected_block_structure.copy()
+        self._transform(transformers, starting_block_usage_key, block_structure)
+
+        if memo_key is not None:
+            self._memoize_transform(transform_memo, memo_key, block_structure, max_memoized)
+            # Return a copy so the memoized result remains unmodified.
+            block_structure = block_structure.copy()
+        return block_structure
+
+    def _transform(self, transformers, starting_block_usage_key, block_structure):
+        """
+        Transforms the given block structure in place, starting at
+        starting_block_usage_key.
+        """
+        if starting_block_usage_key:
+            # Override the root_block_usage_key so traversals start at the
+            # requested location.  The rest of the structure will be pruned
+            # as part of the transformation.
+            if starting_block_usage_key not in block_structure:
+                raise UsageKeyNotInBlockStructure(
+                    "The requested usage_key '{0}' is not found in the block_structure with root '{1}'",
+                    unicode(starting_block_usage_key),
+                    unicode(self.root_block_usage_key),
+                )
+            block_structure.set_root_block(starting_block_usage_key)
+        transformers.transform(block_structure)
+
+    def _get_memoized_transform(self, transform_memo, memo_key):
+        """
+        Returns the memoized result of a transformation for the given
+        memo key in the given transform_memo, if any.
+        """
+        block_structure = transform_memo.pop(memo_key, None)
+        if block_structure is not None:
+            # Reinsert to mark as most recently used.
+            transform_memo[memo_key] = block_structure
+        return block_structure
+
+    def _memoize_transform(self, transform_memo, memo_key, block_structure, max_memoized=None):
+        """
+        Memoizes the given result of a transformation for the given memo
+        key in the given transform_memo (an OrderedDict if max_memoized
+        is given), evicting the least recently used results beyond
+        max_memoized.
+        """
+        transform_memo[memo_key] = block_structure
+        if max_memoized is not None:
+            while len(transform_memo) > max_memoized:
+                transform_memo.popitem(last=False)
+
     @contextmanager
     def _bulk_operations(self):
         """
@@ -0,0 +1,970 @@
+"""
+Module for the columnar, pickle-free serialization format of
+BlockStructure objects.
+
+Layout of a serialized block structure:
+
+    header   - MAGIC followed by the FORMAT_VERSION of the layout and the
+               number of sections that follow.
+    sections - A sequence of named, independently zlib-compressed
+               sections.  Each section is prefixed with its name and its
+               compressed length so that readers can skip sections
+               without decompressing them.
+
+The following sections are written:
+
+    keys           - The interned usage keys of all blocks.  Every other
+                     section refers to a block only by its integer index
+                     in this table.
+    relations      - Parent and child relations of each block stored as
+                     integer adjacency arrays (CSR offsets and indices).
+    fields         - Per-field value columns of the collected xBlock
+                     fields.
+    transformer:*  - One section per transformer, containing the
+                     transformer's structure-level data and its per-block
+                     value columns.
+
+For caching, the serialized data can be split into a base, with the
+sections that every reader needs, and a separate segment per
+transformer (see split_segments).  Readers then fetch and decode only
+the segments of the transformers whose data they need.
+
+A value column stores the indices of the blocks that have a value for
+the field, the index of each block's value into a column-local table of
+distinct values, and the table itself.  Values are encoded as tagged
+JSON (see _ValueEncoder) instead of being pickled.  Plain objects are
+only rebuilt for the classes listed in SERIALIZABLE_OBJECT_CLASSES.
+
+Deserialized block data is materialized into BlockData objects lazily,
+only for the blocks that are actually accessed (see LazyBlockDataMap).
+"""
+from array import array
+from base64 import b64decode, b64encode
+from collections import MutableMapping
+from copy import deepcopy
+from datetime import date, datetime, timedelta
+from hashlib import sha1
+from importlib import import_module
+import json
+import struct
+import sys
+import zlib
+
+from opaque_keys.edx.keys import AssetKey, CourseKey, DefinitionKey, UsageKey
+from opaque_keys import OpaqueKey
+from pytz import utc
+
+from .block_structure import BlockData, TransformerData, TransformerDataMap, _BlockRelations
+from .exceptions import BlockStructureException
+
+
+# Leading bytes of data serialized in this format.  Since zlib streams
+# always start with 0x78, this can never be confused with zpickled data.
+MAGIC = b'BSCF'
+
+# The version of the layout written by this module.  Increment this
+# value whenever the layout changes.
+FORMAT_VERSION = 1
+
+KEYS_SECTION = 'keys'
+RELATIONS_SECTION = 'relations'
+FIELDS_SECTION = 'fields'
+TRANSFORMER_SECTION_PREFIX = 'transformer:'
+SEGMENTS_SECTION = 'segments'
+
+_HEADER = struct.Struct('>4sHI')
+_SECTION_NAME_LENGTH = struct.Struct('>H')
+_SECTION_PAYLOAD_LENGTH = struct.Struct('>I')
+
+# Typecode of the unsigned integer arrays used for relations.
+_INDEX_TYPECODE = 'I' if array('I').itemsize >= 4 else 'L'
+
+_KEY_CLASSES = {
+    key_class.KEY_TYPE: key_class
+    for key_class in (UsageKey, CourseKey, DefinitionKey, AssetKey)
+}
+
+# Importable paths of the classes of the plain objects that may be
+# encoded by their instance dictionary.  Other objects are unsupported,
+# so block structures with them are pickled instead, and serialized data
+# naming any other class is unreadable.
+SERIALIZABLE_OBJECT_CLASSES = frozenset([
+    'lms.djangoapps.course_blocks.transformers.user_partitions._MergedGroupAccess',
+])
+
+
+class UnsupportedValue(BlockStructureException):
+    """
+    Exception for when a collected value cannot be represented in the
+    columnar serialization format.
+    """
+    pass
+
+
+class SerializationFormatError(BlockStructureException):
+    """
+    Exception for when serialized data is not in a readable columnar
+    format.
+    """
+    pass
+
+
+def is_columnar(serialized_data):
+    """
+    Returns whether the given serialized data is in the columnar format.
+    """
+    return serialized_data[:len(MAGIC)] == MAGIC
+
+
+def serialize(block_structure):
+    """
+    Returns the columnar serialization of the given block structure.
+
+    Raises:
+        UnsupportedValue if any collected value cannot be encoded.
+    """
+    try:
+        return write_sections(encode_sections(block_structure))
+    except RuntimeError:
+        # Raised for values with reference cycles, which exceed the
+        # maximum recursion depth of the encoder.
+        raise UnsupportedValue('Collected values exceed the maximum encoding depth.')
+
+
+def deserialize(serialized_data, transformer_names=None):
+    """
+    Deserializes the given columnar data.
+
+    Arguments:
+        serialized_data (bytes) - Data written by serialize.
+
+        transformer_names (set(string)) - Optional names of the
+            transformers whose collected data is to be deserialized.
+            If None, data of all transformers is deserialized.
+
+    Returns:
+        tuple(block_relations, transformer_data, block_data_map) - The
+            internal data structures of the serialized block structure,
+            as expected by BlockStructureFactory.create_new.
+    """
+    return decode_sections(read_sections(serialized_data, _transformer_section_filter(transformer_names)))
+
+
+def split_segments(serialized_data):
+    """
+    Splits the given columnar data into its base and a segment per
+    transformer, without recompressing any section.
+
+    Returns:
+        tuple(string, bytes, dict {string: bytes}) - A digest of the
+            given data, the base data, including a manifest of the
+            transformer segments, and a map of transformer name to the
+            data of its segment.
+
+    The manifest records the digest so that segments of different
+    serializations of a block structure are never combined.
+    """
+    base_sections = []
+    segments = {}
+    for name, compressed_payload in _read_raw_sections(serialized_data):
+        if name.startswith(TRANSFORMER_SECTION_PREFIX):
+            segments[name[len(TRANSFORMER_SECTION_PREFIX):]] = _write_raw_sections([(name, compressed_payload)])
+        else:
+            base_sections.append((name, compressed_payload))
+
+    digest = sha1(serialized_data).hexdigest()
+    manifest = _dumps({'digest': digest, 'names': sorted(segments)})
+    base_sections.append((SEGMENTS_SECTION, zlib.compress(manifest)))
+    return digest, _write_raw_sections(base_sections), segments
+
+
+def read_segment_manifest(base_data):
+    """
+    Returns the digest and the list of names of the transformers with
+    segments, as recorded in the manifest of the given base data written
+    by split_segments.
+
+    Raises:
+        SerializationFormatError if the data has no manifest.
+    """
+    try:
+        manifest = _loads(read_sections(base_data, lambda name: name == SEGMENTS_SECTION)[SEGMENTS_SECTION])
+    except KeyError:
+        raise SerializationFormatError('Missing section {}'.format(SEGMENTS_SECTION))
+    return manifest['digest'], manifest['names']
+
+
+def join_segments(base_data, segments):
+    """
+    Returns columnar data combining the given base data with the given
+    list of transformer segments, without recompressing any section.
+    """
+    sections = [
+        raw_section for raw_section in _read_raw_sections(base_data)
+        if raw_section[0] != SEGMENTS_SECTION
+    ]
+    for segment in segments:
+        sections.extend(_read_raw_sections(segment))
+    return _write_raw_sections(sections)
+
+
+def encode_sections(block_structure):
+    """
+    Returns an ordered list of (name, payload) pairs of the
+    uncompressed sections for the given block structure.
+    """
+    # pylint: disable=protected-access
+    block_relations = block_structure._block_relations
+    block_data_map = block_structure._block_data_map
+
+    key_table = _KeyTable()
+    for usage_key in block_relations:
+        key_table.add(usage_key)
+    for usage_key in block_data_map:
+        key_table.add(usage_key)
+
+    encoder = _ValueEncoder()
+    field_columns = {}
+    transformer_columns = {}
+    for usage_key, block_data in block_data_map.iteritems():
+        index = key_table.index(usage_key)
+        for field_name, value in block_data.fields.iteritems():
+            field_columns.setdefault(field_name, _ColumnWriter(encoder)).add(index, value)
+        for transformer_name, transformer_block_data in block_data.transformer_data.iteritems():
+            columns = transformer_columns.setdefault(transformer_name, {})
+            for field_name, value in transformer_block_data.fields.iteritems():
+                columns.setdefault(field_name, _ColumnWriter(encoder)).add(index, value)
+
+    sections = [
+        (KEYS_SECTION, key_table.encode(data_indices=[key_table.index(key) for key in block_data_map])),
+        (RELATIONS_SECTION, _encode_relations(key_table, block_relations)),
+        (FIELDS_SECTION, _dumps(_encode_columns(field_columns))),
+    ]
+
+    transformer_names = set(block_structure.transformer_data) | set(transformer_columns)
+    for transformer_name in sorted(transformer_names):
+        transformer_data = block_structure.transformer_data.get(transformer_name)
+        sections.append((
+            TRANSFORMER_SECTION_PREFIX + transformer_name,
+            _dumps({
+                'data': encoder.encode(transformer_data.fields) if transformer_data is not None else None,
+                'columns': _encode_columns(transformer_columns.get(transformer_name, {})),
+            }),
+        ))
+    return sections
+
+
+def decode_sections(sections):
+    """
+    Returns the (block_relations, transformer_data, block_data_map) tuple
+    for the given map of section name to uncompressed payload.
+    """
+    try:
+        keys, data_indices = _KeyTable.decode(sections[KEYS_SECTION])
+        block_relations = _decode_relations(keys, sections[RELATIONS_SECTION])
+        field_columns = _decode_columns(_loads(sections[FIELDS_SECTION]))
+    except KeyError as error:
+        raise SerializationFormatError('Missing section {}'.format(error))
+
+    decoder = _ValueDecoder()
+    transformer_data = TransformerDataMap()
+    transformer_columns = {}
+    for section_name, payload in sections.iteritems():
+        if not section_name.startswith(TRANSFORMER_SECTION_PREFIX):
+            continue
+        transformer_name = section_name[len(TRANSFORMER_SECTION_PREFIX):]
+        segment = _loads(payload)
+        if segment['data'] is not None:
+            data = TransformerData()
+            data.fields = decoder.decode(segment['data'])
+            transformer_data[transformer_name] = data
+        transformer_columns[transformer_name] = _decode_columns(segment['columns'])
+
+    block_data_map = LazyBlockDataMap(
+        keys,
+        data_indices,
+        field_columns,
+        transformer_columns,
+        decoder,
+    )
+    return block_relations, transformer_data, block_data_map
+
+
+def write_sections(sections):
+    """
+    Returns the serialized bytes for the given list of (name, payload)
+    pairs, compressing each payload independently.
+    """
+    return _write_raw_sections([(name, zlib.compress(payload)) for name, payload in sections])
+
+
+def read_sections(serialized_data, section_filter=None):
+    """
+    Returns a map of section name to uncompressed payload for the given
+    serialized data.
+
+    Arguments:
+        serialized_data (bytes) - Data written by write_sections.
+
+        section_filter ((string)->bool) - Optional function that returns
+            whether the section with the given name should be read.
+            Sections that are not read are not decompressed.
+
+    Raises:
+        SerializationFormatError if the data is not in a readable format.
+    """
+    return {
+        name: zlib.decompress(compressed_payload)
+        for name, compressed_payload in _read_raw_sections(serialized_data)
+        if section_filter is None or section_filter(name)
+    }
+
+
+def _write_raw_sections(sections):
+    """
+    Returns the serialized bytes for the given list of (name,
+    compressed payload) pairs.
+    """
+    parts = [_HEADER.pack(MAGIC, FORMAT_VERSION, len(sections))]
+    for name, compressed_payload in sections:
+        encoded_name = name.encode('utf-8')
+        parts.append(_SECTION_NAME_LENGTH.pack(len(encoded_name)))
+        parts.append(encoded_name)
+        parts.append(_SECTION_PAYLOAD_LENGTH.pack(len(compressed_payload)))
+        parts.append(compressed_payload)
+    return b''.join(parts)
+
+
+def _read_raw_sections(serialized_data):
+    """
+    Yields the (name, compressed payload) pairs of the sections in the
+    given serialized data.
+
+    Raises:
+        SerializationFormatError if the data is not in a readable format.
+    """
+    if not is_columnar(serialized_data):
+        raise SerializationFormatError('Data is not in the columnar format.')
+
+    _, version, num_sections = _HEADER.unpack_from(serialized_data, 0)
+    if version != FORMAT_VERSION:
+        raise SerializationFormatError('Unsupported format version {}.'.format(version))
+
+    offset = _HEADER.size
+    for _ in xrange(num_sections):
+        name_length, = _SECTION_NAME_LENGTH.unpack_from(serialized_data, offset)
+        offset += _SECTION_NAME_LENGTH.size
+        name = serialized_data[offset:offset + name_length].decode('utf-8')
+        offset += name_length
+        payload_length, = _SECTION_PAYLOAD_LENGTH.unpack_from(serialized_data, offset)
+        offset += _SECTION_PAYLOAD_LENGTH.size
+        yield name, serialized_data[offset:offset + payload_length]
+        offset += payload_length
+
+
+def _transformer_section_filter(transformer_names):
+    """
+    Returns a section filter that reads all non-transformer sections and
+    only the sections of the given transformers, or None to read all.
+    """
+    if transformer_names is None:
+        return None
+    return lambda name: (
+        not name.startswith(TRANSFORMER_SECTION_PREFIX) or
+        name[len(TRANSFORMER_SECTION_PREFIX):] in transformer_names
+    )
+
+
+class LazyBlockDataMap(MutableMapping):
+    """
+    A map of a block's usage key to its BlockData that builds each
+    BlockData from the deserialized value columns only when the block is
+    first accessed.
+
+    The column tables are never mutated and so are shared between
+    copies of the map.
+    """
+    def __init__(self, keys, data_indices, field_columns, transformer_columns, decoder):
+        # Map of usage key to block index for blocks whose BlockData
+        # has not been built yet.
+        # dict {UsageKey: int}
+        self._pending = {keys[index]: index for index in data_indices}
+
+        # Map of usage key to BlockData for blocks that were accessed
+        # or explicitly set.
+        # dict {UsageKey: BlockData}
+        self._materialized = {}
+
+        # dict {field_name: _ColumnReader}
+        self._field_columns = field_columns
+
+        # dict {transformer_name: {field_name: _ColumnReader}}
+        self._transformer_columns = transformer_columns
+
+        self._decoder = decoder
+
+    def __getitem__(self, usage_key):
+        try:
+            return self._materialized[usage_key]
+        except KeyError:
+            # A block is stored in _materialized before it is removed from
+            # _pending, so that threads accessing the same block find it in
+            # either map.  If two threads build it, both get the one stored
+            # first.
+            index = self._pending.get(usage_key)
+            if index is None:
+                return self._materialized[usage_key]
+            block_data = self._materialized.setdefault(usage_key, self._build_block_data(usage_key, index))
+            self._pending.pop(usage_key, None)
+            return block_data
+
+    def __setitem__(self, usage_key, block_data):
+        self._materialized[usage_key] = block_data
+        self._pending.pop(usage_key, None)
+
+    def __delitem__(self, usage_key):
+        materialized = self._materialized.pop(usage_key, None)
+        pending = self._pending.pop(usage_key, None)
+        if materialized is None and pending is None:
+            raise KeyError(usage_key)
+
+    def __contains__(self, usage_key):
+        return usage_key in self._materialized or usage_key in self._pending
+
+    def __iter__(self):
+        # Iterate over a snapshot since iterating over items builds
+        # BlockData and hence moves keys between the internal maps.
+        # Pending keys are listed first, since a block is stored in
+        # _materialized before it is removed from _pending.
+        pending = list(self._pending)
+        materialized = set(self._materialized)
+        return iter(list(materialized) + [usage_key for usage_key in pending if usage_key not in materialized])
+
+    def __len__(self):
+        return len(self._materialized) + len(self._pending)
+
+    def copy(self):
+        """
+        Returns a shallow copy of this map, sharing any BlockData that
+        was already built.
+        """
+        return self._duplicate(dict(self._materialized))
+
+    def __deepcopy__(self, memo):
+        return self._duplicate(deepcopy(self._materialized, memo))
+
+    def _duplicate(self, materialized):
+        """
+        Returns a new map with the given built BlockData, sharing this
+        map's (immutable) value columns.
+        """
+        duplicate = self.__class__.__new__(self.__class__)
+        duplicate._pending = dict(self._pending)  # pylint: disable=protected-access
+        duplicate._materialized = materialized  # pylint: disable=protected-access
+        duplicate._field_columns = self._field_columns  # pylint: disable=protected-access
+        duplicate._transformer_columns = self._transformer_columns  # pylint: disable=protected-access
+        duplicate._decoder = self._decoder  # pylint: disable=protected-access
+        return duplicate
+
+    def _build_block_data(self, usage_key, index):
+        """
+        Returns a new BlockData for the block with the given usage key
+        and block index, populated from the value columns.
+        """
+        block_data = BlockData(usage_key)
+        for field_name, column in self._field_columns.iteritems():
+            if index in column:
+                block_data.fields[field_name] = column.value(index, self._decoder)
+
+        for transformer_name, columns in self._transformer_columns.iteritems():
+            transformer_block_data = None
+            for field_name, column in columns.iteritems():
+                if index in column:
+                    if transformer_block_data is None:
+                        transformer_block_data = block_data.transformer_data.get_or_create(transformer_name)
+                    transformer_block_data.fields[field_name] = column.value(index, self._decoder)
+        return block_data
+
+
+class _KeyTable(object):
+    """
+    Table of interned usage keys.
+
+    Keys are stored relative to an interned table of course keys and
+    block types so that decoding a key does not require parsing its full
+    string representation.
+    """
+    def __init__(self):
+        self._keys = []
+        self._indices = {}
+
+    def add(self, usage_key):
+        """
+        Interns the given usage key.
+        """
+        if usage_key not in self._indices:
+            self._indices[usage_key] = len(self._keys)
+            self._keys.append(usage_key)
+
+    def index(self, usage_key):
+        """
+        Returns the integer index of the given interned usage key.
+        """
+        return self._indices[usage_key]
+
+    def __len__(self):
+        return len(self._keys)
+
+    def encode(self, data_indices):
+        """
+        Returns the payload of the keys section.
+
+        Arguments:
+            data_indices (list(int)) - Indices of the blocks that have
+                collected block data.
+        """
+        course_keys = _Interner()
+        block_types = _Interner()
+        encoded_keys = []
+        for usage_key in self._keys:
+            if not isinstance(usage_key, UsageKey):
+                raise UnsupportedValue('Block key is not a usage key: {!r}'.format(usage_key))
+            try:
+                derived_key = usage_key.course_key.make_usage_key(usage_key.block_type, usage_key.block_id)
+                is_derivable = derived_key == usage_key
+            except (AttributeError, NotImplementedError):
+                is_derivable = False
+
+            if is_derivable:
+                encoded_keys.append([
+                    course_keys.add(unicode(usage_key.course_key)),
+                    block_types.add(usage_key.block_type),
+                    usage_key.block_id,
+                ])
+            else:
+                encoded_keys.append(unicode(usage_key))
+
+        return _dumps({
+            'courses': course_keys.values,
+            'types': block_types.values,
+            'keys': encoded_keys,
+            'data': data_indices,
+        })
+
+    @staticmethod
+    def decode(payload):
+        """
+        Returns the list of usage keys, ordered by index, and the list of
+        indices of the blocks with collected block data.
+        """
+        encoded = _loads(payload)
+        course_keys = [CourseKey.from_string(course_key) for course_key in encoded['courses']]
+        block_types = encoded['types']
+        keys = [
+            UsageKey.from_string(encoded_key) if isinstance(encoded_key, basestring)
+            else course_keys[encoded_key[0]].make_usage_key(block_types[encoded_key[1]], encoded_key[2])
+            for encoded_key in encoded['keys']
+        ]
+        return keys, encoded['data']
+
+
+class _Interner(object):
+    """
+    Assigns consecutive integer indices to distinct hashable values.
+    """
+    def __init__(self):
+        self.values = []
+        self._indices = {}
+
+    def add(self, value):
+        """
+        Returns the index of the given value, adding it if needed.
+        """
+        try:
+            return self._indices[value]
+        except KeyError:
+            self._indices[value] = index = len(self.values)
+            self.values.append(value)
+            return index
+
+
+def _encode_relations(key_table, block_relations):
+    """
+    Returns the payload of the relations section: the number of blocks
+    followed by the offsets and indices arrays of the children and then
+    of the parents.
+    """
+    num_blocks = len(key_table)
+    relations_by_index = [None] * num_blocks
+    for usage_key, relations in block_relations.iteritems():
+        relations_by_index[key_table.index(usage_key)] = relations
+
+    values = array(_INDEX_TYPECODE, [num_blocks])
+    for attr_name in ('children', 'parents'):
+        offsets = array(_INDEX_TYPECODE, [0])
+        indices = array(_INDEX_TYPECODE)
+        for relations in relations_by_index:
+            if relations is not None:
+                indices.extend(key_table.index(usage_key) for usage_key in getattr(relations, attr_name))
+            offsets.append(len(indices))
+        values.append(len(indices))
+        values.extend(offsets)
+        values.extend(indices)
+
+    # Blocks with only block data and no relations.
+    values.extend(index for index, relations in enumerate(relations_by_index) if relations is None)
+    return _array_to_bytes(values)
+
+
+def _decode_relations(keys, payload):
+    """
+    Returns the map of usage key to _BlockRelations from the payload of
+    the relations section.
+    """
+    values = _array_from_bytes(payload)
+    num_blocks = values[0]
+    position = 1
+    adjacency = {}
+    for attr_name in ('children', 'parents'):
+        num_indices = values[position]
+        offsets = values[position + 1:position + 2 + num_blocks]
+        indices = values[position + 2 + num_blocks:position + 2 + num_blocks + num_indices]
+        adjacency[attr_name] = (offsets, indices)
+        position += 2 + num_blocks + num_indices
+    detached_indices = set(values[position:])
+
+    block_relations = {}
+    children_offsets, children_indices = adjacency['children']
+    parents_offsets, parents_indices = adjacency['parents']
+    for index, usage_key in enumerate(keys):
+        if index in detached_indices:
+            continue
+        relations = _BlockRelations()
+        relations.children = [
+            keys[child] for child in children_indices[children_offsets[index]:children_offsets[index + 1]]
+        ]
+        relations.parents = [
+            keys[parent] for parent in parents_indices[parents_offsets[index]:parents_offsets[index + 1]]
+        ]
+        block_relations[usage_key] = relations
+    return block_relations
+
+
+def _array_to_bytes(values):
+    """
+    Returns the little-endian bytes of the given integer array.
+    """
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tostring()
+
+
+def _array_from_bytes(data):
+    """
+    Returns the integer array for the given little-endian bytes.
+    """
+    values = array(_INDEX_TYPECODE)
+    values.fromstring(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+class _ColumnWriter(object):
+    """
+    Accumulates the values of a single field across blocks.
+    """
+    def __init__(self, encoder):
+        self._encoder = encoder
+        self.block_indices = []
+        self.value_indices = []
+        self.table = []
+        self._table_indices = {}
+
+    def add(self, block_index, value):
+        """
+        Adds the value of the field for the block at block_index.
+        """
+        encoded_value = self._encoder.encode(value)
+        table_key = json.dumps(encoded_value, sort_keys=True)
+        try:
+            value_index = self._table_indices[table_key]
+        except KeyError:
+            self._table_indices[table_key] = value_index = len(self.table)
+            self.table.append(encoded_value)
+        self.block_indices.append(block_index)
+        self.value_indices.append(value_index)
+
+
+class _ColumnReader(object):
+    """
+    Provides access to the values of a single field across blocks.
+    """
+    def __init__(self, block_indices, value_indices, table):
+        self._value_indices = dict(zip(block_indices, value_indices))
+        self._table = table
+
+        # Decoded values that are immutable and hence can be shared
+        # across blocks.
+        self._shared_values = {}
+
+    def __contains__(self, block_index):
+        return block_index in self._value_indices
+
+    def value(self, block_index, decoder):
+        """
+        Returns the decoded value for the block at block_index.
+        """
+        value_index = self._value_indices[block_index]
+        try:
+            return self._shared_values[value_index]
+        except KeyError:
+            encoded_value = self._table[value_index]
+            value = decoder.decode(encoded_value)
+            if _ValueDecoder.is_immutable(encoded_value):
+                self._shared_values[value_index] = value
+            return value
+
+
+def _encode_columns(columns):
+    """
+    Returns the JSON-serializable form of the given map of field name
+    to _ColumnWriter.
+    """
+    return [
+        [field_name, column.block_indices, column.value_indices, column.table]
+        for field_name, column in sorted(columns.iteritems())
+    ]
+
+
+def _decode_columns(encoded_columns):
+    """
+    Returns the map of field name to _ColumnReader for the given
+    encoded columns.
+    """
+    return {
+        field_name: _ColumnReader(block_indices, value_indices, table)
+        for field_name, block_indices, value_indices, table in encoded_columns
+    }
+
+
+def _dumps(value):
+    """
+    Returns the compact JSON serialization of the given value.
+    """
+    return json.dumps(value, separators=(',', ':'))
+
+
+def _loads(payload):
+    """
+    Returns the value for the given JSON payload.
+    """
+    return json.loads(payload)
+
+
+# Tags of the encoded forms of values that have no native JSON
+# representation.  Lists are the only JSON containers used without a
+# tag; JSON objects always represent tagged values.
+_TAG = '$'
+_VALUE = 'v'
+_DICT_TAG = 'dict'
+_TUPLE_TAG = 'tuple'
+_SET_TAG = 'set'
+_FROZENSET_TAG = 'frozenset'
+_STR_TAG = 'str'
+_BYTES_TAG = 'bytes'
+_DATETIME_TAG = 'datetime'
+_DATE_TAG = 'date'
+_TIMEDELTA_TAG = 'timedelta'
+_KEY_TAG = 'key'
+_CLASS_TAG = 'class'
+_NAMEDTUPLE_TAG = 'namedtuple'
+_OBJECT_TAG = 'object'
+
+_IMMUTABLE_TAGS = frozenset([
+    _STR_TAG, _BYTES_TAG, _DATETIME_TAG, _DATE_TAG, _TIMEDELTA_TAG, _KEY_TAG, _CLASS_TAG,
+])
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class _ValueEncoder(object):
+    """
+    Encodes collected values into a tagged JSON-serializable form.
+
+    Plain objects of the SERIALIZABLE_OBJECT_CLASSES are encoded by their
+    importable class path and their instance dictionary.  Values that
+    cannot be represented raise UnsupportedValue.
+    """
+    def encode(self, value):
+        """
+        Returns the encoded form of the given value.
+        """
+        value_type = type(value)
+        if value is None or value_type in (bool, int, long, float, unicode):
+            return value
+        elif value_type is str:
+            try:
+                return {_TAG: _STR_TAG, _VALUE: value.decode('ascii')}
+            except UnicodeDecodeError:
+                return {_TAG: _BYTES_TAG, _VALUE: b64encode(value)}
+        elif value_type is list:
+            return [self.encode(item) for item in value]
+        elif value_type is dict:
+            return {_TAG: _DICT_TAG, _VALUE: [[self.encode(key), self.encode(item)] for key, item in value.iteritems()]}
+        elif value_type is tuple:
+            return {_TAG: _TUPLE_TAG, _VALUE: [self.encode(item) for item in value]}
+        elif value_type in (set, frozenset):
+            tag = _SET_TAG if value_type is set else _FROZENSET_TAG
+            return {_TAG: tag, _VALUE: [self.encode(item) for item in value]}
+        elif value_type is datetime:
+            return {_TAG: _DATETIME_TAG, _VALUE: self._encode_datetime(value)}
+        elif value_type is date:
+            return {_TAG: _DATE_TAG, _VALUE: value.toordinal()}
+        elif value_type is timedelta:
+            return {_TAG: _TIMEDELTA_TAG, _VALUE: [value.days, value.seconds, value.microseconds]}
+        elif isinstance(value, OpaqueKey):
+            return {_TAG: _KEY_TAG, _VALUE: [value.KEY_TYPE, unicode(value)]}
+        elif isinstance(value, type):
+            return {_TAG: _CLASS_TAG, _VALUE: _class_path(value)}
+        elif isinstance(value, tuple) and hasattr(value_type, '_fields'):
+            return {_TAG: _NAMEDTUPLE_TAG, _VALUE: [_class_path(value_type), [self.encode(item) for item in value]]}
+        else:
+            class_path = _class_path(value_type)
+            if class_path not in SERIALIZABLE_OBJECT_CLASSES:
+                raise UnsupportedValue('Unsupported value type: {}'.format(class_path))
+            return {_TAG: _OBJECT_TAG, _VALUE: [class_path, self._encode_state(value)]}
+
+    def _encode_datetime(self, value):
+        """
+        Returns the encoded form of the given naive or UTC datetime.
+        """
+        if value.tzinfo is None:
+            is_aware = False
+        elif value.utcoffset() == timedelta(0):
+            is_aware = True
+            value = value.replace(tzinfo=None)
+        else:
+            raise UnsupportedValue('Datetime with non-UTC timezone: {!r}'.format(value))
+        delta = value - _EPOCH
+        return [delta.days, delta.seconds, delta.microseconds, is_aware]
+
+    def _encode_state(self, value):
+        """
+        Returns the encoded instance dictionary of the given plain object.
+        """
+        value_type = type(value)
+        if (
+            not hasattr(value, '__dict__') or
+            hasattr(value_type, '__slots__') or
+            hasattr(value, '__getstate__') or
+            hasattr(value, '__setstate__') or
+            isinstance(value, (dict, list, tuple, set, frozenset, basestring))
+        ):
+            raise UnsupportedValue('Unsupported value type: {}'.format(value_type))
+        return self.encode(value.__dict__)
+
+
+class _ValueDecoder(object):
+    """
+    Decodes values encoded by _ValueEncoder.
+    """
+    def __init__(self):
+        self._classes = {}
+
+    @staticmethod
+    def is_immutable(encoded_value):
+        """
+        Returns whether the decoded form of the given encoded value is
+        immutable, and hence can be shared.
+        """
+        if isinstance(encoded_value, dict):
+            return encoded_value[_TAG] in _IMMUTABLE_TAGS
+        return not isinstance(encoded_value, list)
+
+    def decode(self, encoded_value):
+        """
+        Returns the value for the given encoded value.
+        """
+        if isinstance(encoded_value, list):
+            return [self.decode(item) for item in encoded_value]
+        elif not isinstance(encoded_value, dict):
+            return encoded_value
+
+        tag, value = encoded_value[_TAG], encoded_value[_VALUE]
+        if tag == _DICT_TAG:
+            return {self._decode_hashable(key): self.decode(item) for key, item in value}
+        elif tag == _TUPLE_TAG:
+            return tuple(self.decode(item) for item in value)
+        elif tag == _SET_TAG:
+            return set(self._decode_hashable(item) for item in value)
+        elif tag == _FROZENSET_TAG:
+            return frozenset(self._decode_hashable(item) for item in value)
+        elif tag == _STR_TAG:
+            return value.encode('ascii')
+        elif tag == _BYTES_TAG:
+            return b64decode(value)
+        elif tag == _DATETIME_TAG:
+            days, seconds, microseconds, is_aware = value
+            decoded = _EPOCH + timedelta(days, seconds, microseconds)
+            return decoded.replace(tzinfo=utc) if is_aware else decoded
+        elif tag == _DATE_TAG:
+            return date.fromordinal(value)
+        elif tag == _TIMEDELTA_TAG:
+            return timedelta(*value)
+        elif tag == _KEY_TAG:
+            key_type, serialized_key = value
+            return _KEY_CLASSES[key_type].from_string(serialized_key)
+        elif tag == _CLASS_TAG:
+            return self._get_class(value)
+        elif tag == _NAMEDTUPLE_TAG:
+            class_path, items = value
+            tuple_class = self._get_class(class_path)
+            if not issubclass(tuple_class, tuple):
+                raise SerializationFormatError('Class {} is not a tuple.'.format(class_path))
+            return tuple.__new__(tuple_class, [self.decode(item) for item in items])
+        elif tag == _OBJECT_TAG:
+            class_path, state = value
+            if class_path not in SERIALIZABLE_OBJECT_CLASSES:
+                raise SerializationFormatError('Class {} is not serializable.'.format(class_path))
+            obj_class = self._get_class(class_path)
+            obj = obj_class.__new__(obj_class)
+            obj.__dict__.update(self.decode(state))
+            return obj
+        raise SerializationFormatError('Unknown value tag {}.'.format(tag))
+
+    def _decode_hashable(self, encoded_value):
+        """
+        Decodes a dict key or set member, which is always hashable.
+        """
+        value = self.decode(encoded_value)
+        return tuple(value) if isinstance(value, list) else value
+
+    def _get_class(self, class_path):
+        """
+        Returns the class for the given importable class path.
+        """
+        try:
+            return self._classes[class_path]
+        except KeyError:
+            module_name, _, class_name = class_path.rpartition('.')
+            try:
+                obj_class = getattr(import_module(module_name), class_name)
+            except (ImportError, AttributeError):
+                raise SerializationFormatError('Unknown class {}.'.format(class_path))
+            self._classes[class_path] = obj_class
+            return obj_class
+
+
+def _class_path(obj_class):
+    """
+    Returns the importable path of the given class.
+
+    Raises:
+        UnsupportedValue if the class cannot be imported by its path.
+    """
+    class_path = '{}.{}'.format(obj_class.__module__, obj_class.__name__)
+    module = sys.modules.get(obj_class.__module__)
+    if module is None or getattr(module, obj_class.__name__, None) is not obj_class:
+        raise UnsupportedValue('Class is not importable: {}'.format(class_path))
+    return class_path
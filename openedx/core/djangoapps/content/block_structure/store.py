@@ -6,7 +6,7 @@ from logging import getLogger
 
 from openedx.core.lib.cache_utils import zpickle, zunpickle
 
-from . import config
+from . import config, serialization
 from .block_structure import BlockStructureBlockData
 from .exceptions import BlockStructureNotFound
 from .factory import BlockStructureFactory
@@ -66,7 +66,7 @@ class BlockStructureStore(object):
         bs_model = self._update_or_create_model(block_structure, serialized_data)
         self._add_to_cache(serialized_data, bs_model)
 
-    def get(self, root_block_usage_key):
+    def get(self, root_block_usage_key, transformer_names=None):
         """
         Deserializes and returns the block structure starting at
         root_block_usage_key, if found in the cache or storage.
@@ -79,6 +79,12 @@ class BlockStructureStore(object):
                 root of the block structure that is to be retrieved
                 from the store.
 
+            transformer_names (set(string)) - Optional names of the
+                transformers whose collected data is to be loaded.  If
+                None, the data of all transformers is loaded.  Note: Only
+                block structures stored in the columnar format can be
+                partially loaded.
+
         Returns:
             BlockStructure - The deserialized block structure starting
             at root_block_usage_key, if found.
@@ -90,12 +96,12 @@ class BlockStructureStore(object):
         bs_model = self._get_model(root_block_usage_key)
 
         try:
-            serialized_data = self._get_from_cache(bs_model)
+            serialized_data = self._get_from_cache(bs_model, transformer_names)
         except BlockStructureNotFound:
             serialized_data = self._get_from_store(bs_model)
             self._add_to_cache(serialized_data, bs_model)
 
-        return self._deserialize(serialized_data, root_block_usage_key)
+        return self._deserialize(serialized_data, root_block_usage_key, transformer_names)
 
     def delete(self, root_block_usage_key):
         """
@@ -155,15 +161,32 @@ class BlockStructureStore(object):
         """
         Adds the given serialized_data for the given BlockStructureModel
         to the cache.
+
+        Data in the columnar format is cached as a base entry and a
+        separate entry per transformer segment, so that readers can
+        fetch only the segments they need.
         """
         cache_key = self._encode_root_cache_key(bs_model)
-        self._cache.set(cache_key, serialized_data, timeout=config.cache_timeout_in_seconds())
+        if serialization.is_columnar(serialized_data):
+            digest, base_data, segments = serialization.split_segments(serialized_data)
+            cache_entries = {
+                self._encode_segment_cache_key(cache_key, digest, transformer_name): segment_data
+                for transformer_name, segment_data in segments.iteritems()
+            }
+            cache_entries[cache_key] = base_data
+            self._cache.set_many(cache_entries, timeout=config.cache_timeout_in_seconds())
+        else:
+            self._cache.set(cache_key, serialized_data, timeout=config.cache_timeout_in_seconds())
         logger.info("BlockStructure: Added to cache; %s, size: %d", bs_model, len(serialized_data))
 
-    def _get_from_cache(self, bs_model):
+    def _get_from_cache(self, bs_model, transformer_names=None):
         """
         Returns the serialized data for the given BlockStructureModel
         from the cache.
+
+        For data cached in segments, only the segments of the given
+        transformer_names (or all, if None) are fetched.
+
         Raises:
              BlockStructureNotFound if not found.
         """
@@ -173,10 +196,38 @@ class BlockStructureStore(object):
         if not serialized_data:
             logger.info("BlockStructure: Not found in cache; %s.", bs_model)
             raise BlockStructureNotFound(bs_model.data_usage_key)
-        else:
-            logger.info("BlockStructure: Read from cache; %s, size: %d", bs_model, len(serialized_data))
+
+        if serialization.is_columnar(serialized_data):
+            serialized_data = self._get_segments_from_cache(bs_model, cache_key, serialized_data, transformer_names)
+
+        logger.info("BlockStructure: Read from cache; %s, size: %d", bs_model, len(serialized_data))
         return serialized_data
 
+    def _get_segments_from_cache(self, bs_model, cache_key, base_data, transformer_names):
+        """
+        Returns the given cached base data joined with its cached
+        segments for the given transformer_names (or all, if None).
+
+        Raises:
+             BlockStructureNotFound if any of the segments is not found.
+        """
+        try:
+            digest, segment_names = serialization.read_segment_manifest(base_data)
+        except serialization.SerializationFormatError:
+            raise BlockStructureNotFound(bs_model.data_usage_key)
+
+        segment_cache_keys = [
+            self._encode_segment_cache_key(cache_key, digest, transformer_name)
+            for transformer_name in segment_names
+            if transformer_names is None or transformer_name in transformer_names
+        ]
+        segments = self._cache.get_many(segment_cache_keys)
+        if len(segments) != len(segment_cache_keys):
+            logger.info("BlockStructure: Segments not found in cache; %s.", bs_model)
+            raise BlockStructureNotFound(bs_model.data_usage_key)
+
+        return serialization.join_segments(base_data, [segments[key] for key in segment_cache_keys])
+
     def _get_from_store(self, bs_model):
         """
         Returns the serialized data for the given BlockStructureModel
@@ -192,7 +243,21 @@ class BlockStructureStore(object):
     def _serialize(self, block_structure):
         """
         Serializes the data for the given block_structure.
+
+        The columnar format is used when enabled, falling back to the
+        zpickle format for block structures with values that the
+        columnar format cannot represent.
         """
+        if config.waffle().is_enabled(config.COLUMNAR_SERIALIZATION):
+            try:
+                return serialization.serialize(block_structure)
+            except serialization.UnsupportedValue as error:
+                logger.warning(
+                    "BlockStructure: Falling back to pickled serialization; %s: %s",
+                    block_structure.root_block_usage_key,
+                    error,
+                )
+
         data_to_cache = (
             block_structure._block_relations,
             block_structure.transformer_data,
@@ -200,11 +265,22 @@ class BlockStructureStore(object):
         )
         return zpickle(data_to_cache)
 
-    def _deserialize(self, serialized_data, root_block_usage_key):
+    def _deserialize(self, serialized_data, root_block_usage_key, transformer_names=None):
         """
         Deserializes the given data and returns the parsed block_structure.
+        Data in either the columnar or the zpickle format is accepted.
         """
-        block_relations, transformer_data, block_data_map = zunpickle(serialized_data)
+        if serialization.is_columnar(serialized_data):
+            try:
+                block_relations, transformer_data, block_data_map = serialization.deserialize(
+                    serialized_data,
+                    transformer_names,
+                )
+            except serialization.SerializationFormatError as error:
+                logger.info("BlockStructure: Unreadable serialized data; %s: %s", root_block_usage_key, error)
+                raise BlockStructureNotFound(root_block_usage_key)
+        else:
+            block_relations, transformer_data, block_data_map = zunpickle(serialized_data)
         return BlockStructureFactory.create_new(
             root_block_usage_key,
             block_relations,
@@ -227,6 +303,18 @@ class BlockStructureStore(object):
                 root_usage_key=unicode(bs_model.data_usage_key),
             )
 
+    @staticmethod
+    def _encode_segment_cache_key(root_cache_key, digest, transformer_name):
+        """
+        Returns the cache key to use for the segment of the given
+        transformer in the serialized data with the given digest.
+        """
+        return u"{root_cache_key}.{digest}.{transformer_name}".format(
+            root_cache_key=root_cache_key,
+            digest=digest,
+            transformer_name=transformer_name,
+        )
+
     @staticmethod
     def _version_data_of_block(root_block):
         """
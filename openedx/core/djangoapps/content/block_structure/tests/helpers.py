@@ -127,6 +127,13 @@ class MockCache(object):
         self.map[key] = val
         self.timeout_from_last_call = timeout
 
+    def set_many(self, data, timeout):
+        """
+        Associates each key with its value in the given dict in the cache.
+        """
+        for key, val in data.iteritems():
+            self.set(key, val, timeout)
+
     def get(self, key, default=None):
         """
         Returns the value associated with the given key in the cache;
@@ -134,6 +141,13 @@ class MockCache(object):
         """
         return self.map.get(key, default)
 
+    def get_many(self, keys):
+        """
+        Returns a dict of the given keys that are found in the cache to
+        their associated values.
+        """
+        return {key: self.map[key] for key in keys if key in self.map}
+
     def delete(self, key):
         """
         Deletes the given key from the cache.
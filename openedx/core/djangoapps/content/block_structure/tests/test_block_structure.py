@@ -6,6 +6,7 @@ from datetime import datetime
 from collections import namedtuple
 from copy import deepcopy
 import itertools
+import pickle
 from unittest import TestCase
 
 import ddt
@@ -310,3 +311,37 @@ class TestBlockStructureData(TestCase, ChildrenMapTestMixin):
         _set_value(new_copy, 'edit2')
         self.assertEquals(_get_value(block_structure), 'edit1')
         self.assertEquals(_get_value(new_copy), 'edit2')
+
+    def test_copy_shares_unmodified_block_data(self):
+        block_structure = self.create_block_structure(ChildrenMapTestMixin.LINEAR_CHILDREN_MAP)
+        for block in block_structure:
+            block_structure.set_transformer_block_field(block, 'transformer', 'test_key', block)
+        block_structure.set_transformer_data('transformer', 'test_key', 'original_value')
+
+        new_copy = block_structure.copy()
+        new_copy.remove_block(3, keep_descendants=False)
+        for block in new_copy:
+            self.assertIs(new_copy[block], block_structure[block])
+
+        # verify the first modification of shared data copies it
+        new_copy.set_transformer_block_field(1, 'transformer', 'test_key', 'edit')
+        new_copy.set_transformer_data('transformer', 'test_key', 'edit')
+        self.assertIsNot(new_copy[1], block_structure[1])
+        self.assertIs(new_copy[2], block_structure[2])
+        self.assertEquals(block_structure.get_transformer_block_field(1, 'transformer', 'test_key'), 1)
+        self.assertEquals(block_structure.get_transformer_data('transformer', 'test_key'), 'original_value')
+
+        # verify the original's shared data is also copied on modification
+        block_structure.override_xblock_field(2, 'test_field', 'override')
+        self.assertIsNone(new_copy.get_xblock_field(2, 'test_field'))
+        self.assertEquals(block_structure.get_xblock_field(2, 'test_field'), 'override')
+
+    def test_pickle_block_data(self):
+        block_structure = self.create_block_structure(ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP)
+        block_structure.set_transformer_block_field(1, 'transformer', 'test_key', 'transformer_value')
+        block_structure.override_xblock_field(1, 'test_field', 'value')
+
+        unpickled = pickle.loads(pickle.dumps(block_structure._block_data_map, pickle.HIGHEST_PROTOCOL))
+        self.assertEquals(unpickled[1].location, 1)
+        self.assertEquals(unpickled[1].test_field, 'value')
+        self.assertEquals(unpickled[1].transformer_data['transformer'].test_key, 'transformer_value')
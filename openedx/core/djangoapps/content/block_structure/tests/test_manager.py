@@ -5,7 +5,7 @@ import ddt
 from django.test import TestCase
 
 from ..block_structure import BlockStructureBlockData
-from ..config import RAISE_ERROR_WHEN_NOT_FOUND, STORAGE_BACKING_FOR_CACHE, waffle
+from ..config import MEMOIZE_TRANSFORMS, RAISE_ERROR_WHEN_NOT_FOUND, STORAGE_BACKING_FOR_CACHE, waffle
 from ..exceptions import UsageKeyNotInBlockStructure, BlockStructureNotFound
 from ..manager import BlockStructureManager
 from ..transformers import BlockStructureTransformers
@@ -88,6 +88,23 @@ class TestTransformer1(MockTransformer):
         return data_key + 't1.val1.' + unicode(block_key)
 
 
+class MemoizableTransformer(TestTransformer1):
+    """
+    Test Transformer class whose transformed data can be shared among usages
+    with the same usage info.
+    """
+    collect_data_key = 'memoizable.collect'
+    transform_data_key = 'memoizable.transform'
+    transform_call_count = 0
+
+    def transform_memo_key(self, usage_info, block_structure):
+        return usage_info
+
+    def transform(self, usage_info, block_structure):
+        super(MemoizableTransformer, self).transform(usage_info, block_structure)
+        MemoizableTransformer.transform_call_count += 1
+
+
 @ddt.ddt
 class TestBlockStructureManager(UsageKeyFactoryMixin, ChildrenMapTestMixin, TestCase):
     """
@@ -161,6 +178,48 @@ class TestBlockStructureManager(UsageKeyFactoryMixin, ChildrenMapTestMixin, Test
             )
             self.assert_block_structure(block_structure, expected_structure, missing_blocks=expected_missing_blocks)
 
+    @ddt.data(True, False)
+    def test_get_transformed_memoized(self, memoize_transforms):
+        MemoizableTransformer.transform_call_count = 0
+        registered_transformers = [MemoizableTransformer()]
+        with mock_registered_transformers(registered_transformers):
+            transformers = BlockStructureTransformers(registered_transformers)
+            collected_block_structure = self.bs_manager.get_collected()
+
+        with waffle().override(MEMOIZE_TRANSFORMS, active=memoize_transforms):
+            for usage_info in ['usage1', 'usage2', 'usage1']:
+                transformers.usage_info = usage_info
+                block_structure = self.bs_manager.get_transformed(
+                    transformers,
+                    collected_block_structure=collected_block_structure,
+                )
+                self.assert_block_structure(block_structure, self.children_map)
+                MemoizableTransformer.assert_transformed(block_structure)
+
+                # verify edits to the result do not affect memoized results
+                block_structure.remove_block(self.block_key_factory(1), keep_descendants=False)
+
+        self.assertEquals(MemoizableTransformer.transform_call_count, 2 if memoize_transforms else 3)
+
+    def test_iter_transformed(self):
+        MemoizableTransformer.transform_call_count = 0
+        registered_transformers = [MemoizableTransformer()]
+        usage_infos = ['usage1', 'usage2', 'usage1', 'usage2', 'usage1']
+        with mock_registered_transformers(registered_transformers):
+            transformers = BlockStructureTransformers(registered_transformers)
+            results = list(self.bs_manager.iter_transformed(
+                transformers,
+                iter(usage_infos),
+                starting_block_usage_key=self.block_key_factory(1),
+            ))
+
+        self.assertEquals([usage_info for usage_info, _ in results], usage_infos)
+        for _, block_structure in results:
+            self.assert_block_structure(block_structure, [[], [3, 4], [], [], []], missing_blocks=[0, 2])
+            MemoizableTransformer.assert_transformed(block_structure)
+        self.assertEquals(MemoizableTransformer.transform_call_count, 2)
+        self.assertEquals(self.cache.set_call_count, 1)
+
     def test_get_transformed_with_nonexistent_starting_block(self):
         with mock_registered_transformers(self.registered_transformers):
             with self.assertRaises(UsageKeyNotInBlockStructure):
@@ -0,0 +1,204 @@
+"""
+Tests for block_structure/serialization.py
+"""
+from collections import namedtuple
+from copy import deepcopy
+from datetime import date, datetime, timedelta
+
+import ddt
+from django.test import TestCase
+from opaque_keys.edx.locator import CourseLocator
+from mock import patch
+from pytz import utc
+
+from .. import serialization
+from ..factory import BlockStructureFactory
+from .helpers import ChildrenMapTestMixin, MockTransformer, UsageKeyFactoryMixin
+
+
+SampleTuple = namedtuple('SampleTuple', 'name value')
+
+
+class SampleObject(object):
+    """
+    A plain object with collected state.
+    """
+    def __init__(self, access):
+        self._access = access
+
+    def __eq__(self, other):
+        return type(other) is SampleObject and self._access == other._access  # pylint: disable=protected-access
+
+
+SAMPLE_OBJECT_CLASSES = frozenset([__name__ + '.SampleObject'])
+
+
+class UnsupportedObject(object):
+    """
+    An object with custom pickling, which the columnar format does not support.
+    """
+    def __getstate__(self):
+        return {}
+
+
+@ddt.ddt
+class TestColumnarSerialization(UsageKeyFactoryMixin, ChildrenMapTestMixin, TestCase):
+    """
+    Tests for the columnar serialization format.
+    """
+    shard = 2
+
+    def setUp(self):
+        super(TestColumnarSerialization, self).setUp()
+        self.children_map = self.DAG_CHILDREN_MAP
+        self.block_structure = self.create_block_structure(self.children_map)
+        self.block_structure._add_transformer(MockTransformer)  # pylint: disable=protected-access
+
+    def _round_trip(self):
+        """
+        Serializes and deserializes the test block structure.
+        """
+        serialized_data = serialization.serialize(self.block_structure)
+        self.assertTrue(serialization.is_columnar(serialized_data))
+        return BlockStructureFactory.create_new(
+            self.block_structure.root_block_usage_key,
+            *serialization.deserialize(serialized_data)
+        )
+
+    def test_relations(self):
+        deserialized = self._round_trip()
+        self.assert_block_structure(deserialized, self.children_map)
+        for block_key in self.block_structure:
+            self.assertEqual(deserialized.get_children(block_key), self.block_structure.get_children(block_key))
+            self.assertEqual(deserialized.get_parents(block_key), self.block_structure.get_parents(block_key))
+
+    @ddt.data(
+        None,
+        True,
+        0,
+        2 ** 70,
+        1.5,
+        u'text \u2603',
+        'ascii bytes',
+        '\xff\xfe',
+        [1, [u'nested']],
+        (1, (2, u'three')),
+        {u'key': u'value', 1: [2], (3, 4): None},
+        set([1, u'two']),
+        frozenset([(1, 2)]),
+        datetime(2018, 1, 2, 3, 4, 5, 6),
+        datetime(2018, 1, 2, 3, 4, 5, tzinfo=utc),
+        date(2018, 1, 2),
+        timedelta(days=1, seconds=2),
+        CourseLocator('org', 'course', 'run'),
+        SampleTuple(u'name', {1: set([2])}),
+        SampleObject({1: set([2, 3])}),
+        SampleObject,
+    )
+    @patch.object(serialization, 'SERIALIZABLE_OBJECT_CLASSES', SAMPLE_OBJECT_CLASSES)
+    def test_values(self, value):
+        block_key = self.block_key_factory(3)
+        self.block_structure._get_or_create_block(block_key).test_field = value  # pylint: disable=protected-access
+        self.block_structure.set_transformer_block_field(block_key, MockTransformer, 'test_field', value)
+        self.block_structure.set_transformer_data(MockTransformer, 'test_field', value)
+
+        deserialized = self._round_trip()
+        for deserialized_value in (
+                deserialized.get_xblock_field(block_key, 'test_field'),
+                deserialized.get_transformer_block_field(block_key, MockTransformer, 'test_field'),
+                deserialized.get_transformer_data(MockTransformer, 'test_field'),
+        ):
+            self.assertEqual(deserialized_value, value)
+            self.assertEqual(type(deserialized_value), type(value))
+
+    def test_transformer_version(self):
+        deserialized = self._round_trip()
+        self.assertEqual(
+            deserialized._get_transformer_data_version(MockTransformer),  # pylint: disable=protected-access
+            MockTransformer.WRITE_VERSION,
+        )
+
+    def test_lazy_block_data(self):
+        for block_id in range(len(self.children_map)):
+            block_data = self.block_structure._get_or_create_block(  # pylint: disable=protected-access
+                self.block_key_factory(block_id),
+            )
+            block_data.test_field = block_id
+
+        deserialized = self._round_trip()
+        block_data_map = deserialized._block_data_map  # pylint: disable=protected-access
+        self.assertEqual(len(block_data_map._materialized), 0)  # pylint: disable=protected-access
+
+        self.assertEqual(deserialized.get_xblock_field(self.block_key_factory(2), 'test_field'), 2)
+        self.assertEqual(len(block_data_map._materialized), 1)  # pylint: disable=protected-access
+
+        deserialized.remove_block(self.block_key_factory(4), keep_descendants=False)
+        self.assertEqual(len(block_data_map._materialized), 1)  # pylint: disable=protected-access
+        self.assertEqual(len(block_data_map), len(self.children_map) - 1)
+
+        self.assertEqual(
+            sorted(block_data.test_field for block_data in deserialized.itervalues()),
+            [0, 1, 2, 3, 5, 6],
+        )
+
+    def test_copy_is_independent(self):
+        block_key = self.block_key_factory(1)
+        self.block_structure._get_or_create_block(block_key).test_field = [1]  # pylint: disable=protected-access
+
+        deserialized = self._round_trip()
+        deserialized.get_xblock_field(block_key, 'test_field').append(2)
+        block_data_map = deepcopy(deserialized._block_data_map)  # pylint: disable=protected-access
+        block_data_map[block_key].test_field.append(3)
+
+        self.assertEqual(deserialized.get_xblock_field(block_key, 'test_field'), [1, 2])
+        self.assertEqual(block_data_map[block_key].test_field, [1, 2, 3])
+
+    def test_unsupported_value(self):
+        self.block_structure.set_transformer_data(MockTransformer, 'test_field', UnsupportedObject())
+        with self.assertRaises(serialization.UnsupportedValue):
+            serialization.serialize(self.block_structure)
+
+    def test_unlisted_object_class(self):
+        self.block_structure.set_transformer_data(MockTransformer, 'test_field', SampleObject({}))
+        with self.assertRaises(serialization.UnsupportedValue):
+            serialization.serialize(self.block_structure)
+
+        # Serialized data naming a class that is not listed is not readable.
+        with patch.object(serialization, 'SERIALIZABLE_OBJECT_CLASSES', SAMPLE_OBJECT_CLASSES):
+            serialized_data = serialization.serialize(self.block_structure)
+        with self.assertRaises(serialization.SerializationFormatError):
+            serialization.deserialize(serialized_data)
+
+    def test_concurrent_block_data_access(self):
+        block_key = self.block_key_factory(1)
+        self.block_structure._get_or_create_block(block_key).test_field = 1  # pylint: disable=protected-access
+        block_data_map = self._round_trip()._block_data_map  # pylint: disable=protected-access
+        build_block_data = block_data_map._build_block_data  # pylint: disable=protected-access
+        concurrently_accessed = []
+
+        def build_while_accessed(usage_key, index):
+            """
+            Accesses the block, as another thread would, while it is first built.
+            """
+            block_data = build_block_data(usage_key, index)
+            if not concurrently_accessed:
+                concurrently_accessed.append(None)
+                concurrently_accessed[0] = block_data_map[usage_key]
+            return block_data
+
+        with patch.object(block_data_map, '_build_block_data', side_effect=build_while_accessed):
+            block_data = block_data_map[block_key]
+        self.assertIs(block_data, concurrently_accessed[0])
+        self.assertEqual(block_data.test_field, 1)
+        self.assertEqual(list(block_data_map).count(block_key), 1)
+
+    def test_unsupported_block_key(self):
+        self.block_structure._add_relation(self.block_key_factory(0), 100)  # pylint: disable=protected-access
+        with self.assertRaises(serialization.UnsupportedValue):
+            serialization.serialize(self.block_structure)
+
+    def test_unsupported_format_version(self):
+        serialized_data = serialization.serialize(self.block_structure)
+        serialized_data = serialization.MAGIC + b'\xff\xff' + serialized_data[len(serialization.MAGIC) + 2:]
+        with self.assertRaises(serialization.SerializationFormatError):
+            serialization.deserialize(serialized_data)
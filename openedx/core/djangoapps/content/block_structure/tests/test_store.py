@@ -1,15 +1,19 @@
 """
 Tests for block_structure/cache.py
 """
+from datetime import datetime
+
 import ddt
+from pytz import timezone
 
 from openedx.core.djangolib.testing.utils import CacheIsolationTestCase
 
-from ..config import STORAGE_BACKING_FOR_CACHE, waffle
+from .. import serialization
+from ..config import COLUMNAR_SERIALIZATION, STORAGE_BACKING_FOR_CACHE, waffle
 from ..config.models import BlockStructureConfiguration
 from ..exceptions import BlockStructureNotFound
 from ..store import BlockStructureStore
-from .helpers import ChildrenMapTestMixin, UsageKeyFactoryMixin, MockCache, MockTransformer
+from .helpers import ChildrenMapTestMixin, UsageKeyFactoryMixin, MockCache, MockFilteringTransformer, MockTransformer
 
 
 @ddt.ddt
@@ -89,3 +93,77 @@ class TestBlockStructureStore(UsageKeyFactoryMixin, ChildrenMapTestMixin, CacheI
         self.assertEquals(self.mock_cache.timeout_from_last_call, 0)
         self.store.add(self.block_structure)
         self.assertEquals(self.mock_cache.timeout_from_last_call, timeout)
+
+    @ddt.data(True, False)
+    def test_columnar_serialization(self, with_storage_backing):
+        with waffle().override(STORAGE_BACKING_FOR_CACHE, active=with_storage_backing):
+            with waffle().override(COLUMNAR_SERIALIZATION, active=True):
+                self.store.add(self.block_structure)
+            self.assertTrue(any(serialization.is_columnar(value) for value in self.mock_cache.map.itervalues()))
+
+            self.assert_columnar_block_structure(self.store.get(self.block_structure.root_block_usage_key))
+
+            self.mock_cache.map.clear()
+            if with_storage_backing:
+                self.assert_columnar_block_structure(self.store.get(self.block_structure.root_block_usage_key))
+            else:
+                with self.assertRaises(BlockStructureNotFound):
+                    self.store.get(self.block_structure.root_block_usage_key)
+
+    def assert_columnar_block_structure(self, stored_value):
+        """
+        Verifies the relations and transformer data of a block structure
+        read back from the columnar format.
+        """
+        self.assert_block_structure(stored_value, self.children_map)
+        self.assertEqual(
+            stored_value.get_transformer_block_field(self.block_key_factory(0), MockTransformer, 'test'),
+            '{} val'.format(MockTransformer.name()),
+        )
+
+    def test_columnar_serialization_fallback(self):
+        unsupported_value = timezone('US/Eastern').localize(datetime(2018, 1, 1))
+        self.block_structure.set_transformer_data(MockTransformer, 'unsupported', unsupported_value)
+        with waffle().override(COLUMNAR_SERIALIZATION, active=True):
+            self.store.add(self.block_structure)
+        self.assertFalse(any(serialization.is_columnar(value) for value in self.mock_cache.map.itervalues()))
+        stored_value = self.store.get(self.block_structure.root_block_usage_key)
+        self.assert_block_structure(stored_value, self.children_map)
+
+    @ddt.data(True, False)
+    def test_partial_load(self, with_storage_backing):
+        self.block_structure._add_transformer(MockFilteringTransformer)  # pylint: disable=protected-access
+        with waffle().override(STORAGE_BACKING_FOR_CACHE, active=with_storage_backing):
+            with waffle().override(COLUMNAR_SERIALIZATION, active=True):
+                self.store.add(self.block_structure)
+            self.assertEqual(len(self.mock_cache.map), 3)
+
+            stored_value = self.store.get(
+                self.block_structure.root_block_usage_key,
+                transformer_names={MockFilteringTransformer.name()},
+            )
+            self.assert_block_structure(stored_value, self.children_map)
+            self.assertEqual(stored_value.transformer_data.keys(), [MockFilteringTransformer.name()])
+            self.assertIsNone(
+                stored_value.get_transformer_block_field(self.block_key_factory(0), MockTransformer, 'test'),
+            )
+
+            stored_value = self.store.get(self.block_structure.root_block_usage_key)
+            self.assertEqual(
+                set(stored_value.transformer_data),
+                {MockTransformer.name(), MockFilteringTransformer.name()},
+            )
+
+    def test_partial_load_missing_segment(self):
+        with waffle().override(COLUMNAR_SERIALIZATION, active=True):
+            self.store.add(self.block_structure)
+        root_cache_key = self.store._encode_root_cache_key(self.store._get_model(  # pylint: disable=protected-access
+            self.block_structure.root_block_usage_key
+        ))
+        for cache_key in list(self.mock_cache.map):
+            if cache_key != root_cache_key:
+                self.mock_cache.delete(cache_key)
+
+        with self.assertRaises(BlockStructureNotFound):
+            self.store.get(self.block_structure.root_block_usage_key, transformer_names={MockTransformer.name()})
+        self.store.get(self.block_structure.root_block_usage_key, transformer_names=set())
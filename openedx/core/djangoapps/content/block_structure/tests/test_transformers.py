@@ -6,12 +6,37 @@ from unittest import TestCase
 
 from ..block_structure import BlockStructureModulestoreData
 from ..exceptions import TransformerException, TransformerDataIncompatible
+from ..factory import BlockStructureFactory
 from ..transformers import BlockStructureTransformers
 from .helpers import (
-    ChildrenMapTestMixin, MockTransformer, MockFilteringTransformer, mock_registered_transformers
+    ChildrenMapTestMixin, MockModulestoreFactory, MockTransformer, MockFilteringTransformer,
+    mock_registered_transformers
 )
 
 
+class PercolatingTransformer(MockTransformer):
+    """
+    Mock transformer that percolates the 'value' field of the xBlocks
+    down the hierarchy, collecting the values of each block and its
+    ancestors.
+    """
+    @classmethod
+    def collect(cls, block_structure):
+        for block_key in block_structure.topological_traversal():
+            values = {block_structure.get_xblock(block_key).value}
+            for parent_key in block_structure.get_parents(block_key):
+                values |= block_structure.get_transformer_block_field(parent_key, cls, 'values')
+            block_structure.set_transformer_block_field(block_key, cls, 'values', values)
+
+
+class IncrementalPercolatingTransformer(PercolatingTransformer):
+    """
+    Mock transformer that percolates values and supports incremental
+    collection.
+    """
+    INCREMENTAL_COLLECT = True
+
+
 class TestBlockStructureTransformers(ChildrenMapTestMixin, TestCase):
     """
     Test class for testing BlockStructureTransformers
@@ -82,3 +107,87 @@ class TestBlockStructureTransformers(ChildrenMapTestMixin, TestCase):
                 self.transformers.verify_versions(block_structure)
             self.transformers.collect(block_structure)
             self.assertTrue(self.transformers.verify_versions(block_structure))
+
+    def test_verify_versions_of_named_transformers(self):
+        block_structure = self.create_block_structure(
+            self.SIMPLE_CHILDREN_MAP,
+            BlockStructureModulestoreData
+        )
+
+        with mock_registered_transformers(self.registered_transformers):
+            block_structure._add_transformer(MockTransformer)  # pylint: disable=protected-access
+            with self.assertRaises(TransformerDataIncompatible):
+                self.transformers.verify_versions(block_structure)
+            self.assertTrue(self.transformers.verify_versions(block_structure, {MockTransformer.name()}))
+
+    def test_collected_data_names(self):
+        self.assertEqual(self.transformers.collected_data_names(), set())
+        self.add_mock_transformer()
+        self.assertEqual(
+            self.transformers.collected_data_names(),
+            {MockTransformer.name(), MockFilteringTransformer.name()},
+        )
+
+    def test_incremental_collect(self):
+        modulestore = MockModulestoreFactory.create(self.SIMPLE_CHILDREN_MAP, self.block_key_factory)
+        for block_key, xblock in modulestore.blocks.iteritems():
+            xblock.field_map.update(update_version=1, value=block_key)
+
+        def collect(previous_block_structure=None):
+            """
+            Collects and returns a block structure from the mock modulestore.
+            """
+            block_structure = BlockStructureFactory.create_from_modulestore(0, modulestore)
+            BlockStructureTransformers.collect(block_structure, previous_block_structure, collect_block_versions=True)
+            return block_structure
+
+        def collected_values(block_structure, transformer):
+            """
+            Returns the lists of values collected by the given transformer, by block.
+            """
+            return [
+                sorted(block_structure.get_transformer_block_field(block_key, transformer, 'values'))
+                for block_key in range(len(self.SIMPLE_CHILDREN_MAP))
+            ]
+
+        transformers = [PercolatingTransformer, IncrementalPercolatingTransformer]
+        with mock_registered_transformers(transformers):
+            previous_block_structure = collect()
+
+            # Change a block without updating its version, which is
+            # not picked up by incremental collection.
+            modulestore.blocks[2].field_map['value'] = 20
+
+            # Change a block along with its version, which is picked
+            # up for it and its descendants.
+            modulestore.blocks[1].field_map.update(update_version=2, value=10)
+
+            block_structure = collect(previous_block_structure)
+
+        self.assertEqual(
+            collected_values(block_structure, PercolatingTransformer),
+            [[0], [0, 10], [0, 20], [0, 3, 10], [0, 4, 10]],
+        )
+        self.assertEqual(
+            collected_values(block_structure, IncrementalPercolatingTransformer),
+            [[0], [0, 10], [0, 2], [0, 3, 10], [0, 4, 10]],
+        )
+
+    def test_incremental_collect_of_changed_root(self):
+        modulestore = MockModulestoreFactory.create(self.LINEAR_CHILDREN_MAP, self.block_key_factory)
+        for block_key, xblock in modulestore.blocks.iteritems():
+            xblock.field_map.update(update_version=1, value=block_key)
+
+        with mock_registered_transformers([IncrementalPercolatingTransformer]):
+            previous_block_structure = BlockStructureFactory.create_from_modulestore(0, modulestore)
+            BlockStructureTransformers.collect(previous_block_structure, collect_block_versions=True)
+
+            modulestore.blocks[3].field_map['value'] = 30
+            modulestore.blocks[0].field_map['update_version'] = 2
+            block_structure = BlockStructureFactory.create_from_modulestore(0, modulestore)
+            BlockStructureTransformers.collect(block_structure, previous_block_structure, collect_block_versions=True)
+
+        self.assertEqual(
+            block_structure.get_transformer_block_field(3, IncrementalPercolatingTransformer, 'values'),
+            {0, 1, 2, 30},
+        )
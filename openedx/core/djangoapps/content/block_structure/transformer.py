@@ -55,6 +55,24 @@ class BlockStructureTransformer(object):
     WRITE_VERSION = 0
     READ_VERSION = 0
 
+    # Whether the transformer supports incremental collection, where
+    # its previously collected data is reused for blocks that have not
+    # changed since and its collect method is called to collect data
+    # only for the changed blocks.  While collecting incrementally, the
+    # block structure's topological_traversal and post_order_traversal
+    # yield only the changed blocks, along with their descendants.
+    #
+    # A transformer may set this to True only if the data it collects
+    # for a block depends on nothing other than the block itself and
+    # the data it collected for the block's ancestors, and the
+    # non-block-specific data it collects depends on nothing other than
+    # the root block.  For example, data that is percolated down the
+    # hierarchy in a topological traversal qualifies, while data that
+    # is aggregated up the hierarchy or that is collected for blocks
+    # other than the traversed block does not.
+    #
+    INCREMENTAL_COLLECT = False
+
     @classmethod
     def name(cls):
         """
@@ -70,6 +88,41 @@ class BlockStructureTransformer(object):
         """
         raise NotImplementedError
 
+    @classmethod
+    def collected_data_names(cls):
+        """
+        Returns the names of the transformers whose collected data is
+        read by this transformer's transform method.  When a block
+        structure is partially loaded for a collection of transformers,
+        only the collected data of these transformers is loaded, in
+        addition to the collected xBlock fields.
+
+        Transformers that read the collected data of any other
+        transformer, such as transformers that contain other
+        transformers, should override this method to include their
+        names.
+        """
+        return {cls.name()}
+
+    def transform_memo_key(self, usage_info, block_structure):
+        """
+        Returns a hashable value that identifies the usage-specific
+        input to this transformer's transform method for the given
+        usage_info and (collected) block_structure, such as the user's
+        staff access or partition groups.  Usages with equal memo keys
+        for all transformers share the result of transforming a
+        collected block structure, which is then computed only once.
+
+        Returns None, the default, if the result cannot be shared with
+        other usages, as when it depends on user-specific state.
+
+        Note: Since a transformed block structure may be shared for as
+        long as its collected block structure is in use, the memo key
+        must also account for any other input, such as the current
+        time.
+        """
+        return None
+
     @classmethod
     def collect(cls, block_structure):
         """
@@ -71,29 +71,88 @@ class BlockStructureTransformers(object):
         return self
 
     @classmethod
-    def collect(cls, block_structure):
+    def collect(cls, block_structure, previous_block_structure=None, collect_block_versions=False):
         """
         Collects data for each registered transformer.
-        """
+
+        Arguments:
+            block_structure (BlockStructureModulestoreData) - The block
+                structure whose data is to be collected.
+
+            previous_block_structure (BlockStructureBlockData) - Optional
+                block structure that was previously collected for the
+                same root.  If provided, transformers that support
+                incremental collection reuse its data for the blocks
+                that have not changed since and collect data only for
+                the changed blocks.
+
+            collect_block_versions (bool) - Whether to store the
+                modulestore version of each block, for a later
+                incremental collection.
+        """
+        # pylint: disable=protected-access
+        if collect_block_versions:
+            block_structure._collect_block_versions()
+        blocks_to_collect = None
+        if previous_block_structure is not None:
+            blocks_to_collect = block_structure._get_blocks_to_collect(previous_block_structure)
+            logger.info(
+                'BlockStructure: Incrementally collecting %d of %d blocks of %s.',
+                len(blocks_to_collect),
+                len(block_structure),
+                block_structure.root_block_usage_key,
+            )
+
         for transformer in TransformerRegistry.get_registered_transformers():
-            block_structure._add_transformer(transformer)  # pylint: disable=protected-access
-            transformer.collect(block_structure)
+            block_structure._add_transformer(transformer)
+            if cls._can_collect_incrementally(
+                    transformer, block_structure, previous_block_structure, blocks_to_collect,
+            ):
+                block_structure._copy_transformer_data(previous_block_structure, transformer, blocks_to_collect)
+                with block_structure._collecting_blocks(blocks_to_collect):
+                    transformer.collect(block_structure)
+            else:
+                transformer.collect(block_structure)
 
         # Collect all fields that were requested by the transformers.
-        block_structure._collect_requested_xblock_fields()  # pylint: disable=protected-access
+        block_structure._collect_requested_xblock_fields()
+
+    @classmethod
+    def _can_collect_incrementally(cls, transformer, block_structure, previous_block_structure, blocks_to_collect):
+        """
+        Returns whether the given transformer can reuse its data from the
+        given previously collected block structure, collecting data only
+        for the given blocks.  The root block must be unchanged, since
+        transformers may collect data from the root for all blocks.
+        """
+        # pylint: disable=protected-access
+        return (
+            transformer.INCREMENTAL_COLLECT and
+            previous_block_structure is not None and
+            block_structure.root_block_usage_key not in blocks_to_collect and
+            previous_block_structure._get_transformer_data_version(transformer) == transformer.WRITE_VERSION
+        )
 
     @classmethod
-    def verify_versions(cls, block_structure):
+    def verify_versions(cls, block_structure, transformer_names=None):
         """
         Returns whether the collected data in the block structure is
         incompatible with the current version of the registered Transformers.
 
+        Arguments:
+            transformer_names (set(string)) - Optional names of the
+                transformers whose versions are to be verified, for
+                block structures with partially loaded collected data.
+                If None, all registered transformers are verified.
+
         Raises:
             TransformerDataIncompatible with information about all outdated
             Transformers.
         """
         outdated_transformers = []
         for transformer in TransformerRegistry.get_registered_transformers():
+            if transformer_names is not None and transformer.name() not in transformer_names:
+                continue
             version_in_block_structure = block_structure._get_transformer_data_version(transformer)  # pylint: disable=protected-access
             if transformer.READ_VERSION > version_in_block_structure:
                 outdated_transformers.append(transformer)
@@ -105,6 +164,32 @@ class BlockStructureTransformers(object):
             )
         return True
 
+    def collected_data_names(self):
+        """
+        Returns the names of the transformers whose collected data is
+        needed by the transformers in this collection.
+        """
+        names = set()
+        for transformer in self._transformers['supports_filter'] + self._transformers['no_filter']:
+            names |= transformer.collected_data_names()
+        return names
+
+    def transform_memo_key(self, block_structure):
+        """
+        Returns a hashable key that identifies the result of
+        transforming the given collected block structure for this
+        collection's usage_info, or None if the result of any of the
+        transformers cannot be shared with other usages.  See
+        BlockStructureTransformer.transform_memo_key.
+        """
+        memo_key = []
+        for transformer in self._transformers['supports_filter'] + self._transformers['no_filter']:
+            transformer_memo_key = transformer.transform_memo_key(self.usage_info, block_structure)
+            if transformer_memo_key is None:
+                return None
+            memo_key.append((transformer.name(), transformer_memo_key))
+        return tuple(memo_key)
+
     def transform(self, block_structure):
         """
         The given block structure is transformed by each transformer in the
@@ -1,11 +1,23 @@
 """
 Helper functions for caching course assets.
 """
+import errno
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
 from django.core.cache import caches
 from django.core.cache.backends.base import InvalidCacheBackendError
 from opaque_keys import InvalidKeyError
 
-from xmodule.contentstore.content import STATIC_CONTENT_VERSION
+from xmodule.assetstore.assetmgr import AssetManager
+from xmodule.contentstore.content import STATIC_CONTENT_VERSION, StaticContentStream
+
+log = logging.getLogger(__name__)
 
 # See if there's a "course_assets" cache configured, and if not, fallback to the default cache.
 CONTENT_CACHE = caches['default']
@@ -48,3 +60,199 @@ def del_cached_content(location):
         pass
 
     CONTENT_CACHE.delete_many(locations, version=STATIC_CONTENT_VERSION)
+
+
+class DiskCachedContent(StaticContentStream):
+    """
+    A course asset read from a file in the local disk cache.
+    """
+    # Local files are read in bigger chunks than the 1KB default.
+    DISK_CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, content, path):
+        super(DiskCachedContent, self).__init__(
+            content.location, content.name, content.content_type, open(path, 'rb'),
+            last_modified_at=content.last_modified_at, thumbnail_location=content.thumbnail_location,
+            import_path=content.import_path, length=content.length, locked=content.locked,
+            content_digest=content.content_digest,
+        )
+        self.path = path
+
+    @property
+    def chunk_size(self):
+        return self.DISK_CHUNK_SIZE
+
+    @property
+    def file(self):
+        """
+        The open file of the asset.
+        """
+        return self._stream
+
+
+class DiskAssetCache(object):
+    """
+    Keeps copies of course assets in files of a local directory, shared by the processes of
+    the server, keyed by their location and digest, so that updated assets are never served
+    from a stale copy.
+
+    The total size of the files is bounded by evicting the least recently used ones. Files
+    are written to temporary files which are then renamed, so they are never read partially
+    written.
+    """
+    TEMP_PREFIX = '.tmp-'
+    # Temporary files older than this (in seconds) were left by interrupted writes.
+    TEMP_FILE_MAX_AGE = 60 * 60
+    # How often (in seconds) to measure the size of the directory, which other processes also write to.
+    SCAN_INTERVAL = 60
+    # When evicting files, evict down to this fraction of the maximum size, so as not to evict on every write.
+    EVICTION_TARGET = 0.9
+
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._size = None
+        self._last_scan = 0
+
+    def get_path(self, location, digest):
+        """
+        Returns the path of the file in which the asset at location with the given digest is cached.
+        """
+        name = hashlib.sha1(unicode(location).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, name[:2], u'{}-{}'.format(name, digest))
+
+    def get(self, location, digest):
+        """
+        Returns the path of the cached file of the asset at location with the given digest,
+        marking it as recently used, or None if it isn't cached.
+        """
+        path = self.get_path(location, digest)
+        try:
+            os.utime(path, None)
+        except OSError:
+            return None
+        return path
+
+    def set(self, location, digest, chunks):
+        """
+        Caches the asset at location with the given digest and data chunks, and returns the
+        path of its file.
+        """
+        path = self.get_path(location, digest)
+        try:
+            os.makedirs(os.path.dirname(path))
+        except OSError as exception:
+            if exception.errno != errno.EEXIST:
+                raise
+
+        file_descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=self.TEMP_PREFIX)
+        size = 0
+        try:
+            with os.fdopen(file_descriptor, 'wb') as temp_file:
+                for chunk in chunks:
+                    temp_file.write(chunk)
+                    size += len(chunk)
+            os.rename(temp_path, path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+        with self._lock:
+            if self._size is None or time.time() - self._last_scan > self.SCAN_INTERVAL:
+                self._evict()
+            else:
+                self._size += size
+                if self._size > self.max_size:
+                    self._evict()
+        return path
+
+    def relative_path(self, path):
+        """
+        Returns the given path of a cached file relative to the cache's directory.
+        """
+        return os.path.relpath(path, self.directory)
+
+    def _evict(self):
+        """
+        Measures the size of the cached files, and removes the least recently used ones if it
+        exceeds the maximum size.
+        """
+        now = time.time()
+        files = []
+        for dirpath, __, filenames in os.walk(self.directory):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                    if filename.startswith(self.TEMP_PREFIX):
+                        if now - stat.st_mtime > self.TEMP_FILE_MAX_AGE:
+                            os.remove(path)
+                        continue
+                except OSError:
+                    # removed by another process meanwhile
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        size = sum(file_size for __, file_size, __ in files)
+        if size > self.max_size:
+            files.sort()
+            for __, file_size, path in files:
+                if size <= self.max_size * self.EVICTION_TARGET:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                size -= file_size
+
+        self._size = size
+        self._last_scan = now
+
+
+_DISK_ASSET_CACHES = {}
+
+
+def get_disk_asset_cache():
+    """
+    Returns the configured DiskAssetCache, or None if there's none.
+    """
+    directory = getattr(settings, 'CONTENTSERVER_DISK_CACHE_DIR', None)
+    if not directory:
+        return None
+    max_size = getattr(settings, 'CONTENTSERVER_DISK_CACHE_MAX_SIZE', 1024 * 1024 * 1024)
+    if (directory, max_size) not in _DISK_ASSET_CACHES:
+        _DISK_ASSET_CACHES[(directory, max_size)] = DiskAssetCache(directory, max_size)
+    return _DISK_ASSET_CACHES[(directory, max_size)]
+
+
+def get_disk_cached_content(content):
+    """
+    Returns the given content (a StaticContentStream) read from the local disk cache, after
+    copying it there if it's a miss, or the content itself if it can't be cached on disk.
+
+    A miss is copied before the content is served, so assets bigger than
+    CONTENTSERVER_DISK_CACHE_MAX_FILE_SIZE (typically videos, often requested by range) are
+    streamed from GridFS rather than copied whole in the request.
+    """
+    disk_cache = get_disk_asset_cache()
+    digest = getattr(content, 'content_digest', None)
+    max_file_size = getattr(settings, 'CONTENTSERVER_DISK_CACHE_MAX_FILE_SIZE', 50 * 1024 * 1024)
+    if disk_cache is None or not digest or content.length is None:
+        return content
+    if content.length > disk_cache.max_size or (max_file_size is not None and content.length > max_file_size):
+        return content
+
+    try:
+        path = disk_cache.get(content.location, digest)
+        if path is None:
+            path = disk_cache.set(content.location, digest, content.stream_data(content.chunk_size))
+        disk_cached_content = DiskCachedContent(content, path)
+    except (IOError, OSError):
+        # The content may have been partially read, so reopen it.
+        log.exception(u'Could not cache %s in %s', unicode(content.location), disk_cache.directory)
+        content.close()
+        return AssetManager.find(content.location, as_stream=True)
+
+    content.close()
+    return disk_cached_content
@@ -2,26 +2,33 @@
 Middleware to serve assets.
 """
 
+import calendar
 import logging
 import datetime
+from urllib import quote
+from uuid import uuid4
 log = logging.getLogger(__name__)
 try:
     import newrelic.agent
 except ImportError:
     newrelic = None  # pylint: disable=invalid-name
+from django.conf import settings
 from django.http import (
-    HttpResponse, HttpResponseNotModified, HttpResponseForbidden,
-    HttpResponseBadRequest, HttpResponseNotFound, HttpResponsePermanentRedirect)
+    FileResponse, HttpResponse, HttpResponseNotModified, HttpResponseForbidden,
+    HttpResponseBadRequest, HttpResponseNotFound, HttpResponsePermanentRedirect, StreamingHttpResponse)
+from django.utils.http import parse_etags, parse_http_date_safe
 from six import text_type
 from student.models import CourseEnrollment
 
 from xmodule.assetstore.assetmgr import AssetManager
-from xmodule.contentstore.content import StaticContent, XASSET_LOCATION_TAG
+from xmodule.contentstore.content import StaticContent, StaticContentStream, XASSET_LOCATION_TAG
 from xmodule.modulestore import InvalidLocationError
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.locator import AssetLocator
 from openedx.core.djangoapps.header_control import force_header_for_response
-from .caching import get_cached_content, set_cached_content
+from .caching import (
+    DiskCachedContent, get_cached_content, get_disk_asset_cache, get_disk_cached_content, set_cached_content
+)
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.exceptions import NotFoundError
 
@@ -32,6 +39,13 @@ from .models import CourseAssetCacheTtlConfig, CdnUserAgentsConfig
 
 HTTP_DATE_FORMAT = "%a, %d %b %Y %H:%M:%S GMT"
 
+# Assets smaller than this (in bytes) are cached in memory.
+MAX_CACHED_CONTENT_SIZE = 1048576
+
+# Requests for more ranges than this get the full content instead, as a multipart
+# response with many small parts costs more than it saves.
+MAX_RANGES = 20
+
 
 class StaticContentServer(object):
     """
@@ -69,10 +83,15 @@ class StaticContentServer(object):
                 return HttpResponseBadRequest()
 
             # Attempt to load the asset to make sure it exists, and grab the asset digest
-            # if we're able to load it.
+            # if we're able to load it. Conditional requests can often be answered with
+            # a 304 from the asset's attributes alone, so its file is only opened if needed.
             actual_digest = None
+            is_conditional = self.is_conditional_request(request)
             try:
-                content = self.load_asset_from_location(loc)
+                if is_conditional:
+                    content = self.load_asset_metadata_from_location(loc)
+                else:
+                    content = self.load_asset_from_location(loc)
                 actual_digest = getattr(content, "content_digest", None)
             except (ItemNotFoundError, NotFoundError):
                 return HttpResponseNotFound()
@@ -109,11 +128,13 @@ class StaticContentServer(object):
 
             # Figure out if the client sent us a conditional request, and let them know
             # if this asset has changed since then.
-            last_modified_at_str = content.last_modified_at.strftime(HTTP_DATE_FORMAT)
-            if 'HTTP_IF_MODIFIED_SINCE' in request.META:
-                if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
-                if if_modified_since == last_modified_at_str:
-                    return HttpResponseNotModified()
+            if is_conditional:
+                if self.is_not_modified(request, content):
+                    response = HttpResponseNotModified()
+                    self.set_caching_headers(content, response)
+                    return response
+                if content.data is None:
+                    content = self.load_asset_from_location(loc)
 
             # *** File streaming within a byte range ***
             # If a Range is provided, parse Range attribute of the request
@@ -122,11 +143,10 @@ class StaticContentServer(object):
             # Response -> Content-Range attribute structure: "Content-Range: bytes first-last/totalLength"
             # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.35
             response = None
-            if request.META.get('HTTP_RANGE'):
-                # If we have a StaticContent, get a StaticContentStream.  Can't manipulate the bytes otherwise.
-                if isinstance(content, StaticContent):
-                    content = AssetManager.find(loc, as_stream=True)
-
+            content_type = content.content_type
+            if isinstance(content, DiskCachedContent):
+                response = self.get_disk_cached_response(request, content)
+            if response is None and request.META.get('HTTP_RANGE'):
                 header_value = request.META['HTTP_RANGE']
                 try:
                     unit, ranges = parse_range_header(header_value, content.length)
@@ -136,40 +156,56 @@ class StaticContentServer(object):
                         u"%s in Range header: %s for content: %s", text_type(exception), header_value, unicode(loc)
                     )
                 else:
+                    # Unsatisfiable ranges are ignored, unless none of the ranges are satisfiable.
+                    satisfiable_ranges = [
+                        (first, last) for first, last in ranges if 0 <= first <= last < content.length
+                    ]
                     if unit != 'bytes':
                         # Only accept ranges in bytes
                         log.warning(u"Unknown unit in Range header: %s for content: %s", header_value, text_type(loc))
-                    elif len(ranges) > 1:
-                        # According to Http/1.1 spec content for multiple ranges should be sent as a multipart message.
-                        # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
-                        # But we send back the full content.
+                    elif not satisfiable_ranges:
+                        log.warning(
+                            u"Cannot satisfy ranges in Range header: %s for content: %s",
+                            header_value, text_type(loc)
+                        )
+                        return HttpResponse(status=416)  # Requested Range Not Satisfiable
+                    elif len(satisfiable_ranges) > MAX_RANGES:
+                        # We send back the full content.
                         log.warning(
-                            u"More than 1 ranges in Range header: %s for content: %s", header_value, text_type(loc)
+                            u"More than %d ranges in Range header: %s for content: %s",
+                            MAX_RANGES, header_value, text_type(loc)
+                        )
+                    elif len(satisfiable_ranges) == 1:
+                        first, last = satisfiable_ranges[0]
+                        response = self.make_response(content, self.get_data_in_range(content, first, last))
+                        response['Content-Range'] = 'bytes {first}-{last}/{length}'.format(
+                            first=first, last=last, length=content.length
                         )
+                        response['Content-Length'] = str(last - first + 1)
+                        response.status_code = 206  # Partial Content
+
+                        if newrelic:
+                            newrelic.agent.add_custom_parameter('contentserver.ranged', True)
                     else:
-                        first, last = ranges[0]
-
-                        if 0 <= first <= last < content.length:
-                            # If the byte range is satisfiable
-                            response = HttpResponse(content.stream_data_in_range(first, last))
-                            response['Content-Range'] = 'bytes {first}-{last}/{length}'.format(
-                                first=first, last=last, length=content.length
-                            )
-                            response['Content-Length'] = str(last - first + 1)
-                            response.status_code = 206  # Partial Content
-
-                            if newrelic:
-                                newrelic.agent.add_custom_parameter('contentserver.ranged', True)
-                        else:
-                            log.warning(
-                                u"Cannot satisfy ranges in Range header: %s for content: %s",
-                                header_value, text_type(loc)
-                            )
-                            return HttpResponse(status=416)  # Requested Range Not Satisfiable
+                        # According to Http/1.1 spec content for multiple ranges should be sent as a multipart message.
+                        # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
+                        boundary = uuid4().hex
+                        parts, length = self.get_multipart_byteranges(content, satisfiable_ranges, boundary)
+                        response = self.make_response(content, parts)
+                        response['Content-Length'] = str(length)
+                        response.status_code = 206  # Partial Content
+                        content_type = 'multipart/byteranges; boundary={}'.format(boundary)
+
+                        if newrelic:
+                            newrelic.agent.add_custom_parameter('contentserver.ranged', True)
 
             # If Range header is absent or syntactically invalid return a full content response.
             if response is None:
-                response = HttpResponse(content.stream_data())
+                if isinstance(content, StaticContentStream):
+                    data = content.stream_data(self.get_stream_chunk_size(content))
+                else:
+                    data = content.stream_data()
+                response = self.make_response(content, data)
                 response['Content-Length'] = content.length
 
             if newrelic:
@@ -178,7 +214,7 @@ class StaticContentServer(object):
 
             # "Accept-Ranges: bytes" tells the user that only "bytes" ranges are allowed
             response['Accept-Ranges'] = 'bytes'
-            response['Content-Type'] = content.content_type
+            response['Content-Type'] = content_type
             response['X-Frame-Options'] = 'ALLOW'
 
             # Set any caching headers, and do any response cleanup needed.  Based on how much
@@ -215,6 +251,9 @@ class StaticContentServer(object):
             response['Cache-Control'] = "private, no-cache, no-store"
 
         response['Last-Modified'] = content.last_modified_at.strftime(HTTP_DATE_FORMAT)
+        etag = StaticContentServer.get_etag(content)
+        if etag is not None:
+            response['ETag'] = etag
 
         # Force the Vary header to only vary responses on Origin, so that XHR and browser requests get cached
         # separately and don't screw over one another. i.e. a browser request that doesn't send Origin, and
@@ -268,6 +307,144 @@ class StaticContentServer(object):
 
         return True
 
+    @staticmethod
+    def get_etag(content):
+        """
+        Returns the ETag of the given content, based on its digest, or None if it has no digest.
+        """
+        digest = getattr(content, "content_digest", None)
+        if not digest:
+            return None
+        return '"{}"'.format(digest)
+
+    @staticmethod
+    def is_conditional_request(request):
+        """
+        Determines whether the given request is conditional on the asset having been modified.
+        """
+        return 'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META
+
+    def is_not_modified(self, request, content):
+        """
+        Determines whether the client that sent the given conditional request already has
+        the current version of the content.
+
+        If-None-Match takes precedence over If-Modified-Since, as per
+        https://tools.ietf.org/html/rfc7232#section-6
+        """
+        if 'HTTP_IF_NONE_MATCH' in request.META:
+            etag = self.get_etag(content)
+            if etag is None:
+                return False
+            # ETags are compared weakly, ignoring their W/ prefix.
+            etags = [requested_etag[2:] if requested_etag.startswith('W/') else requested_etag
+                     for requested_etag in parse_etags(request.META['HTTP_IF_NONE_MATCH'])]
+            return '*' in etags or etag in etags
+
+        if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
+        if if_modified_since == content.last_modified_at.strftime(HTTP_DATE_FORMAT):
+            return True
+        if_modified_since = parse_http_date_safe(if_modified_since)
+        return (
+            if_modified_since is not None and
+            calendar.timegm(content.last_modified_at.utctimetuple()) <= if_modified_since
+        )
+
+    @staticmethod
+    def get_stream_chunk_size(content):
+        """
+        Returns the size of the chunks in which to stream the given StaticContentStream.
+        """
+        return getattr(settings, 'CONTENTSERVER_STREAM_CHUNK_SIZE', None) or content.chunk_size
+
+    def get_data_in_range(self, content, first, last):
+        """
+        Returns an iterable over the data of the given content between first and last (included).
+        """
+        if isinstance(content, StaticContentStream):
+            return content.stream_data_in_range(first, last, self.get_stream_chunk_size(content))
+        return [content.data[first:last + 1]]
+
+    def get_multipart_byteranges(self, content, ranges, boundary):
+        """
+        Returns an iterable over the body of a multipart/byteranges response for the given
+        ranges of the content, and its length.
+
+        See https://tools.ietf.org/html/rfc7233#appendix-A
+        """
+        part_headers = [
+            (
+                u'\r\n--{boundary}\r\n'
+                u'Content-Type: {content_type}\r\n'
+                u'Content-Range: bytes {first}-{last}/{length}\r\n\r\n'
+            ).format(
+                boundary=boundary, content_type=content.content_type, first=first, last=last, length=content.length
+            ).encode('utf-8')
+            for first, last in ranges
+        ]
+        closing = u'\r\n--{boundary}--\r\n'.format(boundary=boundary).encode('utf-8')
+        length = sum(len(part_header) for part_header in part_headers) + len(closing) + sum(
+            last - first + 1 for first, last in ranges
+        )
+
+        def _parts():
+            """
+            Yields the chunks of the body.
+            """
+            for part_header, (first, last) in zip(part_headers, ranges):
+                yield part_header
+                for chunk in self.get_data_in_range(content, first, last):
+                    yield chunk
+            yield closing
+
+        return _parts(), length
+
+    def make_response(self, content, data):
+        """
+        Returns a response with the given data of the content: a streaming response that
+        closes the content's stream when it's done, if the content isn't in memory.
+        """
+        if isinstance(content, StaticContentStream):
+            response = StreamingHttpResponse(_stream_and_close(content, data))
+        else:
+            response = HttpResponse(data)
+        return response
+
+    def get_disk_cached_response(self, request, content):
+        """
+        Returns a response for the given content from the local disk cache, served by the web
+        server via X-Accel-Redirect if it's configured to, or else, for non-ranged requests,
+        as a file which the WSGI server may send with sendfile. Returns None for ranged requests
+        which the app has to serve.
+        """
+        accel_redirect_prefix = getattr(settings, 'CONTENTSERVER_DISK_CACHE_ACCEL_REDIRECT_PREFIX', None)
+        if accel_redirect_prefix:
+            # The web server serves the file, and any ranges of it.
+            content.close()
+            response = HttpResponse()
+            response['X-Accel-Redirect'] = u'{}/{}'.format(
+                accel_redirect_prefix.rstrip('/'),
+                quote(get_disk_asset_cache().relative_path(content.path).encode('utf-8')),
+            )
+            return response
+
+        if not request.META.get('HTTP_RANGE'):
+            response = FileResponse(content.file)
+            response.block_size = content.chunk_size
+            response['Content-Length'] = content.length
+            return response
+
+        return None
+
+    def load_asset_metadata_from_location(self, location):
+        """
+        Loads an asset from the cache if it's there, or else only its attributes, without its data.
+        """
+        content = get_cached_content(location)
+        if content is None:
+            content = AssetManager.find_metadata(location)
+        return content
+
     def load_asset_from_location(self, location):
         """
         Loads an asset based on its location, either retrieving it from a cache
@@ -285,14 +462,28 @@ class StaticContentServer(object):
 
             # Now that we fetched it, let's go ahead and try to cache it. We cap this at 1MB
             # because it's the default for memcached and also we don't want to do too much
-            # buffering in memory when we're serving an actual request.
-            if content.length is not None and content.length < 1048576:
+            # buffering in memory when we're serving an actual request. Bigger assets can be
+            # cached on local disk instead.
+            if content.length is not None and content.length < MAX_CACHED_CONTENT_SIZE:
                 content = content.copy_to_in_mem()
                 set_cached_content(content)
+            else:
+                content = get_disk_cached_content(content)
 
         return content
 
 
+def _stream_and_close(content, data):
+    """
+    Yields the given data of the content, then closes the content's stream.
+    """
+    try:
+        for chunk in data:
+            yield chunk
+    finally:
+        content.close()
+
+
 def parse_range_header(header_value, content_length):
     """
     Returns the unit and a list of (start, end) tuples of ranges.
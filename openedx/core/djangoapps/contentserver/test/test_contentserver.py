@@ -1,12 +1,16 @@
 """
 Tests for StaticContentServer
 """
+import contextlib
 import copy
 
 import datetime
 import ddt
 import logging
+import os
+import shutil
 import unittest
+from tempfile import mkdtemp
 from uuid import uuid4
 
 from django.conf import settings
@@ -27,7 +31,8 @@ from xmodule.modulestore.exceptions import ItemNotFoundError
 from student.models import CourseEnrollment
 from student.tests.factories import UserFactory, AdminFactory
 
-from ..middleware import parse_range_header, HTTP_DATE_FORMAT, StaticContentServer
+from ..caching import DiskAssetCache
+from ..middleware import parse_range_header, HTTP_DATE_FORMAT, MAX_RANGES, StaticContentServer
 
 log = logging.getLogger(__name__)
 
@@ -242,17 +247,149 @@ class ContentStoreToyCourseTest(SharedModuleStoreTestCase):
 
     def test_range_request_multiple_ranges(self):
         """
-        Test that multiple ranges in request outputs the full content.
+        Test that multiple ranges in request outputs a multipart message with the content of each range.
         """
         first_byte = self.length_unlocked / 4
         last_byte = self.length_unlocked / 2
         resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={first}-{last}, -100'.format(
             first=first_byte, last=last_byte))
 
+        self.assertEqual(resp.status_code, 206)  # HTTP_206_PARTIAL_CONTENT
+        self.assertNotIn('Content-Range', resp)
+        self.assertTrue(resp['Content-Type'].startswith('multipart/byteranges; boundary='))
+        self.assertEqual(resp['Content-Length'], str(len(resp.content)))
+
+        data = self.contentstore.find(self.unlocked_asset).data
+        for first, last in ((first_byte, last_byte), (self.length_unlocked - 100, self.length_unlocked - 1)):
+            self.assertIn(
+                'Content-Range: bytes {first}-{last}/{length}\r\n\r\n{data}\r\n'.format(
+                    first=first, last=last, length=self.length_unlocked, data=data[first:last + 1]
+                ),
+                resp.content
+            )
+
+    def test_range_request_too_many_ranges(self):
+        """
+        Test that a request for more than MAX_RANGES ranges outputs the full content.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={}'.format(
+            ', '.join('{0}-{0}'.format(byte) for byte in range(MAX_RANGES + 1))
+        ))
+
         self.assertEqual(resp.status_code, 200)
         self.assertNotIn('Content-Range', resp)
         self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
 
+    def test_range_request_streamed(self):
+        """
+        Test that range requests for assets which aren't loaded in memory are streamed.
+        """
+        with patch.object(
+            StaticContentServer, 'load_asset_from_location',
+            side_effect=lambda location: AssetManager.find(location, as_stream=True)
+        ):
+            resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=1-10')
+
+        self.assertEqual(resp.status_code, 206)  # HTTP_206_PARTIAL_CONTENT
+        self.assertTrue(resp.streaming)
+        data = self.contentstore.find(self.unlocked_asset).data
+        self.assertEqual(''.join(resp.streaming_content), data[1:11])
+
+    @contextlib.contextmanager
+    def _disk_cache_settings(self, **kwargs):
+        """
+        Context manager in which uncached assets are cached in a temporary directory.
+        """
+        directory = mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with override_settings(CONTENTSERVER_DISK_CACHE_DIR=directory, **kwargs):
+            with patch('openedx.core.djangoapps.contentserver.middleware.MAX_CACHED_CONTENT_SIZE', 0):
+                with patch('openedx.core.djangoapps.contentserver.middleware.get_cached_content', return_value=None):
+                    yield
+
+    def test_disk_cached_asset(self):
+        """
+        Test that assets too big for the cache are served from the local disk cache.
+        """
+        data = self.contentstore.find(self.unlocked_asset).data
+        with self._disk_cache_settings():
+            resp = self.client.get(self.url_unlocked)
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(''.join(resp.streaming_content), data)
+            self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
+
+            with patch.object(DiskAssetCache, 'set') as mock_set:
+                resp = self.client.get(self.url_unlocked)
+                self.assertEqual(''.join(resp.streaming_content), data)
+
+                resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=1-10')
+                self.assertEqual(resp.status_code, 206)  # HTTP_206_PARTIAL_CONTENT
+                self.assertEqual(''.join(resp.streaming_content), data[1:11])
+            self.assertFalse(mock_set.called)
+
+    def test_asset_too_big_for_disk_cache(self):
+        """
+        Test that assets bigger than the maximum file size of the local disk cache are served
+        without being copied there.
+        """
+        data = self.contentstore.find(self.unlocked_asset).data
+        with self._disk_cache_settings(CONTENTSERVER_DISK_CACHE_MAX_FILE_SIZE=self.length_unlocked - 1):
+            with patch.object(DiskAssetCache, 'set') as mock_set:
+                resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=1-10')
+                self.assertEqual(resp.status_code, 206)  # HTTP_206_PARTIAL_CONTENT
+                self.assertEqual(''.join(resp.streaming_content), data[1:11])
+            self.assertFalse(mock_set.called)
+
+    def test_disk_cached_asset_accel_redirect(self):
+        """
+        Test that assets in the local disk cache are sent by the web server, if it's configured to.
+        """
+        with self._disk_cache_settings(CONTENTSERVER_DISK_CACHE_ACCEL_REDIRECT_PREFIX='/protected/assets/'):
+            resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=1-10')
+            directory = settings.CONTENTSERVER_DISK_CACHE_DIR
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.content, '')
+        self.assertNotIn('Content-Range', resp)
+        self.assertTrue(resp['X-Accel-Redirect'].startswith('/protected/assets/'))
+        with open(os.path.join(directory, resp['X-Accel-Redirect'][len('/protected/assets/'):]), 'rb') as cached_file:
+            self.assertEqual(cached_file.read(), self.contentstore.find(self.unlocked_asset).data)
+
+    def test_etag_header_sent(self):
+        """
+        Test that the digest of assets is sent as their ETag.
+        """
+        resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(
+            resp['ETag'], '"{}"'.format(self.contentstore.get_attr(self.unlocked_asset, 'md5'))
+        )
+
+    @ddt.data(
+        ('HTTP_IF_NONE_MATCH', '"{md5}"', 304),
+        ('HTTP_IF_NONE_MATCH', 'W/"{md5}"', 304),
+        ('HTTP_IF_NONE_MATCH', '"other", "{md5}"', 304),
+        ('HTTP_IF_NONE_MATCH', '"other"', 200),
+        ('HTTP_IF_MODIFIED_SINCE', '{last_modified}', 304),
+        ('HTTP_IF_MODIFIED_SINCE', 'Thu, 01 Jan 1970 00:00:00 GMT', 200),
+    )
+    @ddt.unpack
+    def test_conditional_request(self, header, value, status_code):
+        """
+        Test that conditional requests are answered with 304 Not Modified without
+        opening the asset's file, if the client has the current version of the asset.
+        """
+        attrs = self.contentstore.get_attrs(self.unlocked_asset)
+        value = value.format(md5=attrs['md5'], last_modified=attrs['uploadDate'].strftime(HTTP_DATE_FORMAT))
+        with patch('openedx.core.djangoapps.contentserver.middleware.get_cached_content', return_value=None):
+            with patch.object(
+                StaticContentServer, 'load_asset_from_location', wraps=StaticContentServer().load_asset_from_location
+            ) as mock_load:
+                resp = self.client.get(self.url_unlocked, **{header: value})
+
+        self.assertEqual(resp.status_code, status_code)
+        self.assertEqual(mock_load.called, status_code == 200)
+
     @ddt.data(
         'bytes 0-',
         'bits=0-',